@@ -0,0 +1,313 @@
+import sqlite3
+import json
+import re
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+
+# [증거 기반] 가비아 서버 실제 구조 준수
+# DB 경로: ~/db/sammi.db / 테이블: documents / 식별자: doc_id / 자재데이터: materials (JSON)
+#
+# 스트리밍 DB 유지보수 엔진
+# - doc_id 키셋 페이지네이션으로 chunk 단위 조회 (fetchall 금지 → 메모리 상한 = chunk 크기)
+# - chunk 마다 짧은 쓰기 트랜잭션 + 커밋 (라이브 API 잠금 최소화)
+# - 읽은 materials 와 같을 때만 덮어씀 (compare-and-set) → 그사이 API 저장분은 건너뜀
+# - 체크포인트 파일로 중단 지점부터 재개
+# - SQLite 온라인 백업 API로 백업 (라이브 DB 복사 중에도 일관된 스냅샷)
+# - material 단위 변환 함수를 플러그인으로 교체 가능
+
+DEFAULT_DB_PATH = os.path.expanduser("~/db/sammi.db")
+if not os.path.exists(DEFAULT_DB_PATH):
+    DEFAULT_DB_PATH = "sammi.db"
+
+
+# ─────────────────────────────────────────
+# material 변환 (플러그인)
+# ─────────────────────────────────────────
+# 변환 함수 시그니처: transform(material: dict) -> int (수정한 필드 수, 0이면 변경 없음)
+# 반드시 멱등이어야 함 (체크포인트 재개 시 같은 chunk가 다시 처리될 수 있음)
+
+def fix_pillar_id(part_id):
+    if not part_id or not isinstance(part_id, str):
+        return part_id
+
+    # 1. 증거 기반: 모든 공백 제거 (DB 매칭용)
+    fixed = re.sub(r'\s+', '', part_id)
+
+    # 2. 증거 기반: 하이랙 기둥 규격 내 깊이(D) 삭제
+    # 사이즈{폭}x{깊이}높이{높이} -> 사이즈{폭}x높이{높이}
+    # 예: 하이랙-기둥...-사이즈60x108높이200270kg -> 하이랙-기둥...-사이즈60x높이200270kg
+    fixed = re.sub(r'사이즈(\d+)x\d+높이', r'사이즈\1x높이', fixed)
+
+    # 3. '높이' 키워드 누락 케이스 대응 (사이즈60x108200 -> 사이즈60x높이200)
+    fixed = re.sub(r'사이즈(\d+)x\d+(\d{3})', r'사이즈\1x높이\2', fixed)
+
+    return fixed
+
+
+def highrack_pillar_id_transform(item):
+    """하이랙 기둥의 inventoryPartId / _inventoryPartId / _inventoryList[] 정규화."""
+    # 하이랙 기둥일 때만 핀포인트 작업 수행 (절대 다른 자재 침범 금지)
+    if item.get('rackType') != '하이랙' or item.get('name') != '기둥':
+        return 0
+
+    changed = 0
+    for field in ('inventoryPartId', '_inventoryPartId'):
+        orig = item.get(field)
+        if orig:
+            updated = fix_pillar_id(orig)
+            if orig != updated:
+                item[field] = updated
+                changed += 1
+
+    # _inventoryList 배열 내부도 동일하게 수정
+    for inv_item in item.get('_inventoryList', []) or []:
+        orig_vid = inv_item.get('inventoryPartId')
+        if orig_vid:
+            updated_vid = fix_pillar_id(orig_vid)
+            if orig_vid != updated_vid:
+                inv_item['inventoryPartId'] = updated_vid
+                changed += 1
+    return changed
+
+
+TRANSFORMS = {
+    "pillar-id": highrack_pillar_id_transform,
+}
+
+
+# ─────────────────────────────────────────
+# 백업 (SQLite Online Backup API)
+# ─────────────────────────────────────────
+def backup_database(db_path, backup_path=None, pages=256, sleep=0.01):
+    """
+    sqlite3 Connection.backup 으로 라이브 DB를 페이지 단위로 복사합니다.
+    shutil.copy2 와 달리 WAL 에 남은 변경분까지 일관된 스냅샷으로 저장되며,
+    복사 중에도 API 쓰기가 장시간 막히지 않습니다.
+    """
+    if backup_path is None:
+        backup_path = f"{db_path}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    src = sqlite3.connect(db_path)
+    dst = sqlite3.connect(backup_path)
+    try:
+        src.backup(dst, pages=pages, sleep=sleep)
+    finally:
+        dst.close()
+        src.close()
+    return backup_path
+
+
+# ─────────────────────────────────────────
+# 체크포인트
+# ─────────────────────────────────────────
+def _read_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_checkpoint(path, state):
+    # 임시 파일에 쓴 뒤 교체 → 중간에 죽어도 체크포인트가 깨지지 않음
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ─────────────────────────────────────────
+# 엔진
+# ─────────────────────────────────────────
+class MaterialsMaintenance:
+    """
+    documents.materials JSON 을 chunk 단위로 스트리밍하며 변환 함수를 적용합니다.
+
+    사용 예:
+        engine = MaterialsMaintenance(DB_PATH, [highrack_pillar_id_transform])
+        stats = engine.run()
+    """
+
+    def __init__(self, db_path, transforms, chunk_size=200, checkpoint_path=None,
+                 job_name=None, dry_run=False, busy_timeout_ms=5000, pause=0.0):
+        self.db_path = db_path
+        self.transforms = list(transforms)
+        self.chunk_size = max(1, int(chunk_size))
+        self.job_name = job_name or "+".join(getattr(t, "__name__", "transform") for t in self.transforms)
+        self.checkpoint_path = checkpoint_path or f"{db_path}.{self.job_name}.checkpoint.json"
+        self.dry_run = dry_run
+        self.busy_timeout_ms = busy_timeout_ms
+        self.pause = pause  # chunk 사이 대기(초) - 라이브 API 에 쓰기 기회 양보
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000.0,
+                               isolation_level=None)
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        return conn
+
+    def _fetch_chunk(self, conn, after_key):
+        cursor = conn.execute(
+            "SELECT doc_id, materials FROM documents"
+            " WHERE materials IS NOT NULL AND doc_id > ?"
+            " ORDER BY doc_id LIMIT ?",
+            (after_key, self.chunk_size),
+        )
+        while True:
+            rows = cursor.fetchmany(64)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+
+    def _apply(self, materials):
+        fixed = 0
+        for item in materials:
+            if not isinstance(item, dict):
+                continue
+            for transform in self.transforms:
+                fixed += transform(item) or 0
+        return fixed
+
+    def run(self, restart=False, limit_chunks=None, progress=print):
+        state = None if restart else _read_checkpoint(self.checkpoint_path)
+        db_path = os.path.abspath(self.db_path)
+        # 다른 DB 의 체크포인트로 재개하면 last_key 이전 문서를 통째로 건너뜀 → 거부
+        if state and not state.get("done") and state.get("db_path") != db_path:
+            raise ValueError(
+                f"체크포인트 DB 불일치: {state.get('db_path')} != {db_path} "
+                f"({self.checkpoint_path}, 처음부터 하려면 --restart)"
+            )
+        # 완료된 체크포인트는 재개 대상이 아님 → 새로 처음부터 (증가한 DB 전체 재검사)
+        if not state or state.get("done"):
+            state = {
+                "job": self.job_name,
+                "db_path": db_path,
+                "last_key": "",
+                "scanned": 0,
+                "updated_docs": 0,
+                "skipped_docs": 0,
+                "fixed_fields": 0,
+                "started_at": datetime.now().isoformat(),
+                "done": False,
+            }
+        elif state.get("last_key"):
+            progress(f"[RESUME] {state['last_key']} 이후부터 재개 (처리 {state['scanned']}건)")
+
+        conn = self._connect()
+        chunks = 0
+        try:
+            while True:
+                updates = []
+                last_key = None
+                count = 0
+                for doc_id, materials_json in self._fetch_chunk(conn, state["last_key"]):
+                    count += 1
+                    last_key = doc_id
+                    try:
+                        materials = json.loads(materials_json)
+                    except (json.JSONDecodeError, TypeError):
+                        continue
+                    if not isinstance(materials, list):
+                        continue
+                    fixed = self._apply(materials)
+                    if fixed:
+                        updates.append((json.dumps(materials, ensure_ascii=False), doc_id, materials_json, fixed))
+
+                if count == 0:
+                    state["done"] = True
+                    state["finished_at"] = datetime.now().isoformat()
+                    if not self.dry_run:
+                        _write_checkpoint(self.checkpoint_path, state)
+                    break
+
+                if updates and not self.dry_run:
+                    # chunk 단위 짧은 쓰기 트랜잭션
+                    # 조회는 트랜잭션 밖이라 그사이 API 가 문서를 저장했을 수 있음
+                    # → 읽은 값 그대로일 때만 갱신, 바뀐 문서는 건너뜀 (다음 실행에서 다시 검사)
+                    applied = []
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        for new_json, doc_id, old_json, fixed in updates:
+                            cur = conn.execute(
+                                "UPDATE documents SET materials = ? WHERE doc_id = ? AND materials = ?",
+                                (new_json, doc_id, old_json),
+                            )
+                            if cur.rowcount:
+                                applied.append(fixed)
+                        conn.execute("COMMIT")
+                    except Exception:
+                        conn.execute("ROLLBACK")
+                        raise
+                else:
+                    applied = [u[3] for u in updates]
+
+                state["scanned"] += count
+                state["updated_docs"] += len(applied)
+                state["fixed_fields"] += sum(applied)
+                state["skipped_docs"] = state.get("skipped_docs", 0) + len(updates) - len(applied)
+                state["last_key"] = last_key
+                if not self.dry_run:
+                    _write_checkpoint(self.checkpoint_path, state)
+                chunks += 1
+                progress(f"  chunk {chunks}: ~{last_key} | 누적 스캔 {state['scanned']} / 수정 {state['updated_docs']}"
+                         f" / 충돌 건너뜀 {state['skipped_docs']}")
+
+                if limit_chunks and chunks >= limit_chunks:
+                    break
+                if self.pause:
+                    time.sleep(self.pause)
+        finally:
+            conn.close()
+        return state
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="sammi.db documents.materials 스트리밍 유지보수")
+    p.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite DB 경로")
+    p.add_argument("--transform", action="append", choices=sorted(TRANSFORMS),
+                   help="적용할 변환 (여러 번 지정 가능, 기본: pillar-id)")
+    p.add_argument("--chunk-size", type=int, default=200, help="chunk 당 문서 수")
+    p.add_argument("--pause", type=float, default=0.0, help="chunk 사이 대기 초")
+    p.add_argument("--restart", action="store_true", help="미완료 체크포인트 무시하고 처음부터")
+    p.add_argument("--no-backup", action="store_true", help="온라인 백업 생략")
+    p.add_argument("--dry-run", action="store_true", help="변경 건수만 계산 (쓰기/체크포인트 없음)")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not os.path.exists(args.db):
+        print(f"Error: DB not found at {args.db}")
+        return 1
+    names = args.transform or ["pillar-id"]
+    engine = MaterialsMaintenance(
+        args.db, [TRANSFORMS[n] for n in names],
+        chunk_size=args.chunk_size, job_name="+".join(names),
+        dry_run=args.dry_run, pause=args.pause,
+    )
+    print(f"--- Sammi DB Maintenance ({engine.job_name}) ---")
+    print(f"Target: {args.db}")
+    print(f"Checkpoint: {engine.checkpoint_path}")
+    if not args.no_backup and not args.dry_run:
+        print(f"Backup: {backup_database(args.db)}")
+    try:
+        state = engine.run(restart=args.restart)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"--- {'Dry-run' if args.dry_run else 'Fix'} Complete ---")
+    print(f"Scanned Documents: {state['scanned']}")
+    print(f"Updated Documents: {state['updated_docs']}")
+    print(f"Fixed Fields: {state['fixed_fields']}")
+    print(f"Skipped (concurrent edit): {state.get('skipped_docs', 0)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,14 @@
-import sqlite3
-import json
-import re
 import os
-import shutil
+import sys
 from datetime import datetime
 
+from db_maintenance import (
+    MaterialsMaintenance,
+    backup_database,
+    fix_pillar_id,  # noqa: F401 (하위 호환: 기존 import 경로 유지)
+    highrack_pillar_id_transform,
+)
+
 # [증거 기반] 가비아 서버 실제 구조 준수
 # DB 경로: ~/db/sammi.db
 # 테이블: documents
@@ -18,24 +22,8 @@ if not os.path.exists(DB_PATH):
 
 BACKUP_PATH = f"{DB_PATH}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
 
-def fix_pillar_id(part_id):
-    if not part_id or not isinstance(part_id, str):
-        return part_id
-    
-    # 1. 증거 기반: 모든 공백 제거 (DB 매칭용)
-    fixed = re.sub(r'\s+', '', part_id)
-    
-    # 2. 증거 기반: 하이랙 기둥 규격 내 깊이(D) 삭제
-    # 사이즈{폭}x{깊이}높이{높이} -> 사이즈{폭}x높이{높이}
-    # 예: 하이랙-기둥...-사이즈60x108높이200270kg -> 하이랙-기둥...-사이즈60x높이200270kg
-    fixed = re.sub(r'사이즈(\d+)x\d+높이', r'사이즈\1x높이', fixed)
-    
-    # 3. '높이' 키워드 누락 케이스 대응 (사이즈60x108200 -> 사이즈60x높이200)
-    fixed = re.sub(r'사이즈(\d+)x\d+(\d{3})', r'사이즈\1x높이\2', fixed)
-    
-    return fixed
 
-def run_fix():
+def run_fix(chunk_size=200, restart=False):
     if not os.path.exists(DB_PATH):
         print(f"Error: DB not found at {DB_PATH}")
         return
@@ -43,67 +31,24 @@ def run_fix():
     print(f"--- Sammi DB Pinpoint Fixer (High-Rack Pillar Only) ---")
     print(f"Target: {DB_PATH}")
     print(f"Backup: {BACKUP_PATH}")
-    shutil.copy2(DB_PATH, BACKUP_PATH)
-
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    backup_database(DB_PATH, BACKUP_PATH)
 
+    # chunk 단위 스트리밍 + 커밋, 체크포인트로 중단 시 재개
+    engine = MaterialsMaintenance(
+        DB_PATH, [highrack_pillar_id_transform],
+        chunk_size=chunk_size, job_name="pillar-id",
+    )
     try:
-        # [증거] 테이블명 및 컬럼명: documents, doc_id, materials
-        cursor.execute("SELECT doc_id, materials FROM documents WHERE materials IS NOT NULL")
-        rows = cursor.fetchall()
-        
-        update_count = 0
-        total_instances = 0
-
-        for doc_id, materials_json in rows:
-            try:
-                materials = json.loads(materials_json)
-                modified = False
-                
-                for item in materials:
-                    # 하이랙 기둥일 때만 핀포인트 작업 수행 (절대 다른 자재 침범 금지)
-                    if item.get('rackType') == '하이랙' and item.get('name') == '기둥':
-                        # 수정이 필요한 필드 목록
-                        fields = ['inventoryPartId', '_inventoryPartId']
-                        for field in fields:
-                            orig = item.get(field)
-                            if orig:
-                                updated = fix_pillar_id(orig)
-                                if orig != updated:
-                                    item[field] = updated
-                                    modified = True
-                                    total_instances += 1
-                        
-                        # _inventoryList 배열 내부도 동일하게 수정
-                        inv_list = item.get('_inventoryList', [])
-                        for inv_item in inv_list:
-                            orig_vid = inv_item.get('inventoryPartId')
-                            if orig_vid:
-                                updated_vid = fix_pillar_id(orig_vid)
-                                if orig_vid != updated_vid:
-                                    inv_item['inventoryPartId'] = updated_vid
-                                    modified = True
-
-                if modified:
-                    # [증거] doc_id 식별자를 사용하여 materials 컬럼 업데이트
-                    cursor.execute("UPDATE documents SET materials = ? WHERE doc_id = ?", 
-                                 (json.dumps(materials, ensure_ascii=False), doc_id))
-                    update_count += 1
-
-            except (json.JSONDecodeError, TypeError):
-                continue
-
-        conn.commit()
-        print(f"--- Fix Complete ---")
-        print(f"Updated Documents: {update_count}")
-        print(f"Fixed Pillar IDs: {total_instances}")
-
+        state = engine.run(restart=restart)
     except Exception as e:
         print(f"Processing Error: {e}")
-        conn.rollback()
-    finally:
-        conn.close()
+        print(f"체크포인트에서 재개 가능: {engine.checkpoint_path}")
+        return
+
+    print(f"--- Fix Complete ---")
+    print(f"Updated Documents: {state['updated_docs']}")
+    print(f"Fixed Pillar IDs: {state['fixed_fields']}")
+
 
 if __name__ == "__main__":
-    run_fix()
+    run_fix(restart="--restart" in sys.argv[1:])
@@ -0,0 +1,55 @@
+const zlib = require('zlib');
+
+// 응답 gzip 압축 (compression 패키지 대신 Node 내장 zlib → 서버에 npm install 불필요)
+// - Accept-Encoding 에 gzip 이 있고 본문이 threshold 바이트 이상일 때만 압축
+//   (작은 응답은 gzip 헤더/CPU 비용이 더 큼)
+// - res.json / res.send(문자열) 응답이 대상. 압축은 zlib.gzip 비동기 (콜백에서 전송)
+// - ETag 는 express 가 실제로 보내는 (압축된) 본문으로 계산
+// - 요청 본문 압축(Content-Encoding: gzip)은 express.json 이 기본으로 풀어 줌 (inflate, limit 은 푼 뒤 크기)
+const DEFAULT_THRESHOLD = 1024;
+
+function acceptsGzip(header) {
+  if (!header) return false;
+  let gzip = null;
+  let wildcard = null;
+  for (const part of String(header).toLowerCase().split(',')) {
+    const [name, ...params] = part.split(';').map(s => s.trim());
+    const qParam = params.find(p => p.startsWith('q='));
+    const q = qParam ? parseFloat(qParam.slice(2)) : 1;
+    if (name === 'gzip') gzip = q;
+    else if (name === '*') wildcard = q;
+  }
+  const q = gzip !== null ? gzip : wildcard;
+  return q !== null && q > 0;
+}
+
+function gzipResponses({ threshold = DEFAULT_THRESHOLD, level = 6 } = {}) {
+  return (req, res, next) => {
+    const send = res.send;
+    res.send = function (body) {
+      if (typeof body === 'string' && req.method !== 'HEAD' && !res.get('Content-Encoding')) {
+        res.vary('Accept-Encoding');
+        if (Buffer.byteLength(body) >= threshold && acceptsGzip(req.headers['accept-encoding'])) {
+          // 문자열일 때 send 가 붙이던 charset=utf-8 을 유지 (res.set 이 붙여 줌)
+          res.set('Content-Type', res.get('Content-Type') || 'text/html');
+          // 비동기 압축 (libuv 스레드풀) → 큰 응답을 압축하는 동안에도 이벤트 루프가 다른 요청 처리
+          // 압축 실패 시 원문 그대로 전송
+          zlib.gzip(body, { level }, (err, compressed) => {
+            if (err) {
+              console.warn('응답 gzip 실패 (원문 전송):', err.message);
+              send.call(this, body);
+              return;
+            }
+            res.set('Content-Encoding', 'gzip');
+            send.call(this, compressed);
+          });
+          return this;
+        }
+      }
+      return send.call(this, body);
+    };
+    next();
+  };
+}
+
+module.exports = { gzipResponses, acceptsGzip, DEFAULT_THRESHOLD };
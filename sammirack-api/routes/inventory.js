@@ -123,6 +123,36 @@ router.post('/deduct', async (req, res) => {
   }
 });
 
+// ✅ 문서 단위 차감 반영 확인 (리스너 차감 원장의 pending 확정용)
+// - activity_log 전체에서 documentId 일치 기록 + updated_by 가 documentId 인 재고 행
+// - 활동 로그는 COMMIT 후 기록(실패 시 무시)되고 updated_by 는 이후 차감이 덮어쓰므로
+//   "없음"은 미반영 증거가 아님 → applied 는 true(반영 확정) 또는 null(불명)
+router.get('/deductions/:documentId', async (req, res) => {
+  const { documentId } = req.params;
+
+  try {
+    const logRow = await db.get(`
+      SELECT timestamp, details FROM activity_log
+      WHERE action = 'inventory_deduct' AND json_extract(details, '$.documentId') = ?
+      ORDER BY timestamp DESC LIMIT 1
+    `, [documentId]);
+    const stamped = await db.all(
+      'SELECT part_id FROM inventory WHERE updated_by = ?',
+      [documentId]
+    );
+
+    res.json({
+      documentId,
+      applied: logRow || stamped.length > 0 ? true : null,
+      activity: logRow ? { timestamp: logRow.timestamp, ...JSON.parse(logRow.details) } : null,
+      stampedParts: stamped.map(row => row.part_id)
+    });
+  } catch (error) {
+    console.error('차감 반영 확인 실패:', error);
+    res.status(500).json({ error: error.message });
+  }
+});
+
 // ✅ 재고 복구 (취소/롤백용)
 router.post('/restore', async (req, res) => {
   const { restorations, documentId, userIp } = req.body;
@@ -3,9 +3,19 @@ const router = express.Router();
 const db = require('../db');
 
 // 전체 가격 조회
+// ?since=<ISO timestamp> : 그 시각 이후(같은 시각 포함) 변경된 항목만 (리스너 증분 동기화용)
+// 전체 조회는 Last-Modified(최신 timestamp) + ETag 로 조건부 요청(304) 지원
 router.get('/', async (req, res) => {
   try {
-    const rows = await db.all('SELECT * FROM admin_prices');
+    const { since } = req.query;
+    const rows = since
+      ? await db.all('SELECT * FROM admin_prices WHERE timestamp >= ? ORDER BY timestamp', [since])
+      : await db.all('SELECT * FROM admin_prices');
+    if (!since && rows.length > 0) {
+      const latest = rows.reduce((max, row) => (row.timestamp > max ? row.timestamp : max), '');
+      const lastModified = new Date(latest);
+      if (!isNaN(lastModified)) res.set('Last-Modified', lastModified.toUTCString());
+    }
     const prices = {};
     rows.forEach(row => {
       prices[row.part_id] = {
@@ -1,6 +1,7 @@
 const express = require('express');
 const cors = require('cors');
 const path = require('path');
+const { gzipResponses, DEFAULT_THRESHOLD } = require('./gzip');
 require('dotenv').config();
 
 const app = express();
@@ -16,6 +17,9 @@ app.use(cors({
   credentials: true
 }));
 
+// 큰 JSON 응답(GET /documents 전체 맵 등)은 gzip. GZIP_MIN_BYTES=0 이면 전부 압축
+// 요청 본문의 Content-Encoding: gzip 은 express.json 이 풀어 줌
+app.use(gzipResponses({ threshold: Number(process.env.GZIP_MIN_BYTES ?? DEFAULT_THRESHOLD) }));
 app.use(express.json({ limit: '50mb' }));
 app.use(express.urlencoded({ extended: true, limit: '50mb' }));
 
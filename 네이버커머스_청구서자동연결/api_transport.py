@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+api_transport.py
+─────────────────────────────────────────────────────────────────────────────
+sammirack API 호출 공용 계층 (gzip 요청/응답 압축 + 호출 종류별 전송 바이트 측정)
+
+리스너, migrate_fix_purchase_ss (document_store), verify_ss_doc_regeneration 이 함께 씁니다.
+
+  응답  requests 가 Accept-Encoding: gzip 을 기본으로 보내고 받은 본문을 알아서 풉니다.
+        서버(sammirack-api/gzip.js)는 GZIP_MIN_BYTES(기본 1024) 이상인 응답만 압축합니다
+        → GET /documents 전체 맵, GET /inventory, GET /prices 전체 조회 등.
+  요청  본문이 SAMMIRACK_GZIP_MIN_BYTES(기본 1024) 이상이면 gzip + Content-Encoding: gzip.
+        express.json 은 압축 본문을 기본으로 풀어 줍니다 (inflate, 50mb 제한은 푼 뒤 크기).
+        서버/프록시가 415 로 거부하면 이 프로세스에서는 요청 압축을 끄고 같은 요청을 비압축으로 다시 보냅니다.
+        SAMMIRACK_GZIP=0 이면 요청 압축 안 함.
+
+측정 (listener_metrics → /metrics, 스크립트는 format_transfer_summary()):
+  listener_api_body_bytes_total{call, direction}   압축 전 본문 바이트
+  listener_api_wire_bytes_total{call, direction}   실제 오간 본문 바이트 (HTTP 헤더 제외)
+  direction: sent / received       절약량 = body - wire
+
+  call: document_save, document_flag, inventory_deduct, inventory_fetch, prices_fetch,
+        activity_fetch, deduction_fetch, documents_fetch, documents_bulk_save
+
+  resp = api_transport.post(url, "document_save", data=body, headers=headers, timeout=30)
+  resp = api_transport.get(url, "inventory_fetch", headers={"If-None-Match": etag}, timeout=15)
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import gzip
+import logging
+import os
+from typing import Dict, List, Tuple
+
+import payload_codec
+from listener_metrics import API_BODY_BYTES, API_WIRE_BYTES
+
+log = logging.getLogger("sammirack.listener.transport")
+
+GZIP_REQUESTS = os.environ.get("SAMMIRACK_GZIP", "1").strip().lower() not in ("0", "false", "no")
+GZIP_MIN_BYTES = int(os.environ.get("SAMMIRACK_GZIP_MIN_BYTES", "1024"))
+GZIP_LEVEL = 6
+
+DIRECTION_SENT = "sent"
+DIRECTION_RECEIVED = "received"
+
+_gzip_rejected = False
+
+
+def compress_body(data):
+    # type: (bytes) -> Tuple[bytes, bool]
+    """(전송 본문, 압축 여부). 작은 본문은 gzip 헤더(18B)와 CPU 가 더 커서 그대로 보냄."""
+    if not GZIP_REQUESTS or _gzip_rejected or len(data) < GZIP_MIN_BYTES:
+        return data, False
+    return gzip.compress(data, GZIP_LEVEL, mtime=0), True
+
+
+def _received_wire_bytes(resp):
+    # type: (object) -> int
+    """응답 본문의 실제 전송 바이트 (urllib3 가 읽은 압축 상태 바이트 수, 없으면 Content-Length)."""
+    try:
+        wire = resp.raw.tell()
+    except Exception:
+        wire = 0
+    if wire:
+        return wire
+    length = resp.headers.get("Content-Length") or ""
+    return int(length) if length.isdigit() else len(resp.content)
+
+
+def _record(call, sent_body, sent_wire, resp):
+    # type: (str, int, int, object) -> None
+    if sent_body:
+        API_BODY_BYTES.inc(sent_body, call=call, direction=DIRECTION_SENT)
+        API_WIRE_BYTES.inc(sent_wire, call=call, direction=DIRECTION_SENT)
+    received = len(resp.content)
+    if received:
+        API_BODY_BYTES.inc(received, call=call, direction=DIRECTION_RECEIVED)
+        API_WIRE_BYTES.inc(_received_wire_bytes(resp), call=call, direction=DIRECTION_RECEIVED)
+
+
+def request(method, url, call, json_body=None, data=None, headers=None, **kwargs):
+    """
+    requests.request 와 같은 인자 + 호출 종류(call). json_body 는 payload_codec 으로 인코딩.
+    연결 / 시간 초과 예외는 requests 그대로 올라갑니다 (호출 측 처리 방식 유지).
+    """
+    global _gzip_rejected
+    import requests
+
+    headers = dict(headers or {})
+    if json_body is not None:
+        data = payload_codec.dumps_bytes(json_body)
+        headers.setdefault("Content-Type", payload_codec.CONTENT_TYPE)
+    body = data or b""
+    wire, compressed = compress_body(body)
+    send_headers = dict(headers, **{"Content-Encoding": "gzip"}) if compressed else headers
+    resp = requests.request(method, url, data=wire or None, headers=send_headers, **kwargs)
+    if compressed and resp.status_code == 415:
+        _gzip_rejected = True
+        log.warning("서버가 gzip 요청 본문을 거부 (415) → 이후 요청 압축 안 함: %s", url,
+                    extra={"tag": "TRANSPORT"})
+        wire = body
+        resp = requests.request(method, url, data=body or None, headers=headers, **kwargs)
+    _record(call, len(body), len(wire), resp)
+    return resp
+
+
+def get(url, call, **kwargs):
+    return request("GET", url, call, **kwargs)
+
+
+def post(url, call, **kwargs):
+    return request("POST", url, call, **kwargs)
+
+
+# ─────────────────────────────────────────
+# 측정 요약
+# ─────────────────────────────────────────
+def transfer_stats():
+    # type: () -> Dict[Tuple[str, str], Dict[str, int]]
+    """{(call, direction): {"body", "wire"}} — 프로세스 시작 이후 누적."""
+    wire = API_WIRE_BYTES.snapshot_all()
+    return {key: {"body": int(body), "wire": int(wire.get(key, 0))}
+            for key, body in sorted(API_BODY_BYTES.snapshot_all().items())}
+
+
+def format_transfer_summary():
+    # type: () -> List[str]
+    lines = []  # type: List[str]
+    for (call, direction), stat in transfer_stats().items():
+        saved = stat["body"] - stat["wire"]
+        lines.append("  {:<20} {:<8} {:>12,}B → {:>12,}B (절약 {:.0f}%)".format(
+            call, direction, stat["body"], stat["wire"], saved * 100.0 / stat["body"] if stat["body"] else 0))
+    return lines
+
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+bench_import.py
+─────────────────────────────────────────────────────────────────────────────
+import 시간 벤치마크 (ss_pipeline 코어 vs order_listener 전체)
+
+모듈마다 새 인터프리터를 N 번 띄워 `python -X importtime -c "import <모듈>"` 의
+누적 import 시간(마이크로초)을 모아 중앙값/최댓값을 보여 줍니다.
+ss_pipeline 은 추가로 다음을 확인합니다 (하나라도 어기면 exit 1):
+  - requests / config / http.server / socket 이 로드되지 않을 것 (네트워크 스택 없음)
+  - import 만으로 admin_prices.json / materialOrder.json 을 읽지 않을 것
+
+사용법:
+    python3 bench_import.py                 # 각 7회
+    python3 bench_import.py --runs 20
+    python3 bench_import.py --modules ss_pipeline order_listener bench_pipeline
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MODULES = ["ss_pipeline", "order_listener"]
+FORBIDDEN_IN_CORE = ["requests", "config", "http.server", "socket", "urllib3"]
+
+_PROBE = """
+import json, sys
+import ss_pipeline
+import ss_pipeline.document as document
+import ss_pipeline.pricing as pricing
+print(json.dumps({
+    "loaded": [m for m in %r if m in sys.modules],
+    "admin_prices_loaded": pricing._ADMIN_PRICES_CACHE is not None,
+    "material_rules_loaded": document._MATERIAL_ORDER_RULES is not None,
+}))
+""" % (FORBIDDEN_IN_CORE,)
+
+
+def import_time_us(module):
+    # type: (str) -> int
+    """새 프로세스에서 module 을 import 하고 -X importtime 의 누적 시간(us)을 돌려줍니다."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import {}".format(module)],
+        cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True,
+    )
+    for line in proc.stderr.decode("utf-8", "replace").splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1])
+    raise RuntimeError("importtime 출력에서 {} 를 찾지 못했습니다".format(module))
+
+
+def probe_core():
+    # type: () -> Dict[str, object]
+    proc = subprocess.run([sys.executable, "-c", _PROBE], cwd=BASE_DIR,
+                          stdout=subprocess.PIPE, check=True)
+    return json.loads(proc.stdout.decode("utf-8"))
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="ss_pipeline / order_listener import 시간 벤치마크")
+    p.add_argument("--runs", type=int, default=7, help="모듈당 측정 횟수 (기본 7)")
+    p.add_argument("--modules", nargs="+", default=DEFAULT_MODULES, help="측정할 모듈")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+    args = parse_args(argv)
+
+    # 첫 실행의 .pyc 컴파일 비용은 빼고 잰다
+    for module in args.modules:
+        import_time_us(module)
+
+    print("=" * 62)
+    print("  import 시간 ({}회, -X importtime 누적)".format(args.runs))
+    print("=" * 62)
+    medians = {}  # type: Dict[str, float]
+    for module in args.modules:
+        samples = sorted(import_time_us(module) for _ in range(args.runs))  # type: List[int]
+        medians[module] = samples[len(samples) // 2] / 1000.0
+        print("  {:<24} median {:>8.1f} ms   max {:>8.1f} ms".format(
+            module, medians[module], samples[-1] / 1000.0))
+    if "ss_pipeline" in medians and "order_listener" in medians and medians["ss_pipeline"]:
+        print("  → order_listener 대비 {:.1f}배 빠름".format(medians["order_listener"] / medians["ss_pipeline"]))
+
+    probe = probe_core()
+    print("")
+    print("  ss_pipeline import 후 로드된 금지 모듈 : {}".format(", ".join(probe["loaded"]) or "없음"))
+    print("  admin_prices.json 로드됨            : {}".format(probe["admin_prices_loaded"]))
+    print("  materialOrder.json 로드됨           : {}".format(probe["material_rules_loaded"]))
+
+    if probe["loaded"] or probe["admin_prices_loaded"] or probe["material_rules_loaded"]:
+        print("\n❌ ss_pipeline 코어가 import 시점에 네트워크 모듈/설정 파일을 끌어옵니다")
+        return 1
+    print("\n✅ ss_pipeline 코어: 네트워크 스택 / 파일 I/O 없이 import")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+bench_persistence.py
+─────────────────────────────────────────────────────────────────────────────
+문서 저장 / 재고 차감 처리량 벤치마크 (로컬 mock_sammirack_api 대상)
+
+bench_pipeline.py 와 같은 시드(주문 로그 + 페이로드 로그)로 문서를 만든 뒤,
+리스너의 save_document_to_server → deduct_inventory_for_smartstore
+(→ update_inventory_deducted_status) 를 그대로 호출합니다. 서버는 같은 프로세스에서
+띄운 mock_sammirack_api (임시 SQLite) 이며, 차감 원장도 임시 파일을 씁니다.
+
+안전장치:
+  - order_listener.SAMMIRACK_SERVER_URL 을 mock 주소로 바꾸고, 127.0.0.1 이 아니면 중단
+  - 프록시 사용 안 함 (USE_PROXY=False)
+  - DRY_RUN 은 절대 바꾸지 않음. DRY_RUN=True 이면 전송 함수가 호출되지 않으므로 측정 불가로 종료
+
+측정 항목:
+  orders/sec, docs/sec     : 문서 1건 = 저장 + 차감 (재시도 포함) 완료 기준
+  order p50/p99            : 문서 1건 종단 지연 (ms)
+  retries                  : 단계별 재시도 횟수 / 재시도 소진 실패 건수
+  http                     : mock 이 받은 라우트별 상태코드 / 주입 장애 횟수
+  double deductions        : activity_log 에 같은 documentId 가 2회 이상 + 재고 증감 대조
+
+사용법:
+    python3 bench_persistence.py                                   # 500건, 장애 없음
+    python3 bench_persistence.py --docs 2000 --workers 8 --latency-ms 20
+    python3 bench_persistence.py --p-lost-ack 0.1 --p5xx 0.05 --retries 5
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_pipeline import (
+    LOG_DIR,
+    default_payload_log,
+    iter_scaled_rows,
+    load_csv_seed_rows,
+    load_payload_seed_rows,
+    percentile,
+)
+
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "::1")
+SEED_QUANTITY = 10 ** 9   # 재고 부족(0 으로 clamp)이 대조를 흐리지 않도록 충분히 크게
+
+
+def payload_deductions(payload):
+    # type: (dict) -> Dict[str, int]
+    """deduct_inventory_for_smartstore 와 같은 규칙으로 차감량을 계산합니다."""
+    deductions = {}  # type: Dict[str, int]
+    for mat in payload.get("materials") or []:
+        part_id = mat.get("partId") or mat.get("inventoryPartId")
+        quantity = mat.get("quantity", 0)
+        if part_id and quantity > 0:
+            deductions[part_id] = deductions.get(part_id, 0) + quantity
+    return deductions
+
+
+def build_payloads(seed_rows, docs):
+    # type: (List[dict], int) -> List[dict]
+    """시드 그룹을 복제해 스마트스토어 문서 docs 건을 미리 만듭니다 (측정 밖)."""
+    import order_listener as listener
+
+    payloads = []  # type: List[dict]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        seed_groups = listener.group_orders_by_session(seed_rows)
+        rows_per_round = sum(len(g) for g in seed_groups)
+        if not rows_per_round:
+            return payloads
+        # 복제 1회분(시드 전체)씩 그룹핑 → 복제본끼리 섞이지 않음
+        rows = iter_scaled_rows(seed_groups, sys.maxsize)
+        while len(payloads) < docs:
+            batch = [next(rows) for _ in range(rows_per_round)]
+            for group in listener.group_orders_by_session(batch):
+                payload = listener.build_grouped_document(group)
+                if payload.get("isSmartstore"):
+                    payloads.append(payload)
+            if not payloads:
+                break  # 시드에 스마트스토어 문서가 없음
+    return payloads[:docs]
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# 실행
+# ═════════════════════════════════════════════════════════════════════════════
+
+class _Tally(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()  # type: Counter
+        self.latency = []        # type: List[float]
+
+    def add(self, **kwargs):
+        with self.lock:
+            self.counts.update(kwargs)
+
+
+def _persist_one(listener, payload, retries, backoff, tally):
+    # type: (object, dict, int, float, _Tally) -> None
+    t0 = time.perf_counter()
+    for attempt in range(retries + 1):
+        if attempt:
+            tally.add(save_retries=1)
+            time.sleep(backoff * attempt)
+        if listener.save_document_to_server(payload):
+            break
+    else:
+        tally.add(save_failed=1)
+        return
+
+    if payload_deductions(payload):
+        for attempt in range(retries + 1):
+            if attempt:
+                tally.add(deduct_retries=1)
+                time.sleep(backoff * attempt)
+            if listener.deduct_inventory_for_smartstore(payload):
+                break
+        else:
+            tally.add(deduct_failed=1)
+            return
+
+    with tally.lock:
+        tally.counts["done"] += 1
+        tally.latency.append(time.perf_counter() - t0)
+
+
+def run_benchmark(payloads, mock_args, workers=4, retries=3, backoff_ms=50.0):
+    # type: (List[dict], argparse.Namespace, int, int, float) -> Dict[str, object]
+    import deduction_ledger
+    import order_listener as listener
+    from mock_sammirack_api import make_server
+
+    expected = Counter()  # type: Counter
+    for payload in payloads:
+        expected.update(payload_deductions(payload))
+    seed = {part_id: SEED_QUANTITY for part_id in expected}
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_persistence_")
+    server = make_server(mock_args, db_path=os.path.join(tmp_dir, "mock.db"), inventory=seed)
+    server_thread = threading.Thread(target=server.serve_forever, name="mock-sammirack", daemon=True)
+    server_thread.start()
+    base = "http://127.0.0.1:{}/api".format(server.server_address[1])
+
+    saved = (listener.SAMMIRACK_SERVER_URL, listener.USE_PROXY, deduction_ledger._LEDGER)
+    listener.SAMMIRACK_SERVER_URL = base
+    listener.USE_PROXY = False
+    deduction_ledger._LEDGER = deduction_ledger.DeductionLedger(os.path.join(tmp_dir, "ledger.db"))
+    try:
+        if urlparse(listener.SAMMIRACK_SERVER_URL).hostname not in LOCAL_HOSTS:
+            raise RuntimeError("SAMMIRACK_SERVER_URL 이 로컬이 아님: {}".format(listener.SAMMIRACK_SERVER_URL))
+
+        tally = _Tally()
+        backoff = backoff_ms / 1000.0
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            t_start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for payload in payloads:
+                    pool.submit(_persist_one, listener, payload, retries, backoff, tally)
+            total_sec = time.perf_counter() - t_start
+
+        summary = server.store.summary()
+        with server.handler_class.stats_lock:
+            http = dict(server.handler_class.stats)
+        live = server.store.inventory()
+        ledger_pending = len(deduction_ledger._LEDGER.entries(status=deduction_ledger.STATUS_PENDING))
+    finally:
+        listener.SAMMIRACK_SERVER_URL, listener.USE_PROXY = saved[0], saved[1]
+        deduction_ledger._LEDGER.close()
+        deduction_ledger._LEDGER = saved[2]
+        server.shutdown()
+        server.server_close()
+        server.store.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # 재고 대조: 실패 건을 포함한 전체 요청량 대비 실제 감소량
+    consumed = {part_id: SEED_QUANTITY - live.get(part_id, SEED_QUANTITY) for part_id in expected}
+    over = {p: consumed[p] - expected[p] for p in expected if consumed[p] > expected[p]}
+
+    latency = sorted(tally.latency)
+    done = tally.counts["done"]
+    return {
+        "docs":                 len(payloads),
+        "orders":               sum(len(p.get("items") or []) for p in payloads),
+        "workers":              workers,
+        "retries_allowed":      retries,
+        "total_sec":            round(total_sec, 3),
+        "docs_per_sec":         round(done / total_sec, 1) if total_sec else 0.0,
+        "orders_per_sec":       round(sum(len(p.get("items") or []) for p in payloads) / total_sec, 1)
+                                if total_sec else 0.0,
+        "doc_p50_ms":           round(percentile(latency, 50) * 1000, 2),
+        "doc_p99_ms":           round(percentile(latency, 99) * 1000, 2),
+        "completed":            done,
+        "save_retries":         tally.counts["save_retries"],
+        "deduct_retries":       tally.counts["deduct_retries"],
+        "save_failed":          tally.counts["save_failed"],
+        "deduct_failed":        tally.counts["deduct_failed"],
+        "ledger_pending":       ledger_pending,
+        "server_documents":     summary["documents"],
+        "server_flagged":       summary["documents_flagged"],
+        "server_deductions":    summary["deductions"],
+        "double_deducted_docs": summary["double_deducted_docs"],
+        "over_deducted_parts":  over,
+        "http":                 http,
+        "mock": {
+            "latency_ms": mock_args.latency_ms, "jitter_ms": mock_args.jitter_ms,
+            "p5xx": mock_args.p5xx, "p_drop": mock_args.p_drop, "p_lost_ack": mock_args.p_lost_ack,
+            "fail_routes": sorted(mock_args.fail_routes),
+        },
+        "measured_at":          datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def print_result(result):
+    # type: (dict) -> None
+    print("=" * 62)
+    print("  저장/차감 벤치마크: 문서 {docs:,}건 (주문 {orders:,}행), workers={workers}, retries={retries_allowed}"
+          .format(**result))
+    mock = result["mock"]
+    print("  mock: latency={}ms±{} 5xx={} drop={} lost-ack={} 대상={}".format(
+        mock["latency_ms"], mock["jitter_ms"], mock["p5xx"], mock["p_drop"], mock["p_lost_ack"],
+        ",".join(mock["fail_routes"])))
+    print("=" * 62)
+    print("  {:<22} {:>12}".format("orders/sec", result["orders_per_sec"]))
+    print("  {:<22} {:>12}".format("docs/sec", result["docs_per_sec"]))
+    print("  {:<22} {:>12}".format("doc p50 (ms)", result["doc_p50_ms"]))
+    print("  {:<22} {:>12}".format("doc p99 (ms)", result["doc_p99_ms"]))
+    print("  {:<22} {:>12}".format("완료", "{}/{}".format(result["completed"], result["docs"])))
+    print("  {:<22} {:>12}".format("저장 재시도/실패", "{}/{}".format(result["save_retries"], result["save_failed"])))
+    print("  {:<22} {:>12}".format("차감 재시도/실패", "{}/{}".format(result["deduct_retries"], result["deduct_failed"])))
+    print("  {:<22} {:>12}".format("원장 pending", result["ledger_pending"]))
+    print("  {:<22} {:>12}".format("서버 문서/플래그", "{}/{}".format(result["server_documents"], result["server_flagged"])))
+    print("  {:<22} {:>12}".format("서버 차감 기록", result["server_deductions"]))
+    print("-" * 62)
+    for key in sorted(result["http"]):
+        print("  {:<22} {:>12}".format(key, result["http"][key]))
+    print("-" * 62)
+    if result["double_deducted_docs"] or result["over_deducted_parts"]:
+        print("  ❌ 이중 차감: 문서 {}건, 초과 차감 부품 {}종".format(
+            len(result["double_deducted_docs"]), len(result["over_deducted_parts"])))
+        for doc_id in result["double_deducted_docs"][:10]:
+            print("     - {}".format(doc_id))
+    else:
+        print("  ✅ 이중 차감 없음")
+
+
+def parse_args(argv=None):
+    from mock_sammirack_api import parse_args as parse_mock_args
+
+    p = argparse.ArgumentParser(description="문서 저장/재고 차감 처리량 벤치마크 (로컬 mock 대상)")
+    p.add_argument("--docs", type=int, default=500, help="전송할 문서 수")
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--retries", type=int, default=3, help="단계별 최대 재시도 횟수")
+    p.add_argument("--retry-backoff-ms", type=float, default=50.0, help="재시도 대기 (시도 횟수에 비례)")
+    p.add_argument("--order-glob", default=os.path.join(LOG_DIR, "orders_*.csv"))
+    p.add_argument("--payload-log", default=None, help="기본: order_logs 의 payload_history")
+    p.add_argument("--json-out", default=None)
+    args, rest = p.parse_known_args(argv)
+    # 장애 주입 옵션은 mock_sammirack_api 와 동일 (--latency-ms, --p5xx, --p-lost-ack ...)
+    mock_args = parse_mock_args(rest + ["--port", "0"])
+    return args, mock_args
+
+
+def main(argv=None):
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", line_buffering=True)
+    args, mock_args = parse_args(argv)
+
+    import order_listener as listener
+    if listener.DRY_RUN:
+        print("[BENCH] DRY_RUN=True 상태에서는 저장/차감 함수가 전송하지 않으므로 측정할 수 없습니다.")
+        print("[BENCH] (DRY_RUN 은 운영자만 변경합니다. 이 도구는 값을 바꾸지 않습니다.)")
+        return 2
+
+    payload_log = args.payload_log if args.payload_log is not None else default_payload_log()
+    seed_rows = load_csv_seed_rows(args.order_glob) + load_payload_seed_rows(payload_log)
+    if not seed_rows:
+        print("[BENCH] 시드 주문이 없습니다: {} / {}".format(args.order_glob, payload_log or "-"))
+        return 1
+
+    payloads = build_payloads(seed_rows, args.docs)
+    if not payloads:
+        print("[BENCH] 스마트스토어 문서를 만들지 못했습니다.")
+        return 1
+
+    result = run_benchmark(payloads, mock_args, args.workers, args.retries, args.retry_backoff_ms)
+    print_result(result)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 1 if (result["double_deducted_docs"] or result["over_deducted_parts"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
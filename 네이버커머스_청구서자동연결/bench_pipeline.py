@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+bench_pipeline.py
+─────────────────────────────────────────────────────────────────────────────
+주문 → 문서 변환 파이프라인 벤치마크
+
+기록된 주문 로그(order_logs/orders_*.csv)와 페이로드 로그(payload_history)를
+시드로 삼아 group_orders_by_session → build_grouped_document → generate_bom_for_rack
+을 그대로 재생합니다. 시드 그룹을 구매자/시각/주문번호만 바꿔 복제하므로
+10k ~ 1M 행까지 실제와 같은 그룹 구성으로 늘릴 수 있습니다 (행은 배치 단위로 생성,
+메모리에 전부 올리지 않음).
+
+측정 항목:
+  rows/sec          : 그룹핑 + 문서 생성 전체 처리량
+  group p50/p99     : 그룹 1개 build_grouped_document 지연 (ms)
+  bom p50/p99       : 메인 행 1개 get_rack_type + parse + generate_bom_for_rack 지연 (ms)
+  peak RSS          : 프로세스 최대 상주 메모리 (MB)
+
+사용법:
+    python3 bench_pipeline.py                         # 10,000행
+    python3 bench_pipeline.py --rows 1000000          # 1M행
+    python3 bench_pipeline.py --save-baseline         # 결과를 기준값으로 저장
+    python3 bench_pipeline.py --rows 100000 --tolerance 0.1   # 기준 대비 10% 이상 느려지면 exit 1
+    python3 bench_pipeline.py --dict-rows             # 주문행을 SmartstoreOrder 대신 기존 dict 로 재생 (비교용)
+
+※ 리스너 함수가 찍는 콘솔 출력은 측정 중 /dev/null 로 보냅니다.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LOG_DIR = os.path.join(BASE_DIR, "order_logs")
+DEFAULT_BASELINE = os.path.join(LOG_DIR, "bench_baseline.json")
+
+# (지표, 클수록 좋은지)
+COMPARED_METRICS = [
+    ("rows_per_sec",   True),
+    ("group_p50_ms",   False),
+    ("group_p99_ms",   False),
+    ("bom_p50_ms",     False),
+    ("bom_p99_ms",     False),
+    ("peak_rss_mb",    False),
+]
+
+
+# ─────────────────────────────────────────
+# 시드 로드
+# ─────────────────────────────────────────
+def load_csv_seed_rows(order_glob):
+    # type: (str) -> List[dict]
+    from order_csv_log import iter_order_rows
+
+    rows = []
+    for path in sorted(glob.glob(order_glob)):
+        rows.extend(iter_order_rows(path))
+    return rows
+
+
+def load_payload_seed_rows(path):
+    # type: (str) -> List[dict]
+    """페이로드 items 를 주문행 형태로 복원 (migrate_fix_purchase_ss 와 같은 방식)."""
+    from payload_log import iter_payloads
+
+    rows = []
+    if not path or not os.path.exists(path):
+        return rows
+    for index, (logged_at, payload) in enumerate(iter_payloads(path)):
+        items = payload.get("items") or []
+        buyer = payload.get("companyName") or payload.get("company_name") or "payload{}".format(index)
+        paid = (payload.get("createdAt") or payload.get("created_at") or "")[:19] + "+09:00"
+        for n, item in enumerate(items):
+            if not isinstance(item, dict):
+                continue
+            rows.append({
+                "상품주문번호": "P{}-{}".format(index, n),
+                "결제완료시각": paid,
+                "구매자명":     buyer,
+                "상품명":       item.get("name", ""),
+                "옵션":         item.get("note", ""),
+                "주문수량":     str(item.get("quantity", 1) or 1),
+                "최종금액":     str(item.get("totalPrice", 0) or 0),
+                "수취인명":     buyer,
+                "연락처":       "",
+                "배송지":       "",
+            })
+    return rows
+
+
+def default_payload_log():
+    # type: () -> str
+    from payload_log import COMPACT_FILENAME, LEGACY_FILENAME
+
+    for name in (COMPACT_FILENAME, LEGACY_FILENAME):
+        path = os.path.join(LOG_DIR, name)
+        if os.path.exists(path):
+            return path
+    return ""
+
+
+# ─────────────────────────────────────────
+# 합성 확장
+# ─────────────────────────────────────────
+def iter_scaled_rows(seed_groups, total_rows, start=None):
+    # type: (List[List[dict]], int, Optional[datetime]) -> Iterator[dict]
+    """
+    시드 그룹을 복제해 total_rows 행을 만듭니다. 복제본마다 구매자명/주문번호를 바꾸고
+    결제시각을 1분씩 밀어서, group_orders_by_session 이 시드와 같은 그룹 구성을 만들도록 합니다.
+    """
+    start = start or datetime(2026, 1, 1, 9, 0, 0)
+    produced = 0
+    replica = 0
+    while produced < total_rows:
+        for group in seed_groups:
+            paid = (start + timedelta(minutes=replica)).strftime("%Y-%m-%dT%H:%M:%S.000+09:00")
+            for row in group:
+                if produced >= total_rows:
+                    return
+                order_id = "{}-{}".format(row.get("상품주문번호", ""), replica)
+                buyer = "{}#{}".format(row.get("구매자명", ""), replica)
+                if isinstance(row, dict):
+                    clone = dict(row)
+                    clone["상품주문번호"] = order_id
+                    clone["구매자명"] = buyer
+                    clone["결제완료시각"] = paid
+                else:
+                    clone = row.replace(product_order_id=order_id, buyer=buyer, paid_at_text=paid)
+                produced += 1
+                yield clone
+            replica += 1
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ─────────────────────────────────────────
+# 통계
+# ─────────────────────────────────────────
+def percentile(sorted_values, pct):
+    # type: (List[float], float) -> float
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def peak_rss_mb():
+    # type: () -> Optional[float]
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak / (1024.0 * 1024.0)
+    return peak / 1024.0
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# 실행
+# ═════════════════════════════════════════════════════════════════════════════
+
+def run_benchmark(seed_rows, total_rows, batch_size=500, bom=True):
+    # type: (List[dict], int, int, bool) -> Dict[str, object]
+    import ss_pipeline as pipeline
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        seed_groups = pipeline.group_orders_by_session(seed_rows)
+        # 워밍업: admin_prices / 자재 규칙 등 지연 로드를 측정 밖으로
+        for group in seed_groups[:3]:
+            pipeline.build_grouped_document(group)
+
+        group_lat = []   # type: List[float]
+        bom_lat = []     # type: List[float]
+        grouping_sec = 0.0
+        rows_done = 0
+        groups_done = 0
+        perf = time.perf_counter
+
+        t_start = perf()
+        for batch in _batches(iter_scaled_rows(seed_groups, total_rows), batch_size):
+            t0 = perf()
+            groups = pipeline.group_orders_by_session(batch)
+            grouping_sec += perf() - t0
+            for group in groups:
+                t0 = perf()
+                pipeline.build_grouped_document(group)
+                group_lat.append(perf() - t0)
+            rows_done += len(batch)
+            groups_done += len(groups)
+        total_sec = perf() - t_start
+
+        if bom:
+            # BOM 단독 지연: 시드 메인 행을 total_rows 비율만큼 반복 (상한 20만 회)
+            mains = [r for r in seed_rows if pipeline.classify_row(r) == "main"]
+            repeat = max(1, min(total_rows, 200000) // max(1, len(mains)))
+            for _ in range(repeat):
+                for row in mains:
+                    order = pipeline.as_order(row)
+                    pname = order.product_name
+                    optv = order.option
+                    qty = order.quantity or 1
+                    t0 = perf()
+                    rtype = pipeline.get_rack_type(pname, optv)
+                    if rtype:
+                        pipeline.generate_bom_for_rack(rtype, pipeline.parse_smartstore_option(optv), qty)
+                    bom_lat.append(perf() - t0)
+
+    group_lat.sort()
+    bom_lat.sort()
+    return {
+        "rows":            rows_done,
+        "groups":          groups_done,
+        "seed_rows":       len(seed_rows),
+        "seed_groups":     len(seed_groups),
+        "batch_size":      batch_size,
+        "row_format":      "record" if seed_rows and not isinstance(seed_rows[0], dict) else "dict",
+        "total_sec":       round(total_sec, 3),
+        "grouping_sec":    round(grouping_sec, 3),
+        "rows_per_sec":    round(rows_done / total_sec, 1) if total_sec else 0.0,
+        "group_p50_ms":    round(percentile(group_lat, 50) * 1000, 4),
+        "group_p99_ms":    round(percentile(group_lat, 99) * 1000, 4),
+        "bom_samples":     len(bom_lat),
+        "bom_p50_ms":      round(percentile(bom_lat, 50) * 1000, 4),
+        "bom_p99_ms":      round(percentile(bom_lat, 99) * 1000, 4),
+        "peak_rss_mb":     round(peak_rss_mb() or 0.0, 1),
+        "python":          platform.python_version(),
+        "machine":         platform.node(),
+        "measured_at":     datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def compare_to_baseline(result, baseline, tolerance):
+    # type: (dict, dict, float) -> List[str]
+    """허용 범위를 넘어 나빠진 지표 목록."""
+    regressions = []
+    for key, higher_is_better in COMPARED_METRICS:
+        base, cur = baseline.get(key), result.get(key)
+        if not base or cur is None:
+            continue
+        change = (cur - base) / float(base)
+        if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+            regressions.append(key)
+    return regressions
+
+
+def print_result(result, baseline=None, regressions=()):
+    print("=" * 70)
+    print("파이프라인 벤치마크 | {:,}행 → {:,}그룹 (시드 {}행/{}그룹, 배치 {}, {})".format(
+        result["rows"], result["groups"], result["seed_rows"], result["seed_groups"], result["batch_size"],
+        result.get("row_format", "dict")))
+    print("=" * 70)
+    print("  {:<16} {:>14} {:>14} {:>9}".format("지표", "현재", "기준", "변화"))
+    print("  " + "-" * 56)
+    for key, _ in COMPARED_METRICS:
+        cur = result.get(key)
+        base = (baseline or {}).get(key)
+        change = ""
+        if base:
+            change = "{:+.1f}%".format((cur - base) / float(base) * 100)
+        mark = "  ⚠️" if key in regressions else ""
+        print("  {:<16} {:>14} {:>14} {:>9}{}".format(
+            key, cur, base if base is not None else "-", change, mark))
+    print("  " + "-" * 56)
+    print("  총 {:.2f}s (그룹핑 {:.2f}s)".format(result["total_sec"], result["grouping_sec"]))
+    if baseline and baseline.get("rows") != result["rows"]:
+        print("  ※ 기준 행 수({:,})와 달라 비교 정확도가 낮습니다".format(baseline.get("rows", 0)))
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="주문 → 문서 파이프라인 벤치마크")
+    p.add_argument("--rows", type=int, default=10000, help="재생할 총 행 수 (기본 10,000)")
+    p.add_argument("--batch-size", type=int, default=500, help="group_orders_by_session 1회당 행 수 (폴링 1회분)")
+    p.add_argument("--order-glob", default=os.path.join(LOG_DIR, "orders_*.csv"), help="시드 주문 CSV glob")
+    p.add_argument("--payload-log", default=None,
+                   help="시드 페이로드 로그 (기본: order_logs/payload_history.compact.jsonl 또는 payload_history.jsonl)")
+    p.add_argument("--no-bom", action="store_true", help="BOM 단독 지연 측정 생략")
+    p.add_argument("--dict-rows", action="store_true",
+                   help="주문행을 SmartstoreOrder 로 변환하지 않고 기존 한글 키 dict 로 재생")
+    p.add_argument("--baseline", default=DEFAULT_BASELINE, help="기준값 JSON 경로")
+    p.add_argument("--save-baseline", action="store_true", help="이번 결과를 기준값으로 저장")
+    p.add_argument("--tolerance", type=float, default=0.2, help="허용 악화 비율 (기본 0.2 = 20%%)")
+    p.add_argument("--json-out", default="", help="결과 JSON 저장 경로")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+    args = parse_args(argv)
+
+    payload_path = args.payload_log if args.payload_log is not None else default_payload_log()
+    seed_rows = load_csv_seed_rows(args.order_glob) + load_payload_seed_rows(payload_path)
+    if not seed_rows:
+        print("시드 주문이 없습니다: {} / {}".format(args.order_glob, payload_path or "(payload 로그 없음)"))
+        return 1
+    if not args.dict_rows:
+        from ss_pipeline.order import SmartstoreOrder
+
+        seed_rows = [SmartstoreOrder.from_row(row) for row in seed_rows]
+
+    result = run_benchmark(seed_rows, args.rows, batch_size=args.batch_size, bom=not args.no_bom)
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = compare_to_baseline(result, baseline, args.tolerance) if baseline else []
+    print_result(result, baseline, regressions)
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print("\n기준값 저장: {}".format(args.baseline))
+        return 0
+    if regressions:
+        print("\n❌ 성능 회귀 ({}% 초과): {}".format(int(args.tolerance * 100), ", ".join(regressions)))
+        return 1
+    if baseline:
+        print("\n✅ 기준값 대비 허용 범위 이내")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+bench_serialization.py
+─────────────────────────────────────────────────────────────────────────────
+문서 페이로드 직렬화 벤치마크 (문서 1건당 바이트 / CPU 시간)
+
+  http_legacy     기존 save_document_to_server: items/materials 를 json.dumps 문자열로 만든 뒤
+                  requests(json=) 가 전체를 ASCII 이스케이프로 다시 직렬화
+  http_stdlib     payload_codec.encode_document (표준 json)
+  http_orjson     payload_codec.encode_document (orjson, 설치된 경우)
+  journal_stdlib  payload_log compact 기록 1건 (템플릿 해시 + 줄 인코딩, 템플릿 캐시 유지)
+  journal_orjson  위와 같음 (orjson)
+
+시드 문서:
+  기본            order_logs/orders_*.csv (+ 페이로드 로그) 주문을 bench_pipeline 방식으로 복제해
+                  build_grouped_document 로 생성 (--docs 건)
+  --documents-json  GET /documents 응답(map) 또는 문서 목록 JSON — 실제 저장된 문서로 측정
+
+사용법:
+    python3 bench_serialization.py
+    python3 bench_serialization.py --documents-json documents.json --repeat 20
+    python3 bench_serialization.py --json-out order_logs/bench_serialization.json
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import payload_codec
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LOG_DIR = os.path.join(BASE_DIR, "order_logs")
+
+
+# ─────────────────────────────────────────
+# 시드 문서
+# ─────────────────────────────────────────
+def load_documents_json(path):
+    # type: (str) -> List[dict]
+    """GET /documents 응답({docId: doc}) 또는 목록. items/materials 문자열은 배열로 복원."""
+    from document_store import _safe_json_loads
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    docs = []
+    for doc_id, doc in (data.items() if isinstance(data, dict) else enumerate(data)):
+        if not isinstance(doc, dict):
+            continue
+        doc = dict(doc)
+        doc["items"] = _safe_json_loads(doc.get("items"), [])
+        doc["materials"] = _safe_json_loads(doc.get("materials"), [])
+        doc.setdefault("doc_id", doc.get("docId") or doc.get("id") or str(doc_id))
+        docs.append(doc)
+    return docs
+
+
+def build_seed_documents(count):
+    # type: (int) -> List[dict]
+    import bench_pipeline
+    import ss_pipeline as pipeline
+
+    rows = bench_pipeline.load_csv_seed_rows(os.path.join(LOG_DIR, "orders_*.csv"))
+    rows += bench_pipeline.load_payload_seed_rows(bench_pipeline.default_payload_log())
+    if not rows:
+        return []
+    seed_groups = pipeline.group_orders_by_session(rows)
+    docs = []  # type: List[dict]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for batch in bench_pipeline._batches(bench_pipeline.iter_scaled_rows(seed_groups, count * 4), 500):
+            for group in pipeline.group_orders_by_session(batch):
+                docs.append(pipeline.build_grouped_document(group))
+                if len(docs) >= count:
+                    return docs
+    return docs
+
+
+# ─────────────────────────────────────────
+# 인코더
+# ─────────────────────────────────────────
+def legacy_http_body(payload):
+    # type: (dict) -> bytes
+    """기존 save_document_to_server 본문 (requests 의 json= 처리와 같음)."""
+    doc_id = payload.get("doc_id") or payload.get("id", "")
+    clean_payload = {k: v for k, v in payload.items() if not k.startswith("_")}
+    clean_payload["docId"] = doc_id
+    if isinstance(clean_payload.get("items"), list):
+        clean_payload["items"] = json.dumps(clean_payload["items"], ensure_ascii=False)
+    if isinstance(clean_payload.get("materials"), list):
+        clean_payload["materials"] = json.dumps(clean_payload["materials"], ensure_ascii=False)
+    return json.dumps(clean_payload, allow_nan=False).encode("utf-8")
+
+
+def _journal_encoder():
+    # type: () -> Callable[[dict], bytes]
+    """PayloadLog.append 와 같은 인코딩 (파일 쓰기 제외). 템플릿 캐시는 호출 간 유지."""
+    from payload_log import _dumps, encode_payload
+
+    known = {}  # type: Dict[str, dict]
+
+    def encode(payload):
+        new_templates, record = encode_payload(payload, known, "2026-01-01 00:00:00")
+        lines = [_dumps(t) for t in new_templates]
+        lines.append(_dumps(record))
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    return encode
+
+
+def measure(encode, docs, repeat):
+    # type: (Callable[[dict], bytes], List[dict], int) -> Dict[str, float]
+    """첫 회차 바이트(저널은 새 템플릿 포함) + repeat 회 평균 CPU 시간."""
+    total_bytes = sum(len(encode(doc)) for doc in docs)
+    clock = time.process_time
+    t0 = clock()
+    for _ in range(repeat):
+        for doc in docs:
+            encode(doc)
+    cpu = clock() - t0
+    return {
+        "bytes_per_doc": round(total_bytes / float(len(docs)), 1),
+        "cpu_us_per_doc": round(cpu / (repeat * len(docs)) * 1e6, 2),
+    }
+
+
+def run_benchmark(docs, repeat=10):
+    # type: (List[dict], int) -> Dict[str, object]
+    backends = [payload_codec.BACKEND_STDLIB]
+    if payload_codec.orjson is not None:
+        backends.append(payload_codec.BACKEND_ORJSON)
+    original = payload_codec.BACKEND
+
+    cases = {"http_legacy": measure(legacy_http_body, docs, repeat)}
+    try:
+        for backend in backends:
+            payload_codec.set_backend(backend)
+            cases["http_" + backend] = measure(payload_codec.encode_document, docs, repeat)
+        for backend in backends:
+            payload_codec.set_backend(backend)
+            cases["journal_" + backend] = measure(_journal_encoder(), docs, repeat)
+    finally:
+        payload_codec.set_backend(original)
+
+    return {
+        "documents":     len(docs),
+        "materials_avg": round(sum(len(d.get("materials") or []) for d in docs) / float(len(docs)), 1),
+        "repeat":        repeat,
+        "cases":         cases,
+        "python":        platform.python_version(),
+        "orjson":        getattr(payload_codec.orjson, "__version__", None),
+        "measured_at":   datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def print_result(result):
+    cases = result["cases"]
+    legacy = cases["http_legacy"]
+    print("=" * 70)
+    print("직렬화 벤치마크 | 문서 {:,}건 (자재 평균 {}행, {}회 반복, orjson {})".format(
+        result["documents"], result["materials_avg"], result["repeat"], result["orjson"] or "없음"))
+    print("=" * 70)
+    print("  {:<16} {:>12} {:>10} {:>12} {:>10}".format("방식", "bytes/doc", "대비", "CPU µs/doc", "대비"))
+    print("  " + "-" * 64)
+    for name, case in cases.items():
+        base = legacy if name.startswith("http_") else cases["journal_stdlib"]
+        print("  {:<16} {:>12,.0f} {:>9.0f}% {:>12.1f} {:>9.0f}%".format(
+            name, case["bytes_per_doc"], case["bytes_per_doc"] / base["bytes_per_doc"] * 100,
+            case["cpu_us_per_doc"], case["cpu_us_per_doc"] / base["cpu_us_per_doc"] * 100))
+    print("  " + "-" * 64)
+    print("  (http_* 는 http_legacy 대비, journal_* 는 journal_stdlib 대비)")
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="문서 페이로드 직렬화 벤치마크")
+    p.add_argument("--documents-json", default="", help="GET /documents 응답 또는 문서 목록 JSON")
+    p.add_argument("--docs", type=int, default=500, help="주문 로그로 생성할 문서 수 (기본 500)")
+    p.add_argument("--repeat", type=int, default=10, help="CPU 시간 측정 반복 횟수 (기본 10)")
+    p.add_argument("--json-out", default="", help="결과 JSON 저장 경로")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+    args = parse_args(argv)
+
+    docs = load_documents_json(args.documents_json) if args.documents_json else build_seed_documents(args.docs)
+    if not docs:
+        print("시드 문서가 없습니다 (--documents-json 또는 order_logs/orders_*.csv 필요)")
+        return 1
+
+    result = run_benchmark(docs, repeat=max(1, args.repeat))
+    print_result(result)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
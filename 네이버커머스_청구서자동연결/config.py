@@ -1,14 +1,16 @@
 # config.py
 # 네이버 커머스 API 인증/엔드포인트 설정 파일
+import os
 
 CLIENT_ID = "4RVwBrPGiSldwEpkk1XosY"        # 애플리케이션 ID
 CLIENT_SECRET = "$2a$04$btKPg5JExcAL3sZDX0dznO"  # 애플리케이션 시크릿
 
 # 토큰 발급 URL (공식 문서 기준)
-TOKEN_URL = "https://api.commerce.naver.com/external/v1/oauth2/token"
+# 환경변수 NAVER_TOKEN_URL / NAVER_API_BASE_URL 로 덮어쓸 수 있음 (mock_naver_api.py 로컬 테스트용)
+TOKEN_URL = os.environ.get("NAVER_TOKEN_URL", "https://api.commerce.naver.com/external/v1/oauth2/token")
 
 # 주문 조회 베이스 URL
-API_BASE_URL = "https://api.commerce.naver.com"
+API_BASE_URL = os.environ.get("NAVER_API_BASE_URL", "https://api.commerce.naver.com").rstrip("/")
 
 # 기본 타임존: 한국(KST, UTC+9)
 KST_OFFSET_HOURS = 9
@@ -44,11 +46,13 @@ PROXIES = {
 #   USE_PROXY = False  ← 서버 자체가 프록시이므로 직접 요청
 #
 USE_PROXY = False  # ← 가비아 서버에서 실행 시 False
+if os.environ.get("NAVER_USE_PROXY") is not None:
+    USE_PROXY = os.environ["NAVER_USE_PROXY"].strip().lower() in ("1", "true", "yes")
 
 # ====================================
 # 선택적 페이로드 로깅 설정 (분석용)
 # ====================================
-# True: 주문 상세 매핑 결과(JSON)를 order_logs/payload_history.jsonl 에 저장
+# True: 주문 상세 매핑 결과(JSON)를 order_logs/payload_history.compact.jsonl 에 저장 (compact 형식, 조회: payload_log.py cat)
 # False: 저장 안 함 (서버 용량 절약)
 ENABLE_PAYLOAD_LOGGING = True
 
@@ -56,7 +60,31 @@ ENABLE_PAYLOAD_LOGGING = True
 # 실시간 주문 리스너 설정
 # ====================================
 # 폴링 주기 (초) - 매 N초마다 새 주문 확인
-POLL_INTERVAL_SECONDS = 30
+POLL_INTERVAL_SECONDS = int(os.environ.get("LISTENER_POLL_INTERVAL_SECONDS", "30"))
+
+# 적응형 폴링 (poll_scheduler.py) - 시각별 주문 도착률로 주기를 [MIN, MAX] 안에서 조절
+# 새 주문 직후 / 몰리는 시간엔 짧게, 한가한 시간엔 길게. LISTENER_POLL_ADAPTIVE=0 이면 POLL_INTERVAL_SECONDS 고정
+POLL_ADAPTIVE = os.environ.get("LISTENER_POLL_ADAPTIVE", "1").strip().lower() in ("1", "true", "yes")
+POLL_MIN_SECONDS = float(os.environ.get("LISTENER_POLL_MIN_SECONDS", str(max(1, POLL_INTERVAL_SECONDS // 3))))
+POLL_MAX_SECONDS = float(os.environ.get("LISTENER_POLL_MAX_SECONDS", str(POLL_INTERVAL_SECONDS * 6)))
+# 목록 API 호출 예산 (시간당 평균 상한, 10분치까지 몰아 쓸 수 있음) - 기본: 고정 주기 호출 수의 2배, 0 이면 무제한
+POLL_BUDGET_PER_HOUR = float(os.environ.get("LISTENER_POLL_BUDGET_PER_HOUR", str(7200.0 / POLL_INTERVAL_SECONDS)))
+# 시간당 이만큼 주문이 들어오는 시각에 POLL_INTERVAL_SECONDS (주기 ∝ 1/√도착률) / 새 주문 직후 최소 주기 유지 시간 (초)
+POLL_REFERENCE_PER_HOUR = float(os.environ.get("LISTENER_POLL_REFERENCE_PER_HOUR", "2"))
+POLL_BURST_SECONDS = float(os.environ.get("LISTENER_POLL_BURST_SECONDS", "120"))
+
+# 외부 넛지 (poll_trigger.py) - POST http://127.0.0.1:<LISTENER_METRICS_PORT>/nudge 로 대기를 끊고 즉시 폴링
+# 첫 넛지 후 DEBOUNCE 초 모아서 1회 / 넛지 폴링끼리 최소 MIN_GAP 초 / 분당 MAX_PER_MINUTE 회 (+ 위 호출 예산)
+NUDGE_DEBOUNCE_SECONDS = float(os.environ.get("LISTENER_NUDGE_DEBOUNCE_SECONDS", "0.5"))
+NUDGE_MIN_GAP_SECONDS = float(os.environ.get("LISTENER_NUDGE_MIN_GAP_SECONDS", "2"))
+NUDGE_MAX_PER_MINUTE = int(os.environ.get("LISTENER_NUDGE_MAX_PER_MINUTE", "10"))
+
+# 주문 세션 창 (초) - 같은 주문번호(장바구니)의 행을 이 시간 동안 모아 문서 1건으로 만듦
+# 행이 두 폴링에 나뉘어 와도 문서/재고 차감이 한 번만 일어나도록. 0 이면 폴링 1회분만 묶음 (구매자+결제 분)
+SESSION_GRACE_SECONDS = int(os.environ.get("LISTENER_SESSION_GRACE_SECONDS", str(POLL_INTERVAL_SECONDS * 2)))
+
+# 단계별 지표 (/metrics) + 넛지 (POST /nudge) 포트 - 0 이면 둘 다 비활성. 127.0.0.1 에만 바인딩
+LISTENER_METRICS_PORT = int(os.environ.get("LISTENER_METRICS_PORT", "9108"))
 
 # 토큰 갱신 여유 시간 (초) - 만료 N초 전에 미리 재발급
 TOKEN_REFRESH_BUFFER_SECONDS = 300  # 5분 여유
@@ -70,4 +98,16 @@ TOKEN_EXPIRES_IN_SECONDS = 10800  # 3시간 = 3 * 60 * 60
 # 가비아 서버의 sammirack 웹앱 API (DRY_RUN=False 시 여기에 발주서 POST)
 # 가비아 서버(139.150.11.53)에서 실행할 때: http://localhost/api
 # 로컬 PC에서 직접 접근 시: http://139.150.11.53/api
-SAMMIRACK_SERVER_URL = "http://139.150.11.53/api"
+# 로컬 대역 서버(mock_sammirack_api.py)로 돌릴 때: SAMMIRACK_SERVER_URL=http://127.0.0.1:18081/api
+SAMMIRACK_SERVER_URL = os.environ.get("SAMMIRACK_SERVER_URL", "http://139.150.11.53/api").rstrip("/")
+
+# 차감 전 재고 색인 (GET /inventory) 갱신 주기 (초)
+INVENTORY_INDEX_REFRESH_SECONDS = int(os.environ.get("LISTENER_INVENTORY_REFRESH_SECONDS", "300"))
+
+# 재고 색인에 없는 partId 처리: skip(차감 요청에서 제외 → 서버에 0 수량 행 안 생김) / flag(그대로 보내고 경고만)
+INVENTORY_UNKNOWN_POLICY = os.environ.get("LISTENER_INVENTORY_UNKNOWN_POLICY", "skip").strip().lower()
+
+# 단가표 동기화 (GET /prices) 주기 (초) - 0 이면 비활성 (admin_prices.json 만 사용)
+# 평소에는 ?since= 증분 조회, PRICE_FULL_SYNC_SECONDS 마다 전체 조회 (ETag / If-Modified-Since → 304)
+PRICE_SYNC_SECONDS = int(os.environ.get("LISTENER_PRICE_SYNC_SECONDS", "60"))
+PRICE_FULL_SYNC_SECONDS = int(os.environ.get("LISTENER_PRICE_FULL_SYNC_SECONDS", "3600"))
@@ -0,0 +1,458 @@
+# -*- coding: utf-8 -*-
+"""
+deduction_ledger.py
+─────────────────────────────────────────────────────────────────────────────
+리스너 측 재고 차감 원장 (SQLite)
+
+deduct_inventory_for_smartstore 가 /inventory/deduct 로 보내는 모든 차감 요청을
+로컬에 먼저 기록합니다. 응답이 유실된 요청(타임아웃 등)을 재시도할 때 같은 문서의
+재고가 두 번 빠지지 않도록 막고, 서버를 조회하지 않고도
+"오늘 리스너가 무엇을 차감했는지" 답할 수 있게 합니다.
+
+상태(status):
+  pending : 요청 전송 직전/직후, 또는 응답 유실 / 5xx / 프록시 502·504 (서버가 이미 COMMIT 했을 수 있음).
+            반영 여부 불명 → 서버가 반영을 확인해 주기 전에는 자동으로 다시 보내지 않음
+  acked   : 서버가 2xx 로 응답, 또는 GET /inventory/deductions/{documentId} 가 반영을 확인
+            (server_ack 에 results/warnings 저장)
+  failed  : 서버가 4xx 로 거부 (요청 검증 단계에서 ROLLBACK → 미반영 확정).
+            자동 재전송은 없음. 같은 문서로 다시 차감을 호출하면 새 요청으로 기록
+
+반영 확인은 "있다"만 믿습니다. activity_log 는 COMMIT 이후 기록되고 실패해도 무시되며,
+inventory.updated_by 는 이후 차감이 덮어쓰므로 기록이 없다고 미반영은 아닙니다.
+pending 이 남으면 reconcile 로 재고 차이를 보고 운영자가 처리합니다.
+
+사용법:
+    python3 deduction_ledger.py today                       # 오늘 차감 내역
+    python3 deduction_ledger.py day 2026-03-05              # 특정 일자
+    python3 deduction_ledger.py pending                     # 반영 여부 불명 요청
+    python3 deduction_ledger.py reconcile                   # inventory.json + /inventory 대조
+    python3 deduction_ledger.py reconcile --resolve-pending  # 서버가 반영을 확인한 pending → acked
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional
+
+KST = timezone(timedelta(hours=9))
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_LEDGER_PATH = os.path.join(BASE_DIR, "order_logs", "deduction_ledger.db")
+DEFAULT_INVENTORY_JSON = os.path.join(os.path.dirname(BASE_DIR), "inventory.json")
+
+STATUS_PENDING = "pending"
+STATUS_ACKED = "acked"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS deductions (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    doc_id       TEXT NOT NULL,
+    part_id      TEXT NOT NULL,
+    quantity     INTEGER NOT NULL,
+    request_hash TEXT NOT NULL,
+    status       TEXT NOT NULL,
+    server_ack   TEXT,
+    attempts     INTEGER NOT NULL DEFAULT 1,
+    created_at   TEXT NOT NULL,
+    updated_at   TEXT NOT NULL,
+    UNIQUE (doc_id, part_id)
+);
+CREATE INDEX IF NOT EXISTS idx_deductions_created ON deductions(created_at);
+CREATE INDEX IF NOT EXISTS idx_deductions_status ON deductions(status);
+"""
+
+
+def _now_iso():
+    # type: () -> str
+    return datetime.now(KST).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "+09:00"
+
+
+def compute_request_hash(doc_id, deductions):
+    # type: (str, Dict[str, int]) -> str
+    """doc_id + {partId: 수량} 을 정렬된 JSON 으로 직렬화한 sha256 (순서 무관)."""
+    canonical = json.dumps(
+        {"documentId": doc_id, "deductions": deductions},
+        ensure_ascii=False, sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class DeductionLedger(object):
+    """
+    doc_id 단위 재고 차감 원장.
+
+    한 문서의 차감 요청은 (doc_id, part_id) 행 여러 개로 저장되며
+    같은 request_hash 를 공유합니다. 상태 전이는 문서 단위로 일괄 적용됩니다.
+    """
+
+    def __init__(self, db_path=DEFAULT_LEDGER_PATH):
+        # type: (str) -> None
+        self.db_path = db_path
+        parent = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(parent, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ── 조회 ────────────────────────────────────────────────────────────────
+
+    def entry_for(self, doc_id):
+        # type: (str) -> Optional[dict]
+        """
+        문서의 원장 요약을 반환합니다. 기록이 없으면 None.
+        반환: {doc_id, request_hash, status, deductions, server_ack, attempts, created_at, updated_at}
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM deductions WHERE doc_id = ? ORDER BY part_id", (doc_id,)
+            ).fetchall()
+        if not rows:
+            return None
+        first = rows[0]
+        return {
+            "doc_id":       doc_id,
+            "request_hash": first["request_hash"],
+            "status":       first["status"],
+            "deductions":   {r["part_id"]: r["quantity"] for r in rows},
+            "server_ack":   _loads_or_none(first["server_ack"]),
+            "attempts":     first["attempts"],
+            "created_at":   first["created_at"],
+            "updated_at":   first["updated_at"],
+        }
+
+    def entries(self, status=None, since=None, until=None):
+        # type: (Optional[str], Optional[str], Optional[str]) -> List[dict]
+        """조건에 맞는 원장 행(part 단위)을 created_at 순으로 반환합니다."""
+        sql = "SELECT * FROM deductions WHERE 1=1"
+        params = []  # type: list
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        if since:
+            sql += " AND created_at >= ?"
+            params.append(since)
+        if until:
+            sql += " AND created_at < ?"
+            params.append(until)
+        sql += " ORDER BY created_at, doc_id, part_id"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(r) for r in rows]
+
+    def deducted_on(self, day):
+        # type: (str) -> List[dict]
+        """특정 일자(YYYY-MM-DD, KST)에 기록된 차감 행 전체."""
+        start = datetime.strptime(day, "%Y-%m-%d")
+        end = start + timedelta(days=1)
+        return self.entries(since=start.strftime("%Y-%m-%dT00:00:00"),
+                            until=end.strftime("%Y-%m-%dT00:00:00"))
+
+    def totals_by_part(self, since=None, status=STATUS_ACKED):
+        # type: (Optional[str], str) -> Dict[str, int]
+        """part_id 별 차감 수량 합계 (기본: 서버가 확인한 acked 만)."""
+        totals = {}  # type: Dict[str, int]
+        for row in self.entries(status=status, since=since):
+            totals[row["part_id"]] = totals.get(row["part_id"], 0) + int(row["quantity"])
+        return totals
+
+    # ── 상태 전이 ───────────────────────────────────────────────────────────
+
+    def record_pending(self, doc_id, deductions, request_hash=None):
+        # type: (str, Dict[str, int], Optional[str]) -> str
+        """
+        요청 전송 직전에 호출합니다. 기존 기록(failed 재시도)은 새 내용으로 교체하고
+        attempts 를 1 증가시킵니다. acked 문서에는 호출하지 마십시오.
+        """
+        request_hash = request_hash or compute_request_hash(doc_id, deductions)
+        now = _now_iso()
+        with self._lock:
+            prev = self._conn.execute(
+                "SELECT MAX(attempts) AS a, MIN(created_at) AS c FROM deductions WHERE doc_id = ?",
+                (doc_id,),
+            ).fetchone()
+            attempts = (prev["a"] or 0) + 1
+            created_at = prev["c"] or now
+            with self._conn:
+                self._conn.execute("DELETE FROM deductions WHERE doc_id = ?", (doc_id,))
+                self._conn.executemany(
+                    "INSERT INTO deductions (doc_id, part_id, quantity, request_hash, status,"
+                    " server_ack, attempts, created_at, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, NULL, ?, ?, ?)",
+                    [(doc_id, pid, int(qty), request_hash, STATUS_PENDING, attempts, created_at, now)
+                     for pid, qty in sorted(deductions.items())],
+                )
+        return request_hash
+
+    def mark_acked(self, doc_id, ack=None):
+        # type: (str, Optional[dict]) -> None
+        self._set_status(doc_id, STATUS_ACKED, ack)
+
+    def mark_failed(self, doc_id, error=None):
+        # type: (str, Optional[dict]) -> None
+        self._set_status(doc_id, STATUS_FAILED, error)
+
+    def _set_status(self, doc_id, status, ack):
+        # type: (str, str, Optional[dict]) -> None
+        ack_json = json.dumps(ack, ensure_ascii=False) if ack is not None else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE deductions SET status = ?, server_ack = ?, updated_at = ? WHERE doc_id = ?",
+                (status, ack_json, _now_iso(), doc_id),
+            )
+
+
+def _loads_or_none(raw):
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+# ─────────────────────────────────────────
+# 프로세스 공용 인스턴스 (리스너에서 사용)
+# ─────────────────────────────────────────
+_LEDGER = None  # type: Optional[DeductionLedger]
+_LEDGER_LOCK = threading.Lock()
+
+
+def get_ledger(db_path=None):
+    # type: (Optional[str]) -> DeductionLedger
+    """프로세스당 1개의 원장 인스턴스를 반환합니다 (지연 생성)."""
+    global _LEDGER
+    with _LEDGER_LOCK:
+        if _LEDGER is None:
+            _LEDGER = DeductionLedger(db_path or DEFAULT_LEDGER_PATH)
+        return _LEDGER
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# 서버 대조 (activity_log / inventory)
+# ═════════════════════════════════════════════════════════════════════════════
+
+def find_server_deduction(api_base, doc_id, limit=500, timeout=15):
+    # type: (str, str, int, int) -> Optional[dict]
+    """
+    서버가 이 문서의 차감을 반영했다는 근거를 찾습니다.
+    GET /inventory/deductions/{documentId} (activity_log 전체 + updated_by 가 documentId 인 재고 행).
+    이 라우트가 없는 서버(404)는 /activity/recent 최근 limit 건에서 찾습니다.
+    반환: 반영 근거 details (results / insufficientParts / _logged_at). 못 찾으면 None = 반영 여부 불명
+          (미반영이라는 뜻이 아님 → 호출 측은 재전송하지 말 것)
+    """
+    import api_transport
+    from urllib.parse import quote
+
+    base = api_base.rstrip("/")
+    resp = api_transport.get("{}/inventory/deductions/{}".format(base, quote(doc_id, safe="")),
+                             "deduction_fetch", timeout=timeout)
+    if resp.status_code != 404:
+        resp.raise_for_status()
+        found = resp.json() or {}
+        if not found.get("applied"):
+            return None
+        details = dict(found.get("activity") or {})
+        details["_logged_at"] = details.pop("timestamp", None)
+        details["_stamped_parts"] = found.get("stampedParts") or []
+        return details
+
+    resp = api_transport.get("{}/activity/recent".format(base), "activity_fetch",
+                             params={"limit": limit}, timeout=timeout)
+    resp.raise_for_status()
+    for log in resp.json() or []:
+        if log.get("action") != "inventory_deduct":
+            continue
+        details = log.get("details") or {}
+        if details.get("documentId") == doc_id:
+            details = dict(details)
+            details["_logged_at"] = log.get("timestamp")
+            return details
+    return None
+
+
+def fetch_live_inventory(api_base, timeout=30):
+    # type: (str, int) -> Dict[str, int]
+    """GET /inventory → {part_id: quantity}"""
+    import api_transport
+
+    resp = api_transport.get("{}/inventory".format(api_base.rstrip("/")), "inventory_fetch", timeout=timeout)
+    resp.raise_for_status()
+    return resp.json() or {}
+
+
+def resolve_pending(ledger, api_base, limit=500):
+    # type: (DeductionLedger, str, int) -> Dict[str, str]
+    """
+    pending 상태 문서 중 서버가 반영을 확인해 준 것을 acked 로 확정합니다.
+    근거가 없으면 pending 그대로 둡니다 (활동로그 누락 / 범위 밖일 수 있어 failed 로 바꾸지 않음).
+    반환: {doc_id: 상태}
+    """
+    resolved = {}  # type: Dict[str, str]
+    doc_ids = sorted({r["doc_id"] for r in ledger.entries(status=STATUS_PENDING)})
+    for doc_id in doc_ids:
+        details = find_server_deduction(api_base, doc_id, limit=limit)
+        if details is not None:
+            ledger.mark_acked(doc_id, server_ack_from(details))
+            resolved[doc_id] = STATUS_ACKED
+        else:
+            resolved[doc_id] = STATUS_PENDING
+    return resolved
+
+
+def server_ack_from(details):
+    # type: (dict) -> dict
+    """find_server_deduction 결과 → 원장 server_ack."""
+    return {"results": details.get("results"),
+            "warnings": details.get("insufficientParts"),
+            "stamped_parts": details.get("_stamped_parts"),
+            "source": "server_lookup",
+            "logged_at": details.get("_logged_at")}
+
+
+def reconcile(ledger, snapshot, live, since=None):
+    # type: (DeductionLedger, Dict[str, int], Optional[Dict[str, int]], Optional[str]) -> dict
+    """
+    inventory.json 스냅샷 - 원장 acked 합계 = 기대 재고 를 계산해 라이브 재고와 비교합니다.
+
+    반환:
+      unknown_parts : 원장에는 있으나 스냅샷에 없는 partId (서버가 0 수량 행을 만든 대상)
+      drift         : [{partId, snapshot, deducted, expected, live, diff}] (diff != 0 만)
+      pending       : 반영 여부 불명 doc_id 목록
+    """
+    deducted = ledger.totals_by_part(since=since)
+    unknown = sorted(pid for pid in deducted if pid not in snapshot)
+    drift = []
+    for pid in sorted(deducted):
+        base = int(snapshot.get(pid, 0) or 0)
+        expected = max(0, base - deducted[pid])
+        live_qty = None if live is None else live.get(pid)
+        diff = None if live_qty is None else int(live_qty) - expected
+        if live is None or diff != 0:
+            drift.append({
+                "partId":   pid,
+                "snapshot": base,
+                "deducted": deducted[pid],
+                "expected": expected,
+                "live":     live_qty,
+                "diff":     diff,
+            })
+    pending = sorted({r["doc_id"] for r in ledger.entries(status=STATUS_PENDING)})
+    return {"unknown_parts": unknown, "drift": drift, "pending": pending}
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# CLI
+# ═════════════════════════════════════════════════════════════════════════════
+
+def _print_day(ledger, day):
+    rows = ledger.deducted_on(day)
+    print("=" * 70)
+    print("리스너 재고 차감 내역: {} ({}행)".format(day, len(rows)))
+    print("=" * 70)
+    by_doc = {}  # type: Dict[str, list]
+    for r in rows:
+        by_doc.setdefault(r["doc_id"], []).append(r)
+    totals = {}  # type: Dict[str, int]
+    for doc_id, doc_rows in by_doc.items():
+        print("📄 {} [{}] attempts={}".format(doc_id, doc_rows[0]["status"], doc_rows[0]["attempts"]))
+        for r in doc_rows:
+            print("    {} × {}".format(r["part_id"], r["quantity"]))
+            if r["status"] == STATUS_ACKED:
+                totals[r["part_id"]] = totals.get(r["part_id"], 0) + int(r["quantity"])
+    print("-" * 70)
+    print("partId 별 합계 (acked):")
+    for pid in sorted(totals):
+        print("  {} : {}".format(pid, totals[pid]))
+
+
+def _print_reconcile(report):
+    print("=" * 70)
+    print("재고 대조 결과")
+    print("=" * 70)
+    print("[스냅샷에 없는 partId] {}건".format(len(report["unknown_parts"])))
+    for pid in report["unknown_parts"]:
+        print("  ⚠️ {}".format(pid))
+    print("[차이 발생] {}건".format(len(report["drift"])))
+    for d in report["drift"]:
+        print("  {partId}: 스냅샷 {snapshot} - 차감 {deducted} = 기대 {expected} | 라이브 {live} (diff={diff})".format(**d))
+    print("[반영 여부 불명(pending)] {}건".format(len(report["pending"])))
+    for doc_id in report["pending"]:
+        print("  ⏳ {}".format(doc_id))
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="리스너 재고 차감 원장 조회/대조")
+    p.add_argument("--ledger", default=DEFAULT_LEDGER_PATH, help="원장 SQLite 경로")
+    sub = p.add_subparsers(dest="cmd")
+    sub.add_parser("today", help="오늘(KST) 차감 내역")
+    day = sub.add_parser("day", help="특정 일자 차감 내역")
+    day.add_argument("date", help="YYYY-MM-DD")
+    sub.add_parser("pending", help="반영 여부 불명 요청 목록")
+    rec = sub.add_parser("reconcile", help="inventory.json / GET /inventory 와 대조")
+    rec.add_argument("--inventory-json", default=DEFAULT_INVENTORY_JSON,
+                     help="기준 재고 스냅샷 ({partId: 수량})")
+    rec.add_argument("--since", default=None,
+                     help="이 시각 이후 차감만 합산 (기본: 스냅샷 파일 수정시각)")
+    rec.add_argument("--api", default=None,
+                     help="sammirack API base URL (기본: config.SAMMIRACK_SERVER_URL)")
+    rec.add_argument("--offline", action="store_true", help="/inventory 조회 생략")
+    rec.add_argument("--resolve-pending", action="store_true",
+                     help="서버가 반영을 확인한 pending 요청을 acked 로 확정")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    ledger = DeductionLedger(args.ledger)
+    cmd = args.cmd or "today"
+
+    if cmd == "today":
+        _print_day(ledger, datetime.now(KST).strftime("%Y-%m-%d"))
+    elif cmd == "day":
+        _print_day(ledger, args.date)
+    elif cmd == "pending":
+        rows = ledger.entries(status=STATUS_PENDING)
+        for doc_id in sorted({r["doc_id"] for r in rows}):
+            entry = ledger.entry_for(doc_id)
+            print("⏳ {} | {} | attempts={} | {}개 partId".format(
+                doc_id, entry["updated_at"], entry["attempts"], len(entry["deductions"])))
+    elif cmd == "reconcile":
+        api_base = args.api
+        if api_base is None:
+            from config import SAMMIRACK_SERVER_URL
+            api_base = SAMMIRACK_SERVER_URL
+        with open(args.inventory_json, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        since = args.since
+        if since is None:
+            mtime = os.path.getmtime(args.inventory_json)
+            since = datetime.fromtimestamp(mtime, KST).strftime("%Y-%m-%dT%H:%M:%S")
+        if args.resolve_pending and not args.offline:
+            for doc_id, status in sorted(resolve_pending(ledger, api_base).items()):
+                print("[RESOLVE] {} → {}".format(
+                    doc_id, status if status != STATUS_PENDING else "pending (서버 반영 근거 없음, 수동 확인)"))
+        live = None if args.offline else fetch_live_inventory(api_base)
+        print("  스냅샷: {} (since {})".format(args.inventory_json, since))
+        _print_reconcile(reconcile(ledger, snapshot, live, since=since))
+    ledger.close()
+
+
+if __name__ == "__main__":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+    main()
@@ -0,0 +1,426 @@
+# -*- coding: utf-8 -*-
+"""
+document_store.py
+─────────────────────────────────────────────────────────────────────────────
+sammirack documents 공용 접근 계층
+
+마이그레이션/복원/검증 스크립트가 같은 인터페이스로 문서를 읽고 쓰도록
+세 가지 백엔드를 제공합니다.
+
+  ApiDocumentStore     : GET /documents, POST /documents/bulk-save  (원격/기본)
+  JsonDocumentStore    : documents.json 파일 (오프라인 분석용)
+  SqliteDocumentStore  : sammi.db 직접 접근 (서버 로컬 유지보수 작업용, HTTP 우회)
+
+문서는 GET /documents 응답과 같은 camelCase 형태(+ snake_case 별칭)로 반환됩니다.
+SQLite 백엔드는 요청한 컬럼만 SELECT 하고, items/materials 는 실제로 접근할 때
+JSON 을 디코딩합니다(StoredDocument). 쓰기는 batch 단위 트랜잭션으로 처리합니다.
+
+사용 예:
+    store = open_document_store(api="http://localhost/api", db_path="/home/rocky/db/sammi.db")
+    for doc_id, doc in store.iter_documents(prefix="purchase_ss_"):
+        ...
+    store.save_documents({doc_id: updated_doc})
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import json
+import os
+import sqlite3
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# ─────────────────────────────────────────
+# documents 컬럼 ↔ API 필드 매핑
+# ─────────────────────────────────────────
+# 첫 번째 키가 GET /documents 의 camelCase 필드, 나머지는 호환 별칭
+COLUMN_KEYS = [
+    ("type",                  ("type",)),
+    ("date",                  ("date",)),
+    ("document_number",       ("documentNumber", "document_number")),
+    ("company_name",          ("companyName", "company_name")),
+    ("biz_number",            ("bizNumber", "biz_number")),
+    ("items",                 ("items",)),
+    ("materials",             ("materials",)),
+    ("subtotal",              ("subtotal",)),
+    ("tax",                   ("tax",)),
+    ("total_amount",          ("totalAmount", "total_amount")),
+    ("notes",                 ("notes",)),
+    ("top_memo",              ("topMemo", "top_memo")),
+    ("created_at",            ("createdAt", "created_at")),
+    ("updated_at",            ("updatedAt", "updated_at")),
+    ("deleted",               ("deleted",)),
+    ("inventory_deducted",    ("inventoryDeducted",)),
+    ("inventory_deducted_at", ("inventoryDeductedAt",)),
+    ("inventory_deducted_by", ("inventoryDeductedBy",)),
+]
+ALL_COLUMNS = tuple(col for col, _ in COLUMN_KEYS)
+_KEYS_BY_COLUMN = dict(COLUMN_KEYS)
+JSON_COLUMNS = ("items", "materials")
+
+# 스크립트별 기본 컬럼 세트
+FIELDS_SUMMARY = ("type", "date", "document_number", "company_name", "total_amount",
+                  "created_at", "updated_at", "deleted")
+FIELDS_TIMESTAMPS = ("created_at", "updated_at", "deleted")
+
+
+def _safe_json_loads(value, fallback):
+    if isinstance(value, (list, dict)):
+        return value
+    if value in (None, ""):
+        return fallback
+    try:
+        return json.loads(value)
+    except Exception:
+        return fallback
+
+
+class StoredDocument(dict):
+    """
+    items/materials 를 지연 디코딩하는 문서 dict.
+
+    doc["items"] / doc.get("materials") 로 처음 접근할 때 JSON 문자열을 파싱해
+    캐시합니다. dict(doc) 로 복사하면 아직 파싱 안 된 값은 문자열 그대로 복사되므로,
+    복사본을 쓰는 쪽은 기존처럼 문자열/리스트 둘 다 처리해야 합니다.
+    """
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if key in JSON_COLUMNS and isinstance(value, str):
+            value = _safe_json_loads(value, [])
+            dict.__setitem__(self, key, value)
+        return value
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def is_decoded(self, key):
+        # type: (str) -> bool
+        return not isinstance(dict.get(self, key), str)
+
+
+def row_to_document(doc_id, row, columns):
+    # type: (str, sqlite3.Row, Iterable[str]) -> StoredDocument
+    """SQLite 행 → API 형태 문서 (요청한 컬럼만)."""
+    doc = StoredDocument()
+    doc["doc_id"] = doc_id
+    doc["id"] = doc_id
+    for col in columns:
+        value = row[col]
+        if col == "deleted" or col == "inventory_deducted":
+            value = bool(value)
+        for key in _KEYS_BY_COLUMN[col]:
+            dict.__setitem__(doc, key, value)
+    return doc
+
+
+def document_to_columns(doc, only=None):
+    # type: (dict, Optional[Iterable[str]]) -> Dict[str, object]
+    """API 형태 문서 → {컬럼: 값}. 문서에 존재하는 필드만 포함합니다."""
+    values = {}
+    for col, keys in COLUMN_KEYS:
+        if only is not None and col not in only:
+            continue
+        for key in keys:
+            if key in doc:
+                value = dict.get(doc, key) if isinstance(doc, dict) else doc[key]
+                if col in JSON_COLUMNS and not isinstance(value, str):
+                    value = json.dumps(value if value is not None else [], ensure_ascii=False)
+                elif col in ("deleted", "inventory_deducted"):
+                    value = 1 if value else 0
+                values[col] = value
+                break
+    return values
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# 인터페이스
+# ═════════════════════════════════════════════════════════════════════════════
+
+class DocumentStore(object):
+    """백엔드 공통 인터페이스."""
+
+    name = "base"
+
+    def iter_documents(self, prefix=None, fields=None, include_deleted=True):
+        # type: (Optional[str], Optional[Iterable[str]], bool) -> Iterator[Tuple[str, dict]]
+        """(doc_id, doc) 를 순회합니다. fields 는 필요한 컬럼 힌트(백엔드가 지원하는 경우만 적용)."""
+        raise NotImplementedError
+
+    def load_documents(self, prefix=None, fields=None, include_deleted=True):
+        # type: (Optional[str], Optional[Iterable[str]], bool) -> Dict[str, dict]
+        return dict(self.iter_documents(prefix=prefix, fields=fields, include_deleted=include_deleted))
+
+    def get_documents(self, doc_ids, fields=None):
+        # type: (Iterable[str], Optional[Iterable[str]]) -> Dict[str, dict]
+        """지정한 doc_id 만 (삭제 문서 포함, 없는 ID 는 생략). 기본 구현은 전체 순회."""
+        wanted = set(doc_ids)
+        return {doc_id: doc for doc_id, doc in self.iter_documents(fields=fields) if doc_id in wanted}
+
+    def save_documents(self, docs, batch_size=50):
+        # type: (Dict[str, dict], int) -> Tuple[int, List[str]]
+        """{doc_id: doc} 저장. 반환: (성공 건수, 실패 doc_id 목록)"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _matches(doc_id, doc, prefix, include_deleted):
+    if prefix and not str(doc_id).startswith(prefix):
+        return False
+    if not include_deleted and doc.get("deleted"):
+        return False
+    return True
+
+
+def _chunks(items, size):
+    items = list(items)
+    for i in range(0, len(items), max(1, size)):
+        yield items[i:i + size]
+
+
+# ─────────────────────────────────────────
+# API 백엔드
+# ─────────────────────────────────────────
+class ApiDocumentStore(DocumentStore):
+    name = "api"
+
+    def __init__(self, api_base, timeout=30):
+        self.api_base = api_base.rstrip("/")
+        self.timeout = timeout
+
+    def _fetch_all(self):
+        import api_transport
+
+        resp = api_transport.get("{}/documents".format(self.api_base), "documents_fetch", timeout=self.timeout)
+        resp.raise_for_status()
+        return normalize_documents(resp.json())
+
+    def iter_documents(self, prefix=None, fields=None, include_deleted=True):
+        for doc_id, doc in self._fetch_all().items():
+            if _matches(doc_id, doc, prefix, include_deleted):
+                yield doc_id, doc
+
+    def save_documents(self, docs, batch_size=50):
+        import api_transport
+
+        ok, failed = 0, []  # type: Tuple[int, List[str]]
+        url = "{}/documents/bulk-save".format(self.api_base)
+        for chunk in _chunks(sorted(docs.items()), batch_size):
+            body = {"documents": {doc_id: dict(doc) for doc_id, doc in chunk}}
+            try:
+                resp = api_transport.post(url, "documents_bulk_save", json_body=body, timeout=max(self.timeout, 60))
+            except Exception:
+                failed.extend(doc_id for doc_id, _ in chunk)
+                continue
+            if resp.status_code < 300:
+                ok += len(chunk)
+            else:
+                failed.extend(doc_id for doc_id, _ in chunk)
+        return ok, failed
+
+
+# ─────────────────────────────────────────
+# JSON 파일 백엔드
+# ─────────────────────────────────────────
+class JsonDocumentStore(DocumentStore):
+    name = "documents_json"
+
+    def __init__(self, path):
+        self.path = path
+        self._docs = None  # type: Optional[Dict[str, dict]]
+
+    def _load(self):
+        if self._docs is None:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._docs = normalize_documents(json.load(f))
+        return self._docs
+
+    def iter_documents(self, prefix=None, fields=None, include_deleted=True):
+        for doc_id, doc in self._load().items():
+            if _matches(doc_id, doc, prefix, include_deleted):
+                yield doc_id, doc
+
+    def save_documents(self, docs, batch_size=50):
+        current = self._load()
+        for doc_id, doc in docs.items():
+            current[doc_id] = dict(doc)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+        return len(docs), []
+
+
+# ─────────────────────────────────────────
+# SQLite 직접 백엔드
+# ─────────────────────────────────────────
+class SqliteDocumentStore(DocumentStore):
+    """
+    sammi.db 의 documents 테이블을 직접 읽고 씁니다.
+
+    - 읽기: 필요한 컬럼만 SELECT, 커서를 순회하며 1행씩 변환 (fetchall 없음)
+    - 쓰기: 문서에 존재하는 필드의 컬럼만 UPDATE (inventory_deducted 등 다른 컬럼 보존),
+            batch_size 건마다 커밋하는 짧은 트랜잭션
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path, readonly=False, busy_timeout_ms=5000):
+        self.db_path = db_path
+        self.readonly = readonly
+        if readonly:
+            uri = "file:{}?mode=ro".format(os.path.abspath(db_path))
+            self._conn = sqlite3.connect(uri, uri=True, timeout=busy_timeout_ms / 1000.0)
+        else:
+            self._conn = sqlite3.connect(db_path, timeout=busy_timeout_ms / 1000.0)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA busy_timeout = {}".format(int(busy_timeout_ms)))
+        self._check_table()
+
+    def _check_table(self):
+        tables = {
+            row["name"]
+            for row in self._conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        }
+        if "documents" not in tables:
+            raise RuntimeError(
+                "documents 테이블이 없습니다. 현재 테이블: {}".format(
+                    ", ".join(sorted(tables)) if tables else "(없음)"
+                )
+            )
+        self._columns = {
+            row["name"] for row in self._conn.execute("PRAGMA table_info(documents)")
+        }
+
+    def iter_documents(self, prefix=None, fields=None, include_deleted=True):
+        columns = [c for c in (fields or ALL_COLUMNS) if c in self._columns]
+        if not include_deleted and "deleted" in self._columns and "deleted" not in columns:
+            columns.append("deleted")
+        sql = "SELECT doc_id{} FROM documents".format(
+            "".join(", " + c for c in columns)
+        )
+        params = []  # type: list
+        where = []
+        if prefix:
+            # doc_id 는 PRIMARY KEY → 범위 조건으로 인덱스 사용
+            where.append("doc_id >= ? AND doc_id < ?")
+            params.extend([prefix, prefix + "\uffff"])
+        if not include_deleted and "deleted" in self._columns:
+            where.append("COALESCE(deleted, 0) = 0")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        # PRIMARY KEY 순서 → 정렬용 임시 B-tree 없이 커서가 바로 스트리밍 (다른 순서는 호출 측에서 정렬)
+        sql += " ORDER BY doc_id"
+        cursor = self._conn.execute(sql, params)
+        for row in cursor:
+            doc_id = row["doc_id"]
+            yield doc_id, row_to_document(doc_id, row, columns)
+
+    def get_documents(self, doc_ids, fields=None):
+        columns = [c for c in (fields or ALL_COLUMNS) if c in self._columns]
+        docs = {}  # type: Dict[str, dict]
+        # SQLite 바인드 변수 한도(구버전 999) 안에서 PRIMARY KEY IN (...) 조회
+        for chunk in _chunks(sorted(set(doc_ids)), 500):
+            sql = "SELECT doc_id{} FROM documents WHERE doc_id IN ({})".format(
+                "".join(", " + c for c in columns), ", ".join("?" * len(chunk)))
+            for row in self._conn.execute(sql, chunk):
+                docs[row["doc_id"]] = row_to_document(row["doc_id"], row, columns)
+        return docs
+
+    def save_documents(self, docs, batch_size=50):
+        ok, failed = 0, []  # type: Tuple[int, List[str]]
+        if self.readonly:
+            raise RuntimeError("읽기 전용으로 열린 SqliteDocumentStore 입니다.")
+        for chunk in _chunks(sorted(docs.items()), batch_size):
+            try:
+                with self._conn:
+                    for doc_id, doc in chunk:
+                        values = document_to_columns(doc)
+                        values = {c: v for c, v in values.items() if c in self._columns}
+                        if not values:
+                            continue
+                        cols = sorted(values)
+                        cur = self._conn.execute(
+                            "UPDATE documents SET {} WHERE doc_id = ?".format(
+                                ", ".join("{} = ?".format(c) for c in cols)
+                            ),
+                            [values[c] for c in cols] + [doc_id],
+                        )
+                        if cur.rowcount == 0:
+                            raise KeyError(doc_id)
+                ok += len(chunk)
+            except Exception:
+                failed.extend(doc_id for doc_id, _ in chunk)
+        return ok, failed
+
+    def close(self):
+        self._conn.close()
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# 공용 헬퍼
+# ═════════════════════════════════════════════════════════════════════════════
+
+def normalize_documents(raw):
+    # type: (object) -> Dict[str, dict]
+    if isinstance(raw, dict):
+        return raw
+    if isinstance(raw, list):
+        normalized = {}
+        for doc in raw:
+            doc_id = doc.get("doc_id") or doc.get("id") or ""
+            if doc_id:
+                normalized[doc_id] = doc
+        return normalized
+    return {}
+
+
+def open_document_store(api=None, db_path=None, documents_json=None, readonly=False, timeout=30):
+    # type: (Optional[str], Optional[str], Optional[str], bool, int) -> DocumentStore
+    """
+    우선순위: documents_json > db_path > api.
+    db_path 를 지정했는데 파일이 없으면 FileNotFoundError (오타로 조용히 HTTP 로 쓰지 않도록).
+    """
+    if documents_json:
+        return JsonDocumentStore(documents_json)
+    if db_path:
+        if not os.path.exists(db_path):
+            raise FileNotFoundError("--db-path 파일이 없습니다: {}".format(db_path))
+        return SqliteDocumentStore(db_path, readonly=readonly)
+    if api:
+        return ApiDocumentStore(api, timeout=timeout)
+    raise ValueError("문서 소스가 지정되지 않았습니다 (--api / --db-path / --documents-json)")
+
+
+def add_store_arguments(parser, default_api="http://localhost/api"):
+    """argparse 에 공통 문서 소스 옵션 추가."""
+    parser.add_argument("--api", default=default_api,
+                        help="sammirack API base URL (기본: {})".format(default_api))
+    parser.add_argument("--db-path", default="",
+                        help="sammi.db 직접 접근 (서버 로컬 작업 시 HTTP 우회). 예: /home/rocky/db/sammi.db")
+    parser.add_argument("--documents-json", default="",
+                        help="API 대신 사용할 documents.json 경로")
+    return parser
+
+
+def store_from_args(args, readonly=False):
+    # type: (object, bool) -> DocumentStore
+    """CLI 공용. 소스 지정 오류는 메시지를 출력하고 종료합니다."""
+    try:
+        return open_document_store(
+            api=getattr(args, "api", None),
+            db_path=getattr(args, "db_path", None),
+            documents_json=getattr(args, "documents_json", None),
+            readonly=readonly,
+        )
+    except (FileNotFoundError, ValueError) as e:
+        raise SystemExit("❌ {}".format(e))
+
@@ -2,9 +2,9 @@ import json
 import sys
 import os
 
-# Import order_listener logic
+# Import ss_pipeline logic
 sys.path.append(os.getcwd())
-from order_listener import get_rack_type, parse_smartstore_option, build_item_name, generate_bom_for_rack
+from ss_pipeline import get_rack_type, parse_smartstore_option, build_item_name, generate_bom_for_rack
 
 def generate_report():
     test_cases = [
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+inventory_index.py
+─────────────────────────────────────────────────────────────────────────────
+서버 재고 part_id 색인 (재고 차감 전 검증)
+
+/inventory/deduct 는 모르는 partId 를 받으면 트랜잭션 안에서 수량 0 행을 새로 만듭니다.
+리스너가 GET /inventory 의 part_id 집합을 메모리에 들고 있다가, 차감 요청을 만들 때
+모르는 ID 를 미리 걸러냅니다.
+
+갱신 (refresh_interval 초마다, 차감 직전에 필요할 때만):
+  - If-None-Match (express 기본 ETag) → 304 면 본문 없이 그대로
+  - 200 이어도 part_id 집합이 같으면(digest) 색인 교체 안 함 (수량 변화는 무시)
+  - 조회 실패 시 기존 색인 유지. 한 번도 못 읽었으면 검증 생략 (기존 동작과 같음)
+
+차감 요청 만들기 (build_deductions):
+  partId 가 색인에 있음                        → 그대로
+  없지만 inventoryPartId / _inventoryPartId 가 있음 → 그 ID 로 remap
+  모두 없음                                    → policy "skip": 요청에서 제외 (0 수량 행 방지)
+                                                 policy "flag": 그대로 보내고 경고만
+  모르는 ID 가 나오면 색인을 한 번 강제 갱신한 뒤 다시 판단합니다 (min_forced_interval 제한).
+  건수는 /metrics 의 listener_inventory_unknown_parts_total{rack_type, action}.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from listener_metrics import INVENTORY_MISSES, INVENTORY_PARTS, INVENTORY_REFRESHES
+
+log = logging.getLogger("sammirack.listener.inventory")
+
+POLICY_SKIP = "skip"
+POLICY_FLAG = "flag"
+POLICIES = (POLICY_SKIP, POLICY_FLAG)
+
+ACTION_REMAPPED = "remapped"
+ACTION_SKIPPED = "skipped"
+ACTION_FLAGGED = "flagged"
+
+
+class InventoryIndex(object):
+    def __init__(self, api_base, refresh_interval=300, min_forced_interval=30, timeout=15, proxies=None):
+        # type: (str, float, float, int, Optional[dict]) -> None
+        self.api_base = api_base.rstrip("/")
+        self.refresh_interval = refresh_interval
+        self.min_forced_interval = min_forced_interval
+        self.timeout = timeout
+        self.proxies = proxies
+        self.version = 0              # part_id 집합이 바뀔 때마다 +1
+        self._ids = None              # type: Optional[frozenset]
+        self._digest = None           # type: Optional[str]
+        self._etag = None             # type: Optional[str]
+        self._last_attempt = None     # type: Optional[float]
+        self._last_forced = None      # type: Optional[float]
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        # type: () -> bool
+        return self._ids is not None
+
+    def __contains__(self, part_id):
+        ids = self._ids
+        return ids is not None and part_id in ids
+
+    def __len__(self):
+        ids = self._ids
+        return 0 if ids is None else len(ids)
+
+    def load(self, inventory):
+        # type: (Dict[str, object]) -> bool
+        """{part_id: quantity} 로 색인 교체. 집합이 바뀌었으면 True."""
+        ids = frozenset(str(pid) for pid in inventory)
+        digest = hashlib.sha256("\n".join(sorted(ids)).encode("utf-8")).hexdigest()
+        with self._lock:
+            if digest == self._digest:
+                return False
+            self._ids, self._digest = ids, digest
+            self.version += 1
+        INVENTORY_PARTS.set(len(ids))
+        return True
+
+    def refresh(self):
+        # type: () -> str
+        """GET /inventory. 반환: "changed" / "unchanged" / "not_modified" / "error"."""
+        import api_transport
+
+        self._last_attempt = time.monotonic()
+        headers = {"If-None-Match": self._etag} if self._etag and self.ready else {}
+        try:
+            resp = api_transport.get("{}/inventory".format(self.api_base), "inventory_fetch", headers=headers,
+                                     proxies=self.proxies, timeout=self.timeout)
+            if resp.status_code == 304:
+                result = "not_modified"
+            else:
+                resp.raise_for_status()
+                result = "changed" if self.load(resp.json() or {}) else "unchanged"
+                self._etag = resp.headers.get("ETag")
+        except Exception as e:
+            log.warning("재고 색인 갱신 실패 (기존 색인 유지, %d건): %s", len(self), e,
+                        extra={"tag": "INVENTORY"})
+            result = "error"
+        INVENTORY_REFRESHES.inc(result=result)
+        if result == "changed":
+            log.info("재고 색인 갱신: %d건 (v%d)", len(self), self.version, extra={"tag": "INVENTORY"})
+        return result
+
+    def maybe_refresh(self):
+        # type: () -> Optional[str]
+        """마지막 시도 후 refresh_interval 이 지났으면 갱신."""
+        if self._last_attempt is None or time.monotonic() - self._last_attempt >= self.refresh_interval:
+            return self.refresh()
+        return None
+
+    def force_refresh(self):
+        # type: () -> Optional[str]
+        """모르는 ID 를 만났을 때. min_forced_interval 안에 이미 했으면 생략."""
+        now = time.monotonic()
+        if self._last_forced is not None and now - self._last_forced < self.min_forced_interval:
+            return None
+        self._last_forced = now
+        return self.refresh()
+
+
+def build_deductions(materials, index=None, policy=POLICY_SKIP):
+    # type: (List[dict], Optional[InventoryIndex], str) -> Tuple[Dict[str, int], List[dict]]
+    """
+    materials → ({partId: 수량}, misses).
+    misses: 색인에 없던 ID [{partId, rackType, action, remappedTo?}]. 색인이 없으면 검증 생략.
+    """
+    deductions = {}  # type: Dict[str, int]
+    misses = []      # type: List[dict]
+    check = index is not None and index.ready
+    for mat in materials:
+        part_id = mat.get("partId") or mat.get("inventoryPartId")
+        quantity = mat.get("quantity", 0)
+        if not (part_id and quantity > 0):
+            continue
+        if check and part_id not in index:
+            miss = {"partId": part_id, "rackType": mat.get("rackType") or "unknown"}
+            alt = next((c for c in (mat.get("inventoryPartId"), mat.get("_inventoryPartId"))
+                        if c and c in index), None)
+            if alt:
+                miss.update(action=ACTION_REMAPPED, remappedTo=alt)
+                part_id = alt
+            elif policy == POLICY_SKIP:
+                miss["action"] = ACTION_SKIPPED
+                misses.append(miss)
+                continue
+            else:
+                miss["action"] = ACTION_FLAGGED
+            misses.append(miss)
+        deductions[part_id] = deductions.get(part_id, 0) + quantity
+    return deductions, misses
+
+
+def validated_deductions(materials, index, policy=POLICY_SKIP, doc_id=""):
+    # type: (List[dict], Optional[InventoryIndex], str, str) -> Dict[str, int]
+    """build_deductions + 모르는 ID 가 남으면 색인 강제 갱신 후 재시도 + 지표/로그."""
+    if index is not None:
+        index.maybe_refresh()
+    deductions, misses = build_deductions(materials, index, policy)
+    unresolved = [m for m in misses if m["action"] != ACTION_REMAPPED]
+    if unresolved and index is not None and index.force_refresh() == "changed":
+        deductions, misses = build_deductions(materials, index, policy)
+    for miss in misses:
+        INVENTORY_MISSES.inc(rack_type=miss["rackType"], action=miss["action"])
+    if misses:
+        log.warning("재고 색인에 없는 partId %d건: %s", len(misses),
+                    ", ".join("{}({})".format(m["partId"], m["action"]) for m in misses),
+                    extra={"tag": "INVENTORY", "doc_id": doc_id})
+    return deductions
+
+
+_INDEX = None  # type: Optional[InventoryIndex]
+_INDEX_LOCK = threading.Lock()
+
+
+def get_inventory_index(api_base, **kwargs):
+    # type: (str, ...) -> InventoryIndex
+    """프로세스당 1개의 색인 인스턴스를 반환합니다 (지연 생성, 첫 조회는 차감 직전)."""
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            _INDEX = InventoryIndex(api_base, **kwargs)
+        return _INDEX
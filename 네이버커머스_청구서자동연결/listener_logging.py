@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+listener_logging.py
+─────────────────────────────────────────────────────────────────────────────
+리스너 구조화 로깅 (JSON 한 줄 = 레코드 1개, 큐 기반 비동기 출력)
+
+  from listener_logging import get_logger, setup_logging
+
+  log = get_logger()
+  log.info("저장 성공", extra={"tag": "DB-SAVE", "doc_id": doc_id, "elapsed_ms": 12.3})
+
+  setup_logging()     # 리스너 진입점에서 1회. 이후 stdout 쓰기는 별도 스레드에서 처리
+
+출력 (LISTENER_LOG_FORMAT=json, 기본):
+  {"ts": "2026-03-01T10:00:00.123+09:00", "level": "INFO", "tag": "DB-SAVE",
+   "msg": "저장 성공", "doc_id": "purchase_ss_...", "elapsed_ms": 12.3}
+LISTENER_LOG_FORMAT=text 이면 기존 print 와 같은 "[TAG] msg" 형식 (+ key=value).
+
+레벨 (LISTENER_LOG_LEVEL, 기본 INFO):
+  DEBUG  : 새 주문 상세 박스 / 드라이런 페이로드 덤프 포함
+  INFO   : 폴링·저장·차감 결과 한 줄씩
+  WARNING: 실패/재시도만
+
+setup_logging() 을 부르지 않은 스크립트(검증·벤치 도구)에서는 logging 기본 동작대로
+WARNING 이상만 stderr 로 나갑니다.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+LOGGER_NAME = "sammirack.listener"
+KST = timezone(timedelta(hours=9))
+
+# LogRecord 기본 속성 (이 외의 속성은 extra 로 들어온 구조화 필드)
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "tag"}
+
+_QUEUE_LISTENER = None  # type: Optional[logging.handlers.QueueListener]
+
+
+def _fields(record):
+    # type: (logging.LogRecord) -> dict
+    return {k: v for k, v in vars(record).items() if k not in _RESERVED and not k.startswith("_")}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        # type: (logging.LogRecord) -> str
+        body = {
+            "ts":    datetime.fromtimestamp(record.created, KST).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+        }
+        tag = getattr(record, "tag", None)
+        if tag:
+            body["tag"] = tag
+        body["msg"] = record.getMessage()
+        body.update(_fields(record))
+        if record.exc_info:
+            body["exc"] = self.formatException(record.exc_info)
+        return json.dumps(body, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        # type: (logging.LogRecord) -> str
+        line = record.getMessage()
+        # 박스형 덤프 (print_new_order / print_dry_run) 는 원래 모양 그대로
+        if "\n" not in line:
+            tag = getattr(record, "tag", None)
+            if tag:
+                line = "[{}] {}".format(tag, line)
+            fields = _fields(record)
+            if fields:
+                line += "  " + " ".join("{}={}".format(k, v) for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """같은 프로세스 안의 큐이므로 구조화 필드·exc_info 를 그대로 넘긴다 (기본 prepare 는 msg 로 뭉갬)."""
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def get_logger(name=None):
+    # type: (Optional[str]) -> logging.Logger
+    return logging.getLogger(LOGGER_NAME + ("." + name if name else ""))
+
+
+def setup_logging(level=None, fmt=None, stream=None):
+    # type: (Optional[str], Optional[str], Optional[object]) -> logging.handlers.QueueListener
+    """
+    리스너 로거에 큐 핸들러를 붙이고, 실제 쓰기는 QueueListener 스레드가 맡습니다.
+    여러 번 불러도 한 번만 설정됩니다.
+    """
+    global _QUEUE_LISTENER
+    if _QUEUE_LISTENER is not None:
+        return _QUEUE_LISTENER
+
+    level = (level or os.environ.get("LISTENER_LOG_LEVEL") or "INFO").upper()
+    fmt = (fmt or os.environ.get("LISTENER_LOG_FORMAT") or "json").lower()
+
+    sink = logging.StreamHandler(stream or sys.stdout)
+    sink.setFormatter(TextFormatter() if fmt == "text" else JsonFormatter())
+
+    records = queue.Queue(-1)  # type: queue.Queue
+    _QUEUE_LISTENER = logging.handlers.QueueListener(records, sink)
+    _QUEUE_LISTENER.start()
+
+    logger = get_logger()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(_QueueHandler(records))
+    logger.setLevel(getattr(logging, level, logging.INFO))
+    logger.propagate = False
+
+    atexit.register(shutdown_logging)
+    return _QUEUE_LISTENER
+
+
+def shutdown_logging():
+    """큐에 남은 레코드를 모두 쓰고 출력 스레드를 멈춥니다."""
+    global _QUEUE_LISTENER
+    listener, _QUEUE_LISTENER = _QUEUE_LISTENER, None
+    if listener is None:
+        return
+    logger = get_logger()
+    for handler in list(logger.handlers):
+        if isinstance(handler, _QueueHandler):
+            logger.removeHandler(handler)
+    logger.propagate = True
+    listener.stop()
@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+"""
+listener_metrics.py
+─────────────────────────────────────────────────────────────────────────────
+리스너 단계별 지연 / 카운터 / 게이지 (Prometheus 텍스트 형식, 표준 라이브러리만 사용)
+
+  from listener_metrics import STAGE_SECONDS, stage, timed
+
+  with stage("list_fetch"):
+      ...
+  @timed("bom")
+  def generate_bom_for_rack(...): ...
+
+  start_metrics_server(9108)   # GET http://127.0.0.1:9108/metrics
+  start_metrics_server(9108, routes={("POST", "/nudge"): handler})   # handler(query) → (status, JSON 문자열)
+
+단계 이름 (listener_stage_seconds{stage=...}):
+  token_refresh, list_fetch, detail_fetch, parse, grouping, bom, price_lookup,
+  part_id, csv_write, payload_log, document_build, document_save, inventory_deduct, price_sync,
+  poll_cycle
+  (단계는 중첩될 수 있음: bom 은 price_lookup 을, poll_cycle 은 나머지 전부를 포함)
+
+관측값 기록은 잠금 1회 + 버킷 탐색뿐이라 핫패스(가격 조회 등)에 둬도 부담이 작습니다.
+서버를 띄우지 않으면 값만 메모리에 쌓이고 외부로 나가지 않습니다.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+ROUTE_CONTENT_TYPE = "application/json; charset=utf-8"
+MAX_ROUTE_BODY = 64 * 1024
+
+
+def _label_key(labelnames, labels):
+    # type: (Sequence[str], dict) -> Tuple[str, ...]
+    if set(labels) != set(labelnames):
+        raise ValueError("labels {} != {}".format(sorted(labels), sorted(labelnames)))
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _escape(value):
+    # type: (str) -> str
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, key, extra=None):
+    # type: (Sequence[str], Tuple[str, ...], Optional[Tuple[str, str]]) -> str
+    pairs = list(zip(labelnames, key))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(k, _escape(v)) for k, v in pairs) + "}"
+
+
+def _format_value(value):
+    # type: (float) -> str
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# 지표 타입
+# ═════════════════════════════════════════════════════════════════════════════
+
+class _Metric(object):
+    kind = ""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self):
+        # type: () -> List[str]
+        return ["# HELP {} {}".format(self.name, self.help),
+                "# TYPE {} {}".format(self.name, self.kind)]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super(Counter, self).__init__(name, help_text, labelnames)
+        self._values = {}  # type: Dict[Tuple[str, ...], float]
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        # type: (...) -> float
+        with self._lock:
+            return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def snapshot_all(self):
+        # type: () -> Dict[Tuple[str, ...], float]
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        # type: () -> List[str]
+        lines = self._header()
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        for key, value in items:
+            lines.append("{}{} {}".format(self.name, _format_labels(self.labelnames, key), _format_value(value)))
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key → [bucket counts..., sum, count]
+        self._series = {}  # type: Dict[Tuple[str, ...], List[float]]
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def snapshot(self, **labels):
+        # type: (...) -> Dict[str, float]
+        """{"count", "sum"} (프로파일 메타데이터 등에서 사용)."""
+        with self._lock:
+            series = self._series.get(_label_key(self.labelnames, labels))
+            if series is None:
+                return {"count": 0, "sum": 0.0}
+            return {"count": series[-1], "sum": series[-2]}
+
+    def snapshot_all(self):
+        # type: () -> Dict[Tuple[str, ...], Dict[str, float]]
+        with self._lock:
+            return {key: {"count": series[-1], "sum": series[-2]} for key, series in self._series.items()}
+
+    def render(self):
+        # type: () -> List[str]
+        lines = self._header()
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append("{}_bucket{} {}".format(
+                    self.name, _format_labels(self.labelnames, key, ("le", _format_value(bound))), cumulative))
+            lines.append("{}_bucket{} {}".format(
+                self.name, _format_labels(self.labelnames, key, ("le", "+Inf")), _format_value(series[-1])))
+            labels = _format_labels(self.labelnames, key)
+            lines.append("{}_sum{} {}".format(self.name, labels, repr(float(series[-2]))))
+            lines.append("{}_count{} {}".format(self.name, labels, _format_value(series[-1])))
+        return lines
+
+
+class Registry(object):
+    def __init__(self):
+        self._metrics = []  # type: List[_Metric]
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        # type: () -> str
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []  # type: List[str]
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# 리스너 지표
+# ═════════════════════════════════════════════════════════════════════════════
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "listener_stage_seconds", "Time spent per pipeline stage", ("stage",)))
+ORDERS_SEEN = REGISTRY.register(Counter(
+    "listener_orders_seen_total", "New product orders detected"))
+ORDERS_SKIPPED = REGISTRY.register(Counter(
+    "listener_orders_skipped_total", "Orders skipped as unsupported rack"))
+ORDERS_GROUPED = REGISTRY.register(Counter(
+    "listener_orders_grouped_total", "Supported orders passed to grouping"))
+GROUPS_BUILT = REGISTRY.register(Counter(
+    "listener_groups_total", "Documents built from order groups"))
+ORDERS_FAILED = REGISTRY.register(Counter(
+    "listener_failures_total", "Failures by stage", ("stage",)))
+SEEN_IDS = REGISTRY.register(Gauge(
+    "listener_seen_ids", "Size of the in-memory seen product order id set"))
+POLL_LAG = REGISTRY.register(Gauge(
+    "listener_poll_lag_seconds", "How late the last poll started relative to its schedule"))
+LAST_POLL = REGISTRY.register(Gauge(
+    "listener_last_poll_timestamp_seconds", "Unix time of the last completed poll"))
+INVENTORY_PARTS = REGISTRY.register(Gauge(
+    "listener_inventory_index_parts", "Part ids in the live inventory index"))
+INVENTORY_REFRESHES = REGISTRY.register(Counter(
+    "listener_inventory_refresh_total", "Inventory index refreshes by result", ("result",)))
+INVENTORY_MISSES = REGISTRY.register(Counter(
+    "listener_inventory_unknown_parts_total",
+    "Deduction part ids missing from the inventory index", ("rack_type", "action")))
+SESSIONS_OPEN = REGISTRY.register(Gauge(
+    "listener_sessions_open", "Order sessions held open in the grouping window"))
+SESSIONS_LATE = REGISTRY.register(Counter(
+    "listener_sessions_late_total", "Order sessions reopened by rows arriving after emission"))
+SESSIONS_EVICTED = REGISTRY.register(Counter(
+    "listener_sessions_evicted_total", "Order sessions emitted early because the window was full"))
+PRICE_ENTRIES = REGISTRY.register(Gauge(
+    "listener_price_entries", "Entries in the in-memory admin price table"))
+PRICE_SYNCS = REGISTRY.register(Counter(
+    "listener_price_sync_total", "Price syncs by mode (full/delta) and result", ("mode", "result")))
+PRICE_SYNC_BYTES = REGISTRY.register(Counter(
+    "listener_price_sync_bytes_total", "Response body bytes received by price syncs", ("mode",)))
+POLL_INTERVAL = REGISTRY.register(Gauge(
+    "listener_poll_interval_seconds", "Sleep before the next poll chosen by the scheduler"))
+POLL_SCHEDULES = REGISTRY.register(Counter(
+    "listener_poll_schedule_total", "Poll intervals chosen by reason", ("reason",)))
+ARRIVAL_RATE = REGISTRY.register(Gauge(
+    "listener_arrival_rate_per_hour", "Order arrival rate used for the current poll interval"))
+NUDGES = REGISTRY.register(Counter(
+    "listener_nudges_total", "External poll nudges by result", ("result",)))
+DETECTION_LATENCY = REGISTRY.register(Histogram(
+    "listener_detection_latency_seconds", "Payment time to detection by the listener",
+    buckets=(1, 2, 5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300, 600, 1800, 3600)))
+API_BODY_BYTES = REGISTRY.register(Counter(
+    "listener_api_body_bytes_total", "sammirack API body bytes before compression", ("call", "direction")))
+API_WIRE_BYTES = REGISTRY.register(Counter(
+    "listener_api_wire_bytes_total", "sammirack API body bytes on the wire", ("call", "direction")))
+
+
+def stage(name):
+    """with stage("grouping"): ... — listener_stage_seconds{stage=name} 에 기록."""
+    return STAGE_SECONDS.time(stage=name)
+
+
+def timed(name):
+    """함수 전체를 단계 name 으로 계측하는 데코레이터."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - t0, stage=name)
+        return wrapper
+    return decorator
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# /metrics HTTP 서버
+# ═════════════════════════════════════════════════════════════════════════════
+
+def _make_handler(registry, routes=None):
+    """http.server 는 서버를 띄울 때만 import (ss_pipeline 등 계측만 쓰는 쪽은 네트워크 스택 불필요)."""
+    from http.server import BaseHTTPRequestHandler
+    from urllib.parse import parse_qs
+
+    routes = dict(routes or {})
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass
+
+        def _reply(self, status, body, content_type=CONTENT_TYPE):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _route(self, method):
+            # type: (str) -> bool
+            path, _, query = self.path.partition("?")
+            handler = routes.get((method, path.rstrip("/")))
+            if handler is None:
+                return False
+            status, body = handler(parse_qs(query))
+            self._reply(status, body + "\n", ROUTE_CONTENT_TYPE)
+            return True
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0].rstrip("/")
+            if path == "/metrics":
+                self._reply(200, registry.render())
+            elif not self._route("GET"):
+                self._reply(404, "not found\n")
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_ROUTE_BODY:
+                self._reply(413, "too large\n")
+                return
+            if length:
+                self.rfile.read(length)   # 본문은 쓰지 않음 (연결 정리용)
+            if not self._route("POST"):
+                self._reply(404, "not found\n")
+
+    return MetricsHandler
+
+
+def start_metrics_server(port, host="127.0.0.1", registry=None, routes=None):
+    # type: (int, str, Optional[Registry], Optional[Dict[Tuple[str, str], Callable]]) -> object
+    """
+    데몬 스레드에서 /metrics 를 서비스합니다. 반환값은 ThreadingHTTPServer.
+    routes: {(메서드, 경로): handler(parse_qs 결과) → (status, JSON 문자열)} (예: POST /nudge)
+    """
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), _make_handler(registry or REGISTRY, routes))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="listener-metrics", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+listener_profiler.py
+─────────────────────────────────────────────────────────────────────────────
+폴링 사이클 프로파일러 (opt-in)
+
+다음 N 번의 폴링 사이클을 프로파일링해서 order_logs/profiles/ 에 남깁니다.
+
+켜는 방법:
+  LISTENER_PROFILE=sample:5   python3 order_listener.py   # 시작 직후 5 사이클 (샘플링)
+  LISTENER_PROFILE=cprofile:3 python3 order_listener.py   # 시작 직후 3 사이클 (cProfile)
+  kill -USR1 <pid>                                        # 실행 중 다음 N 사이클 (기본 sample:5)
+    (SIGUSR1 로 켤 때 모드/횟수: LISTENER_PROFILE_ON_SIGNAL=cprofile:10)
+
+출력 (poll_YYYYmmdd_HHMMSS_<mode>.*):
+  sample   → .folded  (접힌 스택 "a;b;c 횟수", flamegraph.pl / speedscope 에서 바로 열림)
+  cprofile → .pstats  (python3 -m pstats, snakeviz 등)
+  공통     → .json    (사이클 수, 주문/그룹 수, 단계별 소요 합계 — listener_metrics 기준)
+
+샘플링 모드는 폴링 스레드 스택만 LISTENER_PROFILE_INTERVAL_MS(기본 5ms) 간격으로 읽으므로
+cProfile 보다 오버헤드가 훨씬 작아 운영 중에도 켤 수 있습니다.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import cProfile
+import json
+import os
+import platform
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from listener_logging import get_logger
+from listener_metrics import GROUPS_BUILT, ORDERS_SEEN, ORDERS_SKIPPED, STAGE_SECONDS
+
+log = get_logger("profiler")
+
+MODE_SAMPLE = "sample"
+MODE_CPROFILE = "cprofile"
+DEFAULT_SIGNAL_SPEC = "sample:5"
+DEFAULT_INTERVAL_MS = 5.0
+
+
+def parse_spec(spec):
+    # type: (Optional[str]) -> Optional[Tuple[str, int]]
+    """'sample:5' / 'cprofile' / '3' → (mode, cycles). 비어 있으면 None."""
+    spec = (spec or "").strip().lower()
+    if not spec or spec in ("0", "off", "false"):
+        return None
+    mode, _, count = spec.partition(":")
+    if mode.isdigit():
+        mode, count = MODE_SAMPLE, mode
+    if mode not in (MODE_SAMPLE, MODE_CPROFILE):
+        raise ValueError("알 수 없는 프로파일 모드: {}".format(spec))
+    return mode, max(1, int(count or 5))
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return "{}:{}".format(os.path.basename(code.co_filename), code.co_name)
+
+
+class _StackSampler(object):
+    """대상 스레드의 스택을 주기적으로 읽어 접힌 스택 카운트로 모읍니다."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()  # type: Counter
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None      # type: Optional[threading.Thread]
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="listener-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def write_folded(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write("{} {}\n".format(stack, count))
+
+
+def _stage_totals():
+    # type: () -> Dict[str, Dict[str, float]]
+    return {key[0]: value for key, value in STAGE_SECONDS.snapshot_all().items()}
+
+
+def _counters():
+    # type: () -> Dict[str, float]
+    return {
+        "orders_seen":    ORDERS_SEEN.value(),
+        "orders_skipped": ORDERS_SKIPPED.value(),
+        "groups":         GROUPS_BUILT.value(),
+    }
+
+
+class PollProfiler(object):
+    """
+    OrderListener._poll 을 감싸는 프로파일러.
+
+      profiler = PollProfiler(log_dir)
+      profiler.arm("sample", 5)          # 또는 install_signal_handler()
+      with profiler.cycle():
+          ... 폴링 1회 ...
+    """
+
+    def __init__(self, log_dir, interval_ms=None):
+        # type: (str, Optional[float]) -> None
+        self.out_dir = os.path.join(log_dir, "profiles")
+        if interval_ms is None:
+            interval_ms = float(os.environ.get("LISTENER_PROFILE_INTERVAL_MS", DEFAULT_INTERVAL_MS))
+        self.interval = max(0.001, interval_ms / 1000.0)
+        # 시그널 핸들러는 폴링 스레드(메인) 위에서 돌기 때문에 잠금 없이 속성 대입만 한다
+        self._requested = None   # type: Optional[Tuple[str, int]]
+        self._session = None     # type: Optional[dict]
+
+    @property
+    def active(self):
+        # type: () -> bool
+        return self._session is not None or self._requested is not None
+
+    def arm(self, mode, cycles):
+        # type: (str, int) -> None
+        """다음 사이클부터 cycles 회 프로파일링. 진행 중이면 무시."""
+        if self._session is None:
+            self._requested = (mode, max(1, int(cycles)))
+
+    def arm_from_env(self, var="LISTENER_PROFILE"):
+        # type: (str) -> bool
+        spec = parse_spec(os.environ.get(var))
+        if spec:
+            self.arm(*spec)
+        return spec is not None
+
+    def install_signal_handler(self):
+        # type: () -> bool
+        """
+        SIGUSR1 → LISTENER_PROFILE_ON_SIGNAL (기본 sample:5). 메인 스레드에서 호출.
+        off/0 이면 프로파일 핸들러 없이 SIGUSR1 을 무시하고, 잘못된 값은 경고 후 기본값 (진단 설정 때문에 리스너가 죽지 않게).
+        """
+        if not hasattr(signal, "SIGUSR1"):
+            return False
+        raw = os.environ.get("LISTENER_PROFILE_ON_SIGNAL") or DEFAULT_SIGNAL_SPEC
+        try:
+            spec = parse_spec(raw)
+        except ValueError as e:
+            log.warning("LISTENER_PROFILE_ON_SIGNAL 무시 (%s) → %s", e, DEFAULT_SIGNAL_SPEC, extra={"tag": "PROFILE"})
+            spec = parse_spec(DEFAULT_SIGNAL_SPEC)
+        if spec is None:
+            signal.signal(signal.SIGUSR1, signal.SIG_IGN)   # 기본 동작(프로세스 종료) 방지
+            return False
+
+        def _handler(sig, frame):
+            self.arm(*spec)
+        signal.signal(signal.SIGUSR1, _handler)
+        return True
+
+    # ── 사이클 ──
+    def _begin_session(self, mode, cycles):
+        log.info("다음 %d 사이클 프로파일링 (%s)", cycles, mode, extra={"tag": "PROFILE"})
+        session = {
+            "mode":       mode,
+            "cycles":     cycles,
+            "done":       0,
+            "started_at": datetime.now(),
+            "counters":   _counters(),
+            "stages":     _stage_totals(),
+            "cycle_sec":  [],
+            "profile":    None,
+            "sampler":    None,
+        }
+        if mode == MODE_CPROFILE:
+            session["profile"] = cProfile.Profile()
+        else:
+            session["sampler"] = _StackSampler(threading.get_ident(), self.interval)
+        return session
+
+    @contextmanager
+    def cycle(self):
+        """폴링 1회를 감쌉니다. 켜져 있지 않으면 아무것도 하지 않습니다."""
+        requested, self._requested = self._requested, None
+        if self._session is None and requested is not None:
+            self._session = self._begin_session(*requested)
+        session = self._session
+        if session is None:
+            yield
+            return
+
+        t0 = time.perf_counter()
+        if session["profile"] is not None:
+            session["profile"].enable()
+        else:
+            session["sampler"].start()
+        try:
+            yield
+        finally:
+            if session["profile"] is not None:
+                session["profile"].disable()
+            else:
+                session["sampler"].stop()
+            session["cycle_sec"].append(round(time.perf_counter() - t0, 4))
+            session["done"] += 1
+            if session["done"] >= session["cycles"]:
+                self._session = None
+                try:
+                    path = self._write(session)
+                    log.info("프로파일 저장: %s", path, extra={"tag": "PROFILE", "cycles": session["done"]})
+                except OSError as e:
+                    log.error("프로파일 저장 실패: %s", e, extra={"tag": "PROFILE"})
+
+    def _write(self, session):
+        # type: (dict) -> str
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, "poll_{}_{}".format(
+            session["started_at"].strftime("%Y%m%d_%H%M%S"), session["mode"]))
+
+        if session["profile"] is not None:
+            profile_path = base + ".pstats"
+            session["profile"].dump_stats(profile_path)
+            samples = None
+        else:
+            profile_path = base + ".folded"
+            session["sampler"].write_folded(profile_path)
+            samples = session["sampler"].samples
+
+        before_c, after_c = session["counters"], _counters()
+        before_s, after_s = session["stages"], _stage_totals()
+        stages = {}
+        for name, after in sorted(after_s.items()):
+            before = before_s.get(name, {"count": 0, "sum": 0.0})
+            count = after["count"] - before["count"]
+            if count:
+                total = after["sum"] - before["sum"]
+                stages[name] = {
+                    "count":   count,
+                    "total_s": round(total, 6),
+                    "mean_ms": round(total / count * 1000, 3),
+                }
+
+        meta = {
+            "mode":           session["mode"],
+            "cycles":         session["done"],
+            "started_at":     session["started_at"].strftime("%Y-%m-%d %H:%M:%S"),
+            "ended_at":       datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "cycle_sec":      session["cycle_sec"],
+            "orders_seen":    after_c["orders_seen"] - before_c["orders_seen"],
+            "orders_skipped": after_c["orders_skipped"] - before_c["orders_skipped"],
+            "groups":         after_c["groups"] - before_c["groups"],
+            "stages":         stages,
+            "samples":        samples,
+            "interval_ms":    round(self.interval * 1000, 3) if samples is not None else None,
+            "profile":        os.path.basename(profile_path),
+            "pid":            os.getpid(),
+            "python":         platform.python_version(),
+        }
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        return profile_path
@@ -12,31 +12,66 @@ migrate_fix_purchase_ss.py
 
 로컬에서:
   python migrate_fix_purchase_ss.py --api http://139.150.11.53/api
+
+서버 로컬에서 HTTP 를 거치지 않고 sammi.db 에 직접 (batch 트랜잭션):
+  python3 migrate_fix_purchase_ss.py --db-path /home/rocky/db/sammi.db --execute
+
+대량 재생성 (워커 프로세스 + 문서별 diff 리포트):
+  python3 migrate_fix_purchase_ss.py --db-path ... --workers 8 --report order_logs/regen_report.jsonl
+
+재생성 결과가 기존과 같은 문서는 저장하지 않습니다 (updated_at 보존).
+--execute 실행은 order_logs/migrate_checkpoint.json 에 처리한 문서를 기록하고,
+다음 실행에서는 내용도 규칙(ss_pipeline 소스/단가표/규격 카탈로그)도 그대로인 문서를 아예 건너뜁니다.
+  python3 migrate_fix_purchase_ss.py --db-path ... --execute --full   # 체크포인트 무시하고 전체 재검사
 ═══════════════════════════════════════════════════════════════════════
 """
-import sys, os, json, argparse, io
+import sys, os, argparse, io
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-import requests
-from order_listener import (
-    get_rack_type,
-    parse_smartstore_option,
-    generate_bom_for_rack,
-    map_highrack_color,
-    _generate_inventory_part_id,
-    build_item_name,
+import api_transport
+from document_store import add_store_arguments, store_from_args
+from ss_pipeline import get_rack_type
+from ss_pipeline.regen import (
+    STATUS_ERROR,
+    STATUS_SKIP,
+    BatchWriter,
+    Checkpoint,
+    DiffReport,
+    Progress,
+    RegenEngine,
+    _json_list,
+    document_hash,
+    regenerate_document,
 )
 
+DEFAULT_CHECKPOINT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "order_logs", "migrate_checkpoint.json")
+
 
 def parse_args():
     p = argparse.ArgumentParser(description="purchase_ss 문서 materials 재생성 마이그레이션")
     p.add_argument("--execute", action="store_true",
                    help="실제 DB에 반영 (기본: DRY_RUN)")
-    p.add_argument("--api", default="http://localhost/api",
-                   help="sammirack API base URL (기본: http://localhost/api)")
+    add_store_arguments(p)
     p.add_argument("--doc-id", default=None,
                    help="특정 doc_id만 처리 (기본: purchase_ss_* 전체)")
+    p.add_argument("--batch-size", type=int, default=50,
+                   help="저장 batch 크기 (기본: 50)")
+    p.add_argument("--workers", type=int, default=0,
+                   help="재생성 워커 프로세스 수 (기본: 0=CPU 수, 1=단일 프로세스)")
+    p.add_argument("--chunksize", type=int, default=32,
+                   help="워커 1회 전달 문서 수 (기본: 32)")
+    p.add_argument("--report", default="",
+                   help="문서별 diff 를 JSONL 로 기록할 경로 (예: order_logs/regen_report.jsonl)")
+    p.add_argument("--progress-interval", type=float, default=2.0,
+                   help="진행률 출력 간격 초 (기본: 2)")
+    p.add_argument("--verbose", action="store_true",
+                   help="문서별 상세 출력 (--doc-id 지정 시 자동)")
+    p.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT,
+                   help="처리 문서 체크포인트 경로 ('' 이면 사용 안 함, DRY_RUN 에서는 읽기만)")
+    p.add_argument("--full", action="store_true",
+                   help="체크포인트를 무시하고 전체 문서 재검사 (체크포인트는 갱신, --doc-id 도 동일)")
     return p.parse_args()
 
 
@@ -44,7 +79,7 @@ def fetch_all_documents(api_base):
     """GET /documents → 전체 문서 목록"""
     url = "{}/documents".format(api_base)
     print("  GET {} ...".format(url))
-    resp = requests.get(url, timeout=30)
+    resp = api_transport.get(url, "documents_fetch", timeout=30)
     resp.raise_for_status()
     data = resp.json()
     # 응답은 dict (key=doc_id, value=doc data) 또는 list
@@ -63,7 +98,7 @@ def save_document(api_base, doc_id, doc_data, dry_run=True):
     url = "{}/documents/save".format(api_base)
     payload = {"docId": doc_id}
     payload.update(doc_data)
-    resp = requests.post(url, json=payload, timeout=30)
+    resp = api_transport.post(url, "document_save", json_body=payload, timeout=30)
     if resp.status_code < 300:
         print("  ✅ 저장 완료: {}".format(doc_id))
         return True
@@ -73,179 +108,192 @@ def save_document(api_base, doc_id, doc_data, dry_run=True):
 
 
 def regenerate_materials_for_doc(doc):
-    """
-    문서의 items JSON에서 원본 상품명+옵션을 읽어
-    수정된 코드로 materials를 재생성하고, items의 name도 함께 갱신합니다.
-    """
-    items = doc.get("items", [])
-    if isinstance(items, str):
-        try:
-            items = json.loads(items)
-        except (json.JSONDecodeError, TypeError):
-            return None, None, "items JSON 파싱 실패"
-
-    if not items:
-        return None, None, "items 비어있음"
-
-    all_materials = {}
-    updated_items = []
-
-    for item in items:
-        # 원본 주문 행 구조 복원 (build_item_name을 위해)
-        pseudo_order = {
-            "상품명": item.get("name", ""),
-            "옵션": item.get("note", ""),
-        }
-        
-        # 1. 항목명(name) 재생성 (하이랙 감지 및 규격 rounding 적용)
-        new_item_name = build_item_name(pseudo_order)
-        item["name"] = new_item_name
-        updated_items.append(item)
-
-        name = pseudo_order["상품명"]
-        note = pseudo_order["옵션"]
-        qty = item.get("quantity", 1) or 1
-
-        # 랙 종류 판별 (원본 상품명 기준)
-        rack_type = get_rack_type(name, note)
-        if not rack_type:
-            continue  # 비지원 랙은 건너뜀
-
-        # 옵션 파싱
-        option = parse_smartstore_option(note)
-
-        # BOM 생성
-        try:
-            bom = generate_bom_for_rack(rack_type, option, qty)
-            # 병합 (같은 _inventoryPartId는 수량 합산)
-            for mat in bom:
-                inv_id = mat.get("_inventoryPartId", "")
-                if inv_id in all_materials:
-                    all_materials[inv_id]["quantity"] += mat["quantity"]
-                else:
-                    all_materials[inv_id] = dict(mat)
-        except Exception as e:
-            print("  ⚠️ BOM 재생성 에러:", e)
+    """(호환) ss_pipeline.regen.regenerate_document 로 옮겨짐. BOM 경고는 출력."""
+    warnings = []
+    result = regenerate_document(doc, warnings)
+    for w in warnings:
+        print("  ⚠️", w)
+    return result
+
+
+def print_doc_detail(doc, result):
+    """문서 1건 상세 (--verbose / --doc-id)."""
+    print("\n" + "-" * 60)
+    print("📄 {}".format(result["doc_id"]))
+
+    items = _json_list(doc.get("items"))
+    print("  items: {}건".format(len(items)))
+    if result["status"] == STATUS_SKIP:
+        print("  ⏭️ items 없음 → 건너뜀")
+        return
 
-    materials = sorted(all_materials.values(),
-                       key=lambda x: (x.get("rackType", ""), x["name"]))
-    return materials, updated_items, None
+    # 각 item 요약
+    for i, item in enumerate(items):
+        name = item.get("name", "")[:50]
+        rack_type = get_rack_type(name)
+        print("  [{}] {} → {} (qty={})".format(
+            i + 1, name, rack_type or "❌비지원", item.get("quantity", 1)))
+
+    # 기존 materials 요약
+    old_mats = _json_list(doc.get("materials"))
+    print("  기존 materials: {}건".format(len(old_mats)))
+    for mat in old_mats[:3]:  # 처음 3개만
+        print("    {} spec={} inv_id={}".format(
+            mat.get("name", ""), mat.get("specification", ""),
+            mat.get("_inventoryPartId", "")))
+    if len(old_mats) > 3:
+        print("    ... +{}개".format(len(old_mats) - 3))
+
+    for w in result["warnings"]:
+        print("  ⚠️", w)
+    if result["status"] == STATUS_ERROR:
+        print("  ❌ 재생성 실패: {}".format(result["error"]))
+        return
+
+    diff = result["diff"]
+    if not diff["changed"]:
+        print("  ➡️ 새 materials: {}건 (변경 없음 → 저장 생략)".format(diff["materials_after"]))
+        return
+    print("  ➡️ 새 materials: {}건 (변경)".format(diff["materials_after"]))
+    for mat in result.get("document", {}).get("materials", []):
+        print("    ✅ {} qty={} spec={} inv_id={}".format(
+            mat.get("name", ""), mat.get("quantity", 0),
+            mat.get("specification", ""), mat.get("_inventoryPartId", "")))
+    for pid in diff["added"]:
+        print("    + {}".format(pid))
+    for pid in diff["removed"]:
+        print("    - {}".format(pid))
+    for pid, (before, after) in diff["qty_changed"].items():
+        print("    ~ {} qty {} → {}".format(pid, before, after))
 
 
 def main():
     args = parse_args()
     dry_run = not args.execute
-    api_base = args.api.rstrip("/")
+    verbose = args.verbose or bool(args.doc_id)
+    store = store_from_args(args, readonly=dry_run)
 
     print("=" * 70)
     print("purchase_ss 문서 materials 재생성 마이그레이션")
-    print("  API: {}".format(api_base))
+    print("  소스: {} ({})".format(store.name, args.documents_json or args.db_path or args.api))
     print("  모드: {}".format("DRY_RUN (미리보기)" if dry_run else "🔴 EXECUTE (실제 반영)"))
     if args.doc_id:
         print("  대상: {}".format(args.doc_id))
     print("=" * 70)
 
-    # 1. 전체 문서 조회
+    # 1. purchase_ss_* 문서 조회 (SQLite 백엔드는 prefix 범위만 SELECT)
     print("\n[1] 문서 조회 중...")
-    all_docs = fetch_all_documents(api_base)
-    print("  전체 문서: {}개".format(len(all_docs)))
-
-    # 2. purchase_ss_* 필터
     if args.doc_id:
-        target_docs = {k: v for k, v in all_docs.items() if k == args.doc_id}
+        target_docs = store.load_documents(prefix=args.doc_id)
+        target_docs = {k: v for k, v in target_docs.items() if k == args.doc_id}
     else:
-        target_docs = {k: v for k, v in all_docs.items()
-                       if k.startswith("purchase_ss_") and not v.get("deleted")}
+        target_docs = store.load_documents(prefix="purchase_ss_", include_deleted=False)
     print("  대상 purchase_ss 문서: {}개".format(len(target_docs)))
 
+    # 체크포인트: 마지막 처리 이후 내용도 규칙도 그대로인 문서는 건너뜀
+    checkpoint = Checkpoint(args.checkpoint) if args.checkpoint else None
+    current = 0
+    if checkpoint is not None:
+        changed_rules = checkpoint.changed_rules()
+        if changed_rules:
+            print("  규칙 변경: {}".format(", ".join(changed_rules)))
+        if not (args.full or args.doc_id):
+            remaining = {}
+            for doc_id, doc in target_docs.items():
+                if checkpoint.is_current(doc_id, document_hash(doc)):
+                    current += 1
+                else:
+                    remaining[doc_id] = doc
+            target_docs = remaining
+            print("  체크포인트: {}건 변경 없음 → 건너뜀, {}건 처리".format(current, len(target_docs)))
+
     if not target_docs:
         print("\n처리할 purchase_ss 문서 없음. 종료.")
+        store.close()
         return
 
-    # 3. 각 문서 재생성
-    print("\n[2] materials 재생성 중...")
+    # 2. 재생성 (워커 프로세스) → diff 리포트 / batch 저장을 결과가 나오는 대로
+    engine = RegenEngine(workers=args.workers or None, chunksize=args.chunksize,
+                         keep_documents=not dry_run or verbose)
+    print("\n[2] materials 재생성 중... (workers={}, chunksize={})".format(
+        engine.workers, engine.chunksize))
+    # DRY_RUN 에서는 체크포인트를 읽기만 함
+    recording = checkpoint if not dry_run else None
+    saved_hashes = {}  # 저장 대기 doc_id → 저장될 내용 hash
+
+    def on_saved(doc_ids):
+        for saved_id in doc_ids:
+            recording.record(saved_id, saved_hashes.pop(saved_id))
+        recording.save()
+
+    report = DiffReport(args.report)
+    writer = None if dry_run else BatchWriter(
+        store, batch_size=args.batch_size, on_saved=on_saved if recording is not None else None)
+    progress = Progress(len(target_docs), interval=args.progress_interval)
     success = 0
     fail = 0
     skip = 0
-
-    for doc_id, doc in sorted(target_docs.items()):
-        print("\n" + "-" * 60)
-        print("📄 {}".format(doc_id))
-
-        # items 확인
-        items = doc.get("items", [])
-        if isinstance(items, str):
-            try:
-                items = json.loads(items)
-            except:
-                items = []
-        print("  items: {}건".format(len(items)))
-
-        if not items:
-            print("  ⏭️ items 없음 → 건너뜀")
-            skip += 1
-            continue
-
-        # 각 item 요약
-        for i, item in enumerate(items):
-            name = item.get("name", "")[:50]
-            rack_type = get_rack_type(name)
-            print("  [{}] {} → {} (qty={})".format(
-                i + 1, name, rack_type or "❌비지원", item.get("quantity", 1)))
-
-        # 기존 materials 요약
-        old_mats = doc.get("materials", [])
-        if isinstance(old_mats, str):
-            try:
-                old_mats = json.loads(old_mats)
-            except:
-                old_mats = []
-        print("  기존 materials: {}건".format(len(old_mats)))
-        for mat in old_mats[:3]:  # 처음 3개만
-            print("    {} spec={} inv_id={}".format(
-                mat.get("name", ""), mat.get("specification", ""),
-                mat.get("_inventoryPartId", "")))
-        if len(old_mats) > 3:
-            print("    ... +{}개".format(len(old_mats) - 3))
-
-        # 신규 materials 생성
-        new_mats, updated_items, err = regenerate_materials_for_doc(doc)
-        if err:
-            print("  ❌ 재생성 실패: {}".format(err))
-            fail += 1
-            continue
-
-        print("  ➡️ 새 materials: {}건".format(len(new_mats)))
-        for mat in new_mats:
-            print("    ✅ {} qty={} spec={} inv_id={}".format(
-                mat.get("name", ""), mat.get("quantity", 0),
-                mat.get("specification", ""), mat.get("_inventoryPartId", "")))
-
-        # 저장
-        updated_doc = dict(doc)
-        updated_doc["materials"] = new_mats
-        if updated_items is not None:
-             updated_doc["items"] = updated_items
-        elif isinstance(updated_doc.get("items"), str):
-            try:
-                updated_doc["items"] = json.loads(updated_doc["items"])
-            except:
-                pass
-
-
-        ok = save_document(api_base, doc_id, updated_doc, dry_run=dry_run)
-        if ok:
-            success += 1
-        else:
-            fail += 1
-
-    # 4. 결과
+    unchanged = 0
+
+    try:
+        for result in engine.run(sorted(target_docs.items())):
+            report.add(result)
+            progress.tick()
+            doc_id = result["doc_id"]
+            if verbose:
+                print_doc_detail(target_docs[doc_id], result)
+            if result["status"] == STATUS_SKIP:
+                skip += 1
+                if recording is not None:
+                    recording.record(doc_id, result["source_hash"])
+            elif result["status"] == STATUS_ERROR:
+                fail += 1
+                if not verbose:
+                    print("  ❌ 재생성 실패: {}: {}".format(doc_id, result["error"]))
+            elif not result["diff"]["changed"]:
+                unchanged += 1
+                if recording is not None:
+                    recording.record(doc_id, result["source_hash"])
+            elif writer is None:
+                success += 1
+            else:
+                saved_hashes[doc_id] = result["content_hash"]
+                writer.add(doc_id, result["document"])
+        if writer is not None:
+            # batch 저장 (API: /documents/bulk-save, SQLite: batch 트랜잭션)
+            saved, failed_ids = writer.close()
+            success += saved
+            fail += len(failed_ids)
+            for doc_id in failed_ids:
+                print("  ❌ 저장 실패: {}".format(doc_id))
+    finally:
+        report.close()
+        store.close()
+        if recording is not None:
+            recording.save()
+    print(progress.line())
+
+    # 3. 결과
+    counts = report.counts
     print("\n" + "=" * 70)
     print("마이그레이션 결과:")
     print("  ✅ 성공: {}건".format(success))
     print("  ❌ 실패: {}건".format(fail))
     print("  ⏭️ 건너뜀: {}건".format(skip))
-    print("  총: {}건".format(success + fail + skip))
+    print("  = 변경 없음 (저장 생략): {}건".format(unchanged))
+    if current:
+        print("  = 체크포인트 (재생성 생략): {}건".format(current))
+    print("  총: {}건".format(success + fail + skip + unchanged + current))
+    print("  변경 내역: 부품 +{} -{} 수량변경 {}, 품목명 변경 {}".format(
+        counts["materials_added"], counts["materials_removed"],
+        counts["qty_changed"], counts["items_renamed"]))
+    if args.report:
+        print("  diff 리포트: {}".format(args.report))
+    transfer = api_transport.format_transfer_summary()
+    if transfer:
+        print("  API 전송량 (본문 → 실제 전송, gzip):")
+        for line in transfer:
+            print("  " + line)
     if dry_run:
         print("\n⚠️ DRY_RUN 모드였습니다. 실제 반영하려면:")
         print("  python3 migrate_fix_purchase_ss.py --execute")
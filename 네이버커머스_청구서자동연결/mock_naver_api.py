@@ -0,0 +1,465 @@
+# -*- coding: utf-8 -*-
+"""
+mock_naver_api.py
+─────────────────────────────────────────────────────────────────────────────
+로컬 네이버 커머스 API 대역 서버 (부하/지연 테스트용)
+
+실제 api.commerce.naver.com 은 호출 한도가 있고 실고객 데이터가 오가므로,
+OrderListener 의 폴링 처리량과 주문 누락 여부를 오프라인에서 측정하기 위한
+최소 구현입니다. 리스너가 쓰는 세 엔드포인트만 흉내 냅니다.
+
+  POST /external/v1/oauth2/token                          토큰 발급 (expires_in)
+  GET  /external/v1/pay-order/seller/product-orders       결제일시 범위 목록 (page/limit)
+  POST /external/v1/pay-order/seller/product-orders/query 상세 조회
+  GET  /__mock/stats                                      생성/조회/누락 통계 (JSON)
+
+합성 주문:
+  --orders-per-min 속도로 시간에 따라 생성 (요청이 올 때 경과 시간만큼 채움).
+  주문 1건(orderId)은 1~3개 상품주문으로 구성되며, 상품명/옵션은
+  order_logs/orders_*.csv 의 실제 행에서 뽑습니다 (없으면 내장 샘플).
+
+장애 주입:
+  --latency-ms / --jitter-ms     응답 지연
+  --p401 / --p429 / --p5xx       확률적 401 / 429 / 5xx
+  --token-ttl                    토큰 만료(초) → 만료 토큰은 401
+  --rate-limit                   초당 요청 수 초과 시 429 (token bucket)
+  --oversize                     limit 를 무시하고 범위 전체를 한 페이지로 반환
+  --page-size                    서버 측 페이지 크기 상한 (hasNext 로 다음 페이지 안내)
+  --split-delay                  여러 상품 주문의 두 번째 이후 상품주문을 N초 늦게 목록에 노출
+                                 (한 장바구니가 두 폴링에 나뉘어 도착하는 경우 재현)
+
+리스너 연결 (config.py 환경변수 오버라이드):
+  python3 mock_naver_api.py --port 18080 --orders-per-min 60
+  NAVER_API_BASE_URL=http://127.0.0.1:18080 \\
+  NAVER_TOKEN_URL=http://127.0.0.1:18080/external/v1/oauth2/token \\
+  NAVER_USE_PROXY=0 python3 order_listener.py
+
+  ⚠️ 합성 주문은 실제 고객 주문이 아닙니다. 리스너를 이 서버에 붙일 때는
+     sammirack 쪽(SAMMIRACK_SERVER_URL)이 운영 서버를 가리키지 않는지 반드시 확인.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import argparse
+import glob
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+KST = timezone(timedelta(hours=9))
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PATH_TOKEN = "/external/v1/oauth2/token"
+PATH_LIST = "/external/v1/pay-order/seller/product-orders"
+PATH_QUERY = "/external/v1/pay-order/seller/product-orders/query"
+PATH_STATS = "/__mock/stats"
+
+_FALLBACK_PRODUCTS = [
+    ("경량랙 무볼트 앵글 선반", "사이즈: 45x90 / 높이: 180 / 단수: 4단 / 색상: 아이보리"),
+    ("하이랙 볼트식 중량랙", "색상: 메트그레이(볼트식)270kg / 사이즈: 60x108 / 높이: 200 / 단수: 4단"),
+    ("스텐랙 스테인리스 선반", "선반사이즈: 45(폭)x90(가로) / 높이: 150 / 단수: 3단"),
+    ("파렛트랙 중량랙", "폭x길이(단당2000Kg): 1000x1480(독립)700kg선반형 / 높이: 2500(독립형) / 단수: 2단(철판형)"),
+]
+
+
+def _kst_iso(dt):
+    # type: (datetime) -> str
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + "{:03d}+09:00".format(dt.microsecond // 1000)
+
+
+def _parse_dt(value):
+    # type: (str) -> Optional[datetime]
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return None
+
+
+def load_seed_products(order_glob):
+    # type: (str) -> List[tuple]
+    try:
+        from order_csv_log import iter_order_rows
+    except ImportError:
+        return list(_FALLBACK_PRODUCTS)
+    products = []
+    for path in sorted(glob.glob(order_glob)):
+        for row in iter_order_rows(path):
+            products.append((row.get("상품명", ""), row.get("옵션", "")))
+    return products or list(_FALLBACK_PRODUCTS)
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# 상태
+# ═════════════════════════════════════════════════════════════════════════════
+
+class MockState(object):
+    """합성 주문 저장소 + 토큰 + 장애 주입 설정 + 통계."""
+
+    def __init__(self, args, products):
+        self.args = args
+        self.products = products
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.generated_until = self.started
+        self.orders = []                # type: List[dict]  (결제시각 오름차순)
+        self.by_id = {}                 # type: Dict[str, dict]
+        self.queried = set()            # type: set
+        self.tokens = {}                # type: Dict[str, float]  token -> 만료 epoch
+        self.counter = 0
+        self.stats = {}                 # type: Dict[str, int]
+        self._bucket = float(args.rate_limit or 0)
+        self._bucket_at = time.time()
+        if args.backfill:
+            self._generate(args.backfill, self.started - 600, self.started)
+
+    # ── 통계 ──
+    def count(self, key):
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    # ── 주문 생성 ──
+    def _new_group(self, paid_epoch):
+        self.counter += 1
+        order_id = "2099{:012d}".format(self.counter)
+        buyer = "테스트{}".format(self.counter)
+        paid = _kst_iso(datetime.fromtimestamp(paid_epoch, KST))
+        group = []
+        for n in range(self.rng.choice((1, 1, 1, 2, 3))):
+            name, option = self.rng.choice(self.products)
+            qty = self.rng.randint(1, 3)
+            po = {
+                "productOrderId": "{}{:02d}".format(order_id, n + 1),
+                "productName": name,
+                "productOption": option,
+                "quantity": qty,
+                "totalPaymentAmount": qty * self.rng.randrange(30000, 300000, 100),
+                "productOrderStatus": "PAYED",
+                "shippingAddress": {
+                    "name": buyer,
+                    "tel1": "010-0000-{:04d}".format(self.counter % 10000),
+                    "baseAddress": "서울특별시 테스트구 모의로 {}".format(self.counter),
+                    "detailedAddress": "{}호".format(n + 1),
+                },
+            }
+            order = {
+                "orderId": order_id,
+                "ordererName": buyer,
+                "ordererTel": "010-0000-0000",
+                "paymentDate": paid,
+            }
+            visible = paid_epoch + (self.args.split_delay if n else 0)
+            group.append({"paid_epoch": paid_epoch, "visible_epoch": visible, "productOrder": po, "order": order})
+        return group
+
+    def _generate(self, count, start_epoch, end_epoch):
+        if count <= 0:
+            return
+        step = (end_epoch - start_epoch) / float(count)
+        for i in range(count):
+            for entry in self._new_group(start_epoch + step * (i + 1)):
+                self.orders.append(entry)
+                self.by_id[entry["productOrder"]["productOrderId"]] = entry
+
+    def advance(self):
+        """마지막 생성 이후 경과 시간만큼 주문 생성."""
+        with self.lock:
+            now = time.time()
+            rate = self.args.orders_per_min / 60.0
+            due = int((now - self.started) * rate) - int((self.generated_until - self.started) * rate)
+            if due > 0:
+                self._generate(due, self.generated_until, now)
+            self.generated_until = now
+
+    # ── 토큰 ──
+    def issue_token(self):
+        token = uuid.uuid4().hex
+        with self.lock:
+            self.tokens[token] = time.time() + self.args.token_ttl
+        return token
+
+    def token_valid(self, header):
+        # type: (str) -> bool
+        if not header.startswith("Bearer "):
+            return False
+        with self.lock:
+            expires = self.tokens.get(header[len("Bearer "):])
+        return expires is not None and expires > time.time()
+
+    # ── 호출 한도 ──
+    def take_rate_token(self):
+        # type: () -> bool
+        if not self.args.rate_limit:
+            return True
+        with self.lock:
+            now = time.time()
+            self._bucket = min(float(self.args.rate_limit),
+                               self._bucket + (now - self._bucket_at) * self.args.rate_limit)
+            self._bucket_at = now
+            if self._bucket < 1.0:
+                return False
+            self._bucket -= 1.0
+            return True
+
+    def snapshot(self):
+        # type: () -> dict
+        grace = self.args.missed_grace
+        with self.lock:
+            cutoff = time.time() - grace
+            generated = len(self.orders)
+            missed = [e["productOrder"]["productOrderId"] for e in self.orders
+                      if e["paid_epoch"] < cutoff and e["productOrder"]["productOrderId"] not in self.queried]
+            return {
+                "uptime_sec":         round(time.time() - self.started, 1),
+                "generated":          generated,
+                "queried_unique":     len(self.queried),
+                "missed":             len(missed),
+                "missed_sample":      missed[:20],
+                "missed_grace_sec":   grace,
+                "requests":           dict(self.stats),
+            }
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# HTTP
+# ═════════════════════════════════════════════════════════════════════════════
+
+class MockHandler(BaseHTTPRequestHandler):
+    state = None  # type: MockState
+    server_version = "MockNaverCommerce/1.0"
+
+    def log_message(self, fmt, *args):
+        if self.state.args.verbose:
+            sys.stderr.write("[MOCK] " + (fmt % args) + "\n")
+
+    # ── 공통 ──
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+        self.state.count("{} {}".format(self._route(), status))
+
+    def _route(self):
+        path = urlparse(self.path).path
+        return {PATH_TOKEN: "token", PATH_LIST: "list", PATH_QUERY: "query", PATH_STATS: "stats"}.get(path, path)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            return json.loads(raw.decode("utf-8")) if raw else {}
+        except ValueError:
+            return None
+
+    def _delay(self):
+        args = self.state.args
+        if args.latency_ms or args.jitter_ms:
+            ms = args.latency_ms + (self.state.rng.uniform(0, args.jitter_ms) if args.jitter_ms else 0)
+            time.sleep(ms / 1000.0)
+
+    def _inject_fault(self, allow_401=True):
+        """장애 주입. 응답을 보냈으면 True."""
+        args = self.state.args
+        rng = self.state.rng
+        if not self.state.take_rate_token():
+            self._send(429, {"code": "GW.RATE_LIMIT", "message": "요청이 너무 많습니다."},
+                       {"Retry-After": "1"})
+            return True
+        if args.p429 and rng.random() < args.p429:
+            self._send(429, {"code": "GW.RATE_LIMIT", "message": "요청이 너무 많습니다. (injected)"},
+                       {"Retry-After": "1"})
+            return True
+        if args.p5xx and rng.random() < args.p5xx:
+            status = rng.choice((500, 502, 503, 504))
+            self._send(status, {"code": "GW.INTERNAL", "message": "injected {}".format(status)})
+            return True
+        if allow_401:
+            if not self.state.token_valid(self.headers.get("Authorization", "")):
+                self._send(401, {"code": "GW.AUTHN", "message": "인증 실패"})
+                return True
+            if args.p401 and rng.random() < args.p401:
+                self._send(401, {"code": "GW.AUTHN", "message": "인증 실패 (injected)"})
+                return True
+        return False
+
+    # ── 라우팅 ──
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path == PATH_STATS:
+            self._send(200, self.state.snapshot())
+            return
+        if parsed.path != PATH_LIST:
+            self._send(404, {"code": "NOT_FOUND", "message": parsed.path})
+            return
+        self._delay()
+        if self._inject_fault():
+            return
+        self.state.advance()
+        self._handle_list(parse_qs(parsed.query))
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        if parsed.path == PATH_TOKEN:
+            self._delay()
+            if self._inject_fault(allow_401=False):
+                return
+            self._send(200, {
+                "access_token": self.state.issue_token(),
+                "expires_in": int(self.state.args.token_ttl),
+                "token_type": "Bearer",
+            })
+            return
+        if parsed.path != PATH_QUERY:
+            self._send(404, {"code": "NOT_FOUND", "message": parsed.path})
+            return
+        self._delay()
+        if self._inject_fault():
+            return
+        body = self._read_body()
+        if not isinstance(body, dict) or not isinstance(body.get("productOrderIds"), list):
+            self._send(400, {"code": "BAD_REQUEST", "message": "productOrderIds 필요"})
+            return
+        self._handle_query(body["productOrderIds"])
+
+    def _handle_list(self, query):
+        def _one(key, default=""):
+            return (query.get(key) or [default])[0]
+
+        from_dt = _parse_dt(_one("from"))
+        to_dt = _parse_dt(_one("to")) or datetime.now(KST)
+        if from_dt is None:
+            self._send(400, {"code": "BAD_REQUEST", "message": "from 필요"})
+            return
+        lo, hi = from_dt.timestamp(), to_dt.timestamp()
+        limit = int(_one("limit", "300") or 300)
+        page = max(1, int(_one("page", "1") or 1))
+
+        now = time.time()
+        with self.state.lock:
+            matched = [e for e in self.state.orders if lo <= e["paid_epoch"] <= hi and e["visible_epoch"] <= now]
+        size = len(matched) if self.state.args.oversize else min(limit, self.state.args.page_size)
+        size = max(1, size)
+        chunk = matched[(page - 1) * size:page * size]
+        contents = [{
+            "productOrderId": e["productOrder"]["productOrderId"],
+            "content": {"productOrder": {
+                "productOrderId": e["productOrder"]["productOrderId"],
+                "productOrderStatus": e["productOrder"]["productOrderStatus"],
+            }},
+        } for e in chunk]
+        self._send(200, {
+            "timestamp": _kst_iso(datetime.now(KST)),
+            "traceId": uuid.uuid4().hex,
+            "data": {
+                "contents": contents,
+                "pagination": {
+                    "page": page,
+                    "size": size,
+                    "totalCount": len(matched),
+                    "hasNext": page * size < len(matched),
+                },
+            },
+        })
+
+    def _handle_query(self, ids):
+        data = []
+        with self.state.lock:
+            for pid in ids:
+                entry = self.state.by_id.get(str(pid))
+                if entry is None:
+                    continue
+                self.state.queried.add(str(pid))
+                data.append({"productOrder": entry["productOrder"], "order": entry["order"]})
+        self._send(200, {"timestamp": _kst_iso(datetime.now(KST)), "traceId": uuid.uuid4().hex,
+                         "data": data})
+
+
+def make_server(args, products=None):
+    # type: (argparse.Namespace, Optional[List[tuple]]) -> ThreadingHTTPServer
+    state = MockState(args, products or load_seed_products(args.order_glob))
+    handler = type("BoundMockHandler", (MockHandler,), {"state": state})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="로컬 네이버 커머스 API 대역 서버")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=18080)
+    p.add_argument("--orders-per-min", type=float, default=10.0, help="합성 주문(orderId) 생성 속도")
+    p.add_argument("--backfill", type=int, default=0, help="시작 시 최근 10분에 미리 깔아둘 주문 수")
+    p.add_argument("--order-glob", default=os.path.join(BASE_DIR, "order_logs", "orders_*.csv"),
+                   help="상품명/옵션 시드 CSV")
+    p.add_argument("--latency-ms", type=float, default=0.0)
+    p.add_argument("--jitter-ms", type=float, default=0.0)
+    p.add_argument("--p401", type=float, default=0.0, help="401 주입 확률")
+    p.add_argument("--p429", type=float, default=0.0, help="429 주입 확률")
+    p.add_argument("--p5xx", type=float, default=0.0, help="5xx 주입 확률")
+    p.add_argument("--rate-limit", type=float, default=0.0, help="초당 허용 요청 수 (0=무제한)")
+    p.add_argument("--token-ttl", type=float, default=10800.0, help="토큰 유효 시간(초)")
+    p.add_argument("--page-size", type=int, default=300, help="서버 측 페이지 크기 상한")
+    p.add_argument("--split-delay", type=float, default=0.0,
+                   help="두 번째 이후 상품주문의 목록 노출 지연(초)")
+    p.add_argument("--oversize", action="store_true", help="limit 무시, 범위 전체를 한 페이지로")
+    p.add_argument("--missed-grace", type=float, default=120.0,
+                   help="결제 후 이 시간(초)이 지나도 상세조회 안 된 주문을 누락으로 집계")
+    p.add_argument("--report-every", type=float, default=0.0, help="N초마다 통계 출력")
+    p.add_argument("--seed", type=int, default=None, help="난수 시드 (재현용)")
+    p.add_argument("--verbose", action="store_true", help="요청 로그 출력")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", line_buffering=True)
+    args = parse_args(argv)
+    server = make_server(args)
+    base = "http://{}:{}".format(args.host, server.server_address[1])
+    print("=" * 62)
+    print("  Mock Naver Commerce API: {}".format(base))
+    print("  주문 생성: {}/분 | 시드 상품 {}종".format(args.orders_per_min, len(server.state.products)))
+    print("  장애: 401={} 429={} 5xx={} rate-limit={} latency={}ms±{}".format(
+        args.p401, args.p429, args.p5xx, args.rate_limit or "-", args.latency_ms, args.jitter_ms))
+    print("  리스너 연결:")
+    print("    NAVER_API_BASE_URL={}".format(base))
+    print("    NAVER_TOKEN_URL={}{}".format(base, PATH_TOKEN))
+    print("    NAVER_USE_PROXY=0")
+    print("  통계: GET {}{}".format(base, PATH_STATS))
+    print("=" * 62)
+
+    if args.report_every:
+        def _report():
+            while True:
+                time.sleep(args.report_every)
+                server.state.advance()
+                snap = server.state.snapshot()
+                print("[MOCK] 생성 {generated} | 조회 {queried_unique} | 누락 {missed}".format(**snap))
+        threading.Thread(target=_report, daemon=True).start()
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.state.snapshot(), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
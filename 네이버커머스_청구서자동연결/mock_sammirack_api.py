@@ -0,0 +1,626 @@
+# -*- coding: utf-8 -*-
+"""
+mock_sammirack_api.py
+─────────────────────────────────────────────────────────────────────────────
+로컬 sammirack API 대역 서버 (저장/재고 차감 처리량 테스트용)
+
+save_document_to_server / deduct_inventory_for_smartstore /
+update_inventory_deducted_status 를 운영 서버(SAMMIRACK_SERVER_URL) 없이
+실행해 보기 위한 최소 구현입니다. 임시 SQLite 파일에 저장하며, 라우트 동작은
+sammirack-api/routes 의 documents.js / inventory.js / activity.js / prices.js 를 따릅니다.
+
+  GET  /api/documents                           전체 문서 맵 (items/materials 는 배열)
+  POST /api/documents/save                       문서 upsert
+  POST /api/documents/bulk-save                  문서 일괄 upsert
+  POST /api/inventory/deduct                     재고 차감 (COMMIT 후 activity_log 기록)
+  POST /api/documents/{id}/inventory-deducted    차감 플래그 (리스너의 /api/api/... 경로도 허용)
+  GET  /api/inventory                            {part_id: quantity} (ETag / If-None-Match → 304, express 기본 동작)
+  GET  /api/inventory/deductions/{documentId}    문서 단위 차감 반영 확인 (원장 pending 확정용)
+  GET  /api/activity/recent?limit=N              활동 로그
+  GET  /api/prices[?since=ISO]                   단가표 (전체: ETag + Last-Modified → 304 / since: 증분)
+  POST /api/prices/update, /api/prices/{partId}  단가 upsert (timestamp 생략 시 현재 시각)
+  GET  /__mock/stats                             요청/상태코드/중복 차감 통계
+
+압축 (sammirack-api/gzip.js + express.json 과 같음):
+  요청 Content-Encoding: gzip 본문은 풀어서 처리 (--reject-gzip-requests: 415, 구 프록시 흉내)
+  응답은 Accept-Encoding 에 gzip 이 있고 --gzip-min-bytes (기본 1024, 0=끔) 이상이면 gzip
+
+장애 주입 (--fail-routes 로 대상 라우트 한정: save,deduct,flag):
+  --latency-ms / --jitter-ms     응답 지연
+  --p5xx                         처리 전에 5xx 반환 (서버 미반영)
+  --p-drop                       처리 전에 연결 끊기 (클라이언트: ConnectionError, 서버 미반영)
+  --p-lost-ack                   처리·COMMIT 후 연결 끊기 (응답 유실 → 재시도 시 이중 처리 위험)
+
+실행:
+  python3 mock_sammirack_api.py --port 18081 --p-lost-ack 0.1
+  SAMMIRACK_SERVER_URL=http://127.0.0.1:18081/api python3 ...
+
+※ DRY_RUN 값은 건드리지 않습니다. 처리량 측정은 bench_persistence.py 참고.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import socket
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, unquote, urlparse
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_INVENTORY_JSON = os.path.join(os.path.dirname(BASE_DIR), "inventory.json")
+DEFAULT_PRICES_JSON = os.path.join(os.path.dirname(BASE_DIR), "admin_prices.json")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY, type TEXT, date TEXT, document_number TEXT,
+    company_name TEXT, biz_number TEXT, items TEXT, materials TEXT,
+    subtotal INTEGER, tax INTEGER, total_amount INTEGER, notes TEXT, top_memo TEXT,
+    created_at TEXT, updated_at TEXT, deleted INTEGER DEFAULT 0,
+    inventory_deducted INTEGER DEFAULT 0, inventory_deducted_at TEXT, inventory_deducted_by TEXT
+);
+CREATE TABLE IF NOT EXISTS inventory (
+    part_id TEXT PRIMARY KEY, quantity INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT, updated_by TEXT
+);
+CREATE TABLE IF NOT EXISTS admin_prices (
+    part_id TEXT PRIMARY KEY, price INTEGER, timestamp TEXT, account TEXT,
+    rack_type TEXT, name TEXT, specification TEXT, original_price INTEGER, display_name TEXT
+);
+CREATE TABLE IF NOT EXISTS activity_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, action TEXT, user_ip TEXT,
+    data_types TEXT, document_count INTEGER, details TEXT
+);
+"""
+
+ROUTE_SAVE = "save"
+ROUTE_DEDUCT = "deduct"
+ROUTE_FLAG = "flag"
+
+_DEDUCTION_RE = re.compile(r"^/api/inventory/deductions/([^/]+)$")
+_FLAG_RE = re.compile(r"^(?:/api)+/documents/([^/]+)/inventory-deducted$")
+_PRICE_RE = re.compile(r"^/api/prices/([^/]+)$")
+
+
+def _now_iso():
+    # type: () -> str
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.") + \
+        "{:03d}Z".format(datetime.now(timezone.utc).microsecond // 1000)
+
+
+class _DropConnection(Exception):
+    """응답 없이 연결을 끊는다."""
+
+
+class _UnsupportedEncoding(Exception):
+    """body-parser 의 415 unsupported content encoding."""
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# 저장소
+# ═════════════════════════════════════════════════════════════════════════════
+
+class MockStore(object):
+    """임시 SQLite 파일 + 단일 쓰기 잠금 (Node 서버의 직렬 트랜잭션과 같은 효과)."""
+
+    def __init__(self, db_path, inventory=None, prices=None):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        if inventory:
+            now = _now_iso()
+            with self._lock:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO inventory (part_id, quantity, updated_at, updated_by) VALUES (?, ?, ?, 'seed')",
+                    [(pid, int(qty or 0), now) for pid, qty in inventory.items()],
+                )
+                self._conn.execute("COMMIT")
+        if prices:
+            with self._lock:
+                self._conn.execute("BEGIN")
+                for part_id, data in prices.items():
+                    self._upsert_price(part_id, data)
+                self._conn.execute("COMMIT")
+
+    def close(self):
+        self._conn.close()
+
+    # ── documents ──
+    def documents(self):
+        # type: () -> Dict[str, dict]
+        """GET /documents (documents.js 의 주요 필드만)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM documents ORDER BY date DESC").fetchall()
+        return {r["doc_id"]: {
+            "id": r["doc_id"].split("_", 1)[-1], "type": r["type"], "date": r["date"],
+            "documentNumber": r["document_number"], "companyName": r["company_name"],
+            "bizNumber": r["biz_number"], "items": json.loads(r["items"] or "[]"),
+            "materials": json.loads(r["materials"] or "[]"), "subtotal": r["subtotal"], "tax": r["tax"],
+            "totalAmount": r["total_amount"], "notes": r["notes"], "topMemo": r["top_memo"],
+            "createdAt": r["created_at"], "updatedAt": r["updated_at"], "deleted": bool(r["deleted"]),
+            "inventoryDeducted": bool(r["inventory_deducted"]),
+            "inventoryDeductedAt": r["inventory_deducted_at"], "inventoryDeductedBy": r["inventory_deducted_by"],
+        } for r in rows}
+
+    def save_document(self, data):
+        # type: (dict) -> str
+        data = dict(data)
+        doc_id = re.sub(r"\.0$", "", str(data.pop("docId", None) or ""))
+        if doc_id and "_" not in doc_id:
+            doc_id = "{}_{}".format(data.get("type") or "estimate", doc_id)
+        now = _now_iso()
+
+        def _json(value):
+            return value if isinstance(value, str) else json.dumps(value or [], ensure_ascii=False)
+
+        row = (
+            doc_id, data.get("type") or (doc_id.split("_")[0] if "_" in doc_id else "estimate"),
+            data.get("date"), data.get("documentNumber"), data.get("companyName"), data.get("bizNumber"),
+            _json(data.get("items")), _json(data.get("materials")),
+            data.get("subtotal") or 0, data.get("tax") or 0, data.get("totalAmount") or 0,
+            data.get("notes") or "", data.get("topMemo") or "",
+            data.get("createdAt") or now, data.get("updatedAt") or data.get("createdAt") or now,
+            1 if data.get("deleted") else 0, 1 if data.get("inventoryDeducted") else 0,
+            data.get("inventoryDeductedAt"), data.get("inventoryDeductedBy"),
+        )
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO documents (doc_id, type, date, document_number, company_name, biz_number,"
+                " items, materials, subtotal, tax, total_amount, notes, top_memo, created_at, updated_at,"
+                " deleted, inventory_deducted, inventory_deducted_at, inventory_deducted_by)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(doc_id) DO UPDATE SET type=excluded.type, date=excluded.date,"
+                " document_number=excluded.document_number, company_name=excluded.company_name,"
+                " biz_number=excluded.biz_number, items=excluded.items, materials=excluded.materials,"
+                " subtotal=excluded.subtotal, tax=excluded.tax, total_amount=excluded.total_amount,"
+                " notes=excluded.notes, top_memo=excluded.top_memo, updated_at=excluded.updated_at,"
+                " deleted=excluded.deleted, inventory_deducted=excluded.inventory_deducted,"
+                " inventory_deducted_at=excluded.inventory_deducted_at,"
+                " inventory_deducted_by=excluded.inventory_deducted_by",
+                row,
+            )
+        return doc_id
+
+    def set_deducted(self, doc_id, deducted, deducted_by):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE documents SET inventory_deducted = ?, inventory_deducted_at = ?, inventory_deducted_by = ?"
+                " WHERE doc_id = ?",
+                (1 if deducted else 0, _now_iso(), json.dumps(deducted_by or "smartstore-listener"), doc_id),
+            )
+
+    # ── inventory ──
+    def deduct(self, deductions, document_id, user_ip):
+        # type: (dict, str, str) -> dict
+        now = _now_iso()
+        results = {}
+        insufficient = []
+        actor = document_id or user_ip or "api"
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for part_id, amount in deductions.items():
+                    amount = int(amount)
+                    if amount < 0:
+                        raise ValueError("Invalid deduction amount: {}".format(part_id))
+                    cur = self._conn.execute("SELECT quantity FROM inventory WHERE part_id = ?", (part_id,)).fetchone()
+                    if cur is None:
+                        self._conn.execute(
+                            "INSERT INTO inventory (part_id, quantity, updated_at, updated_by) VALUES (?, 0, ?, ?)",
+                            (part_id, now, actor))
+                        if amount > 0:
+                            insufficient.append({"partId": part_id, "requested": amount, "available": 0})
+                        results[part_id] = 0
+                        continue
+                    if cur["quantity"] < amount:
+                        insufficient.append({"partId": part_id, "requested": amount, "available": cur["quantity"]})
+                    new_qty = max(0, cur["quantity"] - amount)
+                    self._conn.execute(
+                        "UPDATE inventory SET quantity = ?, updated_at = ?, updated_by = ? WHERE part_id = ?",
+                        (new_qty, now, actor, part_id))
+                    results[part_id] = new_qty
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            details = {"documentId": document_id, "deductions": deductions, "results": results}
+            if insufficient:
+                details["insufficientParts"] = insufficient
+            self._conn.execute(
+                "INSERT INTO activity_log (timestamp, action, user_ip, data_types, details) VALUES (?, ?, ?, ?, ?)",
+                (now, "inventory_deduct", user_ip or "unknown", json.dumps(["inventory"]),
+                 json.dumps(details, ensure_ascii=False)))
+        return {"success": True, "results": results, "warnings": insufficient or None}
+
+    def inventory(self):
+        # type: () -> Dict[str, int]
+        with self._lock:
+            return {r["part_id"]: r["quantity"] for r in self._conn.execute("SELECT part_id, quantity FROM inventory")}
+
+    # ── prices ──
+    def _upsert_price(self, part_id, data):
+        info = data.get("partInfo") or {}
+        self._conn.execute(
+            "INSERT INTO admin_prices (part_id, price, timestamp, account, rack_type, name, specification,"
+            " original_price, display_name) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(part_id) DO UPDATE SET price=excluded.price, timestamp=excluded.timestamp,"
+            " account=excluded.account, rack_type=excluded.rack_type, name=excluded.name,"
+            " specification=excluded.specification, original_price=excluded.original_price,"
+            " display_name=excluded.display_name",
+            (part_id, data.get("price"), data.get("timestamp") or _now_iso(), data.get("account") or "api",
+             info.get("rackType"), info.get("name"), info.get("specification"),
+             info.get("originalPrice"), info.get("displayName")))
+
+    def update_price(self, part_id, data):
+        with self._lock:
+            self._upsert_price(part_id, data)
+
+    def prices(self, since=None):
+        # type: (Optional[str]) -> Dict[str, dict]
+        with self._lock:
+            if since:
+                rows = self._conn.execute(
+                    "SELECT * FROM admin_prices WHERE timestamp >= ? ORDER BY timestamp", (since,)).fetchall()
+            else:
+                rows = self._conn.execute("SELECT * FROM admin_prices").fetchall()
+        return {r["part_id"]: {
+            "price": r["price"], "timestamp": r["timestamp"], "account": r["account"],
+            "partInfo": {
+                "rackType": r["rack_type"], "name": r["name"], "specification": r["specification"],
+                "originalPrice": r["original_price"], "displayName": r["display_name"],
+            },
+        } for r in rows}
+
+    def deduction_for(self, document_id):
+        # type: (str) -> dict
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT timestamp, details FROM activity_log WHERE action = 'inventory_deduct'"
+                " AND json_extract(details, '$.documentId') = ? ORDER BY timestamp DESC LIMIT 1",
+                (document_id,)).fetchone()
+            stamped = [r["part_id"] for r in self._conn.execute(
+                "SELECT part_id FROM inventory WHERE updated_by = ?", (document_id,))]
+        activity = dict(json.loads(row["details"]), timestamp=row["timestamp"]) if row else None
+        return {"documentId": document_id, "applied": True if row or stamped else None,
+                "activity": activity, "stampedParts": stamped}
+
+    def recent_activity(self, limit):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM activity_log ORDER BY timestamp DESC, id DESC LIMIT ?", (limit,)).fetchall()
+        return [{
+            "timestamp": r["timestamp"], "action": r["action"], "userIP": r["user_ip"],
+            "dataTypes": json.loads(r["data_types"] or "[]"), "documentCount": r["document_count"],
+            "details": json.loads(r["details"] or "{}"),
+        } for r in rows]
+
+    def summary(self):
+        # type: () -> dict
+        with self._lock:
+            docs = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(inventory_deducted), 0) FROM documents").fetchone()
+            dup = self._conn.execute(
+                "SELECT json_extract(details, '$.documentId') AS doc, COUNT(*) AS n FROM activity_log"
+                " WHERE action = 'inventory_deduct' GROUP BY doc HAVING n > 1").fetchall()
+            deducts = self._conn.execute(
+                "SELECT COUNT(*) FROM activity_log WHERE action = 'inventory_deduct'").fetchone()[0]
+        return {
+            "documents": docs[0],
+            "documents_flagged": docs[1],
+            "deductions": deducts,
+            "double_deducted_docs": [r["doc"] for r in dup],
+        }
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# HTTP
+# ═════════════════════════════════════════════════════════════════════════════
+
+class MockHandler(BaseHTTPRequestHandler):
+    store = None   # type: MockStore
+    args = None    # type: argparse.Namespace
+    rng = None     # type: random.Random
+    stats = None   # type: Dict[str, int]
+    stats_lock = None
+    server_version = "MockSammirack/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        if self.args.verbose:
+            sys.stderr.write("[MOCK-SR] " + (fmt % args) + "\n")
+
+    def _count(self, key):
+        with self.stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def _send(self, status, body, route="other", etag=False, last_modified=None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        encoding = None
+        if self.args.gzip_min_bytes and len(data) >= self.args.gzip_min_bytes and \
+                "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            # express 처럼 ETag 는 실제로 보내는 (압축된) 본문 기준
+            data, encoding = gzip.compress(data, 6, mtime=0), "gzip"
+        tag = None
+        if etag:
+            # express 처럼 본문 해시 기반 weak ETag, 같으면 304 (본문 없음).
+            # If-None-Match / If-Modified-Since 가 함께 오면 둘 다 맞아야 304 (express fresh() 와 같음)
+            tag = 'W/"{:x}-{}"'.format(len(data), hashlib.sha1(data).hexdigest()[:27])
+            inm = self.headers.get("If-None-Match")
+            ims = self.headers.get("If-Modified-Since")
+            fresh = bool(inm or ims)
+            if inm and inm != tag:
+                fresh = False
+            if ims and (last_modified is None or parsedate_to_datetime(ims) < parsedate_to_datetime(last_modified)):
+                fresh = False
+            if fresh:
+                self.send_response(304)
+                self.send_header("ETag", tag)
+                self.end_headers()
+                self._count("{} 304".format(route))
+                return
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if self.args.gzip_min_bytes:
+            self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        if tag:
+            self.send_header("ETag", tag)
+        if last_modified:
+            self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+        self.wfile.write(data)
+        self._count("{} {}".format(route, status))
+
+    def _drop(self, route, why):
+        self._count("{} {}".format(route, why))
+        self.close_connection = True
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        encoding = (self.headers.get("Content-Encoding") or "identity").strip().lower()
+        if encoding == "gzip" and not self.args.reject_gzip_requests:
+            with self.stats_lock:
+                self.stats["gzip_request_bytes"] = self.stats.get("gzip_request_bytes", 0) + len(raw)
+            raw = gzip.decompress(raw)
+        elif encoding != "identity":
+            raise _UnsupportedEncoding(encoding)
+        return json.loads(raw.decode("utf-8")) if raw else {}
+
+    def _targeted(self, route):
+        return route in self.args.fail_routes
+
+    def _before(self, route):
+        """지연 + 처리 전 장애. 응답을 끝냈으면 True."""
+        if self.args.latency_ms or self.args.jitter_ms:
+            time.sleep((self.args.latency_ms + self.rng.uniform(0, self.args.jitter_ms)) / 1000.0)
+        if not self._targeted(route):
+            return False
+        if self.args.p5xx and self.rng.random() < self.args.p5xx:
+            self._send(self.rng.choice((500, 502, 503)), {"error": "injected"}, route)
+            return True
+        if self.args.p_drop and self.rng.random() < self.args.p_drop:
+            self._drop(route, "dropped")
+            return True
+        return False
+
+    def _lost_ack(self, route):
+        # type: (str) -> bool
+        if self._targeted(route) and self.args.p_lost_ack and self.rng.random() < self.args.p_lost_ack:
+            self._drop(route, "lost-ack")
+            return True
+        return False
+
+    # ── 라우팅 ──
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        path = parsed.path.rstrip("/")
+        deduction = _DEDUCTION_RE.match(path)
+        if path == "/__mock/stats":
+            with self.stats_lock:
+                requests_ = dict(self.stats)
+            body = self.store.summary()
+            body["requests"] = requests_
+            self._send(200, body, "stats")
+        elif path == "/api/documents":
+            self._send(200, self.store.documents(), "documents", etag=True)
+        elif path == "/api/inventory":
+            self._send(200, self.store.inventory(), "inventory", etag=True)
+        elif path == "/api/prices":
+            since = (parse_qs(parsed.query).get("since") or [""])[0]
+            prices = self.store.prices(since or None)
+            if since:
+                self._send(200, prices, "prices-delta")
+            else:
+                self._send(200, prices, "prices", etag=True, last_modified=_http_date(prices))
+        elif deduction:
+            self._send(200, self.store.deduction_for(unquote(deduction.group(1))), "deduction")
+        elif path == "/api/activity/recent":
+            limit = int((parse_qs(parsed.query).get("limit") or ["100"])[0] or 100)
+            self._send(200, self.store.recent_activity(limit), "activity")
+        else:
+            self._send(404, {"error": "not found", "path": path})
+
+    def do_POST(self):
+        path = urlparse(self.path).path.rstrip("/")
+        try:
+            body = self._read_json()
+        except _UnsupportedEncoding as e:
+            self._send(415, {"error": "unsupported content encoding \"{}\"".format(e)})
+            return
+        except (ValueError, OSError, EOFError):
+            self._send(400, {"error": "invalid json"})
+            return
+
+        flag = _FLAG_RE.match(path)
+        price = _PRICE_RE.match(path)
+        if path == "/api/documents/save":
+            if self._before(ROUTE_SAVE):
+                return
+            doc_id = self.store.save_document(body)
+            if not self._lost_ack(ROUTE_SAVE):
+                self._send(200, {"success": True, "docId": doc_id}, ROUTE_SAVE)
+        elif path == "/api/documents/bulk-save":
+            if self._before(ROUTE_SAVE):
+                return
+            docs = body.get("documents") or {}
+            for doc_id, data in docs.items():
+                self.store.save_document(dict(data, docId=doc_id))
+            if not self._lost_ack(ROUTE_SAVE):
+                self._send(200, {"success": True, "saved": len(docs)}, ROUTE_SAVE)
+        elif path == "/api/inventory/deduct":
+            if self._before(ROUTE_DEDUCT):
+                return
+            deductions = body.get("deductions")
+            if not isinstance(deductions, dict):
+                self._send(400, {"error": "Invalid deductions format"}, ROUTE_DEDUCT)
+                return
+            try:
+                result = self.store.deduct(deductions, body.get("documentId"), body.get("userIp"))
+            except ValueError as e:
+                self._send(400, {"error": str(e)}, ROUTE_DEDUCT)
+                return
+            if not self._lost_ack(ROUTE_DEDUCT):
+                self._send(200, result, ROUTE_DEDUCT)
+        elif flag:
+            if self._before(ROUTE_FLAG):
+                return
+            self.store.set_deducted(flag.group(1), body.get("deducted"), body.get("deductedBy"))
+            if not self._lost_ack(ROUTE_FLAG):
+                self._send(200, {"success": True}, ROUTE_FLAG)
+        elif price:
+            part_id = body.get("partId") if price.group(1) == "update" else price.group(1)
+            self.store.update_price(part_id, body)
+            self._send(200, {"success": True}, "prices-update")
+        else:
+            self._send(404, {"error": "not found", "path": path})
+
+
+def _http_date(prices):
+    # type: (Dict[str, dict]) -> Optional[str]
+    """가장 최근 timestamp → Last-Modified (prices.js 와 같이 초 단위 HTTP 날짜)."""
+    latest = max((p.get("timestamp") or "" for p in prices.values()), default="")
+    try:
+        return format_datetime(datetime.strptime(latest[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc),
+                               usegmt=True)
+    except ValueError:
+        return None
+
+
+def load_prices_seed(path):
+    # type: (str) -> Dict[str, dict]
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    return raw if isinstance(raw, dict) else {}
+
+
+def load_inventory_seed(path):
+    # type: (str) -> Dict[str, int]
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    if isinstance(raw, dict):
+        return {k: (v.get("quantity", 0) if isinstance(v, dict) else v) for k, v in raw.items()}
+    return {}
+
+
+def make_server(args, db_path=None, inventory=None, prices=None):
+    # type: (argparse.Namespace, Optional[str], Optional[Dict[str, int]], Optional[Dict[str, dict]]) -> ThreadingHTTPServer
+    """inventory / prices 를 주면 --inventory-json / --prices-json 대신 그 값으로 초기 데이터를 채웁니다."""
+    if db_path is None:
+        fd, db_path = tempfile.mkstemp(prefix="mock_sammirack_", suffix=".db")
+        os.close(fd)
+    if inventory is None:
+        inventory = load_inventory_seed(args.inventory_json)
+    if prices is None:
+        prices = load_prices_seed(getattr(args, "prices_json", None))
+    store = MockStore(db_path, inventory, prices)
+    handler = type("BoundMockSammirackHandler", (MockHandler,), {
+        "store": store, "args": args, "rng": random.Random(args.seed),
+        "stats": {}, "stats_lock": threading.Lock(),
+    })
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    server.store = store
+    server.db_path = db_path
+    server.handler_class = handler
+    return server
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="로컬 sammirack API 대역 서버")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=18081)
+    p.add_argument("--db-path", default=None, help="SQLite 경로 (기본: 임시 파일, 종료 시 삭제)")
+    p.add_argument("--inventory-json", default=DEFAULT_INVENTORY_JSON, help="초기 재고 (inventory.json)")
+    p.add_argument("--prices-json", default=DEFAULT_PRICES_JSON, help="초기 단가표 (admin_prices.json)")
+    p.add_argument("--latency-ms", type=float, default=0.0)
+    p.add_argument("--jitter-ms", type=float, default=0.0)
+    p.add_argument("--p5xx", type=float, default=0.0, help="처리 전 5xx 확률")
+    p.add_argument("--p-drop", type=float, default=0.0, help="처리 전 연결 끊기 확률")
+    p.add_argument("--p-lost-ack", type=float, default=0.0, help="처리(COMMIT) 후 응답 유실 확률")
+    p.add_argument("--fail-routes", default="save,deduct,flag",
+                   type=lambda s: {x.strip() for x in s.split(",") if x.strip()},
+                   help="장애 주입 대상 라우트 (save,deduct,flag)")
+    p.add_argument("--gzip-min-bytes", type=int, default=1024, help="응답 gzip 최소 크기 (0=압축 안 함)")
+    p.add_argument("--reject-gzip-requests", action="store_true", help="gzip 요청 본문을 415 로 거부")
+    p.add_argument("--seed", type=int, default=None)
+    p.add_argument("--verbose", action="store_true")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", line_buffering=True)
+    args = parse_args(argv)
+    keep_db = args.db_path is not None
+    server = make_server(args, args.db_path)
+    base = "http://{}:{}/api".format(args.host, server.server_address[1])
+    print("=" * 62)
+    print("  Mock sammirack API: {}".format(base))
+    print("  DB: {}{}".format(server.db_path, "" if keep_db else " (임시)"))
+    print("  장애: 5xx={} drop={} lost-ack={} 대상={} latency={}ms±{}".format(
+        args.p5xx, args.p_drop, args.p_lost_ack, ",".join(sorted(args.fail_routes)),
+        args.latency_ms, args.jitter_ms))
+    print("  리스너 연결: SAMMIRACK_SERVER_URL={}".format(base))
+    print("=" * 62)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.store.summary(), ensure_ascii=False, indent=2))
+        server.store.close()
+        if not keep_db:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(server.db_path + suffix):
+                    os.remove(server.db_path + suffix)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
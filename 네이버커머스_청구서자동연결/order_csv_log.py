@@ -0,0 +1,474 @@
+# -*- coding: utf-8 -*-
+"""
+order_csv_log.py
+─────────────────────────────────────────────────────────────────────────────
+월별 주문 CSV (order_logs/orders_YYYY-MM.csv) 기록기 + 검증/복구
+
+기존 save_order_to_csv 는 매 행마다 파일을 열고, 헤더 여부를 os.path.isfile 로
+판단하며, 파일명을 기록 시점의 벽시계(datetime.now)로 정했습니다.
+→ 두 프로세스가 동시에 쓰거나 행 중간에 죽으면 헤더 중복 / 잘린 행이 남고,
+  load_orders_from_csv 는 그런 행을 조용히 건너뜁니다.
+
+OrderCsvLog:
+  - 월별 파일 핸들을 유지 (ab+), 행은 메모리에 모았다가 폴링 사이클마다 flush
+  - flush 는 잠금 파일(order_logs/.orders_csv.lock, fcntl) 안에서 한 번의 write + fsync
+  - 월 구분은 주문의 결제완료시각(KST) 기준 → 자정/월말 경계에서도 올바른 파일
+  - 새 파일은 헤더를 임시 파일에 쓴 뒤 os.link 로 원자적으로 생성 (헤더 중복 불가)
+  - 쓰기 전 파일 끝이 개행이 아니면(이전 크래시) 잘린 꼬리를 .torn 으로 격리
+
+사용법:
+    python3 order_csv_log.py validate                   # order_logs/orders_*.csv 검사
+    python3 order_csv_log.py repair                     # 헤더 중복/잘린 행 정리 (.bak 백업)
+    python3 order_csv_log.py repair --dedupe            # 상품주문번호 중복 행도 제거
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import argparse
+import csv
+import glob
+import io
+import logging
+import os
+import re
+import shutil
+import sys
+import threading
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows 로컬 실행: 프로세스 내 잠금만 사용
+    fcntl = None
+
+log = logging.getLogger("sammirack.listener.csv")
+
+KST = timezone(timedelta(hours=9))
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_LOG_DIR = os.path.join(BASE_DIR, "order_logs")
+LOCK_FILENAME = ".orders_csv.lock"
+
+# CSV 저장 컬럼 순서
+ORDER_CSV_FIELDS = [
+    "상품주문번호",
+    "결제완료시각",
+    "구매자명",
+    "상품명",
+    "옵션",
+    "주문수량",
+    "최종금액",
+    "수취인명",
+    "연락처",
+    "배송지",
+]
+
+BOM = "\ufeff"
+LINE_TERMINATOR = "\n"
+MAX_OPEN_HANDLES = 2  # 이번 달 + 지난 달 (월말 경계 주문)
+
+_YM_RE = re.compile(r"^(\d{4})-(\d{2})")
+
+
+# ─────────────────────────────────────────
+# 공용 헬퍼
+# ─────────────────────────────────────────
+def csv_path_for(log_dir, ym):
+    # type: (str, str) -> str
+    return os.path.join(log_dir, "orders_{}.csv".format(ym))
+
+
+def month_key(order, now=None):
+    # type: (dict, Optional[datetime]) -> str
+    """주문의 결제완료시각(KST) 기준 YYYY-MM. 파싱 불가 시 현재 시각."""
+    raw = str(order.get("결제완료시각", "") or "").strip()
+    if raw:
+        try:
+            dt = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+            if dt.tzinfo is not None:
+                dt = dt.astimezone(KST)
+            return dt.strftime("%Y-%m")
+        except ValueError:
+            m = _YM_RE.match(raw)
+            if m:
+                return "{}-{}".format(m.group(1), m.group(2))
+    return (now or datetime.now(KST)).strftime("%Y-%m")
+
+
+def encode_rows(orders, fields=ORDER_CSV_FIELDS):
+    # type: (List[dict], List[str]) -> bytes
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=fields, extrasaction="ignore",
+                            lineterminator=LINE_TERMINATOR)
+    for order in orders:
+        # SmartstoreOrder 는 to_dict() 로 원본 값 복원 ("" 수량 등이 0 으로 바뀌지 않게)
+        to_dict = getattr(order, "to_dict", None)
+        writer.writerow(to_dict() if to_dict is not None else order)
+    return buf.getvalue().encode("utf-8")
+
+
+def header_bytes(fields=ORDER_CSV_FIELDS):
+    # type: (List[str]) -> bytes
+    return (BOM + ",".join(fields) + LINE_TERMINATOR).encode("utf-8")
+
+
+def is_header_row(row, fields=ORDER_CSV_FIELDS):
+    # type: (List[str], List[str]) -> bool
+    """
+    헤더 행 판별. 개행 없이 이어붙은 중복 헤더
+    (…,배송지\\ufeff상품주문번호,… 처럼 한 줄에 두 번)도 헤더로 봅니다.
+    """
+    text = ",".join(row).replace(BOM, "")
+    header = ",".join(fields)
+    count = text.count(header)
+    return count > 0 and text == header * count
+
+
+class _FileLock(object):
+    """order_logs 공용 잠금 파일 (fcntl.flock). fcntl 없는 환경에서는 프로세스 내 잠금."""
+
+    _local = threading.Lock()
+
+    def __init__(self, log_dir):
+        self.path = os.path.join(log_dir, LOCK_FILENAME)
+        self._fh = None
+
+    def __enter__(self):
+        self._local.acquire()
+        if fcntl is not None:
+            self._fh = open(self.path, "a")
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if self._fh is not None:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+                self._fh.close()
+                self._fh = None
+        finally:
+            self._local.release()
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# 기록기
+# ═════════════════════════════════════════════════════════════════════════════
+
+class OrderCsvLog(object):
+    """
+    주문 CSV write-ahead 기록기.
+
+    사용 예:
+        csv_log = OrderCsvLog(log_dir)
+        for order in orders:
+            csv_log.append(order)
+        csv_log.flush()          # 폴링 사이클 끝 (문서 전송 전)
+        csv_log.close()
+    """
+
+    def __init__(self, log_dir=DEFAULT_LOG_DIR, fields=None, fsync=True):
+        self.log_dir = log_dir
+        self.fields = list(fields or ORDER_CSV_FIELDS)
+        self.fsync = fsync
+        self._buffer = {}   # type: Dict[str, List[dict]]
+        self._handles = {}  # type: Dict[str, object]
+        self._mutex = threading.Lock()
+        os.makedirs(log_dir, exist_ok=True)
+
+    # ── 버퍼 ──
+    def append(self, order):
+        # type: (dict) -> str
+        """주문 1행을 버퍼에 추가. 반환: 기록될 CSV 경로."""
+        ym = month_key(order)
+        with self._mutex:
+            self._buffer.setdefault(ym, []).append(order)
+        return csv_path_for(self.log_dir, ym)
+
+    def pending(self):
+        # type: () -> int
+        with self._mutex:
+            return sum(len(rows) for rows in self._buffer.values())
+
+    def flush(self):
+        # type: () -> List[str]
+        """버퍼를 월별 파일에 기록. 실패 시 버퍼를 되돌리고 예외를 올립니다."""
+        with self._mutex:
+            buffered, self._buffer = self._buffer, {}
+        if not buffered:
+            return []
+
+        written = []
+        remaining = dict(buffered)
+        try:
+            with _FileLock(self.log_dir):
+                for ym in sorted(buffered):
+                    fh = self._handle(ym)
+                    self._heal_tail(fh, csv_path_for(self.log_dir, ym))
+                    fh.write(encode_rows(buffered[ym], self.fields))
+                    fh.flush()
+                    if self.fsync:
+                        os.fsync(fh.fileno())
+                    written.append(csv_path_for(self.log_dir, ym))
+                    del remaining[ym]
+        except Exception:
+            with self._mutex:
+                for ym, rows in remaining.items():
+                    self._buffer[ym] = rows + self._buffer.get(ym, [])
+            raise
+        finally:
+            self._evict_handles()
+        return written
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            for fh in self._handles.values():
+                fh.close()
+            self._handles = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ── 파일 ──
+    def _handle(self, ym):
+        path = csv_path_for(self.log_dir, ym)
+        fh = self._handles.get(ym)
+        if fh is not None:
+            # repair 등으로 파일이 교체/삭제됐으면 다시 연다
+            try:
+                if os.stat(path).st_ino == os.fstat(fh.fileno()).st_ino:
+                    return fh
+            except OSError:
+                pass
+            fh.close()
+            del self._handles[ym]
+        self._create_with_header(path)
+        fh = open(path, "ab+")
+        self._handles[ym] = fh
+        return fh
+
+    def _create_with_header(self, path):
+        if os.path.exists(path):
+            return
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp, "wb") as f:
+            f.write(header_bytes(self.fields))
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.link(tmp, path)  # 이미 있으면 실패 → 기존 파일 유지
+        except FileExistsError:
+            pass
+        except (AttributeError, NotImplementedError, PermissionError):
+            if not os.path.exists(path):
+                os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _heal_tail(self, fh, path):
+        """파일 끝이 개행이 아니면 이전 쓰기가 중간에 끊긴 것 → 꼬리 정리."""
+        fd = fh.fileno()
+        size = os.fstat(fd).st_size
+        if size == 0:
+            fh.write(header_bytes(self.fields))
+            return
+        fh.seek(size - 1)
+        if fh.read(1) == b"\n":
+            return
+
+        start = max(0, size - 65536)
+        fh.seek(start)
+        tail = fh.read()
+        cut = tail.rfind(b"\n")
+        if cut < 0 and start > 0:
+            fh.seek(0)
+            tail, start = fh.read(), 0
+            cut = tail.rfind(b"\n")
+        fragment = tail[cut + 1:]
+
+        # 헤더와 정확히 같을 때만 개행 보충. 컬럼 수가 맞는 행도 마지막 셀이 잘렸을 수 있으므로
+        # (개행 없이 끝난 쓰기는 완료를 보장할 수 없음) 항상 격리
+        if fragment.replace(BOM.encode("utf-8"), b"", 1) == ",".join(self.fields).encode("utf-8"):
+            fh.write(LINE_TERMINATOR.encode("utf-8"))
+            return
+
+        with open(path + ".torn", "ab") as torn:
+            torn.write(fragment + b"\n")
+        os.ftruncate(fd, start + cut + 1)
+        log.warning("잘린 행 %d바이트 → %s.torn 로 격리", len(fragment), os.path.basename(path),
+                    extra={"tag": "CSV-REPAIR"})
+        if start + cut + 1 == 0:
+            fh.write(header_bytes(self.fields))
+
+    def _evict_handles(self):
+        for ym in sorted(self._handles)[:-MAX_OPEN_HANDLES]:
+            self._handles.pop(ym).close()
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# 읽기 / 검증 / 복구
+# ═════════════════════════════════════════════════════════════════════════════
+
+def iter_order_rows(csv_path, fields=ORDER_CSV_FIELDS, problems=None):
+    # type: (str, List[str], Optional[List[Tuple[int, str, List[str]]]]) -> Iterator[dict]
+    """
+    주문 CSV 를 dict 로 순회합니다. 헤더 행(중복 포함)은 건너뛰고,
+    컬럼 수가 맞지 않는 행은 problems 에 (행번호, 사유, row) 로 남깁니다.
+    """
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+        for line_no, row in enumerate(csv.reader(f), start=1):
+            if not row:
+                continue
+            if is_header_row(row, fields):
+                if line_no > 1 or len(row) != len(fields):
+                    if problems is not None:
+                        problems.append((line_no, "duplicate_header", row))
+                continue
+            if len(row) != len(fields):
+                if problems is not None:
+                    problems.append((line_no, "torn_row", row))
+                continue
+            yield dict(zip(fields, row))
+
+
+def validate_order_csv(csv_path, fields=ORDER_CSV_FIELDS):
+    # type: (str, List[str]) -> dict
+    problems = []  # type: List[Tuple[int, str, List[str]]]
+    rows = list(iter_order_rows(csv_path, fields, problems))
+    seen = {}  # type: Dict[str, int]
+    duplicate_ids = []
+    for row in rows:
+        pid = row.get(fields[0], "")
+        seen[pid] = seen.get(pid, 0) + 1
+        if seen[pid] == 2:
+            duplicate_ids.append(pid)
+    with open(csv_path, "rb") as f:
+        data = f.read()
+    return {
+        "path":              csv_path,
+        "rows":              len(rows),
+        "duplicate_headers": [p[0] for p in problems if p[1] == "duplicate_header"],
+        "torn_rows":         [p[0] for p in problems if p[1] == "torn_row"],
+        "duplicate_ids":     duplicate_ids,
+        "missing_newline":   bool(data) and not data.endswith(b"\n"),
+        "problems":          problems,
+    }
+
+
+def report_is_clean(report):
+    # type: (dict) -> bool
+    return not (report["duplicate_headers"] or report["torn_rows"] or report["missing_newline"])
+
+
+def repair_order_csv(csv_path, dedupe=False, backup=True, fields=ORDER_CSV_FIELDS):
+    # type: (str, bool, bool, List[str]) -> dict
+    """
+    헤더 1회 + 정상 행만 남기도록 파일을 재작성합니다 (임시 파일 → os.replace).
+    잘린 행은 .torn 으로 격리, dedupe=True 면 상품주문번호 중복은 첫 행만 유지.
+    """
+    log_dir = os.path.dirname(os.path.abspath(csv_path))
+    with _FileLock(log_dir):
+        report = validate_order_csv(csv_path, fields)
+        rows = list(iter_order_rows(csv_path, fields))
+        removed_dupes = 0
+        if dedupe:
+            kept, seen = [], set()
+            for row in rows:
+                pid = row.get(fields[0], "")
+                if pid in seen:
+                    removed_dupes += 1
+                    continue
+                seen.add(pid)
+                kept.append(row)
+            rows = kept
+        report["removed_duplicates"] = removed_dupes
+
+        if report_is_clean(report) and not removed_dupes:
+            report["rewritten"] = False
+            return report
+
+        torn = [p[2] for p in report["problems"] if p[1] == "torn_row"]
+        if torn:
+            buf = io.StringIO()
+            csv.writer(buf, lineterminator=LINE_TERMINATOR).writerows(torn)
+            with open(csv_path + ".torn", "ab") as f:
+                f.write(buf.getvalue().encode("utf-8"))
+        if backup:
+            report["backup"] = "{}.bak_{}".format(csv_path, datetime.now(KST).strftime("%Y%m%d_%H%M%S"))
+            shutil.copy2(csv_path, report["backup"])
+
+        tmp = csv_path + ".repair.tmp"
+        with open(tmp, "wb") as f:
+            f.write(header_bytes(fields))
+            f.write(encode_rows(rows, fields))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, csv_path)
+        report["rewritten"] = True
+        report["rows"] = len(rows)
+        return report
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# CLI
+# ═════════════════════════════════════════════════════════════════════════════
+
+def _print_report(report):
+    name = os.path.basename(report["path"])
+    status = "OK" if report_is_clean(report) else "문제 있음"
+    print("[{}] {} | 행 {}건".format(status, name, report["rows"]))
+    if report["duplicate_headers"]:
+        print("  - 중복 헤더   : {}행".format(", ".join(str(n) for n in report["duplicate_headers"])))
+    if report["torn_rows"]:
+        print("  - 잘린 행     : {}행".format(", ".join(str(n) for n in report["torn_rows"])))
+    if report["missing_newline"]:
+        print("  - 마지막 개행 없음")
+    if report["duplicate_ids"]:
+        print("  - 상품주문번호 중복: {}".format(", ".join(report["duplicate_ids"][:10])))
+    if report.get("rewritten"):
+        print("  → 재작성 완료{}".format(
+            " (백업: {})".format(os.path.basename(report["backup"])) if report.get("backup") else ""))
+        if report.get("removed_duplicates"):
+            print("  → 중복 제거: {}행".format(report["removed_duplicates"]))
+
+
+def main(argv=None):
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+    p = argparse.ArgumentParser(description="주문 CSV 검증/복구")
+    sub = p.add_subparsers(dest="cmd")
+    for name in ("validate", "repair"):
+        sp = sub.add_parser(name)
+        sp.add_argument("paths", nargs="*",
+                        help="CSV 경로 (기본: order_logs/orders_*.csv)")
+        if name == "repair":
+            sp.add_argument("--dedupe", action="store_true", help="상품주문번호 중복 행 제거")
+            sp.add_argument("--no-backup", action="store_true", help=".bak 백업 생략")
+    args = p.parse_args(argv)
+    if not args.cmd:
+        p.print_help()
+        return 1
+
+    paths = args.paths or sorted(glob.glob(os.path.join(DEFAULT_LOG_DIR, "orders_*.csv")))
+    if not paths:
+        print("대상 CSV 없음")
+        return 0
+
+    dirty = 0
+    for path in paths:
+        if args.cmd == "validate":
+            report = validate_order_csv(path)
+        else:
+            report = repair_order_csv(path, dedupe=args.dedupe, backup=not args.no_backup)
+        if not report_is_clean(report) and not report.get("rewritten"):
+            dirty += 1
+        _print_report(report)
+    return 1 if dirty else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,8 @@ order_listener.py
 
 사용법:
     python3 order_listener.py
+    LISTENER_LOG_LEVEL=DEBUG python3 order_listener.py       # 주문 박스 / 드라이런 덤프까지 출력
+    LISTENER_LOG_FORMAT=text python3 order_listener.py       # JSON 대신 "[TAG] msg" 형식
 
 종료:
     Ctrl+C
@@ -15,11 +17,10 @@ order_listener.py
 호환: Python 3.6+
 """
 
-import csv
 import json
+import logging
 import os
 import signal
-import sys
 import time
 from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Optional, Tuple
@@ -35,11 +36,106 @@ from config import (
     PROXIES,
     USE_PROXY,
     POLL_INTERVAL_SECONDS,
+    SESSION_GRACE_SECONDS,
     TOKEN_REFRESH_BUFFER_SECONDS,
     TOKEN_EXPIRES_IN_SECONDS,
     SAMMIRACK_SERVER_URL,
     ENABLE_PAYLOAD_LOGGING,
+    LISTENER_METRICS_PORT,
+    INVENTORY_INDEX_REFRESH_SECONDS,
+    INVENTORY_UNKNOWN_POLICY,
+    PRICE_SYNC_SECONDS,
+    PRICE_FULL_SYNC_SECONDS,
+    NUDGE_DEBOUNCE_SECONDS,
+    NUDGE_MIN_GAP_SECONDS,
+    NUDGE_MAX_PER_MINUTE,
 )
+import api_transport
+from order_csv_log import ORDER_CSV_FIELDS, OrderCsvLog
+from payload_codec import CONTENT_TYPE as JSON_CONTENT_TYPE, encode_document
+from payload_log import COMPACT_FILENAME as PAYLOAD_LOG_FILENAME, get_payload_log
+from listener_metrics import (
+    GROUPS_BUILT,
+    LAST_POLL,
+    ORDERS_FAILED,
+    ORDERS_GROUPED,
+    ORDERS_SEEN,
+    ORDERS_SKIPPED,
+    POLL_LAG,
+    SEEN_IDS,
+    stage,
+    start_metrics_server,
+    timed,
+)
+from listener_logging import get_logger, setup_logging, shutdown_logging
+from listener_profiler import PollProfiler
+from poll_scheduler import observe_detection_latency, scheduler_from_config
+from poll_trigger import NUDGE_PATH, PollTrigger
+from deduction_ledger import (
+    STATUS_ACKED,
+    STATUS_PENDING,
+    compute_request_hash,
+    find_server_deduction,
+    get_ledger,
+    server_ack_from,
+)
+from inventory_index import get_inventory_index, validated_deductions
+from part_index import index_saved_document
+from price_sync import SNAPSHOT_FILENAME as PRICE_SNAPSHOT_FILENAME, PriceSync
+# 파싱/BOM/문서 생성 코어 (기존 `from order_listener import ...` 호환을 위해 그대로 다시 내보냄)
+from ss_pipeline.racks import (
+    ADDON_KEYWORDS,
+    SUPPORTED_RACK_PREFIXES,
+    UNSUPPORTED_RACK_PREFIXES,
+    _detect_connection_type,
+    _extract_size_numbers,
+    _nearest,
+    _strip_segment_label,
+    classify_row,
+    filter_korean,
+    get_rack_type,
+    is_supported_rack,
+    map_highrack_color,
+    map_pallet_size_key,
+    parse_smartstore_option,
+)
+from ss_pipeline.order import SmartstoreOrder, as_order
+from ss_pipeline.grouping import _dedupe_group_rows, _parse_payment_dt, group_orders_by_session
+from ss_pipeline.pricing import _load_admin_prices_cache, _lookup_admin_price, set_admin_prices
+from ss_pipeline.bom import (
+    _extract_weight_from_color,
+    _generate_inventory_part_id,
+    _generate_part_id,
+    _parse_level,
+    _parse_wd,
+    build_item_name,
+    build_material_item,
+    generate_bom_for_rack,
+)
+from ss_pipeline.document import (
+    _build_addon_item_name,
+    _material_group_priority,
+    _material_sort_key,
+    _material_source_priority,
+    _safe_int,
+    build_grouped_document,
+    build_purchase_order_item,
+    build_purchase_order_payload,
+    material_order_rules,
+)
+from ss_pipeline.stages import (
+    DocumentBuilder,
+    DocumentSink,
+    NaverItemParser,
+    OrderGrouper,
+    OrderParser,
+    OrderSource,
+    SessionGrouper,
+    WindowedSessionGrouper,
+    parse_naver_item as _parse_order_item,
+)
+
+log = get_logger()
 
 
 # ─────────────────────────────────────────
@@ -57,20 +153,6 @@ URL_PRODUCT_ORDER_QUERY = (
     "{}/external/v1/pay-order/seller/product-orders/query".format(API_BASE_URL)
 )
 
-# CSV 저장 컬럼 순서
-ORDER_CSV_FIELDS = [
-    "상품주문번호",
-    "결제완료시각",
-    "구매자명",
-    "상품명",
-    "옵션",
-    "주문수량",
-    "최종금액",
-    "수취인명",
-    "연락처",
-    "배송지",
-]
-
 
 # ═════════════════════════════════════════════════════════════════════════════
 # 1. 토큰 관리
@@ -121,9 +203,7 @@ def get_access_token():
     if "access_token" not in data:
         raise RuntimeError("[TOKEN] 발급 실패: {}".format(data))
 
-    print("[TOKEN] 새 액세스 토큰 발급 완료 ({})".format(
-        datetime.now(KST).strftime("%H:%M:%S")
-    ))
+    log.info("새 액세스 토큰 발급 완료", extra={"tag": "TOKEN"})
     return data["access_token"]
 
 
@@ -140,13 +220,14 @@ class TokenManager(object):
         # type: () -> str
         """유효한 토큰을 반환합니다. 만료 임박 시 자동 갱신."""
         if self._should_refresh():
-            self._token = get_access_token()
+            with stage("token_refresh"):
+                self._token = get_access_token()
             self._issued_at = time.time()
         return self._token
 
     def invalidate(self):
         """401 응답 등으로 토큰이 무효화된 경우 강제 리셋."""
-        print("[TOKEN] 토큰 무효화 → 다음 호출 시 재발급됩니다.")
+        log.info("토큰 무효화 → 다음 호출 시 재발급됩니다.", extra={"tag": "TOKEN"})
         self._token = None
         self._issued_at = None
 
@@ -179,7 +260,7 @@ def _safe_get(url, token_mgr, **kwargs):
     resp = requests.get(url, headers=_make_headers(token), proxies=proxies, timeout=15, **kwargs)
 
     if resp.status_code == 401:
-        print("[AUTH] 401 Unauthorized → 토큰 재발급 후 재시도")
+        log.warning("401 Unauthorized → 토큰 재발급 후 재시도", extra={"tag": "AUTH", "url": url})
         token_mgr.invalidate()
         token = token_mgr.get_token()
         resp = requests.get(url, headers=_make_headers(token), proxies=proxies, timeout=15, **kwargs)
@@ -195,7 +276,7 @@ def _safe_post(url, token_mgr, json_body):
     resp = requests.post(url, headers=_make_headers(token), json=json_body, proxies=proxies, timeout=15)
 
     if resp.status_code == 401:
-        print("[AUTH] 401 Unauthorized → 토큰 재발급 후 재시도")
+        log.warning("401 Unauthorized → 토큰 재발급 후 재시도", extra={"tag": "AUTH", "url": url})
         token_mgr.invalidate()
         token = token_mgr.get_token()
         resp = requests.post(url, headers=_make_headers(token), json=json_body, proxies=proxies, timeout=15)
@@ -207,6 +288,7 @@ def _safe_post(url, token_mgr, json_body):
 # 3. 주문 조회 (1단계: 목록 → 2단계: 상세)
 # ═════════════════════════════════════════════════════════════════════════════
 
+@timed("list_fetch")
 def fetch_recent_product_order_ids(token_mgr, from_dt, to_dt):
     # type: (TokenManager, datetime, datetime) -> List[str]
     """결제완료 상태의 상품주문번호 목록을 조회합니다."""
@@ -226,7 +308,8 @@ def fetch_recent_product_order_ids(token_mgr, from_dt, to_dt):
     resp = _safe_get(URL_PRODUCT_ORDER_LIST, token_mgr, params=params)
 
     if resp.status_code != 200:
-        print("[LIST-API] 오류 {}: {}".format(resp.status_code, resp.text[:300]))
+        log.error("목록 조회 오류 HTTP %s: %s", resp.status_code, resp.text[:300],
+                  extra={"tag": "LIST-API", "status": resp.status_code})
         return []
 
     payload = resp.json()
@@ -267,112 +350,87 @@ def _extract_product_order_id(item):
     return None
 
 
-def fetch_order_details(token_mgr, product_order_ids):
+def fetch_order_items(token_mgr, product_order_ids):
     # type: (TokenManager, List[str]) -> List[Dict]
-    """상품주문번호 목록으로 상세 주문 정보를 조회합니다 (POST /query)."""
+    """상품주문번호 목록으로 상세 주문 원본 항목을 조회합니다 (POST /query)."""
     if not product_order_ids:
         return []
 
     body = {"productOrderIds": product_order_ids}
-    resp = _safe_post(URL_PRODUCT_ORDER_QUERY, token_mgr, body)
+    with stage("detail_fetch"):
+        resp = _safe_post(URL_PRODUCT_ORDER_QUERY, token_mgr, body)
 
     if resp.status_code != 200:
-        print("[QUERY-API] 오류 {}: {}".format(resp.status_code, resp.text[:300]))
+        log.error("상세 조회 오류 HTTP %s: %s", resp.status_code, resp.text[:300],
+                  extra={"tag": "QUERY-API", "status": resp.status_code, "orders": len(product_order_ids)})
         return []
 
-    payload = resp.json()
-    data = payload.get("data", [])
-
-    orders = []
-    for item in (data if isinstance(data, list) else []):
-        parsed = _parse_order_item(item)
-        if parsed:
-            orders.append(parsed)
-
+    data = resp.json().get("data", [])
+    return data if isinstance(data, list) else []
+
+
+def fetch_order_details(token_mgr, product_order_ids, parser=None):
+    # type: (TokenManager, List[str], Optional[OrderParser]) -> List[Dict]
+    """상품주문번호 목록으로 상세 주문 정보를 조회해 주문행으로 변환합니다."""
+    items = fetch_order_items(token_mgr, product_order_ids)
+    parse = parser.parse if parser is not None else _parse_order_item
+    with stage("parse"):
+        orders = []
+        for item in items:
+            parsed = parse(item)
+            if parsed:
+                orders.append(parsed)
     return orders
 
 
-def _parse_order_item(item):
-    # type: (dict) -> Optional[Dict]
-    """
-    API 응답의 단일 주문 항목을 읽기 쉬운 딕셔너리로 변환.
-
-    API 명세 기준 필드 매핑:
-      상품주문번호  ← productOrder.productOrderId
-      구매자명      ← order.ordererName
-      옵션          ← productOrder.productOption
-      주문수량      ← productOrder.quantity
-      최종금액      ← productOrder.totalPaymentAmount
-      수취인명      ← productOrder.shippingAddress.name
-      연락처        ← productOrder.shippingAddress.tel1
-      배송지        ← productOrder.shippingAddress (baseAddress + detailedAddress)
-      결제완료시각  ← order.paymentDate
-    """
-    if not isinstance(item, dict):
-        return None
-
-    content = item.get("content", item)
-    order = content.get("order") or {}
-    po = content.get("productOrder") or {}
-    shipping = po.get("shippingAddress") or {}
-
-    base_addr = shipping.get("baseAddress") or ""
-    detail_addr = shipping.get("detailedAddress") or ""
-    full_address = "{} {}".format(base_addr, detail_addr).strip()
-
-    return {
-        "주문번호":     order.get("orderId", ""),      # <--- 추가됨: 상위 장바구니 그룹용 진짜 주문번호
-        "상품주문번호": po.get("productOrderId", ""),  # 개별 아이템 키
-        "구매자명":     order.get("ordererName", ""),
-        "상품명":       po.get("productName", ""),
-        "옵션":         po.get("productOption") or "(옵션없음)",
-        "주문수량":     po.get("quantity", 0),
-        "최종금액":     po.get("totalPaymentAmount", 0),
-        "수취인명":     shipping.get("name") or order.get("ordererName", ""),
-        "연락처":       shipping.get("tel1") or order.get("ordererTel", ""),
-        "배송지":       full_address,
-        "결제완료시각": order.get("paymentDate", ""),
-    }
-
-
 # ═════════════════════════════════════════════════════════════════════════════
 # 4. 콘솔 출력
 # ═════════════════════════════════════════════════════════════════════════════
 
 def print_new_order(order):
     # type: (Dict) -> None
-    """새 주문 정보를 콘솔에 보기 좋게 출력합니다."""
+    """
+    새 주문 1건을 로그로 남깁니다.
+    INFO: 한 줄 요약 (주문번호/구매자/상품) / DEBUG: 기존 콘솔 박스 형식 전체
+    """
+    fields = {
+        "tag":      "NEW ORDER",
+        "order_id": order.get("상품주문번호"),
+        "buyer":    order.get("구매자명"),
+        "product":  order.get("상품명"),
+        "option":   order.get("옵션"),
+        "qty":      order.get("주문수량"),
+        "amount":   order.get("최종금액"),
+        "paid_at":  order.get("결제완료시각"),
+    }
+    if not log.isEnabledFor(logging.DEBUG):
+        log.info("새 주문", extra=fields)
+        return
     now_str = datetime.now(KST).strftime("%Y-%m-%d %H:%M:%S")
-    print()
-    print("=" * 60)
-    print("  [NEW ORDER] {}".format(now_str))
-    print("=" * 60)
-    print("  상품주문번호  : {}".format(order["상품주문번호"]))
-    print("  결제완료시각  : {}".format(order["결제완료시각"]))
-    print("  구매자명      : {}".format(order["구매자명"]))
-    print("  주문 상품     : {}".format(order["상품명"]))
-    print("  선택 옵션     : {}".format(order["옵션"]))
-    print("  주문 수량     : {}개".format(order["주문수량"]))
-    print("  최종 금액     : {:,}원".format(order["최종금액"]))
-    print("  수취인        : {} / {}".format(order["수취인명"], order["연락처"]))
-    print("  배송지        : {}".format(order["배송지"]))
-    print("=" * 60)
-    print()
+    lines = [
+        "=" * 60,
+        "  [NEW ORDER] {}".format(now_str),
+        "=" * 60,
+        "  상품주문번호  : {}".format(order["상품주문번호"]),
+        "  결제완료시각  : {}".format(order["결제완료시각"]),
+        "  구매자명      : {}".format(order["구매자명"]),
+        "  주문 상품     : {}".format(order["상품명"]),
+        "  선택 옵션     : {}".format(order["옵션"]),
+        "  주문 수량     : {}개".format(order["주문수량"]),
+        "  최종 금액     : {:,}원".format(order["최종금액"]),
+        "  수취인        : {} / {}".format(order["수취인명"], order["연락처"]),
+        "  배송지        : {}".format(order["배송지"]),
+        "=" * 60,
+    ]
+    log.debug("\n".join(lines), extra=fields)
 
 
 # ═════════════════════════════════════════════════════════════════════════════
 # 5. 스마트스토어 파싱 (랙종류 필터링 + 옵션 파싱 + 그룹핑)
+#    파싱/BOM/문서 생성 코어는 ss_pipeline 패키지로 이동 (위에서 다시 내보냄).
+#    여기에는 DRY_RUN 플래그와 드라이런 덤프만 남는다.
 # ═════════════════════════════════════════════════════════════════════════════
 
-import re as _re
-
-def filter_korean(text):
-    # type: (str) -> str
-    """한글, 영문, 숫자 및 공백만 남깁니다."""
-    if not text: return ""
-    return _re.sub(r'[^a-zA-Z0-9\u3131-\u3163\uac00-\ud7a3\s×xX*()./-]', '', str(text))
-
-
 # ─── DRY_RUN 플래그 ────────────────────────────────────────────────────────
 # True : 콘솔 출력만 (DB 저장 안 함)  ← 1단계 기본값
 # False: 가비아 서버에 실제 POST       ← 2단계에서 전환
@@ -385,1447 +443,79 @@ def filter_korean(text):
 # ⚠️ ══════════════════════════════════════════════════════════════════════
 DRY_RUN = False  # DO NOT TOUCH - AI AGENT MUST NEVER MODIFY THIS LINE
 
-# ─── 지원 랙 타입 화이트리스트 ──────────────────────────────────────────────
-# admin_prices.json 기준 실제 존재하는 rack_type만 포함
-# 절대 다른 종류를 여기에 매핑(aliasing)하지 말 것
-SUPPORTED_RACK_PREFIXES = {
-    "하이랙":   "하이랙",
-    "파렛트랙": "파렛트랙",
-    "파래트랙": "파렛트랙",
-    "파랫트랙": "파렛트랙",
-    "중량랙":   "중량랙",
-    "경량랙":   "경량랙",
-    "스텐랙":   "스텐랙",
-    "스텐":     "스텐랙",
-}
-
-# ─── 비지원 랙 블랙리스트 (초스피드/실버랙/사이버랙/올스텐랙 등) ────────────
-# 이 키워드로 시작하는 주문은 리슨 단계에서 즉시 무시
-# 절대 다른 종류로 매핑하거나 분류하지 말 것
-UNSUPPORTED_RACK_PREFIXES = [
-    "초스피드", "실버랙", "사이버랙", "올스텐랙",
-    "조립식 앵글", "앵글선반", "철제선반 경량", "철제선반 무볼트",
-]
-
-# ─── 추가부품(addon) 판단 키워드 ─────────────────────────────────────────────
-# 중요:
-# - 메인 주문의 옵션 플레이스홀더("A.색상: 추가상품구매")는 addon 판정 근거가 아님
-# - 실제 추가부품 주문으로 명확히 보이는 패턴만 addon으로 판정
-ADDON_KEYWORDS = ["단추가", "선반추가", "기둥추가", "로드빔추가"]
-
-
-
-def is_supported_rack(product_name, option_str=""):
-    # type: (str, str) -> bool
-    """
-    스마트스토어 상품명(+옵션)이 sammirack-estimator 지원 랙 관련 주문인지 확인.
-    비지원 랙(초스피드/실버/사이버/올스텐/스텐)은 False → 주문 전체 skip.
-
-    단, 추가부품(선반추가/기둥추가/로드빔추가/단추가 등):
-    - 상품명 또는 옵션 중 하나라도 ADDON_KEYWORDS 포함 시 True (통과)
-    - 예) 상품명에는 랙명이 없어도 옵션에 '선반추가/기둥추가' 문구가 있으면 통과
-    """
-    name     = (product_name or "").strip()
-    opt_str  = (option_str or "").strip()
-    combined = name + " " + opt_str
-
-    # 추가부품 키워드 → 통과 (그룹 내 addon 후보)
-    for kw in ADDON_KEYWORDS:
-        if kw in combined:
-            return True
-
-    # 비지원 랙 블랙리스트
-    for prefix in UNSUPPORTED_RACK_PREFIXES:
-        if name.startswith(prefix):
-            return False
-    # 지원 랙 화이트리스트
-    for prefix in SUPPORTED_RACK_PREFIXES:
-        if name.startswith(prefix):
-            return True
-    # 알 수 없는 상품명도 skip (안전 우선)
-    return False
-
-
-
-def get_rack_type(product_name, option_name=""):
-    # type: (str, str) -> str
-    """지원 랙의 정규화된 rackType 반환. 비지원이면 빈 문자열.
-
-    ⚠️ 규칙: 상품명에서 가장 먼저(왼쪽) 나오는 랙 종류 이름이 해당 랙.
-    뒤에 SEO용으로 다른 랙 이름이 아무리 많아도 무시.
-    예) "하이랙 철제선반 앵글 중량랙 경량랙 창고 파렛트랙..." → 하이랙
-    예) "파렛트랙 파래트랙 중량랙 창고..." → 파렛트랙
-    예) "철제선반 경량랙 수납장 조립식앵글..." → 경량랙
-    """
-    name = (product_name or "").strip()
-
-    # 상품명에서 각 지원 랙 키워드의 위치를 찾아서 가장 앞에 있는 것 선택
-    best_pos = len(name) + 1
-    best_type = ""
-
-    for prefix, rack_type in SUPPORTED_RACK_PREFIXES.items():
-        pos = name.find(prefix)
-        if pos != -1 and pos < best_pos:
-            best_pos = pos
-            best_type = rack_type
-
-    if not best_type:
-        return ""
-
-    combined = name + " " + (option_name or "")
-
-    # ── 하이랙 강제 판별: 하이랙 전용 색상/중량 키워드가 있으면 무조건 하이랙 ──
-    # 파렛트랙에는 메트그레이/아이보리(볼트식)/블루+오렌지/270kg/450kg/600kg 없음
-    # 파렛트랙은 2t/3t, 색상 없음
-    _HIGHRACK_ONLY = ["메트그레이(볼트식)", "아이보리(볼트식)", "블루(기둥)+오렌지",
-                      "(볼트식)270kg", "(볼트식)450kg", "(볼트식)600kg"]
-    if best_type != "하이랙" and any(k in combined for k in _HIGHRACK_ONLY):
-        return "하이랙"
-
-    # 파렛트랙인 경우 철판형 여부 추가 판별
-    if best_type == "파렛트랙":
-        if any(k in combined for k in ["철판형", "선반형", "700kg", "990kg"]):
-            return "파렛트랙 철판형"
-
-    return best_type
-
-
-def _strip_segment_label(seg):
-    # type: (str) -> str
-    seg = _re.sub(r'^[A-Za-z]\s*[.\-]\s*', '', seg).strip()
-    seg = _re.sub(r'^\d+\s*[.\-]\s*', '', seg).strip()
-    return seg
-
-
-def _extract_size_numbers(val):
-    # type: (str) -> list
-    val_no_weight = _re.sub(r'\d+\s*[kK][gG]', '', val)
-    nums = _re.findall(r'\d+', val_no_weight)
-    return [int(n) for n in nums]
-
-
-def _detect_connection_type(val):
-    # type: (str) -> str
-    if "연결" in val:
-        return "연결형"
-    if "독립" in val:
-        return "독립형"
-    return ""
-
-
-def parse_smartstore_option(option_str):
-    # type: (str) -> dict
-    """
-    스마트스토어 옵션 문자열 파싱.
-    반환 키: rack_type_hint, color, width, length, height, dan, size_raw, is_iron, 원본옵션
-    """
-    if not option_str or option_str == "(옵션없음)":
-        return {"원본옵션": option_str or ""}
-
-    result = {"원본옵션": option_str, "is_iron": False}
-    if "철판형" in option_str or "선반형" in option_str:
-        result["is_iron"] = True
-
-    segments = [s.strip() for s in option_str.split("/")]
-
-    for seg in segments:
-        seg = _strip_segment_label(seg)
-        if ":" not in seg:
-            # 3개 숫자(WxLxH)
-            m3 = _re.search(r'(\d+)[^\d]*[xX*][^\d]*(\d+)[^\d]*[xX*][^\d]*(\d+)', seg)
-            if m3:
-                result["width"] = int(m3.group(1))
-                result["length"] = int(m3.group(2))
-                result["height"] = int(m3.group(3))
-                result["size_raw"] = m3.group(0)
-                continue
-            # 2개 숫자(WxL)
-            m2 = _re.search(r'(\d+)[^\d]*[xX*][^\d]*(\d+)', seg)
-            if m2:
-                result["width"] = int(m2.group(1))
-                result["length"] = int(m2.group(2))
-                result["size_raw"] = m2.group(0)
-                continue
-            continue
-            
-        colon_idx = seg.index(":")
-        raw_key = seg[:colon_idx].strip()
-        raw_val = seg[colon_idx + 1:].strip()
-        key_lower = raw_key.lower()
-
-        if "색상" in raw_key:
-            result["color"] = raw_val
-        elif "단수" in raw_key or raw_key == "단":
-            result["dan"] = raw_val
-        elif any(k in raw_key for k in ["선반", "폭", "규격", "사이즈", "길이"]) or "cm" in key_lower:
-            nums = _extract_size_numbers(raw_val)
-            conn = _detect_connection_type(raw_val)
-            if conn:
-                result["rack_type_hint"] = conn
-            if len(nums) >= 3:
-                result["width"]  = nums[0]
-                result["length"] = nums[1]
-                result["height"] = nums[2]
-            elif len(nums) == 2:
-                result["width"]  = nums[0]
-                result["length"] = nums[1]
-            elif len(nums) == 1:
-                result["width"]  = nums[0]
-            # size_raw: 숫자만 추출하여 깨끗한 WxD 형식으로 저장 (한글 제거)
-            if len(nums) >= 2:
-                result["size_raw"] = "{}x{}".format(nums[0], nums[1])
-            elif len(nums) == 1:
-                result["size_raw"] = str(nums[0])
-            else:
-                result["size_raw"] = raw_val
-        elif "높이" in raw_key:
-            nums = _extract_size_numbers(raw_val)
-            if nums:
-                result["height"] = nums[0]
-            conn = _detect_connection_type(raw_val)
-            if conn and "rack_type_hint" not in result:
-                result["rack_type_hint"] = conn
-        elif "추가" in raw_key or "단추가" in raw_key:
-            result["extra_add"] = raw_val
-        else:
-            result["extra_{}".format(raw_key)] = raw_val
-
-    return result
-
-
-# ─── 파렛트랙 / 파렛트랙 철판형 size 키 변환 ──────────────────────────────────
-# SOURCE OF TRUTH: ProductContext.jsx + bom_data_weight_added.json 기준
-# 파렛트랙 (일반):  1390x1000 / 2590x1000 / 2790x1000
-# 파렛트랙 철판형:  1390x800 / 1390x1000 / 2590x800 / 2590x1000
-#                   + EXTRA: 2090x800 / 2090x1000  (ProductContext EXTRA_OPTIONS)
-#
-# 스마트스토어 옵션에서 치수 두 숫자(a, b)를 받아서:
-#   - 로드빔 길이를 판별 (1390 / 2090 / 2590 / 2790?)
-#   - 철판형 여부를 반환
-
-# 로드빔 길이 후보 (허용 오차 ±50mm) - 2090은 철판형 EXTRA_OPTIONS 전용
-_PALLET_RODBEAM_CANDIDATES = [1390, 2090, 2590, 2790]
-# 타이빔/깊이 후보 (허용 오차 ±50mm)
-_PALLET_DEPTH_CANDIDATES = [800, 1000]
-
-def _nearest(val, candidates, tolerance=100):
-    # type: (int, list, int) -> int
-    """candidates 중 val에 가장 가까운 값 반환. 허용 오차 초과 시 0 반환."""
-    best, best_dist = 0, tolerance + 1
-    for c in candidates:
-        d = abs(val - c)
-        if d < best_dist:
-            best, best_dist = c, d
-    return best if best_dist <= tolerance else 0
-
-
-def map_pallet_size_key(num_a, num_b, product_name="", option_data=None):
-    # type: (int, int, str, dict) -> tuple
-    """
-    파렛트랙/철판형 스마트스토어 치수 (두 숫자) → 실제 시스템 size 키 + 타입 판정.
-
-    스마트스토어 표기는 폭x깊이 또는 깊이x폭 등 혼재.
-    로드빔 길이(1390/2090/2590/2790)가 어느 숫자인지 판별 후 size 키 생성.
-
-    반환: (size_key, is_iron)
-      size_key : str  "1390x1000", "2590x800" 등. 매핑 실패 시 ""
-      is_iron  : bool True=철판형, False=일반 파렛트랙
-
-    ※ 2090 = 철판형 EXTRA_OPTIONS 전용 (파렛트랙 일반엔 없음)
-    ※ 2790 = 파렛트랙 일반만 (철판형 없음)
-    ※ 800 깊이 = 철판형만 허용
-    """
-    a_beam = _nearest(num_a, _PALLET_RODBEAM_CANDIDATES)
-    b_depth = _nearest(num_b, _PALLET_DEPTH_CANDIDATES)
-    b_beam = _nearest(num_b, _PALLET_RODBEAM_CANDIDATES)
-    a_depth = _nearest(num_a, _PALLET_DEPTH_CANDIDATES)
-
-    # 케이스1: a가 로드빔, b가 깊이
-    if a_beam and b_depth:
-        rod = a_beam
-        dep = b_depth
-    # 케이스2: b가 로드빔, a가 깊이
-    elif b_beam and a_depth:
-        rod = b_beam
-        dep = a_depth
-    else:
-        # 매핑 불가
-        return ("", False)
-
-    is_iron = "철판" in product_name
-    if option_data and option_data.get("is_iron"):
-        is_iron = True
-        
-    # 800 깊이는 철판형만 허용
-    if dep == 800:
-        is_iron = True
-    # 2090은 철판형 EXTRA_OPTIONS 전용
-    if rod == 2090 and not is_iron:
-        is_iron = True
-    # 2790은 파렛트랙 일반만 (철판형 없음)
-    if rod == 2790 and is_iron:
-        return ("", False)  # 존재하지 않는 조합
-
-    size_key = "{}x{}".format(rod, dep)
-    return (size_key, is_iron)
-
-
-def map_highrack_color(raw_color):
-    # type: (str) -> str
-    """
-    스마트스토어의 잡다한 하이랙 색상(예: 아이보리 200kg, 700kg 등)을
-    시스템의 5가지 표준 color 키로 매핑.
-    (메트그레이 270/450, 블루오렌지 270/450, 블루오렌지 600kg)
-    """
-    if not raw_color: return "메트그레이(볼트식)270kg"
-    
-    raw = str(raw_color).replace(" ", "")
-    is_blue_orange = "블루" in raw or "오렌지" in raw
-    is_ivory = "아이보리" in raw
-    
-    # 중량 추출 (숫자만 보고 시스템 표준 중량으로 매핑)
-    weight = "270kg"
-    if "700" in raw or "600" in raw:
-        weight = "600kg"
-    elif "450" in raw or "350" in raw:
-        weight = "450kg"
-    elif "200" in raw or "270" in raw:
-        weight = "270kg"
-        
-    if is_blue_orange:
-        # 블루오렌지의 경우 로드빔은 _generate_inventory_part_id에서 별도 처리됨
-        return "블루(기둥)+오렌지(가로대)(볼트식){}".format(weight)
-    elif is_ivory:
-        return "아이보리(볼트식){}".format(weight)
-    else:
-        # 기타 색상(메트그레이 등)은 전부 메트그레이 통일
-        return "메트그레이(볼트식){}".format(weight)
-
-
-def classify_row(order):
-    # type: (dict) -> str
-    """
-    주문 1행이 메인 랙인지 추가부품(addon)인지 분류.
-
-    ★ 버그 수정: ADDON_KEYWORDS 체크가 반드시 최우선이어야 함.
-      이전 코드는 parse_option 결과 색상/규격 체크가 먼저 실행되어
-      '아이보리선반 단추가(볼트식)' 같은 상품이 items[]로 잘못 분류됨.
-
-    반환: "main" | "addon"
-    """
-    product_name = str(order.get("상품명", "") or "")
-    option_str   = str(order.get("옵션", "") or "")
-    combined     = product_name + " " + option_str
-
-    # ① 지원 랙 이름으로 시작하면 파싱 없이 바로 main
-    #    (옵션에 '추가상품구매'가 있어도 메인 주문임)
-    for prefix in SUPPORTED_RACK_PREFIXES:
-        if product_name.strip().startswith(prefix):
-            return "main"
-
-    # ② 명시적인 추가부품 문구가 있으면 addon
-    addon_check_str = combined.replace("추가상품구매", "")
-    for kw in ADDON_KEYWORDS:
-        if kw in addon_check_str:
-            return "addon"
-
-    # ③ 색상 또는 규격(폭) 있으면 main
-    parsed = parse_smartstore_option(option_str)
-    if (parsed.get("color") or parsed.get("width") or parsed.get("size_raw")):
-        return "main"
-        
-    return "addon"
-
-
-def _parse_payment_dt(dt_str):
-    # type: (str) -> Optional[datetime]
-    """결제완료시각 문자열을 파싱하여 datetime 반환."""
-    try:
-        dt_str2 = str(dt_str or "").strip()
-        if _re.search(r'[+-]\d{2}:\d{2}$', dt_str2):
-            return datetime.fromisoformat(dt_str2)
-        return datetime.strptime(dt_str2[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=KST)
-    except Exception:
-        return None
-
-
-def group_orders_by_session(orders):
-    # type: (List[dict]) -> List[List[dict]]
-    """
-    동일 구매자명 + 결제완료시각(분단위) 기준으로 주문을 묶습니다.
-    같은 분(minute) 내 같은 구매자 = 한 번의 장바구니 결제 = 1개 document.
-    """
-    groups = {}  # type: Dict[tuple, list]
-    for order in orders:
-        buyer  = str(order.get("구매자명", "") or "")
-        dt     = _parse_payment_dt(order.get("결제완료시각", ""))
-        tm_key = dt.strftime("%Y%m%d%H%M") if dt else ""
-        key    = (buyer, tm_key)
-        groups.setdefault(key, []).append(order)
-    return list(groups.values())
-
-
-def build_item_name(order):
-    # type: (dict) -> str
-    """주문 1행 → items[].name 문자열 생성."""
-    pname = str(order.get("상품명", "") or "")
-    optv  = str(order.get("옵션", "") or "")
-    
-    rtype  = get_rack_type(pname, optv)
-    parsed = parse_smartstore_option(optv)
-    
-    # 랙 타입별 기본 이름
-    base_name = rtype if rtype and rtype != "기타" else pname
-    
-    # 규격 문자열 구성 (사이즈 -> 높이 -> 단수 순서)
-    dims = []
-    
-    # ── nearest-valid 헬퍼 ──
-    def _nearest(val, valid_list):
-        return min(valid_list, key=lambda x: abs(x - val))
-    
-    # 1. 사이즈 (WxD)
-    if rtype in ("파렛트랙", "파렛트랙 철판형") and parsed.get("width") and parsed.get("length"):
-        size_key, is_iron = map_pallet_size_key(
-            parsed["width"], parsed["length"], pname, parsed
-        )
-        if size_key:
-            dims.append(size_key)
-            if is_iron and base_name == "파렛트랙":
-                base_name = "파렛트랙 철판형"
-        else:
-            dims.append("{}x{}".format(parsed["width"], parsed["length"]))
-    elif parsed.get("width") and parsed.get("length"):
-        w = int(parsed["width"])
-        d = int(parsed["length"])
-        # 하이랙: cm 단위 (45/60 x 108/150/200)
-        if rtype == "하이랙":
-            w = _nearest(w, [45, 60])
-            d = _nearest(d, [108, 150, 200])
-        # 경량랙: SS는 depth x width (cm), 유효값은 mm
-        elif rtype == "경량랙":
-            d_mm = _nearest(w * 10, [300, 450, 600])
-            w_mm = _nearest(d * 10, [700, 900, 1000, 1200, 1500])
-            w = d_mm // 10
-            d = w_mm // 10
-        # 중량랙: SS는 depth x width (cm), 유효값은 mm
-        elif rtype == "중량랙":
-            d_mm = _nearest(w * 10, [450, 600, 900])
-            w_mm = _nearest(d * 10, [900, 1200, 1500, 1800])
-            w = d_mm // 10
-            d = w_mm // 10
-        dims.append("{}x{}".format(w, d))
-    elif parsed.get("size_raw"):
-        dims.append(parsed["size_raw"])
-        
-    # 2. 높이
-    if parsed.get("height"):
-        dims.append(str(parsed["height"]))
-        
-    # 3. 단수
-    if parsed.get("dan"):
-        dan_val = str(parsed["dan"])
-        m = _re.search(r'(\d+)', dan_val)
-        dims.append("{}단".format(m.group(1)) if m else dan_val)
-        
-    spec_str = " ".join(dims)
-    full_name = filter_korean("{} {}".format(base_name, spec_str).strip())
-    
-    # 4. 옵션 (색상/중량)
-    if rtype == "하이랙" and parsed.get("color"):
-        full_name += " " + map_highrack_color(parsed["color"])
-    elif parsed.get("color"):
-        full_name += " " + parsed["color"]
-        
-    # 최소한의 이름 보장 (내용이 너무 없으면 상품명 반환)
-    if len(full_name) < len(base_name) + 2:
-        return pname
-        
-    return full_name
-
-
-def build_material_item(order, main_rack_type=""):
-    # type: (dict, str) -> dict
-    """
-    추가부품(addon) 주문 1행 → materials[] 한 행.
-    """
-    product_name = str(order.get("상품명", "") or "")
-    option_str   = str(order.get("옵션", "") or "")
-    qty_str      = str(order.get("주문수량", "1") or "1")
-    total_str    = str(order.get("최종금액", "0") or "0")
-
-    try:
-        qty = int(qty_str)
-    except ValueError:
-        qty = 1
-    try:
-        total = int(total_str.replace(",", ""))
-    except ValueError:
-        total = 0
-    unit_price = total // qty if qty else total
-
-    # 괄호 안 텍스트에서 부품명 추출
-    m = _re.search(r'[（(]([^）)]+)[）)]', product_name)
-    mat_name = m.group(1) if m else product_name
-
-    # 규격: 옵션(더 상세함) -> 상품명 순으로 숫자×숫자(×숫자) 추출
-    # 80x206 600kg 같은 경우 600이 3번째 숫자로 잡히지 않도록 구분자(x, X, *, ×)를 명시
-    dim_pattern = r'(\d+)\s*[xX×*]\s*(\d+)(?:\s*[xX×*]\s*(\d+))?'
-    m2 = _re.search(dim_pattern, option_str)
-    if not m2:
-        m2 = _re.search(dim_pattern, product_name)
-    
-    if m2:
-        if m2.group(3):
-            spec = "{}x{}x{}".format(m2.group(1), m2.group(2), m2.group(3))
-        else:
-            spec = "{}x{}".format(m2.group(1), m2.group(2))
-    else:
-        spec = product_name
-
-    # 로드빔 계열 처리
-    if "로드빔" in option_str or "로드빔" in product_name:
-        mat_name = "로드빔 + 철판형"
-        mw = _re.search(r'(\d+)kg', option_str, _re.IGNORECASE)
-        if mw:
-            mat_name += " {}kg".format(mw.group(1))
-        mn = _re.search(r'(\d{3,4})\(', product_name)
-        spec = mn.group(1) if mn else spec
-    elif "선반" in mat_name:
-        mat_name = _re.sub(r'([가-힣])선반', r'\1 선반', mat_name)
-    elif "기둥" in mat_name:
-        mat_name = _re.sub(r'([가-힣])기둥', r'\1 기둥', mat_name)
-
-    # 하이랙인 경우 색상/중량 추출
-    cw = ""
-    color = ""
-    if main_rack_type == "하이랙":
-        combined = product_name + " " + option_str
-        cw = map_highrack_color(combined)
-        
-    return {
-        "name":          mat_name,
-        "rackType":      main_rack_type,
-        "specification": spec,
-        "quantity":      qty,
-        "unitPrice":     unit_price,
-        "totalPrice":    total,
-        "note":          "",
-        "ssSource":      "addon",
-        "colorWeight":   cw,
-        "color":         color
-    }
-
-
-# ── BOM 재생성 로직 (React regenerateBOMFromOptions 100% 재현) ───────────────
-
-def _parse_wd(size_str):
-    # type: (str) -> Tuple[Optional[int], Optional[int]]
-    """숫자xD 형식에서 w, d 추출. 한글 섞여 있어도 숫자만 추출."""
-    if not size_str: return None, None
-    # 무게 표기(예: 3000kg, 2000Kg) 먼저 제거
-    s = _re.sub(r'\d+\s*[kK][gG]', '', str(size_str))
-    # 한글 등 제거하고 숫자와 구분자만 남기기
-    cleaned = _re.sub(r'[^\d.xX*×]', '', s)
-    m = _re.search(r'(\d+)\s*[xX*×]\s*(\d+)', cleaned)
-    if m:
-        return (int(m.group(1)), int(m.group(2)))
-    # fallback: 원본에서 시도
-    m = _re.search(r'(\d+)[^\d]*[xX*×][^\d]*(\d+)', str(size_str))
-    return (int(m.group(1)), int(m.group(2))) if m else (None, None)
-
-def _parse_level(dan_str):
-    # type: (str) -> int
-    m = _re.search(r'(\d+)', str(dan_str or ""))
-    return int(m.group(1)) if m else 1
-
-
-# ── admin_prices.json 캐시 ────────────────────────────────────────────────────
-_ADMIN_PRICES_CACHE = None  # type: Optional[dict]
-
-def _load_admin_prices_cache():
-    # type: () -> dict
-    """admin_prices.json을 1회만 로드하여 {part_id: price} 딕셔너리 반환."""
-    global _ADMIN_PRICES_CACHE
-    if _ADMIN_PRICES_CACHE is not None:
-        return _ADMIN_PRICES_CACHE
-    # 프로젝트 루트의 admin_prices.json 경로
-    base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    path = os.path.join(base, "admin_prices.json")
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            raw = json.load(f)
-        # admin_prices.json은 part_id를 키로 하는 dict
-        if isinstance(raw, dict):
-            _ADMIN_PRICES_CACHE = raw
-        elif isinstance(raw, list):
-            # [{part_id, price, ...}, ...] 형식인 경우
-            _ADMIN_PRICES_CACHE = {}
-            for item in raw:
-                pid = item.get("part_id") or item.get("partId") or ""
-                if pid:
-                    _ADMIN_PRICES_CACHE[pid] = item
-        else:
-            _ADMIN_PRICES_CACHE = {}
-    except Exception as e:
-        print("[WARN] admin_prices.json 로드 실패: {}".format(e))
-        _ADMIN_PRICES_CACHE = {}
-    return _ADMIN_PRICES_CACHE
-
-
-def _lookup_admin_price(part_id):
-    # type: (str) -> int
-    """part_id로 admin_prices에서 가격 조회. 없으면 0."""
-    cache = _load_admin_prices_cache()
-    entry = cache.get(part_id)
-    if entry is None:
-        return 0
-    if isinstance(entry, dict):
-        return int(entry.get("price", 0) or 0)
-    if isinstance(entry, (int, float)):
-        return int(entry)
-    return 0
-
-
-# ── partId / inventoryPartId 생성 (JS generateInventoryPartId 재현) ──────────
-
-def _generate_part_id(rack_type, name, specification):
-    # type: (str, str, str) -> str
-    """JS generatePartId 재현: '{rackType}-{name}-{spec}' (소문자, 공백제거)."""
-    clean_name = _re.sub(r'\s+', '', str(name)).replace('*', 'x')
-    clean_name = _re.sub(r'[()]', '', clean_name).lower()
-    clean_spec = _re.sub(r'\s+', '', str(specification or '')).replace('*', 'x').lower()
-    return "{}-{}-{}".format(rack_type, clean_name, clean_spec)
-
-
-def _generate_inventory_part_id(rack_type, name, specification, color="", color_weight="", version=""):
-    # type: (str, str, str, str, str, str) -> str
-    """
-    JS generateInventoryPartId 100% 재현.
-    재고 관리용 ID 생성 (색상 포함).
-    """
-    rt = str(rack_type)
-
-    # 파렛트랙 + 신형 → 파렛트랙신형
-    if rt == "파렛트랙" and version == "신형":
-        rt = "파렛트랙신형"
-
-    clean_name = _re.sub(r'\s+', '', str(name)).replace('*', 'x')
-
-    def _snap_dimension(val_str, standards, tolerance=10):
-        try:
-            num_str = _re.sub(r'\D', '', val_str)
-            if not num_str: return val_str
-            val = int(num_str)
-            best_match = val_str
-            min_diff = tolerance + 1
-            for s in standards:
-                diff = abs(s - val)
-                if diff < min_diff:
-                    min_diff = diff
-                    best_match = str(s)
-            return best_match
-        except:
-            return val_str
-
-    HI_D = [45, 60, 80]
-    HI_W = [108, 150, 200]
-    HI_H = [150, 200, 250]
-
-    # ── 하이랙 전용 처리 ──
-    if rt == "하이랙":
-        # 기본 부품명 추출
-        if "기둥" in clean_name:
-            base_name = "기둥"
-        elif "선반" in clean_name:
-            base_name = "선반"
-        elif "로드빔" in clean_name:
-            base_name = "로드빔"
-        else:
-            base_name = clean_name
-
-        # 색상+속성 결정
-        target_str = clean_name + str(color or '') + str(color_weight or '')
-        color_attr = ""
-        if "아이보리" in target_str:
-            color_attr = "아이보리(볼트식)"
-        elif "메트그레이" in target_str or "매트그레이" in target_str:
-            color_attr = "메트그레이(볼트식)"
-        elif "블루" in target_str or "오렌지" in target_str:
-            if (base_name == "로드빔" or "빔" in target_str) and "600kg" in target_str:
-                color_attr = "블루(기둥.선반)+오렌지(빔)"
-            else:
-                color_attr = "블루(기둥)+오렌지(가로대)(볼트식)"
-
-        # 중량 추출 (기본 270kg)
-        # 중요: clean_name뿐만 아니라 specification, color, color_weight 전체에서 중량 검색
-        weight_attr = "270kg"
-        search_target = clean_name + str(specification or '') + str(color or '') + str(color_weight or '')
-        if "450kg" in search_target:
-            weight_attr = "450kg"
-        elif "600kg" in search_target:
-            weight_attr = "600kg"
-        elif "270kg" in search_target:
-            weight_attr = "270kg"
-
-        # 규격 처리
-        clean_spec = _re.sub(r'\s+', '', str(specification or '')).replace('*', 'x')
-        clean_spec = _re.sub(r'(270|450|600)kg', '', clean_spec)  # 중량 중복 제거
-
-        if base_name == "기둥":
-            # 하이랙 기둥 인벤토리 규격: '사이즈{폭}x높이{높이}{중량}'
-            # clean_spec에서 숫자만 추출하여 폭과 높이를 스냅
-            nums = _re.findall(r'(\d+)', clean_spec)
-            if len(nums) >= 3:
-                # DxWxH -> 첫번째가 폭(45,60,80), 세번째가 높이 (가운데 width는 무시)
-                width_part = _snap_dimension(nums[0], HI_D, tolerance=20)
-                height_part = _snap_dimension(nums[2], HI_H, tolerance=50)
-            elif len(nums) == 2:
-                # WxH (Addon) -> 첫번째가 폭(깊이), 두번째가 높이
-                width_part = _snap_dimension(nums[0], HI_D, tolerance=20)
-                height_part = _snap_dimension(nums[1], HI_H, tolerance=50)
-            else:
-                # 숫자가 하나만 있으면 높이로 간주하고 폭은 기본값 60
-                width_part = '60'
-                height_part = _snap_dimension(nums[0] if nums else '150', HI_H, tolerance=50)
-            
-            final_spec = "사이즈{}x높이{}{}".format(width_part, height_part, weight_attr)
-        elif base_name == "선반":
-            m = _re.search(r'(\d+)x(\d+)', clean_spec)
-            if m:
-                d_part = _snap_dimension(m.group(1), HI_D)
-                w_part = _snap_dimension(m.group(2), HI_W)
-                size_part = "{}x{}".format(d_part, w_part)
-            else:
-                sm = _re.search(r'(\d+)', clean_spec)
-                size_part = sm.group(1) if sm else '45x108'
-            final_spec = "사이즈{}{}".format(size_part, weight_attr)
-        elif base_name == "로드빔":
-            lm = _re.search(r'(\d+)', clean_spec)
-            length_part = _snap_dimension(lm.group(1) if lm else '108', HI_W)
-            final_spec = "{}{}".format(length_part, weight_attr)
-        else:
-            final_spec = clean_spec
-
-        return "하이랙-{}{}{}-{}".format(base_name, color_attr, weight_attr, final_spec)
-
-    # ── 경량랙: color가 있으면 이름에 포함 ──
-    clean_name_lower = clean_name.lower()
-    if rt == "경량랙" and color:
-        clean_color = _re.sub(r'\s+', '', str(color)).lower()
-        clean_name_lower = "{}{}".format(clean_name_lower, clean_color)
-
-    # ── 하이랙 외 일반 처리 ──
-    clean_name_lower = _re.sub(r'[()]', '', clean_name_lower)
-    clean_spec = _re.sub(r'\s+', '', str(specification or '')).replace('*', 'x').lower()
-    return "{}-{}-{}".format(rt, clean_name_lower, clean_spec)
-
-
-def _extract_weight_from_color(color_str):
-    # type: (str) -> str
-    """색상 문자열에서 중량만 추출. 예: 메트그레이(볼트식)270kg → 270kg"""
-    m = _re.search(r'(\d{2,4}kg)', str(color_str or ''), _re.IGNORECASE)
-    return m.group(1) if m else ""
-
-
-def generate_bom_for_rack(rack_type, option_data, quantity):
-    # type: (str, dict, int) -> List[dict]
-    """
-    rack_type과 옵션을 기반으로 실제 자재 명세(BOM)를 생성합니다.
-    React의 bomRegeneration.js 로직을 100% 구현합니다.
-
-    각 material에 다음 필드를 포함합니다:
-      name, rackType, specification, quantity, unitPrice, totalPrice, note,
-      colorWeight, color, partId, _inventoryPartId, _inventoryList
-    """
-    qty = int(quantity)
-    res = []
-
-    sz = option_data.get("size_raw", "")
-    # "추가상품구매" 등의 플레이스홀더 처리
-    if sz and "추가" in sz:
-        sz = ""
-    
-    w, d = _parse_wd(sz)
-    ht_raw = str(option_data.get("height", ""))
-    if "추가" in ht_raw:
-        ht_raw = ""
-        
-    dan = _parse_level(option_data.get("dan", "1"))
-    form = option_data.get("rack_type_hint", "독립형")
-    color = option_data.get("color", "")
-
-    # ═══ 하이랙 ═══════════════════════════════════════════════════════════════
-    # 하이랙 SS 옵션: 선반(폭cm+가로cm)x기둥(높이cm): 60(폭)x108(가로)x200(높이)
-    # → w=폭(깊이), d=가로(로드빔 길이cm), h=높이
-    # 시스템 키: 기둥 → 사이즈{w}x{d}높이{h}{weight}, 선반 → 사이즈{w}x{d}{weight}, 로드빔 → {d}{weight}
-    if rack_type == "하이랙":
-        cw = map_highrack_color(color)  # 예: 메트그레이(볼트식)270kg
-        weight_only = _extract_weight_from_color(cw)
-        pillar_qty = (2 if form == "연결형" else 4) * qty
-        rod_beam_d = str(d) if d else ""  # d = 가로cm (로드빔 길이)
-        shelf_per_level = 2 if d in (150, 200) else 1
-
-        # 기둥: 사이즈{w}x{d}높이{h}{weight}
-        if w and d:
-            g_spec = "사이즈 {}x{}높이{} {}".format(w, d, ht_raw, weight_only).strip()
-        else:
-            g_spec = "높이 {} {}".format(ht_raw, weight_only).strip()
-        res.append({"name": "기둥", "rackType": rack_type, "specification": g_spec,
-                    "quantity": pillar_qty, "colorWeight": cw, "color": "", "ssSource": "main"})
-        # 로드빔: {d}{weight}
-        r_spec = "{} {}".format(rod_beam_d, weight_only).strip() if rod_beam_d else weight_only
-        res.append({"name": "로드빔", "rackType": rack_type, "specification": r_spec,
-                    "quantity": 2 * dan * qty, "colorWeight": cw, "color": "", "ssSource": "main"})
-        # 선반: 사이즈{w}x{d}{weight}
-        if w and d:
-            s_spec = "사이즈 {}x{} {}".format(w, d, weight_only).strip()
-        else:
-            s_spec = "사이즈 {} {}".format(sz, weight_only).strip() if sz else weight_only
-        res.append({"name": "선반", "rackType": rack_type, "specification": s_spec,
-                    "quantity": shelf_per_level * dan * qty, "colorWeight": cw, "color": "", "ssSource": "main"})
-
-    # ═══ 파렛트랙 / 파렛트랙 철판형 ══════════════════════════════════════════
-    # 파렛트랙 SS 옵션: 폭x길이(단당2000Kg): 1000x1480(연결형)2000kg
-    # → w=폭(깊이=1000mm), d=길이(로드빔 길이mm)
-    # 시스템: 로드빔 spec = d(1390/2590/2790), 타이빔 = 1000(깊이 고정), 브레싱 = 1000
-    elif rack_type in ("파렛트랙", "파렛트랙 철판형"):
-        is_iron = (rack_type == "파렛트랙 철판형")
-        post_qty = (2 if form == "연결형" else 4) * qty
-
-        # 파렛트랙 기둥 높이: 이미 mm 단위 (3000, 2000 등)
-        ht_mm = ht_raw
-        try:
-            ht_num = int(ht_raw)
-            if ht_num <= 600:  # 600 이하이면 cm로 간주 → mm 변환
-                ht_mm = str(ht_num * 10)
-        except (ValueError, TypeError):
-            pass
-
-        # 파렛트랙 로드빔 길이 = d (SS의 길이/가로 값)
-        # SS 1480 → 시스템 1390 매핑 (가장 가까운 유효 규격)
-        VALID_RODBEAM = [1390, 2090, 2590, 2790]
-        rod_len = d if d else 0
-        if rod_len > 0:
-            rod_len = min(VALID_RODBEAM, key=lambda x: abs(x - rod_len))
-        rod_spec = str(rod_len) if rod_len else ""
-
-        # 파렛트랙 깊이 = w (SS의 폭 값, 보통 1000)
-        depth_val = w if w else 1000
-
-        # 기둥
-        res.append({"name": "기둥", "rackType": rack_type, "specification": ht_mm,
-                    "quantity": post_qty, "colorWeight": "", "color": "", "ssSource": "main"})
-        # 로드빔
-        res.append({"name": "로드빔", "rackType": rack_type, "specification": rod_spec,
-                    "quantity": 2 * dan * qty, "colorWeight": "", "color": "", "ssSource": "main"})
-
-        if is_iron:
-            # 철판 선반: 사이즈 {로드빔}x{깊이}
-            shelf_per_level = 2 if rod_len in (1380, 1390) else (3 if rod_len in (2080, 2090) else (4 if rod_len in (2580, 2590, 2710, 2790) else 1))
-            iron_sz = "사이즈 {}x{}".format(rod_len, depth_val)
-            res.append({"name": "선반", "rackType": rack_type, "specification": iron_sz,
-                        "quantity": shelf_per_level * dan * qty, "colorWeight": "", "color": "", "ssSource": "main"})
-        else:
-            # 타이빔: 깊이 (항상 1000)
-            tie_spec = str(depth_val)
-            res.append({"name": "타이빔", "rackType": rack_type, "specification": tie_spec,
-                        "quantity": 2 * dan * qty, "colorWeight": "", "color": "", "ssSource": "main"})
-
-        # 안전핀
-        res.append({"name": "안전핀", "rackType": rack_type, "specification": "",
-                    "quantity": 2 * dan * 2 * qty, "colorWeight": "", "color": "", "ssSource": "main"})
-        # 하드웨어: 브레싱 spec은 깊이 (1000)
-        brace_spec = str(depth_val)
-        res.append({"name": "수평브레싱", "rackType": rack_type, "specification": brace_spec,
-                    "quantity": (2 if form == "연결형" else 4) * qty, "colorWeight": "", "color": "", "ssSource": "main"})
-        res.append({"name": "경사브레싱", "rackType": rack_type, "specification": brace_spec,
-                    "quantity": (2 if form == "연결형" else 4) * qty, "colorWeight": "", "color": "", "ssSource": "main"})
-        res.append({"name": "앙카볼트", "rackType": rack_type, "specification": "",
-                    "quantity": (2 if form == "연결형" else 4) * qty, "colorWeight": "", "color": "", "ssSource": "main"})
-        res.append({"name": "브레싱볼트", "rackType": rack_type, "specification": "",
-                    "quantity": post_qty * 3, "colorWeight": "", "color": "", "ssSource": "main"})
-
-    # ═══ 스텐랙 ══════════════════════════════════════════════════════════════
-    # 스텐랙 SS: "스텐선반추가(단위cm) 폭x길이: 50x180" → height는 별도 또는 기본 210
-    elif rack_type == "스텐랙":
-        # 높이가 없으면 기본값 210 (SOURCE_OF_TRUTH: EXTRA_OPTIONS 고정)
-        ht_val = ht_raw if ht_raw and ht_raw != "None" else "210"
-        ht_spec = "높이{}".format(ht_val)
-        # 선반 사이즈: WxD 형식
-        sz_spec = "사이즈{}".format(sz) if sz else ""
-        res.append({"name": "기둥", "rackType": rack_type, "specification": ht_spec,
-                    "quantity": 4 * qty, "colorWeight": "", "color": "", "ssSource": "main"})
-        res.append({"name": "선반", "rackType": rack_type, "specification": sz_spec,
-                    "quantity": dan * qty, "colorWeight": "", "color": "", "ssSource": "main"})
-
-    # ═══ 경량랙 / 중량랙 ═════════════════════════════════════════════════════
-    # 경량랙 SS: "색상: 블랙 / 규격: 30x75 / 높이: 75 / 단수: 2단"
-    #   → SS '규격: 30x75' = 폭(앞뒤=깊이)x가로(좌우=폭).
-    #   → 30cm = depth(D300), 75cm = width(W700에 가장 가까운 유효값)
-    # 중량랙 SS: "폭(앞뒤)x가로(좌우): 45x185"
-    #   → 45cm = depth(D450), 185cm = width(W1800에 가장 가까운)
-    # 공통: SS의 첫번째 숫자 = depth, 두번째 = width
-    elif rack_type in ("경량랙", "중량랙"):
-        post_qty = (2 if form == "연결형" else 4) * qty
-
-        # ⚠️ w, d 반전: SS의 parse결과 w=첫째(깊이), d=둘째(폭/가로)
-        ss_depth_cm = w   # SS 첫번째 숫자 = 깊이(앞뒤)
-        ss_width_cm = d   # SS 두번째 숫자 = 폭(좌우/가로)
-
-        # cm → mm 변환
-        if rack_type == "경량랙":
-            depth_mm = ss_depth_cm * 10 if ss_depth_cm and ss_depth_cm <= 200 else (ss_depth_cm or 0)
-            width_mm = ss_width_cm * 10 if ss_width_cm and ss_width_cm <= 200 else (ss_width_cm or 0)
-            # 유효 규격 매핑
-            VALID_W_LIGHT = [700, 900, 1000, 1200, 1500]
-            VALID_D_LIGHT = [300, 450, 600]
-            if width_mm > 0:
-                width_mm = min(VALID_W_LIGHT, key=lambda x: abs(x - width_mm))
-            if depth_mm > 0:
-                depth_mm = min(VALID_D_LIGHT, key=lambda x: abs(x - depth_mm))
-        else:  # 중량랙
-            depth_mm = ss_depth_cm * 10 if ss_depth_cm and ss_depth_cm <= 200 else (ss_depth_cm or 0)
-            width_mm = ss_width_cm * 10 if ss_width_cm and ss_width_cm <= 200 else (ss_width_cm or 0)
-            VALID_W_HEAVY = [900, 1200, 1500, 1800]
-            VALID_D_HEAVY = [450, 600, 900]
-            if width_mm > 0:
-                width_mm = min(VALID_W_HEAVY, key=lambda x: abs(x - width_mm))
-            if depth_mm > 0:
-                depth_mm = min(VALID_D_HEAVY, key=lambda x: abs(x - depth_mm))
-
-        # 경량랙 색상 추출 (아이보리/블랙/실버)
-        rack_color = ""
-        if rack_type == "경량랙" and color:
-            raw_c = str(color).replace(" ", "")
-            if "블랙" in raw_c or "검정" in raw_c:
-                rack_color = "블랙"
-            elif "실버" in raw_c or "은색" in raw_c:
-                rack_color = "실버"
-            elif "아이보리" in raw_c or "백색" in raw_c or "흰" in raw_c:
-                rack_color = "아이보리"
-
-        # 기둥 spec: h{height_mm}
-        ht_mm_val = ht_raw
-        try:
-            ht_num = int(ht_raw)
-            if ht_num <= 300:
-                ht_mm_val = str(ht_num * 10)
-        except (ValueError, TypeError):
-            pass
-        g_spec = "h{}".format(ht_mm_val) if ht_mm_val else ""
-        res.append({"name": "기둥", "rackType": rack_type, "specification": g_spec,
-                    "quantity": post_qty, "colorWeight": "", "color": rack_color, "ssSource": "main"})
-
-        # 선반 spec: w{width}xd{depth}
-        if width_mm and depth_mm:
-            sel_spec = "w{}xd{}".format(width_mm, depth_mm)
-        else:
-            sel_spec = sz
-        res.append({"name": "선반", "rackType": rack_type, "specification": sel_spec,
-                    "quantity": dan * qty, "colorWeight": "", "color": rack_color, "ssSource": "main"})
-
-        # 받침(상/하) spec: d{depth_mm}
-        depth_spec = "d{}".format(depth_mm) if depth_mm else ""
-        res.append({"name": "받침(상)", "rackType": rack_type, "specification": depth_spec,
-                    "quantity": post_qty, "colorWeight": "", "color": rack_color, "ssSource": "main"})
-        res.append({"name": "받침(하)", "rackType": rack_type, "specification": depth_spec,
-                    "quantity": post_qty, "colorWeight": "", "color": rack_color, "ssSource": "main"})
-
-        # 연결대 spec: w{width_mm}
-        width_spec = "w{}".format(width_mm) if width_mm else ""
-        res.append({"name": "연결대", "rackType": rack_type, "specification": width_spec,
-                    "quantity": dan * qty, "colorWeight": "", "color": rack_color, "ssSource": "main"})
-
-        # 안전좌 / 안전핀
-        res.append({"name": "안전좌", "rackType": rack_type, "specification": "",
-                    "quantity": dan * qty, "colorWeight": "", "color": "", "ssSource": "main"})
-        res.append({"name": "안전핀", "rackType": rack_type, "specification": "",
-                    "quantity": dan * qty, "colorWeight": "", "color": "", "ssSource": "main"})
-
-    # ─── 모든 자재에 대해 공통 ID 및 단가 로드 (ID 생성 필수) ───
-    for r in res:
-        rt = r["rackType"]
-        nm = r["name"]
-        sp = r.get("specification", "")
-        cl = r.get("color", "")
-        cw = r.get("colorWeight", "")
-
-        version = "신형" if rt == "파렛트랙" else ""
-
-        r["partId"] = _generate_part_id(rt, nm, sp)
-        # _inventoryPartId 생성 (매우 중요: 테스트 코드 및 재고 연동 필수)
-        r["_inventoryPartId"] = _generate_inventory_part_id(
-            rt, nm, sp, color=cl, color_weight=cw, version=version
-        )
-        r["inventoryPartId"] = r["_inventoryPartId"]
-        
-        # _inventoryList (React 호환)
-        r["_inventoryList"] = [{
-            "inventoryPartId": r["_inventoryPartId"],
-            "quantity": r["quantity"],
-            "colorWeight": cw,
-            "color": cl,
-            "specification": sp,
-            "rackType": rt,
-            "name": nm,
-            "version": version
-        }]
-
-        # admin_prices에서 가격 조회
-        if not r.get("unitPrice"):
-            price = _lookup_admin_price(r["partId"])
-            if not price:
-                price = _lookup_admin_price(r["_inventoryPartId"])
-            r["unitPrice"] = price
-            r["totalPrice"] = price * r["quantity"]
-
-    return res
-
-
-def _safe_int(val):
-    # type: (object) -> int
-    try:
-        return int(str(val or "0").replace(",", ""))
-    except ValueError:
-        return 0
-
-
-def _load_material_order_rules():
-    # type: () -> List[dict]
-    try:
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        cfg_path = os.path.abspath(os.path.join(base_dir, "..", "src", "config", "materialOrder.json"))
-        with open(cfg_path, "r", encoding="utf-8") as f:
-            payload = json.load(f)
-        order_rows = payload.get("order", []) or []
-        return [{
-            "key": str(r.get("key", "") or ""),
-            "aliases": [str(a) for a in (r.get("aliases", []) or [])],
-            "idx": idx,
-        } for idx, r in enumerate(order_rows)]
-    except Exception:
-        return []
-
-
-MATERIAL_ORDER_RULES = _load_material_order_rules()
-
-
-def _build_addon_item_name(order):
-    # type: (dict) -> str
-    """추가옵션 주문행을 품목목록에 표시할 이름 생성."""
-    pname = str(order.get("상품명", "") or "").strip()
-    optv = str(order.get("옵션", "") or "").strip()
-    if not optv:
-        return pname
-    if optv in pname:
-        return pname
-    return "{}: {}".format(pname, optv)
-
-
-def _material_group_priority(name):
-    # type: (str) -> int
-    n = str(name or "")
-    for rule in MATERIAL_ORDER_RULES:
-        key = rule.get("key", "")
-        if key == "*":
-            continue
-        if key and key in n:
-            return int(rule.get("idx", 9999))
-        aliases = rule.get("aliases", []) or []
-        for alias in aliases:
-            if alias and alias in n:
-                return int(rule.get("idx", 9999))
-
-    for rule in MATERIAL_ORDER_RULES:
-        if rule.get("key") == "*":
-            return int(rule.get("idx", 9999))
-    return 9999
-
-
-def _material_source_priority(mat):
-    # type: (dict) -> int
-    marker = str(mat.get("ssSource", "") or "").strip().lower()
-    if marker in ("addon", "additional", "extra"):
-        return 1
-    return 0
-
-
-def _material_sort_key(mat):
-    # type: (dict) -> tuple
-    name = str(mat.get("name", "") or "")
-    return (
-        str(mat.get("rackType", "") or ""),  # 1. 랙 타입 (하이랙...)
-        _material_source_priority(mat),      # 2. 메인(0) vs 애드온(1) - 메인 먼저
-        _material_group_priority(name),      # 3. 부품 순서 (메인/애드온 내부에서만)
-        name,                                 # 4. 이름 (동일 우선순위 시)
-    )
-
-
-def _dedupe_group_rows(group):
-    # type: (List[dict]) -> List[dict]
-    """같은 스마트스토어 주문행이 중복 수집된 경우 1행만 남긴다."""
-    seen = set()
-    deduped = []
-    for row in group:
-        key = (
-            str(row.get("상품주문번호", "") or ""),
-            str(row.get("상품명", "") or ""),
-            str(row.get("옵션", "") or ""),
-            str(row.get("주문수량", "") or ""),
-            str(row.get("최종금액", "") or ""),
-            str(row.get("수취인명", "") or ""),
-            str(row.get("연락처", "") or ""),
-            str(row.get("배송지", "") or ""),
-        )
-        if key in seen:
-            continue
-        seen.add(key)
-        deduped.append(row)
-    return deduped
-
-
-def build_grouped_document(group):
-    # type: (List[dict]) -> dict
-    """
-    같은 세션으로 묶인 주문 그룹 → documents DB 한 행.
-
-    - 메인 랙 주문 → items[]
-    - 추가부품 주문 → materials[]
-    - 금액은 그룹 전체 합산
-    - doc_id는 그룹 내 가장 작은 상품주문번호 기준
-    - camelCase + snake_case 필드 동시 포함 (React 웹앱 + DB 양쪽 호환)
-    """
-    group = _dedupe_group_rows(group)
-    group_sorted = sorted(group, key=lambda r: str(r.get("상품주문번호", "")))
-
-    mains  = [r for r in group_sorted if classify_row(r) == "main"]
-    addons = [r for r in group_sorted if classify_row(r) == "addon"]
-
-    # 세션의 대표 랙 타입 결정
-    session_rack_type = ""
-    if mains:
-        session_rack_type = get_rack_type(mains[0].get("상품명", ""), mains[0].get("옵션", ""))
-    elif addons:
-        # 메인 상품 없이 추가상품만 있는 경우, 첫 번째 항목에서 랙 타입을 유추
-        for r in addons:
-            session_rack_type = get_rack_type(r.get("상품명", ""), r.get("옵션", ""))
-            if session_rack_type: break
-
-    # items[] 및 materials[](BOM) 생성
-    items = []
-    materials = []
-    
-    # 메인 랙 처리 (있는 경우에만)
-    for r in mains:
-        pname = str(r.get("상품명", "") or "")
-        optv  = str(r.get("옵션", "") or "")
-        qty   = _safe_int(r.get("주문수량", 1)) or 1
-        total = _safe_int(r.get("최종금액", 0))
-        
-        # 1. 항목명 생성
-        display_name = build_item_name(r)
-        parsed = parse_smartstore_option(optv)
-        rtype = get_rack_type(pname, optv)
-        
-        items.append({
-            "name":       display_name,
-            "unit":       "개",
-            "quantity":   qty,
-            "unitPrice":  total // qty if qty else total,
-            "totalPrice": total,
-            "note":       optv,
-        })
-        
-        # 2. 메인 랙의 BOM 생성하여 materials에 합산
-        if rtype and rtype != "기타":
-            rack_bom = generate_bom_for_rack(rtype, parsed, qty)
-            for m in rack_bom:
-                m["ssSource"] = "main"
-            materials.extend(rack_bom)
-
-    # 3. 추가부품(addons) 주문을 items/materials에 반영
-    for r in addons:
-        qty = _safe_int(r.get("주문수량", 1)) or 1
-        total = _safe_int(r.get("최종금액", 0))
-        items.append({
-            "name": _build_addon_item_name(r),
-            "unit": "개",
-            "quantity": qty,
-            "unitPrice": total // qty if qty else total,
-            "totalPrice": total,
-            "note": str(r.get("옵션", "") or ""),
-        })
-        materials.append(build_material_item(r, session_rack_type))
-
-    # 4. materials 중복 제거 및 수량 합산 (자재명 + 규격 + 색상 기준)
-    merged_mats = {}
-    for m in materials:
-        key = (m["name"], m.get("rackType", ""), m.get("specification", ""), m.get("colorWeight", ""), m.get("color", ""), m.get("ssSource", "main"))
-        if key in merged_mats:
-            merged_mats[key]["quantity"] += m["quantity"]
-            # totalPrice는 나중에 재조회된 단가로 갱신할 수 있으나 일단 합산
-            merged_mats[key]["totalPrice"] = merged_mats[key].get("totalPrice", 0) + m.get("totalPrice", 0)
-        else:
-            merged_mats[key] = m
-            
-    materials = sorted(merged_mats.values(), key=_material_sort_key)
-
-    # 5. 모든 자재에 대해 공통 ID 및 단가 로드
-    for r in materials:
-        rt = r["rackType"]
-        nm = r["name"]
-        sp = r.get("specification", "")
-        cl = r.get("color", "")
-        cw = r.get("colorWeight", "")
-
-        # 파렛트랙은 SS 기본 신형
-        version = "신형" if rt == "파렛트랙" else ""
-
-        r["partId"] = _generate_part_id(rt, nm, sp)
-        r["_inventoryPartId"] = _generate_inventory_part_id(
-            rt, nm, sp, color=cl, color_weight=cw, version=version
-        )
-        r["inventoryPartId"] = r["_inventoryPartId"]
-        
-        # _inventoryList (React 호환)
-        r["_inventoryList"] = [{
-            "inventoryPartId": r["_inventoryPartId"],
-            "quantity": r["quantity"],
-            "colorWeight": cw,
-            "color": cl,
-            "specification": sp,
-            "rackType": rt,
-            "name": nm,
-            "version": version
-        }]
-
-        # admin_prices에서 가격 조회 (이미 있으면(addon) 유지하되 없으면 조회)
-        if not r.get("unitPrice"):
-            price = _lookup_admin_price(r["partId"])
-            if not price:
-                price = _lookup_admin_price(r["_inventoryPartId"])
-            r["unitPrice"] = price
-            r["totalPrice"] = price * r["quantity"]
-
-    # 금액 합산
-    subtotal     = sum(_safe_int(r.get("최종금액", 0)) for r in group_sorted)
-    tax          = round(subtotal * 0.1)
-    total_amount = subtotal + tax
-
-    # 대표 행 (가장 앞 주문)
-    first     = group_sorted[0]
-    order_id  = str(first.get("상품주문번호", ""))
-    now_iso   = datetime.now(KST).strftime("%Y-%m-%dT%H:%M:%S.000+09:00")
-    dt_str    = str(first.get("결제완료시각", "") or "")
-    date_part = dt_str.split("T")[0] if "T" in dt_str else datetime.now(KST).strftime("%Y-%m-%d")
-
-    doc_id      = "purchase_ss_{}".format(order_id)
-    # 거래번호: 연락처 뒤 8자리 기준 (예: 010-8457-8978 → SS-84578978)
-    phone_raw   = str(first.get("연락처", "") or "")
-    phone_digits = _re.sub(r'\D', '', phone_raw)  # 숫자만 추출
-    phone_suffix = phone_digits[-8:] if len(phone_digits) >= 8 else phone_digits
-    doc_num     = "SS-{}".format(phone_suffix) if phone_suffix else "SS-{}".format(order_id[-10:])
-    
-    # 상호명: 구매자명 우선, 비어있으면 수취인명
-    buyer_name = str(first.get("구매자명", "") or "").strip()
-    recipient_name = str(first.get("수취인명", "") or "").strip()
-    company = buyer_name if buyer_name else recipient_name
-
-    # 메모: 배송지, 연락처 정보를 메모칸으로 이동
-    memo_str = "배송지: {} | 연락처: {}".format(
-        str(first.get("배송지", "") or ""),
-        str(first.get("연락처", "") or ""),
-    )
-
-    return {
-        # ── DB 컬럼 (snake_case) ─────────────────────────────
-        "doc_id":          doc_id,
-        "date":            date_part,
-        "document_number": doc_num,
-        "company_name":    company,
-        "biz_number":      "",
-        "items":           items,
-        "materials":       materials,
-        "subtotal":        subtotal,
-        "tax":             tax,
-        "total_amount":    total_amount,
-        "notes":           "", # 비고칸은 비움 (메모로 이동됨)
-        "top_memo":        memo_str,
-        "created_at":      now_iso,
-        "updated_at":      now_iso,
-        "type":            "purchase",
-        # ── React 웹앱 호환 추가 필드 (camelCase) ─────────────
-        # realtimeAdminSync.js 및 PurchaseOrderForm.jsx에서 id/type 필수
-        "id":              doc_id,
-        "documentNumber":  doc_num,
-        "companyName":     company,
-        "bizNumber":       "",
-        "totalAmount":     total_amount,
-        "topMemo":         memo_str,
-        "purchaseNumber":  doc_num,
-        "customerName":    company,
-        "status":          "진행 중",
-        "isSmartstore":    True,
-        "createdAt":       now_iso,
-        "updatedAt":       now_iso,
-        # ── 디버깅 메타 (저장 시 제외) ───────────────────────
-        "_group_size":     len(group_sorted),
-        "_buyer":          str(first.get("구매자명", "") or ""),
-        "_mains_count":    len(mains),
-        "_addons_count":   len(addons),
-        "_rack_type":      session_rack_type,
-    }
-
 
 def print_dry_run(payload):
     # type: (dict) -> None
     """
-    드라이런 모드: 생성될 document 전체 구조를 콘솔에 출력합니다.
-    실제 DB 저장은 하지 않습니다 (DRY_RUN=True 상태).
+    생성될 document 전체 구조를 DEBUG 로그로 남깁니다 (기존 드라이런 콘솔 덤프).
+    LISTENER_LOG_LEVEL=DEBUG 일 때만 문자열을 만듭니다.
     """
-    print()
-    print("[DRY-RUN] " + "=" * 58)
-    print("  doc_id          : {}".format(payload["doc_id"]))
-    print("  document_number : {}".format(payload["document_number"]))
-    print("  date            : {}".format(payload["date"]))
-    print("  company_name    : {}".format(payload["company_name"]))
-    print("  type            : {}".format(payload["type"]))
-    print("  그룹 주문수     : {}건 (메인랙 {}행 / 추가부품 {}행)".format(
-        payload["_group_size"], payload["_mains_count"], payload["_addons_count"]
-    ))
-    print()
-    print("  [items] {}행:".format(len(payload["items"])))
-    for i, item in enumerate(payload["items"], 1):
-        print("    {} {}개  단가:{:,}  합계:{:,}".format(
+    if not log.isEnabledFor(logging.DEBUG):
+        return
+    lines = [
+        "[DRY-RUN] " + "=" * 58,
+        "  doc_id          : {}".format(payload["doc_id"]),
+        "  document_number : {}".format(payload["document_number"]),
+        "  date            : {}".format(payload["date"]),
+        "  company_name    : {}".format(payload["company_name"]),
+        "  type            : {}".format(payload["type"]),
+        "  그룹 주문수     : {}건 (메인랙 {}행 / 추가부품 {}행)".format(
+            payload["_group_size"], payload["_mains_count"], payload["_addons_count"]
+        ),
+        "",
+        "  [items] {}행:".format(len(payload["items"])),
+    ]
+    for item in payload["items"]:
+        lines.append("    {} {}개  단가:{:,}  합계:{:,}".format(
             item["name"], item["quantity"], item["unitPrice"], item["totalPrice"]
         ))
-    print()
-    print("  [materials] {}행:".format(len(payload["materials"])))
-    for i, mat in enumerate(payload["materials"], 1):
-        print("    {} | {} | {} | {}개 | {:,}원".format(
+    lines.append("")
+    lines.append("  [materials] {}행:".format(len(payload["materials"])))
+    for mat in payload["materials"]:
+        lines.append("    {} | {} | {} | {}개 | {:,}원".format(
             mat["name"], mat["rackType"], mat["specification"],
             mat["quantity"], mat["totalPrice"]
         ))
-    print()
-    print("  subtotal   : {:,}원".format(payload["subtotal"]))
-    print("  tax        : {:,}원".format(payload["tax"]))
-    print("  total      : {:,}원".format(payload["total_amount"]))
-    print("  notes      : {}".format(payload["notes"][:80]))
-    print("[DRY-RUN] " + "=" * 58)
-    print("  ※ DRY_RUN=True: 실제 DB 저장 안 함. 확인 후 False로 전환")
-    print()
-
-
-# ── 하위 호환: 기존 단건 처리 함수 (2단계에서 제거 예정) ─────────────────────
-def build_purchase_order_item(order):
-    # type: (dict) -> dict
-    """[레거시] 단건 주문 → items[] 한 행. 2단계에서 build_grouped_document로 대체됨."""
-    qty   = int(order.get("주문수량", 1) or 1)
-    total = int(order.get("최종금액", 0) or 0)
-    return {
-        "name":       build_item_name(order),
-        "unit":       "개",
-        "quantity":   qty,
-        "unitPrice":  total // qty if qty else total,
-        "totalPrice": total,
-        "note":       str(order.get("옵션", "") or ""),
-    }
-
-
-def build_purchase_order_payload(order):
-    # type: (dict) -> dict
-    """[레거시] 단건 주문 → document 페이로드. 2단계에서 build_grouped_document로 대체됨."""
-    item    = build_purchase_order_item(order)
-    rack_type = get_rack_type(order.get("상품명", ""))
-
-    subtotal     = int(order.get("최종금액", 0) or 0)
-    tax          = round(subtotal * 0.1)
-    total_amount = subtotal + tax
-
-    payment_date = str(order.get("결제완료시각", "") or "")
-    date_part    = payment_date.split("T")[0] if "T" in payment_date else datetime.now(KST).strftime("%Y-%m-%d")
-
-    order_id   = str(order.get("상품주문번호", ""))
-    doc_number = "SS-{}".format(order_id[-10:]) if len(order_id) >= 10 else "SS-{}".format(order_id)
-    doc_id     = "purchase_ss_{}".format(order_id)
-    now_iso    = datetime.now(KST).strftime("%Y-%m-%dT%H:%M:%S.000+09:00")
+    lines.extend([
+        "",
+        "  subtotal   : {:,}원".format(payload["subtotal"]),
+        "  tax        : {:,}원".format(payload["tax"]),
+        "  total      : {:,}원".format(payload["total_amount"]),
+        "  notes      : {}".format(payload["notes"][:80]),
+        "[DRY-RUN] " + "=" * 58,
+    ])
+    if DRY_RUN:
+        lines.append("  ※ DRY_RUN=True: 실제 DB 저장 안 함. 확인 후 False로 전환")
+    log.debug("\n".join(lines), extra={"tag": "DRY-RUN", "doc_id": payload.get("doc_id")})
 
-    return {
-        "doc_id":          doc_id,
-        "date":            date_part,
-        "document_number": doc_number,
-        "company_name":    str(order.get("구매자명", "") or ""),
-        "biz_number":      "",
-        "items":           [item],
-        "materials":       [],
-        "subtotal":        subtotal,
-        "tax":             tax,
-        "total_amount":    total_amount,
-        "notes":           "배송지: {} | 연락처: {} | 수취인: {}".format(
-                               str(order.get("배송지", "") or ""),
-                               str(order.get("연락처", "") or ""),
-                               str(order.get("수취인명", "") or ""),
-                           ),
-        "top_memo":        "",
-        "created_at":      now_iso,
-        "updated_at":      now_iso,
-        "type":            "purchase",
-        "_rack_type":      rack_type,
-        "_parsed_option":  parse_smartstore_option(str(order.get("옵션", "") or "")),
-        "_smartstore":     order,
-    }
 
 # ═════════════════════════════════════════════════════════════════════════════
 # 6. 저장 (CSV + 가비아 DB)
 # ═════════════════════════════════════════════════════════════════════════════
 
-# CSV 컨럼 순서
-ORDER_CSV_FIELDS = [
-    "상품주문번호",
-    "결제완료시각",
-    "구매자명",
-    "상품명",
-    "옵션",
-    "주문수량",
-    "최종금액",
-    "수취인명",
-    "연락처",
-    "배송지",
-]
-
-
 def save_order_to_csv(order, log_dir):
     # type: (dict, str) -> str
-    """월별 누적 CSV (orders_YYYY-MM.csv) 에 주문 1행을 append 합니다."""
-    ym = datetime.now(KST).strftime("%Y-%m")
-    csv_path = os.path.join(log_dir, "orders_{}.csv".format(ym))
-
-    file_exists = os.path.isfile(csv_path)
-    with open(csv_path, "a", encoding="utf-8-sig", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=ORDER_CSV_FIELDS, extrasaction="ignore")
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(order)
-
+    """
+    월별 누적 CSV (orders_YYYY-MM.csv) 에 주문 1행을 즉시 기록합니다 (하위 호환용).
+    리스너 루프는 OrderCsvLog 로 폴링 사이클 단위로 모아서 기록합니다.
+    """
+    with OrderCsvLog(log_dir) as csv_log:
+        csv_path = csv_log.append(order)
     return csv_path
 
 
+@timed("payload_log")
 def save_payload_to_log(payload, log_dir):
     # type: (dict, str) -> None
-    """생성된 최종 JSON 페이로드를 분석용 로그 파일에 기록합니다 (ENABLE_PAYLOAD_LOGGING=True 시)."""
-    log_path = os.path.join(log_dir, "payload_history.jsonl")
-    
-    # 저장 시각 추가
-    log_entry = {
-        "logged_at": datetime.now(KST).strftime("%Y-%m-%d %H:%M:%S"),
-        "payload": payload
-    }
-    
-    with open(log_path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
+    """
+    생성된 최종 JSON 페이로드를 분석용 로그 파일에 기록합니다 (ENABLE_PAYLOAD_LOGGING=True 시).
+    자재 템플릿을 해시로 한 번만 저장하는 compact 형식 (payload_history.compact.jsonl).
+    조회: python3 payload_log.py cat --last 5
+    """
+    get_payload_log(log_dir).append(payload)
 
 
+@timed("document_save")
 def save_document_to_server(payload):
     # type: (dict) -> bool
     """
@@ -1838,84 +528,118 @@ def save_document_to_server(payload):
     반환: True(성공) / False(실패)
     """
     if DRY_RUN:
-        print("[DRY-RUN] save_document_to_server 실제 호출 안 함 (DRY_RUN=True)")
+        log.info("save_document_to_server 실제 호출 안 함 (DRY_RUN=True)", extra={"tag": "DRY-RUN"})
         return False
 
-    # _로 시작하는 디버깅 필드 제외 (설계 외 DB 저장 불필요)
+    # _ 디버깅 필드 / 서버가 읽지 않는 snake_case 별칭 제외, items / materials 는 배열 그대로
+    # (서버가 JSON.stringify) → 본문을 한 번만 UTF-8 로 인코딩 (payload_codec.py)
+    # 큰 본문(다중 랙 materials)은 api_transport 가 gzip 으로 보냄
     doc_id = payload.get("doc_id") or payload.get("id", "")
-    clean_payload = {k: v for k, v in payload.items() if not k.startswith("_")}
-    clean_payload["docId"] = doc_id
-
-    # items / materials 는 JSON 문자열로 직렬화 후 전송
-    if isinstance(clean_payload.get("items"), list):
-        clean_payload["items"] = json.dumps(clean_payload["items"], ensure_ascii=False)
-    if isinstance(clean_payload.get("materials"), list):
-        clean_payload["materials"] = json.dumps(clean_payload["materials"], ensure_ascii=False)
+    body = encode_document(payload)
 
     url = "{}/documents/save".format(SAMMIRACK_SERVER_URL)
-    headers = {"Content-Type": "application/json"}
+    headers = {"Content-Type": JSON_CONTENT_TYPE}
 
     proxies = PROXIES if USE_PROXY else None
+    fields = {"tag": "DB-ERROR", "doc_id": doc_id}
 
+    t0 = time.perf_counter()
     try:
-        resp = requests.post(
+        resp = api_transport.post(
             url,
-            json=clean_payload,
+            "document_save",
+            data=body,
             headers=headers,
             proxies=proxies,
             timeout=30,
         )
+        fields["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        fields["status"] = resp.status_code
         if resp.status_code in (200, 201):
-            print("[DB-SAVE] 저장 성공: {} (HTTP {})".format(doc_id, resp.status_code))
+            fields["tag"] = "DB-SAVE"
+            log.info("저장 성공", extra=fields)
             return True
         else:
-            print("[DB-ERROR] HTTP {} | {}".format(resp.status_code, resp.text[:200]))
+            log.error("저장 실패: %s", resp.text[:200], extra=fields)
             return False
     except requests.exceptions.ConnectionError:
-        print("[DB-ERROR] 서버 연결 실패: {}".format(url))
+        log.error("서버 연결 실패: %s", url, extra=fields)
         return False
     except requests.exceptions.Timeout:
-        print("[DB-ERROR] 서버 응답 시간 초과 (30서)")
+        log.error("서버 응답 시간 초과 (30초)", extra=fields)
         return False
     except Exception as e:
-        print("[DB-ERROR] 예상치 못한 오류: {}".format(e))
+        log.exception("예상치 못한 오류: %s", e, extra=fields)
         return False
 
 
+@timed("inventory_deduct")
 def deduct_inventory_for_smartstore(payload):
     # type: (dict) -> bool
     """
     스마트스토어 주문에 한정하여 재고를 곧바로 차감합니다.
-    매칭되지 않는 재고는 차감 요청을 하지 않습니다.
+    매칭되지 않는 재고는 차감 요청을 하지 않습니다
+    (서버 재고 색인에 없는 partId — inventory_index.py, INVENTORY_UNKNOWN_POLICY).
 
     API: POST {SAMMIRACK_SERVER_URL}/api/inventory/deduct
     Body: { deductions: {partId: amount}, documentId: str, userIp: str }
 
+    모든 요청은 전송 전에 로컬 차감 원장(deduction_ledger)에 pending 으로 기록됩니다.
+      - 이미 acked 인 문서      → 재전송 없이 성공 처리 (이중 차감 방지)
+      - pending 으로 남은 문서  → 서버 활동로그로 반영 여부 확인 후 결정
+      - failed 인 문서          → 서버가 ROLLBACK 했으므로 재전송
+
     반환: True(성공) / False(실패)
     """
     if DRY_RUN:
-        print("[DRY-RUN] deduct_inventory_for_smartstore 실제 호출 안 함 (DRY_RUN=True)")
+        log.info("deduct_inventory_for_smartstore 실제 호출 안 함 (DRY_RUN=True)", extra={"tag": "DRY-RUN"})
         return False
 
+    doc_id = payload.get("doc_id") or payload.get("id", "")
     materials = payload.get("materials", [])
     if not materials:
-        print("[INVENTORY] materials 없음 → 재고 차감 생략")
+        log.info("materials 없음 → 재고 차감 생략", extra={"tag": "INVENTORY", "doc_id": doc_id})
         return True  # 성공으로 간주 (차감할 게 없음)
 
-    deductions = {}
-    for mat in materials:
-        part_id = mat.get("partId") or mat.get("inventoryPartId")
-        quantity = mat.get("quantity", 0)
-        if part_id and quantity > 0:
-            deductions[part_id] = (deductions.get(part_id, 0) + quantity)
+    # 서버 재고 색인으로 partId 검증 (모르는 ID 는 remap / 제외 — inventory_index.py)
+    index = get_inventory_index(SAMMIRACK_SERVER_URL,
+                                refresh_interval=INVENTORY_INDEX_REFRESH_SECONDS,
+                                proxies=PROXIES if USE_PROXY else None)
+    deductions = validated_deductions(materials, index, INVENTORY_UNKNOWN_POLICY, doc_id)
 
     if not deductions:
-        print("[INVENTORY] 유효한 partId 없음 → 재고 차감 생략")
+        log.info("유효한 partId 없음 → 재고 차감 생략", extra={"tag": "INVENTORY", "doc_id": doc_id})
         return True
 
-    doc_id = payload.get("doc_id") or payload.get("id", "")
     user_ip = "smartstore-listener"  # 고정 IP
 
+    # ── 차감 원장 확인 (재시도 안전성) ──
+    ledger = get_ledger()
+    request_hash = compute_request_hash(doc_id, deductions)
+    entry = ledger.entry_for(doc_id)
+    ledger_fields = {"tag": "LEDGER", "doc_id": doc_id}
+    if entry and entry["status"] == STATUS_ACKED:
+        if entry["request_hash"] != request_hash:
+            log.warning("이미 다른 내용으로 차감됨 → 재차감 안 함 (reconcile 필요)", extra=ledger_fields)
+        else:
+            log.info("이미 차감 완료 → 재전송 생략", extra=ledger_fields)
+        return True
+    if entry and entry["status"] == STATUS_PENDING:
+        # 서버가 반영을 확인해 줄 때만 확정. 근거가 없어도 미반영은 아니므로 자동 재전송 안 함
+        try:
+            details = find_server_deduction(SAMMIRACK_SERVER_URL, doc_id)
+        except Exception as e:
+            log.warning("반영 여부 확인 실패 → 이중 차감 방지를 위해 보류: %s", e, extra=ledger_fields)
+            return False
+        if details is None:
+            log.warning("이전 요청 반영 여부 불명 → 재전송 안 함 (deduction_ledger.py reconcile 로 확인)",
+                        extra=ledger_fields)
+            return False
+        ledger.mark_acked(doc_id, server_ack_from(details))
+        log.info("이전 요청이 서버에 반영되어 있음 → 재전송 생략", extra=ledger_fields)
+        update_inventory_deducted_status(doc_id, True)
+        return True
+
     body = {
         "deductions": deductions,
         "documentId": doc_id,
@@ -1927,30 +651,49 @@ def deduct_inventory_for_smartstore(payload):
 
     proxies = PROXIES if USE_PROXY else None
 
+    fields = {"tag": "INVENTORY-ERROR", "doc_id": doc_id, "parts": len(deductions)}
+    ledger.record_pending(doc_id, deductions, request_hash)
+    t0 = time.perf_counter()
     try:
-        resp = requests.post(
+        resp = api_transport.post(
             url,
-            json=body,
+            "inventory_deduct",
+            json_body=body,
             headers=headers,
             proxies=proxies,
             timeout=30,
         )
+        fields["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        fields["status"] = resp.status_code
         if resp.status_code in (200, 201):
-            print("[INVENTORY-DEDUCT] 재고 차감 성공: {} (HTTP {})".format(doc_id, resp.status_code))
+            try:
+                ack = resp.json()
+            except ValueError:
+                ack = {"raw": resp.text[:500]}
+            ledger.mark_acked(doc_id, ack)
+            fields["tag"] = "INVENTORY-DEDUCT"
+            log.info("재고 차감 성공", extra=fields)
             # 재고 감소 성공 시 문서의 inventory_deducted 업데이트
             update_inventory_deducted_status(doc_id, True)
             return True
+        elif 400 <= resp.status_code < 500:
+            # 요청 검증 단계 거부 → 서버 ROLLBACK, 미반영 확정
+            ledger.mark_failed(doc_id, {"status": resp.status_code, "body": resp.text[:500]})
+            log.error("재고 차감 거부: %s", resp.text[:200], extra=fields)
+            return False
         else:
-            print("[INVENTORY-ERROR] HTTP {} | {}".format(resp.status_code, resp.text[:200]))
+            # 5xx / 프록시 502·504 는 서버 COMMIT 뒤에도 올 수 있음 → pending 유지, 재전송 안 함
+            log.error("재고 차감 응답 오류 → 원장 pending 유지 (반영 여부 불명): %s", resp.text[:200], extra=fields)
             return False
     except requests.exceptions.ConnectionError:
-        print("[INVENTORY-ERROR] 서버 연결 실패: {}".format(url))
+        # 전송 여부 불명 → pending 유지 (다음 호출 시 서버 반영 확인, 근거 없으면 재전송 안 함)
+        log.error("서버 연결 실패: %s → 원장 pending 유지", url, extra=fields)
         return False
     except requests.exceptions.Timeout:
-        print("[INVENTORY-ERROR] 서버 응답 시간 초과 (30초)")
+        log.error("서버 응답 시간 초과 (30초) → 원장 pending 유지", extra=fields)
         return False
     except Exception as e:
-        print("[INVENTORY-ERROR] 예상치 못한 오류: {}".format(e))
+        log.exception("예상치 못한 오류: %s", e, extra=fields)
         return False
 
 
@@ -1970,54 +713,136 @@ def update_inventory_deducted_status(doc_id, deducted):
     proxies = PROXIES if USE_PROXY else None
 
     try:
-        resp = requests.post(
+        resp = api_transport.post(
             url,
-            json=body,
+            "document_flag",
+            json_body=body,
             headers=headers,
             proxies=proxies,
             timeout=15,
         )
         if resp.status_code in (200, 201):
-            print("[DOCUMENT-UPDATE] inventory_deducted 업데이트 성공: {} (HTTP {})".format(doc_id, resp.status_code))
+            log.info("inventory_deducted 업데이트 성공",
+                     extra={"tag": "DOCUMENT-UPDATE", "doc_id": doc_id, "status": resp.status_code})
         else:
-            print("[DOCUMENT-UPDATE-ERROR] HTTP {} | {}".format(resp.status_code, resp.text[:200]))
+            log.error("inventory_deducted 업데이트 실패: %s", resp.text[:200],
+                      extra={"tag": "DOCUMENT-UPDATE-ERROR", "doc_id": doc_id, "status": resp.status_code})
     except Exception as e:
-        print("[DOCUMENT-UPDATE-ERROR] {}".format(e))
+        log.error("inventory_deducted 업데이트 실패: %s", e,
+                  extra={"tag": "DOCUMENT-UPDATE-ERROR", "doc_id": doc_id})
+
 
+# ═════════════════════════════════════════════════════════════════════════════
+# 6-1. 파이프라인 단계 (네트워크가 필요한 것만 여기, 나머지는 ss_pipeline.stages)
+# ═════════════════════════════════════════════════════════════════════════════
 
+class NaverOrderSource(OrderSource):
+    """
+    네이버 커머스 API 주문 원천.
+    리스너는 list_ids → (이미 본 번호 제외) → fetch_items 순서로 나눠 부르고,
+    runner.Pipeline 에서는 fetch() 가 최근 look_back_seconds 구간을 한 번에 가져옵니다.
+    """
 
+    def __init__(self, token_mgr=None, look_back_seconds=None):
+        # type: (Optional[TokenManager], Optional[float]) -> None
+        self.token_mgr = token_mgr or TokenManager()
+        self.look_back_seconds = look_back_seconds or POLL_INTERVAL_SECONDS * 2
 
+    def list_ids(self, from_dt, to_dt):
+        # type: (datetime, datetime) -> List[str]
+        return fetch_recent_product_order_ids(self.token_mgr, from_dt, to_dt)
+
+    def fetch_items(self, product_order_ids):
+        # type: (List[str]) -> List[Dict]
+        return fetch_order_items(self.token_mgr, product_order_ids)
+
+    def fetch(self):
+        now = datetime.now(KST)
+        return self.fetch_items(self.list_ids(now - timedelta(seconds=self.look_back_seconds), now))
+
+
+class ServerSink(DocumentSink):
+    """
+    가비아 서버 저장 + 스마트스토어 재고 차감.
+    DRY_RUN=True 면 아무것도 보내지 않는다 (DRY_RUN 판단은 이 모듈에서만).
+    """
+
+    def write(self, payload):
+        if DRY_RUN:
+            return False
+        if not save_document_to_server(payload):
+            ORDERS_FAILED.inc(stage="document_save")
+            return False
+        index_saved_document(payload)   # 부품 ID → 문서 역색인 (part_index.py reprice)
+        if payload.get("isSmartstore") and not deduct_inventory_for_smartstore(payload):
+            ORDERS_FAILED.inc(stage="inventory_deduct")
+            return False
+        return True
 
 
 # ═════════════════════════════════════════════════════════════════════════════
 # 6. 메인 실시간 리스너
 # ═════════════════════════════════════════════════════════════════════════════
 
+OPEN_SESSIONS_FILENAME = "open_sessions.json"   # 세션 창에 남은 주문행 (재시작 시 복원)
+
+
 class OrderListener(object):
     """
     스마트스토어 실시간 주문 리스너 (폴링 방식).
 
     동작:
-      1. POLL_INTERVAL_SECONDS 마다 최근 결제 완료 주문 목록 조회
+      0. 사이클 시작 시 서버 단가표 증분 동기화 (PRICE_SYNC_SECONDS 마다, price_sync.py)
+      1. 최근 결제 완료 주문 목록 조회 (주기는 poll_scheduler.py: 시각별 주문 도착률 / 새 주문 직후 짧게,
+         한가하면 길게, POLL_MIN~MAX_SECONDS + 호출 예산 안에서. LISTENER_POLL_ADAPTIVE=0 이면
+         POLL_INTERVAL_SECONDS 고정). 대기 중 POST /nudge (poll_trigger.py) 를 받으면 바로 조회
       2. 이전에 본 상품주문번호를 제외 → 새 주문만 필터링
       3. 비지원 낙 종류 필터링 (is_supported_rack)
-      4. 동일 구매자+분 기준 그룹핑 → 한 폴링에서 수신한 주문 → 그룹단위 처리
+      4. 주문번호 기준 그룹핑 → SESSION_GRACE_SECONDS 동안 모아 창이 닫힌 그룹단위 처리
+         (0 이면 한 폴링에서 수신한 주문만 동일 구매자+분 기준으로)
       5. DRY_RUN=True:〼콘솔 드라이런 출력 / False:실제 DB POST
+
+    각 단계는 생성자 인자로 바꿔 끼울 수 있습니다 (ss_pipeline.stages 인터페이스).
+    기본값: NaverOrderSource / NaverItemParser / WindowedSessionGrouper(SessionGrouper) /
+    DocumentBuilder(generate_bom_for_rack + admin_prices) / [ServerSink]
     """
 
-    def __init__(self, on_new_order=None):
+    def __init__(self, on_new_order=None, source=None, parser=None, grouper=None, builder=None, sinks=None):
         self.token_mgr    = TokenManager()
         self.on_new_order = on_new_order   # 레거시 콜백 (미사용)
+        self.source       = source or NaverOrderSource(self.token_mgr)     # type: NaverOrderSource
+        self.parser       = parser or NaverItemParser()                    # type: OrderParser
+        self.grouper      = grouper or (WindowedSessionGrouper(SESSION_GRACE_SECONDS)
+                                        if SESSION_GRACE_SECONDS > 0 else SessionGrouper())  # type: OrderGrouper
+        self.builder      = builder or DocumentBuilder()                   # type: DocumentBuilder
+        self.sinks        = list(sinks) if sinks is not None else [ServerSink()]  # type: List[DocumentSink]
         self._seen_ids    = set()          # type: set
         self._running     = False
+        self._last_poll_started = None     # type: Optional[float]
+        self._poll_gap    = 0.0            # 직전 사이클 시작부터 이번 시작까지 (초)
+        self._sleep_interval = float(POLL_INTERVAL_SECONDS)
+        self._new_in_cycle = 0
+        self._open_saved_ids = ()          # open_sessions.json 에 마지막으로 쓴 상품주문번호
+        self.scheduler    = scheduler_from_config()   # 다음 폴링까지 대기 시간
+        self.trigger      = PollTrigger(NUDGE_DEBOUNCE_SECONDS, NUDGE_MIN_GAP_SECONDS, NUDGE_MAX_PER_MINUTE,
+                                        budget_check=self.scheduler.has_budget)   # 외부 넛지로 대기 중단
+        self.metrics_server = None
         self.log_dir      = os.path.join(
             os.path.dirname(os.path.abspath(__file__)), "order_logs"
         )
         os.makedirs(self.log_dir, exist_ok=True)
+        self.csv_log      = OrderCsvLog(self.log_dir)
+        self.profiler     = PollProfiler(self.log_dir)
+        # 서버 단가표 증분 동기화 (price_sync.py, PRICE_SYNC_SECONDS=0 이면 admin_prices.json 만 사용)
+        self.price_sync   = PriceSync(
+            SAMMIRACK_SERVER_URL, os.path.join(self.log_dir, PRICE_SNAPSHOT_FILENAME),
+            interval=PRICE_SYNC_SECONDS, full_interval=PRICE_FULL_SYNC_SECONDS,
+            proxies=PROXIES if USE_PROXY else None,
+        ) if PRICE_SYNC_SECONDS > 0 else None  # type: Optional[PriceSync]
         
         # 분석용 페이로드 로그 파일 미리 생성 (tail 에러 방지)
         if globals().get("ENABLE_PAYLOAD_LOGGING", False):
-            payload_log = os.path.join(self.log_dir, "payload_history.jsonl")
+            payload_log = os.path.join(self.log_dir, PAYLOAD_LOG_FILENAME)
             if not os.path.exists(payload_log):
                 with open(payload_log, "a") as f:
                     pass
@@ -2027,107 +852,242 @@ class OrderListener(object):
         self._running = True
         self._setup_signal_handler()
 
-        print()
-        print("=" * 62)
-        print("  삼미랙 스마트스토어 실시간 주문 리스너 시작")
-        print("  폴링 주기: {}초".format(POLL_INTERVAL_SECONDS))
-        print("  모드: {}".format("[DRY-RUN] 콘솔 출력만 (DB 저장 안 함)" if DRY_RUN else "[LIVE] 실제 DB 저장 활성"))
-        if USE_PROXY:
-            print("  프록시: 사용 중 ({})".format(PROXIES.get("https", "")))
-        else:
-            print("  프록시: 미사용 (서버 직접 요청)")
-        print("  sammirack API: {}".format(SAMMIRACK_SERVER_URL))
-        print("  종료: Ctrl+C")
-        print("=" * 62)
-        print()
-
-        print("[INIT] 기존 주문 목록 초기화 중...")
-        self._poll(init_run=True)
-        print("[INIT] 완료. 이 시각 이후의 새 주문부터 감지합니다.")
-        print()
-
-        while self._running:
-            time.sleep(POLL_INTERVAL_SECONDS)
-            if self._running:
-                self._poll(init_run=False)
+        setup_logging()
+
+        metrics_url = None
+        if LISTENER_METRICS_PORT:
+            try:
+                self.metrics_server = start_metrics_server(
+                    LISTENER_METRICS_PORT, routes={("POST", NUDGE_PATH): self.trigger.http_route})
+                metrics_url = "http://127.0.0.1:{}/metrics".format(LISTENER_METRICS_PORT)
+            except OSError as e:
+                log.warning("지표 서버 시작 실패: %s", e, extra={"tag": "INIT"})
+        log.info("삼미랙 스마트스토어 실시간 주문 리스너 시작", extra={
+            "tag":           "INIT",
+            "poll_interval": POLL_INTERVAL_SECONDS,
+            "poll_adaptive": "{:g}-{:g}s, {}".format(
+                self.scheduler.min_interval, self.scheduler.max_interval,
+                "{:g}/h".format(self.scheduler.budget_per_hour) if self.scheduler.budget_limited else "unlimited")
+                if self.scheduler.adaptive else None,
+            "mode":          "DRY-RUN" if DRY_RUN else "LIVE",
+            "proxy":         PROXIES.get("https", "") if USE_PROXY else None,
+            "sammirack_api": SAMMIRACK_SERVER_URL,
+            "metrics":       metrics_url,
+        })
+
+        try:
+            self.profiler.arm_from_env()
+        except ValueError as e:
+            log.warning("%s", e, extra={"tag": "PROFILE"})
+
+        if self.price_sync is not None:
+            self.price_sync.load_snapshot()
+
+        if self.scheduler.adaptive:
+            try:
+                loaded = self.scheduler.load_history(os.path.join(self.log_dir, "orders_*.csv"))
+                log.info("시각별 주문 도착률: 주문 로그 %d건 반영", loaded, extra={"tag": "INIT"})
+            except Exception as e:
+                log.warning("주문 로그 도착률 로드 실패 (실시간 관측만 사용): %s", e, extra={"tag": "INIT"})
+
+        try:
+            self._restore_open_sessions()
+            log.info("기존 주문 목록 초기화 중...", extra={"tag": "INIT"})
+            self._poll(init_run=True)
+            log.info("완료. 이 시각 이후의 새 주문부터 감지합니다.", extra={"tag": "INIT"})
+
+            while self._running:
+                self._sleep_interval = self.scheduler.next_interval()
+                if self.trigger.wait(self._sleep_interval):
+                    self.scheduler.note_nudge()
+                if self._running:
+                    self._poll(init_run=False)
+        finally:
+            self._shutdown()
 
     def stop(self):
+        """종료 요청. 진행 중인 사이클을 마친 뒤 start() 가 창에 남은 세션을 처리하고 반환합니다."""
         self._running = False
-        print("\n[STOP] 리스너를 종료합니다...")
+        self.trigger.interrupt()
+
+    def _shutdown(self):
+        # 창에 남은 세션은 버리지 않고 처리 (다음 실행은 기존 주문을 본 것으로 등록하므로)
+        try:
+            self._emit_groups(self.grouper.drain(force=True))
+        except Exception as e:
+            log.exception("대기 세션 처리 실패: %s", e, extra={"tag": "STOP"})
+        self._save_open_sessions()
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+            self.metrics_server = None
+        try:
+            self.csv_log.close()
+        except Exception as csv_err:
+            log.error("%s", csv_err, extra={"tag": "CSV-ERROR"})
+        log.info("리스너를 종료합니다...", extra={"tag": "STOP"})
+        shutdown_logging()
 
     def _setup_signal_handler(self):
+        # 핸들러는 종료 요청만 (저장/차감은 start() 루프가 사이클을 마친 뒤 _shutdown 에서)
+        # systemd 는 SIGTERM 으로 멈추므로 SIGINT 와 같이 처리
         def _handler(sig, frame):
+            log.info("종료 신호 (%s) → 진행 중인 사이클 후 종료", signal.Signals(sig).name, extra={"tag": "STOP"})
             self.stop()
-            sys.exit(0)
         signal.signal(signal.SIGINT, _handler)
+        signal.signal(signal.SIGTERM, _handler)
+        self.profiler.install_signal_handler()   # SIGUSR1 → 다음 N 사이클 프로파일링
 
     def _poll(self, init_run=False):
         """한 번의 폴링 사이클을 실행합니다."""
+        started = time.time()
+        if self._last_poll_started is not None:
+            # 직전 사이클 시작 + (사이클 소요 + 대기) 기준으로 얼마나 늦게 시작했는지
+            self._poll_gap = started - self._last_poll_started
+            POLL_LAG.set(max(0.0, self._poll_gap - self._sleep_interval))
+        self._last_poll_started = started
+        self._new_in_cycle = 0
+        try:
+            with self.profiler.cycle(), stage("poll_cycle"):
+                if self.price_sync is not None:
+                    with stage("price_sync"):
+                        self.price_sync.maybe_sync()
+                self._poll_once(init_run)
+                if not init_run:
+                    # 새 주문이 없던 사이클에도 창이 닫힌 세션은 내보냄
+                    self._emit_groups(self.grouper.drain())
+        finally:
+            self._save_open_sessions()
+            self.scheduler.record_poll(self._new_in_cycle)
+            SEEN_IDS.set(len(self._seen_ids))
+            LAST_POLL.set(time.time())
+
+    def _poll_once(self, init_run):
         now = datetime.now(KST)
 
         if init_run:
             look_back_seconds = 600
         else:
-            look_back_seconds = POLL_INTERVAL_SECONDS * 2
+            # 적응형 주기에서는 대기가 POLL_INTERVAL_SECONDS 보다 길 수 있음 → 실제 간격의 2배
+            look_back_seconds = max(POLL_INTERVAL_SECONDS, self._poll_gap) * 2
 
         from_dt = now - timedelta(seconds=look_back_seconds)
         to_dt   = now
 
+        t_list = time.perf_counter()
         try:
-            product_order_ids = fetch_recent_product_order_ids(
-                self.token_mgr, from_dt, to_dt
-            )
+            product_order_ids = self.source.list_ids(from_dt, to_dt)
         except Exception as e:
-            print("[ERROR] 주문 목록 조회 실패: {}".format(e))
+            ORDERS_FAILED.inc(stage="list_fetch")
+            log.exception("주문 목록 조회 실패: %s", e, extra={"tag": "ERROR"})
             return
 
-        if not init_run:
-            ts_str = now.strftime("%H:%M:%S")
-            print("[POLL] {} | 조회: {}건".format(ts_str, len(product_order_ids)))
-            sys.stdout.flush()
-
         new_ids = [pid for pid in product_order_ids if pid not in self._seen_ids]
         self._seen_ids.update(product_order_ids)
 
         if init_run:
-            print("  → 기존 주문 {}건 등록 완료".format(len(self._seen_ids)))
+            log.info("기존 주문 %d건 등록 완료", len(self._seen_ids), extra={"tag": "INIT"})
             return
 
+        log.info("조회: %d건 / 새 주문 %d건", len(product_order_ids), len(new_ids), extra={
+            "tag":     "POLL",
+            "listed":  len(product_order_ids),
+            "new":     len(new_ids),
+            "list_ms": round((time.perf_counter() - t_list) * 1000, 1),
+        })
         if not new_ids:
-            print("  → 새 주문 없음")
             return
 
-        print("  → [NEW] 새 주문 {}건 발견!".format(len(new_ids)))
+        ORDERS_SEEN.inc(len(new_ids))
+        self._new_in_cycle = len(new_ids)
 
         try:
-            orders = fetch_order_details(self.token_mgr, new_ids)
+            items = self.source.fetch_items(new_ids)
+            orders = []
+            with stage("parse"):
+                for item in items:
+                    order = self.parser.parse(item)
+                    if order:
+                        orders.append(order)
+            observe_detection_latency(orders)
         except Exception as e:
-            print("[ERROR] 주문 상세 조회 실패: {}".format(e))
+            ORDERS_FAILED.inc(stage="detail_fetch")
+            log.exception("주문 상세 조회 실패: %s", e, extra={"tag": "ERROR", "orders": len(new_ids)})
             return
 
         # 비지원 랙 필터링
         supported = []
         for order in orders:
-            pname = str(order.get("상품명", "") or "")
-            optv  = str(order.get("옵션", "") or "")
-            if is_supported_rack(pname, optv):
+            if self.grouper.accept(order):
                 supported.append(order)
-                # CSV 저장 (확인용, 전체 로우 매)
-                try:
-                    save_order_to_csv(order, self.log_dir)
-                except Exception as csv_err:
-                    print("[CSV-ERROR] {}".format(csv_err))
+                # CSV 저장 (확인용, 전체 로우 매) - 사이클 끝에 한 번에 기록
+                self.csv_log.append(order)
             else:
-                print("[SKIP] 비지원 랙: {}".format(pname[:50]))
-                print_new_order(order)  # 콘솔 출력은 유지
+                ORDERS_SKIPPED.inc()
+                log.info("비지원 랙: %s", str(order.get("상품명", "") or "")[:50],
+                         extra={"tag": "SKIP", "order_id": order.get("상품주문번호")})
+                print_new_order(order)
+
+        # 문서 전송 전에 원본 주문행부터 디스크에 남김 (write-ahead)
+        try:
+            with stage("csv_write"):
+                self.csv_log.flush()
+        except Exception as csv_err:
+            ORDERS_FAILED.inc(stage="csv_write")
+            log.error("%s (다음 사이클에 재시도)", csv_err,
+                      extra={"tag": "CSV-ERROR", "pending_rows": self.csv_log.pending()})
 
         if not supported:
             return
 
         # 동일 세션 기준 그룹핑
-        groups = group_orders_by_session(supported)
-        print("[GROUP] {}건 → {}개 그룹".format(len(supported), len(groups)))
-
+        with stage("grouping"):
+            groups = self.grouper.group(supported)
+        ORDERS_GROUPED.inc(len(supported))
+        log.info("%d건 → %d개 그룹 (세션 창 대기 %d개)", len(supported), len(groups),
+                 len(getattr(self.grouper, "window", ())), extra={"tag": "GROUP"})
+        self._emit_groups(groups)
+
+    def _save_open_sessions(self):
+        """
+        창에 남은 주문행을 order_logs/open_sessions.json 에 저장 (바뀐 경우만, 없으면 파일 삭제).
+        강제 종료 뒤 재시작하면 초기화가 최근 주문을 모두 본 것으로 등록하므로, 이 파일로 이어 처리합니다.
+        """
+        rows = [as_order(r) for r in self.grouper.pending()]
+        ids = tuple(o.product_order_id for o in rows)
+        if ids == self._open_saved_ids:
+            return
+        path = os.path.join(self.log_dir, OPEN_SESSIONS_FILENAME)
+        try:
+            if rows:
+                tmp = path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump([o.to_dict() for o in rows], f, ensure_ascii=False, default=str)
+                os.replace(tmp, path)
+            elif os.path.exists(path):
+                os.remove(path)
+            self._open_saved_ids = ids
+        except OSError as e:
+            log.error("대기 세션 저장 실패: %s", e, extra={"tag": "GROUP"})
+
+    def _restore_open_sessions(self):
+        """이전 실행이 남긴 대기 세션을 창에 다시 넣음 (새 창 시간이 지나면 문서 생성)."""
+        path = os.path.join(self.log_dir, OPEN_SESSIONS_FILENAME)
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                rows = [SmartstoreOrder.from_row(row) for row in json.load(f)]
+        except (OSError, ValueError) as e:
+            log.error("대기 세션 복원 실패: %s", e, extra={"tag": "GROUP"})
+            return
+        self._seen_ids.update(o.product_order_id for o in rows)
+        # 파일 내용 = 마지막 저장분 → 창이 비면 다음 저장에서 파일이 지워짐 (재시작마다 다시 복원 방지)
+        self._open_saved_ids = tuple(o.product_order_id for o in rows)
+        log.info("이전 실행의 대기 세션 %d행 복원", len(rows), extra={"tag": "GROUP", "orders": len(rows)})
+        self._emit_groups(self.grouper.group(rows))
+
+    def _emit_groups(self, groups):
+        # type: (List[list]) -> None
         for group in groups:
             for order in group:
                 print_new_order(order)
@@ -2138,13 +1098,22 @@ class OrderListener(object):
         """
         그룹핑된 주문 목록을 document로 전환합니다.
         
-        DRY_RUN=True : print_dry_run()으로 콘솔 출력만
-        DRY_RUN=False: print_dry_run() 후 save_document_to_server()를 호출
-        스마트스토어 주문에 한정하여 재고 차감도 곧바로 수행
+        DRY_RUN=True : print_dry_run() 덤프만 (LISTENER_LOG_LEVEL=DEBUG 일 때 출력)
+        DRY_RUN=False: print_dry_run() 후 싱크로 전달 (기본 ServerSink: 서버 저장 +
+        스마트스토어 주문에 한정하여 재고 차감도 곧바로 수행)
         """
-        payload = build_grouped_document(group)
+        t0 = time.perf_counter()
+        payload = self.builder.build(group)
+        GROUPS_BUILT.inc()
+        log.info("문서 생성", extra={
+            "tag":       "DOC",
+            "doc_id":    payload.get("doc_id"),
+            "order_ids": [o.get("상품주문번호") for o in group],
+            "items":     len(payload.get("items") or []),
+            "materials": len(payload.get("materials") or []),
+            "build_ms":  round((time.perf_counter() - t0) * 1000, 2),
+        })
         print_dry_run(payload)
-        sys.stdout.flush() # PM2 실시간 출력을 위해 강제 플러시
 
         # 분석용 페이로드 로깅 (설정 시)
         if globals().get("ENABLE_PAYLOAD_LOGGING", False):
@@ -2155,12 +1124,17 @@ class OrderListener(object):
                 log_dir = os.path.join(base_dir, "order_logs")
                 save_payload_to_log(payload, log_dir)
             except Exception as e:
-                print("[LOG-ERROR] 페이로드 로깅 실패: {}".format(e))
+                ORDERS_FAILED.inc(stage="payload_log")
+                log.error("페이로드 로깅 실패: %s", e,
+                          extra={"tag": "LOG-ERROR", "doc_id": payload.get("doc_id")})
 
-        if not DRY_RUN:
-            save_success = save_document_to_server(payload)
-            if save_success and payload.get("isSmartstore"):
-                deduct_inventory_for_smartstore(payload)
+        for sink in self.sinks:
+            try:
+                sink.write(payload)
+            except Exception as e:
+                ORDERS_FAILED.inc(stage="sink")
+                log.exception("싱크 %s 실패: %s", type(sink).__name__, e,
+                              extra={"tag": "ERROR", "doc_id": payload.get("doc_id")})
 
 
 
@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+"""
+part_index.py
+─────────────────────────────────────────────────────────────────────────────
+부품 ID → 문서(doc_id) 역색인 (SQLite) + 단가 변경분 재계산
+
+관리자가 /prices/update, /prices/bulk-update 로 단가를 바꿨을 때, 그 부품이 들어간
+purchase_ss_* 문서를 materials JSON 전체를 읽지 않고 바로 찾기 위한 색인입니다.
+materials 의 partId / _inventoryPartId / inventoryPartId 를 모두 키로 등록합니다.
+
+갱신:
+  - 리스너: ServerSink 가 문서 저장에 성공할 때마다 그 문서만 교체 (index_saved_document)
+  - 일괄:   python3 part_index.py build --db-path /home/rocky/db/sammi.db
+            (materials 컬럼만 1행씩 읽어 한 트랜잭션으로 재구축)
+
+재계산 (reprice):
+  색인으로 찾은 문서만 불러와 materials 의 unitPrice/totalPrice 를 현재 단가표로 다시 매깁니다
+  (ss_pipeline.pricing.reprice_materials — BOM/수량/items 는 그대로, 추가부품은 주문 금액 유지).
+  대상은 열린 문서(삭제되지 않은 문서, --from-date 로 문서 일자 하한)만.
+  단가표: --prices-json > --db-path 의 admin_prices 테이블 > GET {api}/prices
+
+사용법:
+    python3 part_index.py build --db-path /home/rocky/db/sammi.db
+    python3 part_index.py lookup 하이랙-기둥-높이200270kg
+    python3 part_index.py reprice --db-path ... --changed-since 2026-03-01T00:00:00Z   # 미리보기
+    python3 part_index.py reprice --db-path ... --parts 파렛트랙-기둥-3000 --execute
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from document_store import _chunks, _safe_json_loads, add_store_arguments, store_from_args
+from ss_pipeline.pricing import ADMIN_PRICES_PATH, material_part_ids, normalize_admin_prices, \
+    price_of_entry, reprice_materials
+
+KST = timezone(timedelta(hours=9))
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_INDEX_PATH = os.path.join(BASE_DIR, "order_logs", "part_index.db")
+DOC_PREFIX = "purchase_ss_"
+
+log = logging.getLogger("sammirack.listener.part_index")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id     TEXT PRIMARY KEY,
+    doc_date   TEXT,
+    indexed_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS doc_parts (
+    part_id TEXT NOT NULL,
+    doc_id  TEXT NOT NULL,
+    PRIMARY KEY (part_id, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_doc_parts_doc ON doc_parts(doc_id);
+"""
+
+
+def _now_iso():
+    # type: () -> str
+    return datetime.now(KST).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "+09:00"
+
+
+def _materials(value):
+    # type: (object) -> List[dict]
+    """materials 컬럼 (JSON 문자열 또는 리스트) → 리스트."""
+    parsed = _safe_json_loads(value, [])
+    return parsed if isinstance(parsed, list) else []
+
+
+def document_part_ids(materials):
+    # type: (Iterable[dict]) -> Set[str]
+    ids = set()  # type: Set[str]
+    for mat in materials:
+        if isinstance(mat, dict):
+            ids.update(material_part_ids(mat))
+    return ids
+
+
+class PartIndex(object):
+    """part_id → doc_id. 문서 단위로 통째 교체합니다 (부분 갱신 없음)."""
+
+    def __init__(self, db_path=DEFAULT_INDEX_PATH):
+        # type: (str) -> None
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ── 갱신 ────────────────────────────────────────────────────────────────
+
+    def _replace(self, doc_id, doc_date, part_ids, now):
+        self._conn.execute("DELETE FROM doc_parts WHERE doc_id = ?", (doc_id,))
+        self._conn.execute(
+            "INSERT OR REPLACE INTO docs (doc_id, doc_date, indexed_at) VALUES (?, ?, ?)",
+            (doc_id, doc_date, now))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO doc_parts (part_id, doc_id) VALUES (?, ?)",
+            [(pid, doc_id) for pid in sorted(part_ids)])
+
+    def index_document(self, doc_id, materials, doc_date=None):
+        # type: (str, Iterable[dict], Optional[str]) -> int
+        """문서 1건의 부품 목록을 교체합니다. 반환: 등록한 부품 ID 수."""
+        part_ids = document_part_ids(materials)
+        with self._lock, self._conn:
+            self._replace(doc_id, doc_date, part_ids, _now_iso())
+        return len(part_ids)
+
+    def index_documents(self, docs, clear=False):
+        # type: (Iterable[Tuple[str, dict]], bool) -> int
+        """(doc_id, doc) 들을 한 트랜잭션으로 색인. clear=True 면 기존 색인을 비우고 재구축."""
+        now = _now_iso()
+        count = 0
+        with self._lock, self._conn:
+            if clear:
+                self._conn.execute("DELETE FROM doc_parts")
+                self._conn.execute("DELETE FROM docs")
+            for doc_id, doc in docs:
+                self._replace(doc_id, doc.get("date"), document_part_ids(_materials(doc.get("materials"))), now)
+                count += 1
+        return count
+
+    def remove_document(self, doc_id):
+        # type: (str) -> None
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM doc_parts WHERE doc_id = ?", (doc_id,))
+            self._conn.execute("DELETE FROM docs WHERE doc_id = ?", (doc_id,))
+
+    # ── 조회 ────────────────────────────────────────────────────────────────
+
+    def docs_for_parts(self, part_ids, from_date=None):
+        # type: (Iterable[str], Optional[str]) -> List[str]
+        """part_ids 중 하나라도 포함한 doc_id (from_date: 문서 일자 하한 YYYY-MM-DD)."""
+        found = set()  # type: Set[str]
+        with self._lock:
+            for chunk in _chunks(sorted(set(part_ids)), 500):
+                sql = ("SELECT DISTINCT p.doc_id FROM doc_parts p JOIN docs d ON d.doc_id = p.doc_id"
+                       " WHERE p.part_id IN ({})".format(", ".join("?" * len(chunk))))
+                params = list(chunk)
+                if from_date:
+                    sql += " AND d.doc_date >= ?"
+                    params.append(from_date)
+                found.update(row["doc_id"] for row in self._conn.execute(sql, params))
+        return sorted(found)
+
+    def parts_of(self, doc_id):
+        # type: (str) -> List[str]
+        with self._lock:
+            return [row["part_id"] for row in self._conn.execute(
+                "SELECT part_id FROM doc_parts WHERE doc_id = ? ORDER BY part_id", (doc_id,))]
+
+    def stats(self):
+        # type: () -> Dict[str, int]
+        with self._lock:
+            docs = self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+            rows = self._conn.execute("SELECT COUNT(*) FROM doc_parts").fetchone()[0]
+            parts = self._conn.execute("SELECT COUNT(DISTINCT part_id) FROM doc_parts").fetchone()[0]
+        return {"documents": docs, "parts": parts, "rows": rows}
+
+
+# ─────────────────────────────────────────
+# 프로세스 공용 인스턴스 (리스너에서 사용)
+# ─────────────────────────────────────────
+_INDEX = None  # type: Optional[PartIndex]
+_INDEX_LOCK = threading.Lock()
+
+
+def get_part_index(db_path=None):
+    # type: (Optional[str]) -> PartIndex
+    """프로세스당 1개의 색인 인스턴스를 반환합니다 (지연 생성)."""
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            _INDEX = PartIndex(db_path or DEFAULT_INDEX_PATH)
+        return _INDEX
+
+
+def index_saved_document(payload):
+    # type: (dict) -> None
+    """서버 저장에 성공한 문서 페이로드를 색인에 반영. 실패해도 리스너 흐름은 막지 않음."""
+    doc_id = payload.get("doc_id") or payload.get("id", "")
+    try:
+        get_part_index().index_document(doc_id, _materials(payload.get("materials")), payload.get("date"))
+    except Exception as e:
+        log.warning("부품 색인 갱신 실패 (build 로 재구축 가능): %s", e, extra={"tag": "PART-INDEX", "doc_id": doc_id})
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# 단가 재계산
+# ═════════════════════════════════════════════════════════════════════════════
+
+def load_price_table(prices_json=None, db_path=None, api=None, timeout=30):
+    # type: (Optional[str], Optional[str], Optional[str], int) -> Dict[str, dict]
+    """우선순위: prices_json > db_path 의 admin_prices > GET {api}/prices"""
+    if prices_json:
+        with open(prices_json, "r", encoding="utf-8") as f:
+            return normalize_admin_prices(json.load(f))
+    if db_path and os.path.exists(db_path):
+        conn = sqlite3.connect("file:{}?mode=ro".format(os.path.abspath(db_path)), uri=True)
+        try:
+            return {pid: {"price": price, "timestamp": ts} for pid, price, ts in
+                    conn.execute("SELECT part_id, price, timestamp FROM admin_prices")}
+        finally:
+            conn.close()
+    if api:
+        import requests
+
+        resp = requests.get("{}/prices".format(api.rstrip("/")), timeout=timeout)
+        resp.raise_for_status()
+        return normalize_admin_prices(resp.json())
+    raise ValueError("단가표 소스가 없습니다 (--prices-json / --db-path / --api)")
+
+
+def changed_parts(prices, since):
+    # type: (Dict[str, dict], str) -> Set[str]
+    """timestamp 가 since 이후(같은 시각 포함)인 부품 ID."""
+    return {pid for pid, entry in prices.items()
+            if isinstance(entry, dict) and (entry.get("timestamp") or "") >= since}
+
+
+def reprice_documents(index, store, prices, part_ids, from_date=None):
+    # type: (PartIndex, object, Dict[str, dict], Iterable[str], Optional[str]) -> dict
+    """
+    part_ids 가 들어간 열린 문서만 불러와 재계산합니다 (저장은 호출자).
+    불러온 문서로 색인도 바로잡습니다 (삭제 문서 제거, 부품 목록 교체).
+    반환: {candidates, closed, unchanged, documents: {doc_id: 새 문서}, changes: {doc_id: [...]}}
+    """
+    part_ids = set(part_ids)
+    candidates = index.docs_for_parts(part_ids, from_date=from_date)
+    loaded = store.get_documents(candidates)
+    summary = {"candidates": len(candidates), "closed": 0, "unchanged": 0,
+               "documents": {}, "changes": {}}  # type: dict
+
+    def price_of(part_id):
+        return price_of_entry(prices.get(part_id))
+
+    for doc_id in candidates:
+        doc = loaded.get(doc_id)
+        if doc is None or doc.get("deleted"):
+            index.remove_document(doc_id)
+            summary["closed"] += 1
+            continue
+        materials = _materials(doc.get("materials"))
+        index.index_document(doc_id, materials, doc.get("date"))
+        new_materials, changes = reprice_materials(materials, price_of, part_ids)
+        if not changes:
+            summary["unchanged"] += 1
+            continue
+        summary["documents"][doc_id] = dict(doc, materials=new_materials)
+        summary["changes"][doc_id] = changes
+    return summary
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# CLI
+# ═════════════════════════════════════════════════════════════════════════════
+
+def parse_args():
+    p = argparse.ArgumentParser(description="부품 ID → 문서 역색인 / 단가 변경분 재계산")
+    p.add_argument("--index", default=DEFAULT_INDEX_PATH, help="색인 SQLite 경로")
+    sub = p.add_subparsers(dest="cmd")
+    build = sub.add_parser("build", help="문서 저장소에서 색인 재구축")
+    add_store_arguments(build)
+    look = sub.add_parser("lookup", help="부품 ID 가 들어간 문서")
+    look.add_argument("part_ids", nargs="+")
+    look.add_argument("--from-date", default=None, help="문서 일자 하한 (YYYY-MM-DD)")
+    rep = sub.add_parser("reprice", help="단가가 바뀐 부품이 들어간 열린 문서만 재계산")
+    add_store_arguments(rep)
+    rep.add_argument("--parts", default="", help="부품 ID (쉼표 구분)")
+    rep.add_argument("--changed-since", default=None,
+                     help="단가표 timestamp 가 이 시각 이후인 부품 (ISO, 예: 2026-03-01T00:00:00Z)")
+    rep.add_argument("--prices-json", default="",
+                     help="단가표 파일 (기본: --db-path 의 admin_prices → GET /prices,"
+                          " --documents-json 이면 admin_prices.json)")
+    rep.add_argument("--from-date", default=None, help="문서 일자 하한 (YYYY-MM-DD)")
+    rep.add_argument("--batch-size", type=int, default=50, help="저장 batch 크기 (기본: 50)")
+    rep.add_argument("--execute", action="store_true", help="실제 저장 (기본: 미리보기)")
+    sub.add_parser("stats", help="색인 규모")
+    return p.parse_args()
+
+
+def _cmd_build(index, args):
+    store = store_from_args(args, readonly=True)
+    print("  소스: {} ({})".format(store.name, args.documents_json or args.db_path or args.api))
+    try:
+        count = index.index_documents(
+            store.iter_documents(prefix=DOC_PREFIX, fields=("date", "materials", "deleted"),
+                                 include_deleted=False),
+            clear=True)
+    finally:
+        store.close()
+    stats = index.stats()
+    print("  색인 재구축: 문서 {}건, 부품 {}종 ({}행)".format(count, stats["parts"], stats["rows"]))
+
+
+def _cmd_reprice(index, args):
+    dry_run = not args.execute
+    part_ids = {p.strip() for p in args.parts.split(",") if p.strip()}
+    prices_json = args.prices_json or (ADMIN_PRICES_PATH if args.documents_json else None)
+    prices = load_price_table(prices_json, args.db_path, args.api)
+    if args.changed_since:
+        part_ids |= changed_parts(prices, args.changed_since)
+    print("=" * 70)
+    print("단가 재계산: 부품 {}종 / 모드 {}".format(
+        len(part_ids), "DRY_RUN (미리보기)" if dry_run else "🔴 EXECUTE (실제 반영)"))
+    print("=" * 70)
+    if not part_ids:
+        print("대상 부품 없음 (--parts / --changed-since). 종료.")
+        return
+
+    store = store_from_args(args, readonly=dry_run)
+    try:
+        result = reprice_documents(index, store, prices, part_ids, from_date=args.from_date)
+        for doc_id in sorted(result["changes"]):
+            print("📄 {}".format(doc_id))
+            for c in result["changes"][doc_id]:
+                print("    {partId}: {before} → {after}".format(**c))
+        saved, failed = 0, []  # type: Tuple[int, List[str]]
+        if not dry_run and result["documents"]:
+            saved, failed = store.save_documents(result["documents"], batch_size=args.batch_size)
+    finally:
+        store.close()
+
+    print("-" * 70)
+    print("  후보 문서 (색인): {}건".format(result["candidates"]))
+    print("  닫힌/없는 문서 (색인에서 제거): {}건".format(result["closed"]))
+    print("  단가 그대로: {}건".format(result["unchanged"]))
+    print("  재계산 대상: {}건".format(len(result["documents"])))
+    if not dry_run:
+        print("  ✅ 저장: {}건 / ❌ 실패: {}건".format(saved, len(failed)))
+        for doc_id in failed:
+            print("    ❌ {}".format(doc_id))
+    else:
+        print("\n⚠️ DRY_RUN 모드였습니다. 실제 반영하려면 --execute")
+
+
+def main():
+    args = parse_args()
+    index = PartIndex(args.index)
+    cmd = args.cmd or "stats"
+    try:
+        if cmd == "build":
+            _cmd_build(index, args)
+        elif cmd == "lookup":
+            for pid in args.part_ids:
+                doc_ids = index.docs_for_parts([pid], from_date=args.from_date)
+                print("{} : {}건".format(pid, len(doc_ids)))
+                for doc_id in doc_ids:
+                    print("  {}".format(doc_id))
+        elif cmd == "reprice":
+            _cmd_reprice(index, args)
+        elif cmd == "stats":
+            print("부품 색인: {}".format(json.dumps(index.stats(), ensure_ascii=False)))
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+    main()
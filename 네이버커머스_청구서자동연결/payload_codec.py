@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+payload_codec.py
+─────────────────────────────────────────────────────────────────────────────
+문서 페이로드 / 로그 JSON 인코딩 (orjson 이 있으면 사용, 없으면 표준 json)
+
+출력 형식은 백엔드와 무관하게 같습니다: UTF-8, 한글 그대로(\\uXXXX 이스케이프 없음),
+구분자 공백 없음 (",", ":"). 같은 객체는 같은 바이트이므로 해시 / 중복 판단에 써도 됩니다.
+orjson 이 못 다루는 값(64비트 초과 정수, 짝 없는 서로게이트 등)은 그 호출만 표준 json 으로 처리하고,
+datetime 등 표준 json 이 거부하는 값은 백엔드와 상관없이 TypeError 입니다.
+
+  LISTENER_JSON_BACKEND = auto (기본, orjson 있으면 orjson) / orjson / stdlib
+
+문서 저장 본문 (encode_document):
+  기존에는 items / materials 를 json.dumps 로 문자열로 만든 뒤, requests(json=) 가 전체를 다시
+  ASCII 이스케이프로 직렬화했습니다 (문자열 안의 JSON 을 한 번 더 이스케이프 + 한글 1자 6바이트).
+  서버 saveHandler 는 items / materials 가 배열이면 직접 JSON.stringify 하므로 배열 그대로 보내고
+  전체를 한 번만 인코딩합니다. 서버가 읽지 않는 snake_case 별칭(같은 값의 camelCase 키가 있는 것)과
+  _ 디버깅 필드는 본문에서 뺍니다.
+
+측정: python3 bench_serialization.py
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import json
+import os
+from typing import Dict
+
+try:
+    import orjson
+except ImportError:  # 선택 의존성
+    orjson = None
+
+BACKEND_AUTO = "auto"
+BACKEND_ORJSON = "orjson"
+BACKEND_STDLIB = "stdlib"
+
+# 서버 saveHandler 가 읽는 camelCase 키 ← 페이로드의 snake_case 별칭
+WIRE_ALIASES = {
+    "doc_id":          "docId",
+    "document_number": "documentNumber",
+    "company_name":    "companyName",
+    "biz_number":      "bizNumber",
+    "total_amount":    "totalAmount",
+    "top_memo":        "topMemo",
+    "created_at":      "createdAt",
+    "updated_at":      "updatedAt",
+}
+
+CONTENT_TYPE = "application/json; charset=utf-8"
+
+_MISSING = object()
+
+_STDLIB_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+
+def _resolve_backend(name):
+    # type: (str) -> str
+    name = (name or BACKEND_AUTO).strip().lower()
+    if name not in (BACKEND_AUTO, BACKEND_ORJSON, BACKEND_STDLIB):
+        raise ValueError("LISTENER_JSON_BACKEND 는 auto/orjson/stdlib 중 하나: {}".format(name))
+    if name == BACKEND_ORJSON and orjson is None:
+        raise ValueError("LISTENER_JSON_BACKEND=orjson 이지만 orjson 이 설치되어 있지 않습니다")
+    if name == BACKEND_AUTO:
+        return BACKEND_ORJSON if orjson is not None else BACKEND_STDLIB
+    return name
+
+
+BACKEND = _resolve_backend(os.environ.get("LISTENER_JSON_BACKEND", BACKEND_AUTO))
+
+
+def _stdlib_dumps_bytes(obj):
+    # type: (object) -> bytes
+    return _STDLIB_ENCODER.encode(obj).encode("utf-8")
+
+
+def _orjson_dumps_bytes(obj):
+    # type: (object) -> bytes
+    try:
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+    except TypeError:
+        return _stdlib_dumps_bytes(obj)
+
+
+def set_backend(name):
+    # type: (str) -> str
+    """백엔드 교체 (벤치마크 / 테스트용). 실제 선택된 이름을 반환."""
+    global BACKEND, dumps_bytes
+    BACKEND = _resolve_backend(name)
+    dumps_bytes = _orjson_dumps_bytes if BACKEND == BACKEND_ORJSON else _stdlib_dumps_bytes
+    return BACKEND
+
+
+dumps_bytes = _orjson_dumps_bytes if BACKEND == BACKEND_ORJSON else _stdlib_dumps_bytes
+
+
+def dumps(obj):
+    # type: (object) -> str
+    return dumps_bytes(obj).decode("utf-8")
+
+
+def loads(data):
+    # type: (object) -> object
+    """bytes / str → 객체."""
+    if orjson is not None and BACKEND == BACKEND_ORJSON:
+        return orjson.loads(data)
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode("utf-8")
+    return json.loads(data)
+
+
+# ─────────────────────────────────────────
+# 문서 저장 본문
+# ─────────────────────────────────────────
+def wire_document(payload):
+    # type: (dict) -> Dict[str, object]
+    """
+    build_grouped_document 페이로드 → POST /documents/save 본문 dict.
+    _ 필드 제외, docId 추가, camelCase 와 값이 같은 snake_case 별칭 제외 (값이 다르면 둘 다 유지).
+    """
+    doc_id = payload.get("doc_id") or payload.get("id", "")
+    body = {}
+    for key, value in payload.items():
+        if key[:1] == "_":
+            continue
+        twin = WIRE_ALIASES.get(key)
+        if twin is not None:
+            twin_value = doc_id if twin == "docId" else payload.get(twin, _MISSING)
+            if twin_value == value:
+                continue
+        body[key] = value
+    body["docId"] = doc_id
+    return body
+
+
+def encode_document(payload):
+    # type: (dict) -> bytes
+    """문서 저장 요청 본문 (UTF-8 JSON, 한 번만 인코딩)."""
+    return dumps_bytes(wire_document(payload))
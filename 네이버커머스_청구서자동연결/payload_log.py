@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""
+payload_log.py
+─────────────────────────────────────────────────────────────────────────────
+분석용 페이로드 로그 (order_logs/payload_history.compact.jsonl)
+
+기존 payload_history.jsonl 은 줄마다 materials 배열 전체를 저장했습니다.
+자재마다 name/spec/color/version 이 같은 _inventoryList 사본을 들고 있어서,
+로그 대부분이 몇 안 되는 랙 구성의 같은 BOM 조각 반복이었습니다.
+
+compact 형식은 materials/items 의 각 항목을 "템플릿"(수량성 필드를 비운 dict)과
+"값"(quantity / totalPrice)으로 나누고, 템플릿은 내용 해시로 한 번만 기록합니다.
+같은 값을 중복 저장하는 별칭 키(documentNumber ↔ document_number 등)는 앞선 키를 참조합니다.
+줄 인코딩과 템플릿 해시는 payload_codec (orjson / 표준 json, 같은 바이트) 을 씁니다.
+구분자 공백이 있던 이전 기록의 템플릿은 해시가 달라 처음 참조될 때 한 번 더 기록됩니다.
+
+  {"t":"tpl","h":"<hash>","v":{...자재 템플릿...}}
+  {"t":"p","at":"2026-03-05 10:00:00","p":{...나머지 필드, 분리된 키는 null...},
+   "r":{"materials":[["<hash>",[22,660000,22]],...],"items":[...]},
+   "a":{"documentNumber":"document_number",...}}
+
+템플릿은 항상 처음 참조하는 페이로드 줄보다 앞에 기록됩니다.
+read 쪽은 원본 페이로드를 키 순서까지 그대로 복원합니다.
+
+사용법:
+    python3 payload_log.py stats                          # 크기/템플릿 수
+    python3 payload_log.py cat --last 5                   # 복원된 페이로드 (기존 형식 jsonl)
+    python3 payload_log.py compact payload_history.jsonl  # 기존 로그 → compact 변환 + 왕복 검증
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import sys
+import threading
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import payload_codec
+
+KST = timezone(timedelta(hours=9))
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_LOG_DIR = os.path.join(BASE_DIR, "order_logs")
+COMPACT_FILENAME = "payload_history.compact.jsonl"
+LEGACY_FILENAME = "payload_history.jsonl"
+
+# 템플릿에서 비워 두고 페이로드마다 따로 저장하는 키 (어느 깊이든 적용)
+VALUE_KEYS = ("quantity", "totalPrice")
+
+# 템플릿으로 분리하는 리스트 필드 / 별칭 참조로 바꿀 최소 문자열 길이
+INTERNED_LISTS = ("materials", "items")
+ALIAS_MIN_LEN = 8
+
+_TPL_PREFIXES = ('{"t":"tpl"', '{"t": "tpl"')  # 현재 / 이전(구분자 공백) 형식
+
+
+# ─────────────────────────────────────────
+# 템플릿 분리 / 복원
+# ─────────────────────────────────────────
+def _split(node, values):
+    # type: (object, list) -> object
+    """VALUE_KEYS 값을 values 로 빼내고 그 자리를 None 으로 둔 사본 반환 (순회 순서 고정)."""
+    if isinstance(node, dict):
+        out = {}
+        for key, value in node.items():
+            if key in VALUE_KEYS:
+                values.append(value)
+                out[key] = None
+            else:
+                out[key] = _split(value, values)
+        return out
+    if isinstance(node, list):
+        return [_split(v, values) for v in node]
+    return node
+
+
+def _fill(node, values):
+    # type: (object, Iterator) -> object
+    if isinstance(node, dict):
+        out = {}
+        for key, value in node.items():
+            if key in VALUE_KEYS:
+                out[key] = next(values)
+            else:
+                out[key] = _fill(value, values)
+        return out
+    if isinstance(node, list):
+        return [_fill(v, values) for v in node]
+    return node
+
+
+def _dumps(obj):
+    # type: (object) -> str
+    return payload_codec.dumps(obj)
+
+
+def template_hash(template):
+    # type: (dict) -> str
+    # 키 순서까지 포함해 해시 (정확한 복원을 위해 순서가 다르면 다른 템플릿)
+    return hashlib.sha256(payload_codec.dumps_bytes(template)).hexdigest()[:16]
+
+
+def split_template(entry):
+    # type: (dict) -> Tuple[dict, list]
+    values = []  # type: list
+    return _split(entry, values), values
+
+
+def _intern_list(entries, known, new_templates):
+    # type: (list, Dict[str, dict], List[dict]) -> list
+    refs = []
+    for entry in entries:
+        if not isinstance(entry, dict):
+            refs.append({"raw": entry})
+            continue
+        template, values = split_template(entry)
+        h = template_hash(template)
+        if h not in known:
+            known[h] = template
+            new_templates.append({"t": "tpl", "h": h, "v": template})
+        refs.append([h, values])
+    return refs
+
+
+def encode_payload(payload, known, logged_at=None):
+    # type: (dict, Dict[str, dict], Optional[str]) -> Tuple[List[dict], dict]
+    """
+    페이로드 1건 → (새 템플릿 레코드 목록, 페이로드 레코드).
+    known 은 이미 기록된 {hash: template} 이며 새 템플릿이 추가됩니다.
+    """
+    new_templates = []  # type: List[dict]
+    record = {"t": "p", "at": logged_at or datetime.now(KST).strftime("%Y-%m-%d %H:%M:%S")}
+    stripped = dict(payload)
+
+    refs = {}
+    for key in INTERNED_LISTS:
+        if isinstance(payload.get(key), list):
+            refs[key] = _intern_list(payload[key], known, new_templates)
+            stripped[key] = None  # 키 위치 유지용 자리표시
+
+    # documentNumber / document_number 처럼 같은 값을 가진 별칭 키는 앞선 키를 참조
+    aliases = {}
+    first_key_by_value = {}  # type: Dict[str, str]
+    for key, value in payload.items():
+        if key in refs or not isinstance(value, str) or len(value) < ALIAS_MIN_LEN:
+            continue
+        source = first_key_by_value.setdefault(value, key)
+        if source != key:
+            aliases[key] = source
+            stripped[key] = None
+
+    record["p"] = stripped
+    if refs:
+        record["r"] = refs
+    if aliases:
+        record["a"] = aliases
+    return new_templates, record
+
+
+def _expand_list(refs, templates):
+    # type: (list, Dict[str, dict]) -> list
+    out = []
+    for ref in refs:
+        if isinstance(ref, dict):
+            out.append(ref.get("raw"))
+        else:
+            h, values = ref
+            out.append(_fill(templates[h], iter(values)))
+    return out
+
+
+def decode_payload(record, templates, expand=True):
+    # type: (dict, Dict[str, dict], bool) -> dict
+    payload = dict(record["p"])
+    for key, refs in record.get("r", {}).items():
+        payload[key] = _expand_list(refs, templates) if expand else len(refs)
+    for key, source in record.get("a", {}).items():
+        payload[key] = payload[source]
+    return payload
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# 기록기
+# ═════════════════════════════════════════════════════════════════════════════
+
+class PayloadLog(object):
+    """append 전용 compact 페이로드 로그. 템플릿 해시는 메모리에 유지."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._known = {}  # type: Dict[str, dict]
+        if os.path.exists(path):
+            for h, template in iter_templates(path):
+                self._known[h] = template
+            # 이전 프로세스가 줄 중간에 죽었으면 다음 레코드가 붙지 않도록 개행 보충
+            if os.path.getsize(path) > 0:
+                with open(path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    torn = f.read(1) != b"\n"
+                if torn:
+                    with open(path, "a", encoding="utf-8") as f:
+                        f.write("\n")
+
+    def append(self, payload, logged_at=None):
+        # type: (dict, Optional[str]) -> None
+        with self._lock:
+            new_templates, record = encode_payload(payload, self._known, logged_at)
+            lines = [_dumps(t) for t in new_templates]
+            lines.append(_dumps(record))
+            # 템플릿 + 페이로드를 한 번에 기록 (템플릿이 항상 먼저)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+
+    @property
+    def template_count(self):
+        # type: () -> int
+        return len(self._known)
+
+
+_LOGS = {}  # type: Dict[str, PayloadLog]
+_LOGS_LOCK = threading.Lock()
+
+
+def get_payload_log(log_dir=DEFAULT_LOG_DIR):
+    # type: (str) -> PayloadLog
+    """log_dir 별 프로세스 단일 인스턴스 (템플릿 해시 캐시 공유)."""
+    path = os.path.join(log_dir, COMPACT_FILENAME)
+    with _LOGS_LOCK:
+        if path not in _LOGS:
+            _LOGS[path] = PayloadLog(path)
+        return _LOGS[path]
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# 읽기
+# ═════════════════════════════════════════════════════════════════════════════
+
+def iter_templates(path):
+    # type: (str) -> Iterator[Tuple[str, dict]]
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.startswith(_TPL_PREFIXES):
+                continue
+            try:
+                rec = payload_codec.loads(line)
+            except ValueError:
+                continue  # 기록 중 끊긴 마지막 줄
+            yield rec["h"], rec["v"]
+
+
+def iter_payloads(path, materials=True):
+    # type: (str, bool) -> Iterator[Tuple[str, dict]]
+    """
+    (logged_at, payload) 순회. compact / 기존 payload_history.jsonl 둘 다 지원.
+    materials=False 면 materials/items 복원을 생략하고 항목 수만 채워 빠르게 훑습니다.
+    """
+    templates = {}  # type: Dict[str, dict]
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = payload_codec.loads(line)
+            except ValueError:
+                continue
+            kind = rec.get("t")
+            if kind == "tpl":
+                templates[rec["h"]] = rec["v"]
+            elif kind == "p":
+                try:
+                    payload = decode_payload(rec, templates, expand=materials)
+                except KeyError:
+                    continue  # 템플릿 줄이 손상된 레코드
+                yield rec.get("at", ""), payload
+            elif "payload" in rec:
+                # 기존 형식 {"logged_at": ..., "payload": {...}}
+                yield rec.get("logged_at", ""), rec["payload"]
+
+
+def compact_file(src, dst):
+    # type: (str, str) -> dict
+    """기존 jsonl → compact 변환 후 모든 페이로드 왕복 비교."""
+    known = {}  # type: Dict[str, dict]
+    count = 0
+    tmp = dst + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as out:
+        for logged_at, payload in iter_payloads(src):
+            new_templates, record = encode_payload(payload, known, logged_at)
+            for t in new_templates:
+                out.write(_dumps(t) + "\n")
+            out.write(_dumps(record) + "\n")
+            count += 1
+
+    mismatches = 0
+    for (at_a, a), (at_b, b) in zip(iter_payloads(src), iter_payloads(tmp)):
+        if at_a != at_b or _dumps(a) != _dumps(b):
+            mismatches += 1
+    if mismatches:
+        os.remove(tmp)
+        raise ValueError("왕복 검증 실패: {}건 불일치".format(mismatches))
+    os.replace(tmp, dst)
+    return {
+        "payloads": count,
+        "templates": len(known),
+        "src_bytes": os.path.getsize(src),
+        "dst_bytes": os.path.getsize(dst),
+    }
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# CLI
+# ═════════════════════════════════════════════════════════════════════════════
+
+def main(argv=None):
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+    default_path = os.path.join(DEFAULT_LOG_DIR, COMPACT_FILENAME)
+    p = argparse.ArgumentParser(description="payload_history compact 로그 도구")
+    sub = p.add_subparsers(dest="cmd")
+    sp = sub.add_parser("stats")
+    sp.add_argument("path", nargs="?", default=default_path)
+    sp = sub.add_parser("cat")
+    sp.add_argument("path", nargs="?", default=default_path)
+    sp.add_argument("--last", type=int, default=0, help="마지막 N건만")
+    sp = sub.add_parser("compact")
+    sp.add_argument("src", nargs="?", default=os.path.join(DEFAULT_LOG_DIR, LEGACY_FILENAME))
+    sp.add_argument("dst", nargs="?", default="")
+    args = p.parse_args(argv)
+
+    if args.cmd == "stats":
+        payloads = sum(1 for _ in iter_payloads(args.path, materials=False))
+        templates = sum(1 for _ in iter_templates(args.path))
+        print("{} | 페이로드 {}건 | 템플릿 {}개 | {:,} bytes".format(
+            os.path.basename(args.path), payloads, templates, os.path.getsize(args.path)))
+        return 0
+    if args.cmd == "cat":
+        entries = iter_payloads(args.path)
+        if args.last:
+            entries = list(entries)[-args.last:]
+        for logged_at, payload in entries:
+            print(_dumps({"logged_at": logged_at, "payload": payload}))
+        return 0
+    if args.cmd == "compact":
+        dst = args.dst or os.path.join(os.path.dirname(os.path.abspath(args.src)), COMPACT_FILENAME)
+        if os.path.exists(dst):
+            print("이미 존재: {} (덮어쓰지 않음)".format(dst))
+            return 1
+        result = compact_file(args.src, dst)
+        print("변환 완료: {} → {}".format(args.src, dst))
+        print("  페이로드 {payloads}건 | 템플릿 {templates}개".format(**result))
+        print("  {:,} → {:,} bytes ({:.1f}x)".format(
+            result["src_bytes"], result["dst_bytes"],
+            result["src_bytes"] / float(max(1, result["dst_bytes"]))))
+        return 0
+    p.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
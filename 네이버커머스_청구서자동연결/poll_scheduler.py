@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""
+poll_scheduler.py
+─────────────────────────────────────────────────────────────────────────────
+주문 도착률 기반 적응형 폴링 주기 (OrderListener.start 의 고정 POLL_INTERVAL_SECONDS 대체)
+
+고정 30초 폴링은 주문이 없는 새벽에도 목록 API 를 시간당 120번 부르고, 낮 시간 몰림에서는
+최대 30초의 감지 지연을 만듭니다. PollScheduler 는 매 사이클 뒤 다음 대기 시간을 정합니다.
+
+  도착률  시각(KST 0~23시)별 상품주문 수 / 관측 시간.
+          시작 시 order_logs/orders_*.csv 의 결제완료시각으로 채우고 (관측 기간 = 첫 날 ~ 마지막 날),
+          이후 폴링마다 새 주문 수와 경과 시간을 더합니다 (시각별 최근 max_history_days 일치만 유지).
+          시각별 값에는 하루치 전체 평균을 섞어, 관측이 며칠 안 될 때 빈 시각이 바로 max 가 되지 않게 함.
+          최근 10분 지수 가중 도착률이 더 높으면 그 값을 씀 (평소와 다른 몰림).
+  주기    base_interval × √(reference_per_hour / 시간당 도착률) → [min_interval, max_interval]
+          (시간당 reference_per_hour 건일 때 base_interval. 도착률이 4배면 주기 절반, 1/4 이면 2배.
+           같은 호출 수로 평균 감지 지연이 가장 작은 배분은 주기 ∝ 1/√도착률)
+          새 주문을 본 뒤 burst_seconds 동안은 min_interval (장바구니 / 연속 주문).
+          외부 넛지(poll_trigger.py)를 받은 뒤에도 같음 (알림이 목록 API 반영보다 먼저 온 경우).
+  예산    목록 API 호출 토큰 버킷: 시간당 budget_per_hour, 최대 10분치 적립. 0 이면 무제한 (대기/넛지 제한 없음).
+          한가한 시간에 아낀 호출을 몰림에 쓰되 평균은 예산을 넘지 않습니다.
+
+지표 (/metrics):
+  listener_poll_interval_seconds          다음 대기 시간
+  listener_poll_schedule_total{reason}    burst / rate / idle / budget / fixed
+  listener_arrival_rate_per_hour          주기 계산에 쓴 도착률
+  listener_detection_latency_seconds      결제완료시각 → 리스너 감지 (히스토그램)
+
+설정 (config.py): LISTENER_POLL_ADAPTIVE, LISTENER_POLL_MIN_SECONDS, LISTENER_POLL_MAX_SECONDS,
+                  LISTENER_POLL_BUDGET_PER_HOUR, LISTENER_POLL_REFERENCE_PER_HOUR, LISTENER_POLL_BURST_SECONDS
+
+사용법 (주문 로그로 배운 시각별 도착률 / 주기 / 하루 호출 수 / 예상 감지 지연, 고정 주기 대비):
+    python3 poll_scheduler.py
+    python3 poll_scheduler.py --orders-glob "order_logs/orders_2026-*.csv"
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import argparse
+import glob
+import io
+import math
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from listener_metrics import ARRIVAL_RATE, DETECTION_LATENCY, POLL_INTERVAL, POLL_SCHEDULES
+from order_csv_log import DEFAULT_LOG_DIR, iter_order_rows
+from ss_pipeline.order import KST, parse_payment_dt
+
+REASON_FIXED = "fixed"
+REASON_BURST = "burst"
+REASON_RATE = "rate"
+REASON_IDLE = "idle"
+REASON_BUDGET = "budget"
+
+HOURS = 24
+BUDGET_WINDOW_SECONDS = 600.0   # 토큰 버킷 최대 적립 (10분치)
+PRIOR_SECONDS = 3600.0          # 시각별 도착률에 섞는 전체 평균의 무게 (그 시각 하루치)
+
+
+def _hour(ts):
+    # type: (float) -> int
+    return datetime.fromtimestamp(ts, KST).hour
+
+
+class ArrivalModel(object):
+    """시각별 상품주문 도착률 (건/초) + 최근 지수 가중 도착률."""
+
+    def __init__(self, max_history_days=28, recent_tau=600.0):
+        # type: (int, float) -> None
+        self.counts = [0.0] * HOURS     # 시각별 주문 수
+        self.exposure = [0.0] * HOURS   # 시각별 관측 시간 (초)
+        self.max_exposure = max_history_days * 3600.0
+        self.recent_tau = recent_tau
+        self._recent = 0.0
+        self._recent_at = None  # type: Optional[float]
+
+    def _trim(self, hour):
+        # type: (int) -> None
+        # 오래된 관측은 비율 그대로 줄여서 최근 max_history_days 일치만 남김
+        if self.exposure[hour] > self.max_exposure:
+            scale = self.max_exposure / self.exposure[hour]
+            self.counts[hour] *= scale
+            self.exposure[hour] = self.max_exposure
+
+    def load_rows(self, rows):
+        # type: (Iterable[dict]) -> int
+        """주문행(결제완료시각)으로 시각별 도착 수를 채웁니다. 반환: 반영한 상품주문 수."""
+        seen = set()
+        first = last = None
+        for row in rows:
+            pid = row.get("상품주문번호")
+            if pid in seen:
+                continue
+            paid_at = parse_payment_dt(row.get("결제완료시각"))
+            if paid_at is None:
+                continue
+            seen.add(pid)
+            paid_at = paid_at.astimezone(KST)
+            self.counts[paid_at.hour] += 1
+            day = paid_at.date()
+            first = day if first is None or day < first else first
+            last = day if last is None or day > last else last
+        if first is not None:
+            days = (last - first).days + 1
+            for hour in range(HOURS):
+                self.exposure[hour] += days * 3600.0
+                self._trim(hour)
+        return len(seen)
+
+    def load_csv(self, pattern):
+        # type: (str) -> int
+        rows = []  # type: List[dict]
+        for path in sorted(glob.glob(pattern)):
+            rows.extend(iter_order_rows(path))
+        return self.load_rows(rows)
+
+    def observe(self, new_orders, start, end):
+        # type: (int, float, float) -> None
+        """폴링 한 번: start~end 구간 관측 시간을 시각별로 나눠 더하고, 새 주문은 end 시각에."""
+        t = start
+        while t < end:
+            hour_end = (math.floor((t + 9 * 3600) / 3600.0) + 1) * 3600 - 9 * 3600   # 다음 KST 정시
+            step = min(end, hour_end) - t
+            hour = _hour(t)
+            self.exposure[hour] += step
+            self._trim(hour)
+            t += step
+        if new_orders:
+            self.counts[_hour(end)] += new_orders
+        self._recent = self.recent_rate(end) + new_orders / self.recent_tau
+        self._recent_at = end
+
+    def hourly_rate(self, hour):
+        # type: (int) -> Optional[float]
+        """건/초 (전체 평균 1시간치를 사전값으로 섞음). 관측이 전혀 없으면 None."""
+        total_exposure = sum(self.exposure)
+        if total_exposure <= 0:
+            return None
+        overall = sum(self.counts) / total_exposure
+        return (self.counts[hour] + overall * PRIOR_SECONDS) / (self.exposure[hour] + PRIOR_SECONDS)
+
+    def recent_rate(self, now):
+        # type: (float) -> float
+        if self._recent_at is None:
+            return 0.0
+        return self._recent * math.exp(-max(0.0, now - self._recent_at) / self.recent_tau)
+
+    def rate(self, now):
+        # type: (float) -> Optional[float]
+        hourly = self.hourly_rate(_hour(now))
+        recent = self.recent_rate(now)
+        if hourly is None:
+            return recent or None
+        return max(hourly, recent)
+
+
+class PollScheduler(object):
+    """
+    사이클이 끝날 때 record_poll(새 주문 수) → next_interval() 만큼 대기.
+    adaptive=False 면 base_interval 고정 (지표만 기록).
+    """
+
+    def __init__(self, base_interval, min_interval, max_interval, budget_per_hour,
+                 reference_per_hour=2.0, burst_seconds=120.0, adaptive=True, model=None, clock=time.time):
+        self.base_interval = float(base_interval)
+        self.min_interval = float(min(min_interval, max_interval))
+        self.max_interval = float(max(min_interval, max_interval))
+        self.reference_rate = reference_per_hour / 3600.0
+        self.burst_seconds = burst_seconds
+        self.adaptive = adaptive
+        self.model = model or ArrivalModel()  # type: ArrivalModel
+        self.clock = clock
+        if budget_per_hour < 0:
+            raise ValueError("budget_per_hour 는 0(무제한) 이상이어야 합니다: {}".format(budget_per_hour))
+        self.budget_per_hour = budget_per_hour
+        self.budget_limited = budget_per_hour > 0
+        self._refill = budget_per_hour / 3600.0
+        self._capacity = max(1.0, self._refill * BUDGET_WINDOW_SECONDS)
+        self._tokens = self._capacity
+        self._tokens_at = None      # type: Optional[float]
+        self._last_poll_at = None   # type: Optional[float]
+        self._last_new_at = None    # type: Optional[float]
+        self._lock = threading.Lock()
+        self.interval = self.base_interval
+        self.reason = REASON_FIXED
+
+    def load_history(self, pattern):
+        # type: (str) -> int
+        with self._lock:
+            return self.model.load_csv(pattern)
+
+    def _refill_tokens(self, now):
+        # type: (float) -> None
+        if self._tokens_at is not None:
+            self._tokens = min(self._capacity, self._tokens + (now - self._tokens_at) * self._refill)
+        self._tokens_at = now
+
+    def record_poll(self, new_orders, now=None):
+        # type: (int, Optional[float]) -> None
+        """목록 조회 1회 (예산 토큰 1개 사용) + 새 상품주문 수."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            if self.budget_limited:
+                self._refill_tokens(now)
+                self._tokens -= 1.0
+            if self._last_poll_at is not None:
+                self.model.observe(new_orders, self._last_poll_at, now)
+            self._last_poll_at = now
+            if new_orders:
+                self._last_new_at = now
+
+    def note_nudge(self, now=None):
+        # type: (Optional[float]) -> None
+        """외부 넛지로 깬 폴링 → 이후 burst_seconds 동안 min_interval."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            self._last_new_at = now
+
+    def has_budget(self, now=None):
+        # type: (Optional[float]) -> bool
+        """예산 토큰이 1개 이상 남았는지 (넛지 상한용). adaptive=False 또는 예산 무제한이면 항상 True."""
+        if not self.adaptive or not self.budget_limited:
+            return True
+        now = self.clock() if now is None else now
+        with self._lock:
+            self._refill_tokens(now)
+            return self._tokens >= 1.0
+
+    def next_interval(self, now=None):
+        # type: (Optional[float]) -> float
+        now = self.clock() if now is None else now
+        with self._lock:
+            rate = self.model.rate(now)
+            if not self.adaptive:
+                interval, reason = self.base_interval, REASON_FIXED
+            elif self._last_new_at is not None and now - self._last_new_at < self.burst_seconds:
+                interval, reason = self.min_interval, REASON_BURST
+            elif rate is None:
+                interval, reason = self.base_interval, REASON_RATE
+            elif rate <= 0 or self.rate_interval(rate) >= self.max_interval:
+                interval, reason = self.max_interval, REASON_IDLE
+            else:
+                interval, reason = max(self.min_interval, self.rate_interval(rate)), REASON_RATE
+            if self.adaptive and self.budget_limited:
+                self._refill_tokens(now)
+                wait = (1.0 - self._tokens) / self._refill if self._tokens < 1.0 else 0.0
+                if wait > interval:
+                    interval, reason = wait, REASON_BUDGET
+            self.interval, self.reason = interval, reason
+        POLL_INTERVAL.set(round(interval, 3))
+        POLL_SCHEDULES.inc(reason=reason)
+        ARRIVAL_RATE.set(round((rate or 0.0) * 3600, 4))
+        return interval
+
+    def rate_interval(self, rate):
+        # type: (float) -> float
+        """도착률(건/초) → 범위 적용 전 주기."""
+        return self.base_interval * math.sqrt(self.reference_rate / rate)
+
+    def hourly_plan(self):
+        # type: () -> List[dict]
+        """시각별 도착률 / 주기 (몰림 유지·예산 제외, CLI 요약용)."""
+        plan = []
+        for hour in range(HOURS):
+            rate = self.model.hourly_rate(hour)
+            if rate is None:
+                interval = self.base_interval
+            elif rate <= 0:
+                interval = self.max_interval
+            else:
+                interval = min(self.max_interval, max(self.min_interval, self.rate_interval(rate)))
+            plan.append({"hour": hour, "rate_per_hour": (rate or 0.0) * 3600, "interval": interval})
+        return plan
+
+
+def observe_detection_latency(orders, now=None):
+    # type: (Iterable[object], Optional[float]) -> None
+    """결제완료시각 → 감지까지 걸린 시간 (시각이 없거나 하루 넘게 지난 주문은 제외)."""
+    now = time.time() if now is None else now
+    for order in orders:
+        paid_at = getattr(order, "paid_at", None)
+        if paid_at is None:
+            continue
+        latency = now - paid_at.timestamp()
+        if 0 <= latency < 86400:
+            DETECTION_LATENCY.observe(latency)
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# CLI
+# ═════════════════════════════════════════════════════════════════════════════
+
+def scheduler_from_config():
+    # type: () -> PollScheduler
+    from config import (
+        POLL_ADAPTIVE, POLL_BUDGET_PER_HOUR, POLL_BURST_SECONDS, POLL_INTERVAL_SECONDS,
+        POLL_MAX_SECONDS, POLL_MIN_SECONDS, POLL_REFERENCE_PER_HOUR,
+    )
+
+    return PollScheduler(POLL_INTERVAL_SECONDS, POLL_MIN_SECONDS, POLL_MAX_SECONDS, POLL_BUDGET_PER_HOUR,
+                         reference_per_hour=POLL_REFERENCE_PER_HOUR, burst_seconds=POLL_BURST_SECONDS,
+                         adaptive=POLL_ADAPTIVE)
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="주문 로그 기반 적응형 폴링 주기 요약")
+    p.add_argument("--orders-glob", default=os.path.join(DEFAULT_LOG_DIR, "orders_*.csv"))
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+    args = parse_args(argv)
+    scheduler = scheduler_from_config()
+    loaded = scheduler.load_history(args.orders_glob)
+    plan = scheduler.hourly_plan()
+
+    print("=" * 62)
+    print("적응형 폴링 | 주문 {}건 ({}) | 주기 {:g}~{:g}초, 예산 {}".format(
+        loaded, args.orders_glob, scheduler.min_interval, scheduler.max_interval,
+        "시간당 {:g}회".format(scheduler.budget_per_hour) if scheduler.budget_limited else "무제한"))
+    print("=" * 62)
+    print("  {:>4} {:>12} {:>10} {:>10}".format("시", "주문/시간", "주기(초)", "호출/시간"))
+    calls = 0.0
+    weighted_latency = 0.0
+    arrivals = 0.0
+    for row in plan:
+        polls = 3600.0 / row["interval"]
+        calls += polls
+        weighted_latency += row["rate_per_hour"] * row["interval"] / 2
+        arrivals += row["rate_per_hour"]
+        print("  {:>4} {:>12.2f} {:>10.1f} {:>10.1f}".format(row["hour"], row["rate_per_hour"], row["interval"], polls))
+    fixed_calls = 86400.0 / scheduler.base_interval
+    print("-" * 62)
+    print("  목록 API 호출/일  : {:,.0f} (고정 {:g}초: {:,.0f})".format(calls, scheduler.base_interval, fixed_calls))
+    if arrivals:
+        print("  평균 감지 대기    : {:.1f}초 (고정: {:.1f}초, 새 주문 직후 {:g}초 유지 제외)".format(
+            weighted_latency / arrivals, scheduler.base_interval / 2, scheduler.burst_seconds))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+poll_trigger.py
+─────────────────────────────────────────────────────────────────────────────
+"주문이 바뀌었다" 알림(넛지) → 리스너 폴링 즉시 실행
+
+폴링 사이 대기는 poll_scheduler 가 정한 대로 길게 두고, 메일/알림 중계나 운영자 스크립트가
+넛지를 보내면 대기를 끊고 1초 안에 목록을 조회합니다.
+
+  POST http://127.0.0.1:<LISTENER_METRICS_PORT>/nudge?source=mail     (지표 서버와 같은 포트, 127.0.0.1 전용)
+  python3 poll_trigger.py --source operator                          (같은 요청을 보내는 CLI)
+
+  응답 202 {"result": "accepted"}      대기를 끊음 (debounce 뒤 폴링)
+       202 {"result": "coalesced"}     이미 깨우는 중 → 같은 폴링에 합침
+       429 {"result": "rate_limited"}  분당 상한 / 목록 API 예산 초과 → 무시 (정기 폴링이 가져감)
+
+  debounce   첫 넛지 후 NUDGE_DEBOUNCE_SECONDS(0.5) 기다렸다 폴링 → 알림 여러 개가 폴링 1회로 묶임
+  최소 간격  넛지로 깬 폴링끼리 NUDGE_MIN_GAP_SECONDS(2) 이상
+  상한       넛지로 깬 폴링은 분당 NUDGE_MAX_PER_MINUTE(10)회 + 스케줄러 호출 예산이 남아 있을 때만
+  넛지 후    스케줄러가 burst_seconds 동안 최소 주기로 폴링 (알림이 목록 API 보다 먼저 온 경우 대비)
+
+지표: listener_nudges_total{result}
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import argparse
+import collections
+import io
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from listener_metrics import NUDGES
+
+log = logging.getLogger("sammirack.listener.trigger")
+
+RESULT_ACCEPTED = "accepted"
+RESULT_COALESCED = "coalesced"
+RESULT_RATE_LIMITED = "rate_limited"
+
+NUDGE_PATH = "/nudge"
+_SOURCE_RE = re.compile(r"^[A-Za-z0-9_.-]{1,32}$")
+
+
+class PollTrigger(object):
+    """폴링 루프의 대기(wait)를 넛지(nudge)로 끊는다."""
+
+    def __init__(self, debounce=0.5, min_gap=2.0, max_per_minute=10, budget_check=None, clock=time.monotonic):
+        # type: (float, float, int, Optional[Callable[[], bool]], Callable[[], float]) -> None
+        self.debounce = debounce
+        self.min_gap = min_gap
+        self.max_per_minute = max_per_minute
+        self.budget_check = budget_check
+        self.clock = clock
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._pending_since = None          # type: Optional[float]
+        self._last_fire = None              # type: Optional[float]
+        self._fired = collections.deque()   # 최근 60초 동안 넛지로 깬 시각
+
+    def nudge(self, source="manual"):
+        # type: (str) -> str
+        now = self.clock()
+        with self._lock:
+            while self._fired and now - self._fired[0] >= 60:
+                self._fired.popleft()
+            if self._pending_since is not None:
+                result = RESULT_COALESCED
+            elif len(self._fired) >= self.max_per_minute or \
+                    (self.budget_check is not None and not self.budget_check()):
+                result = RESULT_RATE_LIMITED
+            else:
+                self._pending_since = now
+                self._event.set()
+                result = RESULT_ACCEPTED
+        NUDGES.inc(result=result)
+        log.info("넛지 (%s): %s", source, result, extra={"tag": "NUDGE", "source": source, "result": result})
+        return result
+
+    def wait(self, timeout):
+        # type: (float) -> bool
+        """timeout 초 대기. 넛지로 깼으면 (debounce / 최소 간격을 채운 뒤) True."""
+        if not self._event.wait(max(0.0, timeout)):
+            return False
+        with self._lock:
+            pending = self._pending_since
+        if pending is None:   # interrupt()
+            self._event.clear()
+            return False
+        not_before = pending + self.debounce
+        if self._last_fire is not None:
+            not_before = max(not_before, self._last_fire + self.min_gap)
+        delay = not_before - self.clock()
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            now = self.clock()
+            self._event.clear()
+            self._pending_since = None
+            self._last_fire = now
+            self._fired.append(now)
+        return True
+
+    def interrupt(self):
+        """종료 시 대기 중인 루프를 바로 깨움 (폴링으로 세지 않음)."""
+        self._event.set()
+
+    # ── listener_metrics 라우트 ──
+    def http_route(self, query):
+        # type: (dict) -> Tuple[int, str]
+        source = (query.get("source") or ["http"])[0]
+        if not _SOURCE_RE.match(source):
+            source = "other"
+        result = self.nudge(source)
+        status = 429 if result == RESULT_RATE_LIMITED else 202
+        return status, json.dumps({"result": result})
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# CLI (운영자 / 알림 중계용)
+# ═════════════════════════════════════════════════════════════════════════════
+
+def send_nudge(port, source="operator", host="127.0.0.1", timeout=5):
+    # type: (int, str, str, float) -> Tuple[int, str]
+    from urllib.error import HTTPError
+    from urllib.parse import urlencode
+    from urllib.request import Request, urlopen
+
+    url = "http://{}:{}{}?{}".format(host, port, NUDGE_PATH, urlencode({"source": source}))
+    try:
+        with urlopen(Request(url, data=b"", method="POST"), timeout=timeout) as resp:
+            return resp.status, json.loads(resp.read().decode("utf-8")).get("result", "")
+    except HTTPError as e:
+        return e.code, json.loads(e.read().decode("utf-8") or "{}").get("result", "")
+
+
+def parse_args(argv=None):
+    from config import LISTENER_METRICS_PORT
+
+    p = argparse.ArgumentParser(description="실행 중인 리스너에 즉시 폴링 요청 (넛지)")
+    p.add_argument("--port", type=int, default=LISTENER_METRICS_PORT, help="리스너 지표 포트 (기본: LISTENER_METRICS_PORT)")
+    p.add_argument("--source", default="operator", help="로그/지표에 남길 출처 (영문/숫자 32자)")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+    args = parse_args(argv)
+    try:
+        status, result = send_nudge(args.port, args.source)
+    except OSError as e:
+        print("리스너 연결 실패 (127.0.0.1:{}): {}".format(args.port, e))
+        return 1
+    print("넛지: HTTP {} {}".format(status, result))
+    return 0 if status == 202 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+price_sync.py
+─────────────────────────────────────────────────────────────────────────────
+서버 단가표(GET /prices) → 메모리 단가표 동기화
+
+리스너는 ss_pipeline.pricing 의 메모리 단가표(_ADMIN_PRICES_CACHE)로 자재 단가를 매깁니다.
+원본은 서버 admin_prices 테이블이므로, 주기적으로 바뀐 항목만 받아 반영합니다.
+
+조회 (interval 초마다, 폴링 사이클 시작 시):
+  증분  GET /prices?since=<cursor>   cursor = 지금까지 받은 가장 최근 timestamp (같은 시각 포함 → 재수신은 무시)
+  전체  GET /prices                  full_interval 초마다 또는 cursor 가 없을 때.
+                                     If-None-Match / If-Modified-Since → 304 면 본문 없음.
+                                     timestamp 는 관리자 PC 시각이라 늦게 찍힌 변경은 증분에서 빠질 수
+                                     있으므로, 전체 조회가 그 누락(과 삭제)을 바로잡습니다.
+  ?since 를 모르는 구버전 서버는 전체 표를 돌려주는데, 증분과 같이 병합하면 되므로 그대로 동작합니다.
+
+반영:
+  - 바뀐 항목이 있을 때만 새 dict 를 만들어 set_admin_prices() 로 한 번에 교체
+    (조회 쪽은 잠금 없이 이전 표 또는 새 표 중 하나를 온전히 봄)
+  - 조회 실패 시 기존 표 유지
+
+스냅샷 (snapshot_path, 기본 order_logs/admin_prices_snapshot.json):
+  표가 바뀌거나 전체 조회를 마치면 원자적으로 저장 (tmp → os.replace).
+  재시작 시 load_snapshot() 으로 먼저 채우고 cursor 부터 증분 조회 → 콜드 스타트에 전체 표를 다시 받지 않음.
+  스냅샷이 없으면 기존처럼 admin_prices.json 을 쓰다가 첫 전체 조회로 교체됩니다.
+  건수/결과는 /metrics 의 listener_price_sync_total{mode, result}, listener_price_entries.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from listener_metrics import PRICE_ENTRIES, PRICE_SYNC_BYTES, PRICE_SYNCS
+from ss_pipeline.pricing import _load_admin_prices_cache, set_admin_prices
+
+log = logging.getLogger("sammirack.listener.prices")
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FILENAME = "admin_prices_snapshot.json"
+
+MODE_FULL = "full"
+MODE_DELTA = "delta"
+
+
+def _max_timestamp(entries, start=None):
+    # type: (Dict[str, dict], Optional[str]) -> Optional[str]
+    """ISO 문자열은 사전순 = 시간순."""
+    latest = start or ""
+    for entry in entries.values():
+        ts = entry.get("timestamp") if isinstance(entry, dict) else None
+        if ts and ts > latest:
+            latest = ts
+    return latest or None
+
+
+class PriceSync(object):
+    def __init__(self, api_base, snapshot_path, interval=60, full_interval=3600, timeout=15, proxies=None):
+        # type: (str, str, float, float, int, Optional[dict]) -> None
+        self.api_base = api_base.rstrip("/")
+        self.snapshot_path = snapshot_path
+        self.interval = interval
+        self.full_interval = full_interval
+        self.timeout = timeout
+        self.proxies = proxies
+        self.version = 0              # 메모리 단가표를 교체할 때마다 +1
+        self.cursor = None            # type: Optional[str]
+        self._etag = None             # type: Optional[str]
+        self._last_modified = None    # type: Optional[str]
+        self._synced = False          # 서버 표(스냅샷 포함)를 한 번이라도 반영했는지
+        self._last_attempt = None     # type: Optional[float]
+        self._last_full = None        # type: Optional[float]   # time.time() (스냅샷에 저장)
+        self._lock = threading.Lock()
+
+    # ── 스냅샷 ──
+    def load_snapshot(self):
+        # type: () -> bool
+        """스냅샷으로 메모리 단가표를 채웁니다. 없거나 깨졌으면 False (admin_prices.json 유지)."""
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snap = json.load(f)
+            if snap.get("version") != SNAPSHOT_VERSION or not isinstance(snap.get("prices"), dict):
+                return False
+        except (OSError, ValueError) as e:
+            if os.path.exists(self.snapshot_path):
+                log.warning("단가 스냅샷 로드 실패 (무시): %s", e, extra={"tag": "PRICES"})
+            return False
+        with self._lock:
+            self._swap(snap["prices"])
+            self.cursor = snap.get("cursor")
+            self._etag = snap.get("etag")
+            self._last_modified = snap.get("lastModified")
+            self._last_full = snap.get("fullSyncedAt")
+            self._synced = True
+        log.info("단가 스냅샷 로드: %d건 (cursor=%s)", len(snap["prices"]), self.cursor,
+                 extra={"tag": "PRICES"})
+        return True
+
+    def _save_snapshot(self, prices):
+        # type: (dict) -> None
+        snap = {
+            "version": SNAPSHOT_VERSION,
+            "cursor": self.cursor,
+            "etag": self._etag,
+            "lastModified": self._last_modified,
+            "fullSyncedAt": self._last_full,
+            "prices": prices,
+        }
+        tmp = self.snapshot_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(snap, f, ensure_ascii=False)
+            os.replace(tmp, self.snapshot_path)
+        except OSError as e:
+            log.warning("단가 스냅샷 저장 실패: %s", e, extra={"tag": "PRICES"})
+
+    # ── 반영 ──
+    def _swap(self, prices):
+        # type: (dict) -> None
+        set_admin_prices(prices)
+        self.version += 1
+        PRICE_ENTRIES.set(len(prices))
+
+    def apply(self, entries, replace=False):
+        # type: (Dict[str, dict], bool) -> int
+        """
+        서버 응답 → 메모리 단가표. 바뀐 항목 수를 반환합니다 (0 이면 교체 안 함).
+        replace=True (전체 조회): 응답에 없는 항목은 삭제.
+        """
+        with self._lock:
+            current = _load_admin_prices_cache()
+            changed = [pid for pid, entry in entries.items() if current.get(pid) != entry]
+            removed = [pid for pid in current if pid not in entries] if replace else []
+            self.cursor = _max_timestamp(entries, None if replace else self.cursor)
+            if not (changed or removed) and self._synced:
+                return 0
+            if replace:
+                prices = dict(entries)
+            else:
+                prices = dict(current)
+                prices.update((pid, entries[pid]) for pid in changed)
+            self._swap(prices)
+            self._synced = True
+        return len(changed) + len(removed)
+
+    # ── 조회 ──
+    def _full_due(self):
+        # type: () -> bool
+        return (not self._synced or self.cursor is None or self._last_full is None
+                or time.time() - self._last_full >= self.full_interval)
+
+    def sync(self, full=None):
+        # type: (Optional[bool]) -> str
+        """GET /prices. 반환: "changed" / "unchanged" / "not_modified" / "error"."""
+        import api_transport
+
+        if full is None:
+            full = self._full_due()
+        mode = MODE_FULL if full else MODE_DELTA
+        self._last_attempt = time.monotonic()
+        headers = {}   # type: Dict[str, str]
+        params = None  # type: Optional[dict]
+        if full:
+            if self._synced and self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._synced and self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+        else:
+            params = {"since": self.cursor}
+        changed = 0
+        try:
+            resp = api_transport.get("{}/prices".format(self.api_base), "prices_fetch", params=params,
+                                     headers=headers, proxies=self.proxies, timeout=self.timeout)
+            if resp.status_code == 304:
+                result = "not_modified"
+            else:
+                resp.raise_for_status()
+                PRICE_SYNC_BYTES.inc(len(resp.content), mode=mode)
+                entries = resp.json() or {}
+                if not isinstance(entries, dict):
+                    raise ValueError("예상치 못한 응답 형식: {}".format(type(entries).__name__))
+                changed = self.apply(entries, replace=full)
+                result = "changed" if changed else "unchanged"
+                if full:
+                    self._etag = resp.headers.get("ETag")
+                    self._last_modified = resp.headers.get("Last-Modified")
+            if full:
+                self._last_full = time.time()
+        except Exception as e:
+            log.warning("단가표 동기화 실패 (기존 단가 유지): %s", e, extra={"tag": "PRICES"})
+            result = "error"
+        PRICE_SYNCS.inc(mode=mode, result=result)
+        if changed or (full and result != "error"):
+            self._save_snapshot(_load_admin_prices_cache())
+        if changed:
+            log.info("단가표 %s 동기화: %d건 변경 (v%d, cursor=%s)", mode, changed, self.version, self.cursor,
+                     extra={"tag": "PRICES"})
+        return result
+
+    def maybe_sync(self):
+        # type: () -> Optional[str]
+        """마지막 시도 후 interval 이 지났으면 동기화."""
+        if self._last_attempt is None or time.monotonic() - self._last_attempt >= self.interval:
+            return self.sync()
+        return None
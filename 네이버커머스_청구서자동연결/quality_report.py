@@ -3,10 +3,10 @@ import os
 import json
 from datetime import datetime
 
-# Ensure we can import order_listener
+# Ensure we can import ss_pipeline
 sys.path.append(os.getcwd())
 
-from order_listener import build_grouped_document, KST
+from ss_pipeline import build_grouped_document, KST
 
 def generate_quality_report():
     # Mock a real Smartstore order group based on analysis
@@ -13,38 +13,43 @@ purchase_ss_* 문서들의 updated_at을 원래 값으로 복원.
 사용법:
   python restore_ss_timestamps.py --api http://139.150.11.53/api
   python restore_ss_timestamps.py --api http://139.150.11.53/api --execute
+
+  서버 로컬 (sammi.db 직접, 타임스탬프 컬럼만 읽고 updated_at 만 UPDATE):
+  python3 restore_ss_timestamps.py --db-path /home/rocky/db/sammi.db --execute
 """
-import sys, io, argparse, json, requests
+import sys, os, io, argparse
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from document_store import FIELDS_TIMESTAMPS, SqliteDocumentStore, add_store_arguments, store_from_args
 
 def parse_args():
     p = argparse.ArgumentParser()
     p.add_argument("--execute", action="store_true", help="실제 반영 (기본: DRY_RUN)")
-    p.add_argument("--api", default="http://localhost/api")
+    add_store_arguments(p)
+    p.add_argument("--batch-size", type=int, default=50, help="저장 batch 크기 (기본: 50)")
     return p.parse_args()
 
 def main():
     args = parse_args()
     dry_run = not args.execute
-    api = args.api.rstrip("/")
+    store = store_from_args(args, readonly=dry_run)
+    direct = isinstance(store, SqliteDocumentStore)
 
     print("=" * 60)
     print("purchase_ss updated_at 복원")
     print("  모드: {}".format("DRY_RUN" if dry_run else "EXECUTE"))
+    print("  소스: {}".format(store.name))
     print("=" * 60)
 
-    # 전체 문서 조회
-    resp = requests.get("{}/documents".format(api), timeout=30)
-    resp.raise_for_status()
-    all_docs = resp.json()
-
-    # purchase_ss_* 필터
-    ss_docs = {k: v for k, v in all_docs.items()
-               if k.startswith("purchase_ss_") and not v.get("deleted")}
+    # purchase_ss_* 조회 (SQLite 는 타임스탬프 컬럼만 SELECT)
+    ss_docs = store.load_documents(prefix="purchase_ss_", fields=FIELDS_TIMESTAMPS,
+                                   include_deleted=False)
     print("purchase_ss 문서: {}건".format(len(ss_docs)))
 
     patched = 0
     skipped = 0
+    pending_saves = {}
 
     for doc_id, doc in sorted(ss_docs.items()):
         created_at = doc.get("createdAt", "")
@@ -72,25 +77,24 @@ def main():
         print("  🔄 {} | {} → {}".format(doc_id[-20:], updated_at[:22], restore_to[:22]))
 
         if not dry_run:
-            # POST /documents/save 로 updated_at만 변경 (나머지 그대로)
-            payload = {"docId": doc_id}
-            payload.update(doc)
-            payload["updatedAt"] = restore_to
-            payload["updated_at"] = restore_to
-
-            # items/materials가 list인지 확인
-            if isinstance(payload.get("items"), list):
-                payload["items"] = payload["items"]
-            if isinstance(payload.get("materials"), list):
-                payload["materials"] = payload["materials"]
-
-            r = requests.post("{}/documents/save".format(api), json=payload, timeout=30)
-            if r.status_code < 300:
-                print("    ✅ 저장 완료")
+            if direct:
+                # updated_at 컬럼만 UPDATE (나머지 컬럼은 건드리지 않음)
+                payload = {"updatedAt": restore_to}
             else:
-                print("    ❌ 저장 실패: HTTP {}".format(r.status_code))
+                # bulk-save 는 문서 전체를 덮어쓰므로 나머지 필드 그대로 포함
+                payload = dict(doc)
+                payload["updatedAt"] = restore_to
+                payload["updated_at"] = restore_to
+            pending_saves[doc_id] = payload
         patched += 1
 
+    if pending_saves:
+        saved, failed_ids = store.save_documents(pending_saves, batch_size=args.batch_size)
+        print("\n  ✅ 저장 완료: {}건".format(saved))
+        for doc_id in failed_ids:
+            print("  ❌ 저장 실패: {}".format(doc_id))
+    store.close()
+
     print("\n" + "=" * 60)
     print("수정: {}건 | 건너뜀: {}건".format(patched, skipped))
     if dry_run:
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+ss_pipeline
+─────────────────────────────────────────────────────────────────────────────
+스마트스토어 주문 → 청구서 변환 코어 (파싱 / 그룹핑 / BOM / 문서 생성)
+
+order_listener 에서 네트워크·저장과 무관한 부분만 떼어 낸 패키지입니다.
+  - 표준 라이브러리 + listener_metrics(계측) 만 import (requests / config / http.server 없음)
+  - import 시 파일 I/O 없음: admin_prices.json, materialOrder.json, 규격 카탈로그
+    (public/data.json → catalog.get_catalog()) 는 첫 사용 때 로드
+
+  from ss_pipeline import group_orders_by_session, build_grouped_document
+
+주문행은 SmartstoreOrder (ss_pipeline.order) 로 한 번만 파싱해 넘깁니다. 기존 한글 키 dict 도
+그대로 받습니다 (각 단계에서 as_order 로 변환).
+
+단계 교체 / 병렬 실행은 하위 모듈을 직접 import 합니다:
+  ss_pipeline.stages : 단계 인터페이스 (source → parser → grouper → BOM → pricer → sinks)
+  ss_pipeline.runner : Pipeline (serial / thread / process 실행기)
+  ss_pipeline.regen  : RegenEngine (기존 문서 일괄 재생성 + diff 리포트 / batch 저장)
+  (runner / regen 은 concurrent.futures 를 쓰므로 여기서 자동 import 하지 않음)
+
+order_listener 는 기존 이름을 그대로 다시 내보내므로 `from order_listener import ...`
+를 쓰는 스크립트는 그대로 동작합니다 (대신 requests/config 까지 함께 로드됨).
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+from .bom import build_item_name, build_material_item, generate_bom_for_rack
+from .catalog import get_catalog
+from .document import build_grouped_document, material_order_rules
+from .grouping import KST, group_orders_by_session
+from .order import SmartstoreOrder, as_order
+from .pricing import set_admin_prices
+from .racks import (
+    classify_row,
+    filter_korean,
+    get_rack_type,
+    is_supported_rack,
+    map_highrack_color,
+    map_pallet_size_key,
+    parse_smartstore_option,
+)
+
@@ -0,0 +1,562 @@
+# -*- coding: utf-8 -*-
+"""
+ss_pipeline/bom.py
+─────────────────────────────────────────────────────────────────────────────
+품목명 / 원자재(BOM) 생성 + partId·inventoryPartId 규칙
+(React regenerateBOMFromOptions / generateInventoryPartId 재현)
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import re
+from typing import Callable, List, Optional, Tuple
+
+from listener_metrics import timed
+
+from .catalog import get_catalog
+from .order import as_order
+from .pricing import _lookup_admin_price
+from .racks import (
+    filter_korean,
+    get_rack_type,
+    map_highrack_color,
+    map_pallet_size_key,
+    parse_smartstore_option,
+)
+
+
+def build_item_name(order):
+    # type: (dict) -> str
+    """주문 1행 → items[].name 문자열 생성."""
+    o     = as_order(order)
+    pname = o.product_name
+    optv  = o.option
+    
+    rtype  = get_rack_type(pname, optv)
+    parsed = parse_smartstore_option(optv)
+    
+    # 랙 타입별 기본 이름
+    base_name = rtype if rtype and rtype != "기타" else pname
+    
+    # 규격 문자열 구성 (사이즈 -> 높이 -> 단수 순서)
+    dims = []
+    
+    cat = get_catalog()
+
+    # 1. 사이즈 (WxD)
+    if rtype in ("파렛트랙", "파렛트랙 철판형") and parsed.get("width") and parsed.get("length"):
+        size_key, is_iron = map_pallet_size_key(
+            parsed["width"], parsed["length"], pname, parsed
+        )
+        if size_key:
+            dims.append(size_key)
+            if is_iron and base_name == "파렛트랙":
+                base_name = "파렛트랙 철판형"
+        else:
+            dims.append("{}x{}".format(parsed["width"], parsed["length"]))
+    elif parsed.get("width") and parsed.get("length"):
+        w = int(parsed["width"])
+        d = int(parsed["length"])
+        # 하이랙: cm 단위 (45/60 x 108/150/200)
+        if rtype == "하이랙":
+            w = cat.nearest(rtype, "name_depth_cm", w)
+            d = cat.nearest(rtype, "width_cm", d)
+        # 경량랙/중량랙: SS는 depth x width (cm), 유효값은 mm
+        elif rtype in ("경량랙", "중량랙"):
+            d_mm = cat.nearest(rtype, "depth_mm", w * 10)
+            w_mm = cat.nearest(rtype, "width_mm", d * 10)
+            w = d_mm // 10
+            d = w_mm // 10
+        dims.append("{}x{}".format(w, d))
+    elif parsed.get("size_raw"):
+        dims.append(parsed["size_raw"])
+        
+    # 2. 높이
+    if parsed.get("height"):
+        dims.append(str(parsed["height"]))
+        
+    # 3. 단수
+    if parsed.get("dan"):
+        dan_val = str(parsed["dan"])
+        m = re.search(r'(\d+)', dan_val)
+        dims.append("{}단".format(m.group(1)) if m else dan_val)
+        
+    spec_str = " ".join(dims)
+    full_name = filter_korean("{} {}".format(base_name, spec_str).strip())
+    
+    # 4. 옵션 (색상/중량)
+    if rtype == "하이랙" and parsed.get("color"):
+        full_name += " " + map_highrack_color(parsed["color"])
+    elif parsed.get("color"):
+        full_name += " " + parsed["color"]
+        
+    # 최소한의 이름 보장 (내용이 너무 없으면 상품명 반환)
+    if len(full_name) < len(base_name) + 2:
+        return pname
+        
+    return full_name
+
+
+def build_material_item(order, main_rack_type=""):
+    # type: (dict, str) -> dict
+    """
+    추가부품(addon) 주문 1행 → materials[] 한 행.
+    """
+    o            = as_order(order)
+    product_name = o.product_name
+    option_str   = o.option
+    qty          = o.quantity or 1
+    total        = o.amount
+    unit_price = total // qty if qty else total
+
+    # 괄호 안 텍스트에서 부품명 추출
+    m = re.search(r'[（(]([^）)]+)[）)]', product_name)
+    mat_name = m.group(1) if m else product_name
+
+    # 규격: 옵션(더 상세함) -> 상품명 순으로 숫자×숫자(×숫자) 추출
+    # 80x206 600kg 같은 경우 600이 3번째 숫자로 잡히지 않도록 구분자(x, X, *, ×)를 명시
+    dim_pattern = r'(\d+)\s*[xX×*]\s*(\d+)(?:\s*[xX×*]\s*(\d+))?'
+    m2 = re.search(dim_pattern, option_str)
+    if not m2:
+        m2 = re.search(dim_pattern, product_name)
+    
+    if m2:
+        if m2.group(3):
+            spec = "{}x{}x{}".format(m2.group(1), m2.group(2), m2.group(3))
+        else:
+            spec = "{}x{}".format(m2.group(1), m2.group(2))
+    else:
+        spec = product_name
+
+    # 로드빔 계열 처리
+    if "로드빔" in option_str or "로드빔" in product_name:
+        mat_name = "로드빔 + 철판형"
+        mw = re.search(r'(\d+)kg', option_str, re.IGNORECASE)
+        if mw:
+            mat_name += " {}kg".format(mw.group(1))
+        mn = re.search(r'(\d{3,4})\(', product_name)
+        spec = mn.group(1) if mn else spec
+    elif "선반" in mat_name:
+        mat_name = re.sub(r'([가-힣])선반', r'\1 선반', mat_name)
+    elif "기둥" in mat_name:
+        mat_name = re.sub(r'([가-힣])기둥', r'\1 기둥', mat_name)
+
+    # 하이랙인 경우 색상/중량 추출
+    cw = ""
+    color = ""
+    if main_rack_type == "하이랙":
+        combined = product_name + " " + option_str
+        cw = map_highrack_color(combined)
+        
+    return {
+        "name":          mat_name,
+        "rackType":      main_rack_type,
+        "specification": spec,
+        "quantity":      qty,
+        "unitPrice":     unit_price,
+        "totalPrice":    total,
+        "note":          "",
+        "ssSource":      "addon",
+        "colorWeight":   cw,
+        "color":         color
+    }
+
+
+# ── BOM 재생성 로직 (React regenerateBOMFromOptions 100% 재현) ───────────────
+
+def _parse_wd(size_str):
+    # type: (str) -> Tuple[Optional[int], Optional[int]]
+    """숫자xD 형식에서 w, d 추출. 한글 섞여 있어도 숫자만 추출."""
+    if not size_str: return None, None
+    # 무게 표기(예: 3000kg, 2000Kg) 먼저 제거
+    s = re.sub(r'\d+\s*[kK][gG]', '', str(size_str))
+    # 한글 등 제거하고 숫자와 구분자만 남기기
+    cleaned = re.sub(r'[^\d.xX*×]', '', s)
+    m = re.search(r'(\d+)\s*[xX*×]\s*(\d+)', cleaned)
+    if m:
+        return (int(m.group(1)), int(m.group(2)))
+    # fallback: 원본에서 시도
+    m = re.search(r'(\d+)[^\d]*[xX*×][^\d]*(\d+)', str(size_str))
+    return (int(m.group(1)), int(m.group(2))) if m else (None, None)
+
+def _parse_level(dan_str):
+    # type: (str) -> int
+    m = re.search(r'(\d+)', str(dan_str or ""))
+    return int(m.group(1)) if m else 1
+
+
+# ── partId / inventoryPartId 생성 (JS generateInventoryPartId 재현) ──────────
+
+def _generate_part_id(rack_type, name, specification):
+    # type: (str, str, str) -> str
+    """JS generatePartId 재현: '{rackType}-{name}-{spec}' (소문자, 공백제거)."""
+    clean_name = re.sub(r'\s+', '', str(name)).replace('*', 'x')
+    clean_name = re.sub(r'[()]', '', clean_name).lower()
+    clean_spec = re.sub(r'\s+', '', str(specification or '')).replace('*', 'x').lower()
+    return "{}-{}-{}".format(rack_type, clean_name, clean_spec)
+
+
+@timed("part_id")
+def _generate_inventory_part_id(rack_type, name, specification, color="", color_weight="", version=""):
+    # type: (str, str, str, str, str, str) -> str
+    """
+    JS generateInventoryPartId 100% 재현.
+    재고 관리용 ID 생성 (색상 포함).
+    """
+    rt = str(rack_type)
+
+    # 파렛트랙 + 신형 → 파렛트랙신형
+    if rt == "파렛트랙" and version == "신형":
+        rt = "파렛트랙신형"
+
+    clean_name = re.sub(r'\s+', '', str(name)).replace('*', 'x')
+
+    cat = get_catalog()
+
+    def _snap_dimension(val_str, dim, tolerance=10):
+        # 하이랙 치수표(dim)에서 tolerance 이내 최근접값, 없으면 원래 문자열
+        num_str = re.sub(r'\D', '', val_str)
+        if not num_str:
+            return val_str
+        best = cat.snap("하이랙", dim, int(num_str), tolerance)
+        return val_str if best is None else str(best)
+
+    # ── 하이랙 전용 처리 ──
+    if rt == "하이랙":
+        # 기본 부품명 추출
+        if "기둥" in clean_name:
+            base_name = "기둥"
+        elif "선반" in clean_name:
+            base_name = "선반"
+        elif "로드빔" in clean_name:
+            base_name = "로드빔"
+        else:
+            base_name = clean_name
+
+        # 색상+속성 결정
+        target_str = clean_name + str(color or '') + str(color_weight or '')
+        color_attr = ""
+        if "아이보리" in target_str:
+            color_attr = "아이보리(볼트식)"
+        elif "메트그레이" in target_str or "매트그레이" in target_str:
+            color_attr = "메트그레이(볼트식)"
+        elif "블루" in target_str or "오렌지" in target_str:
+            if (base_name == "로드빔" or "빔" in target_str) and "600kg" in target_str:
+                color_attr = "블루(기둥.선반)+오렌지(빔)"
+            else:
+                color_attr = "블루(기둥)+오렌지(가로대)(볼트식)"
+
+        # 중량 추출 (기본 270kg)
+        # 중요: clean_name뿐만 아니라 specification, color, color_weight 전체에서 중량 검색
+        weight_attr = "270kg"
+        search_target = clean_name + str(specification or '') + str(color or '') + str(color_weight or '')
+        if "450kg" in search_target:
+            weight_attr = "450kg"
+        elif "600kg" in search_target:
+            weight_attr = "600kg"
+        elif "270kg" in search_target:
+            weight_attr = "270kg"
+
+        # 규격 처리
+        clean_spec = re.sub(r'\s+', '', str(specification or '')).replace('*', 'x')
+        clean_spec = re.sub(r'(270|450|600)kg', '', clean_spec)  # 중량 중복 제거
+
+        if base_name == "기둥":
+            # 하이랙 기둥 인벤토리 규격: '사이즈{폭}x높이{높이}{중량}'
+            # clean_spec에서 숫자만 추출하여 폭과 높이를 스냅
+            nums = re.findall(r'(\d+)', clean_spec)
+            if len(nums) >= 3:
+                # DxWxH -> 첫번째가 폭(45,60,80), 세번째가 높이 (가운데 width는 무시)
+                width_part = _snap_dimension(nums[0], "depth_cm", tolerance=20)
+                height_part = _snap_dimension(nums[2], "height_cm", tolerance=50)
+            elif len(nums) == 2:
+                # WxH (Addon) -> 첫번째가 폭(깊이), 두번째가 높이
+                width_part = _snap_dimension(nums[0], "depth_cm", tolerance=20)
+                height_part = _snap_dimension(nums[1], "height_cm", tolerance=50)
+            else:
+                # 숫자가 하나만 있으면 높이로 간주하고 폭은 기본값 60
+                width_part = '60'
+                height_part = _snap_dimension(nums[0] if nums else '150', "height_cm", tolerance=50)
+            
+            final_spec = "사이즈{}x높이{}{}".format(width_part, height_part, weight_attr)
+        elif base_name == "선반":
+            m = re.search(r'(\d+)x(\d+)', clean_spec)
+            if m:
+                d_part = _snap_dimension(m.group(1), "depth_cm")
+                w_part = _snap_dimension(m.group(2), "width_cm")
+                size_part = "{}x{}".format(d_part, w_part)
+            else:
+                sm = re.search(r'(\d+)', clean_spec)
+                size_part = sm.group(1) if sm else '45x108'
+            final_spec = "사이즈{}{}".format(size_part, weight_attr)
+        elif base_name == "로드빔":
+            lm = re.search(r'(\d+)', clean_spec)
+            length_part = _snap_dimension(lm.group(1) if lm else '108', "width_cm")
+            final_spec = "{}{}".format(length_part, weight_attr)
+        else:
+            final_spec = clean_spec
+
+        return "하이랙-{}{}{}-{}".format(base_name, color_attr, weight_attr, final_spec)
+
+    # ── 경량랙: color가 있으면 이름에 포함 ──
+    clean_name_lower = clean_name.lower()
+    if rt == "경량랙" and color:
+        clean_color = re.sub(r'\s+', '', str(color)).lower()
+        clean_name_lower = "{}{}".format(clean_name_lower, clean_color)
+
+    # ── 하이랙 외 일반 처리 ──
+    clean_name_lower = re.sub(r'[()]', '', clean_name_lower)
+    clean_spec = re.sub(r'\s+', '', str(specification or '')).replace('*', 'x').lower()
+    return "{}-{}-{}".format(rt, clean_name_lower, clean_spec)
+
+
+def _extract_weight_from_color(color_str):
+    # type: (str) -> str
+    """색상 문자열에서 중량만 추출. 예: 메트그레이(볼트식)270kg → 270kg"""
+    m = re.search(r'(\d{2,4}kg)', str(color_str or ''), re.IGNORECASE)
+    return m.group(1) if m else ""
+
+
+@timed("bom")
+def generate_bom_for_rack(rack_type, option_data, quantity, pricer=None):
+    # type: (str, dict, int, Optional[Callable[[str], int]]) -> List[dict]
+    """
+    rack_type과 옵션을 기반으로 실제 자재 명세(BOM)를 생성합니다.
+    React의 bomRegeneration.js 로직을 100% 구현합니다.
+
+    각 material에 다음 필드를 포함합니다:
+      name, rackType, specification, quantity, unitPrice, totalPrice, note,
+      colorWeight, color, partId, _inventoryPartId, _inventoryList
+
+    pricer: part_id → 단가. 생략하면 admin_prices.json (_lookup_admin_price).
+    """
+    price_of = pricer or _lookup_admin_price
+    qty = int(quantity)
+    res = []
+
+    sz = option_data.get("size_raw", "")
+    # "추가상품구매" 등의 플레이스홀더 처리
+    if sz and "추가" in sz:
+        sz = ""
+    
+    w, d = _parse_wd(sz)
+    ht_raw = str(option_data.get("height", ""))
+    if "추가" in ht_raw:
+        ht_raw = ""
+        
+    dan = _parse_level(option_data.get("dan", "1"))
+    form = option_data.get("rack_type_hint", "독립형")
+    color = option_data.get("color", "")
+
+    # ═══ 하이랙 ═══════════════════════════════════════════════════════════════
+    # 하이랙 SS 옵션: 선반(폭cm+가로cm)x기둥(높이cm): 60(폭)x108(가로)x200(높이)
+    # → w=폭(깊이), d=가로(로드빔 길이cm), h=높이
+    # 시스템 키: 기둥 → 사이즈{w}x{d}높이{h}{weight}, 선반 → 사이즈{w}x{d}{weight}, 로드빔 → {d}{weight}
+    if rack_type == "하이랙":
+        cw = map_highrack_color(color)  # 예: 메트그레이(볼트식)270kg
+        weight_only = _extract_weight_from_color(cw)
+        pillar_qty = (2 if form == "연결형" else 4) * qty
+        rod_beam_d = str(d) if d else ""  # d = 가로cm (로드빔 길이)
+        shelf_per_level = 2 if d in (150, 200) else 1
+
+        # 기둥: 사이즈{w}x{d}높이{h}{weight}
+        if w and d:
+            g_spec = "사이즈 {}x{}높이{} {}".format(w, d, ht_raw, weight_only).strip()
+        else:
+            g_spec = "높이 {} {}".format(ht_raw, weight_only).strip()
+        res.append({"name": "기둥", "rackType": rack_type, "specification": g_spec,
+                    "quantity": pillar_qty, "colorWeight": cw, "color": "", "ssSource": "main"})
+        # 로드빔: {d}{weight}
+        r_spec = "{} {}".format(rod_beam_d, weight_only).strip() if rod_beam_d else weight_only
+        res.append({"name": "로드빔", "rackType": rack_type, "specification": r_spec,
+                    "quantity": 2 * dan * qty, "colorWeight": cw, "color": "", "ssSource": "main"})
+        # 선반: 사이즈{w}x{d}{weight}
+        if w and d:
+            s_spec = "사이즈 {}x{} {}".format(w, d, weight_only).strip()
+        else:
+            s_spec = "사이즈 {} {}".format(sz, weight_only).strip() if sz else weight_only
+        res.append({"name": "선반", "rackType": rack_type, "specification": s_spec,
+                    "quantity": shelf_per_level * dan * qty, "colorWeight": cw, "color": "", "ssSource": "main"})
+
+    # ═══ 파렛트랙 / 파렛트랙 철판형 ══════════════════════════════════════════
+    # 파렛트랙 SS 옵션: 폭x길이(단당2000Kg): 1000x1480(연결형)2000kg
+    # → w=폭(깊이=1000mm), d=길이(로드빔 길이mm)
+    # 시스템: 로드빔 spec = d(1390/2590/2790), 타이빔 = 1000(깊이 고정), 브레싱 = 1000
+    elif rack_type in ("파렛트랙", "파렛트랙 철판형"):
+        is_iron = (rack_type == "파렛트랙 철판형")
+        post_qty = (2 if form == "연결형" else 4) * qty
+
+        # 파렛트랙 기둥 높이: 이미 mm 단위 (3000, 2000 등)
+        ht_mm = ht_raw
+        try:
+            ht_num = int(ht_raw)
+            if ht_num <= 600:  # 600 이하이면 cm로 간주 → mm 변환
+                ht_mm = str(ht_num * 10)
+        except (ValueError, TypeError):
+            pass
+
+        # 파렛트랙 로드빔 길이 = d (SS의 길이/가로 값)
+        # SS 1480 → 시스템 1390 매핑 (가장 가까운 유효 규격)
+        rod_len = d if d else 0
+        if rod_len > 0:
+            rod_len = get_catalog().nearest("파렛트랙", "rodbeam_mm", rod_len)
+        rod_spec = str(rod_len) if rod_len else ""
+
+        # 파렛트랙 깊이 = w (SS의 폭 값, 보통 1000)
+        depth_val = w if w else 1000
+
+        # 기둥
+        res.append({"name": "기둥", "rackType": rack_type, "specification": ht_mm,
+                    "quantity": post_qty, "colorWeight": "", "color": "", "ssSource": "main"})
+        # 로드빔
+        res.append({"name": "로드빔", "rackType": rack_type, "specification": rod_spec,
+                    "quantity": 2 * dan * qty, "colorWeight": "", "color": "", "ssSource": "main"})
+
+        if is_iron:
+            # 철판 선반: 사이즈 {로드빔}x{깊이}
+            shelf_per_level = 2 if rod_len in (1380, 1390) else (3 if rod_len in (2080, 2090) else (4 if rod_len in (2580, 2590, 2710, 2790) else 1))
+            iron_sz = "사이즈 {}x{}".format(rod_len, depth_val)
+            res.append({"name": "선반", "rackType": rack_type, "specification": iron_sz,
+                        "quantity": shelf_per_level * dan * qty, "colorWeight": "", "color": "", "ssSource": "main"})
+        else:
+            # 타이빔: 깊이 (항상 1000)
+            tie_spec = str(depth_val)
+            res.append({"name": "타이빔", "rackType": rack_type, "specification": tie_spec,
+                        "quantity": 2 * dan * qty, "colorWeight": "", "color": "", "ssSource": "main"})
+
+        # 안전핀
+        res.append({"name": "안전핀", "rackType": rack_type, "specification": "",
+                    "quantity": 2 * dan * 2 * qty, "colorWeight": "", "color": "", "ssSource": "main"})
+        # 하드웨어: 브레싱 spec은 깊이 (1000)
+        brace_spec = str(depth_val)
+        res.append({"name": "수평브레싱", "rackType": rack_type, "specification": brace_spec,
+                    "quantity": (2 if form == "연결형" else 4) * qty, "colorWeight": "", "color": "", "ssSource": "main"})
+        res.append({"name": "경사브레싱", "rackType": rack_type, "specification": brace_spec,
+                    "quantity": (2 if form == "연결형" else 4) * qty, "colorWeight": "", "color": "", "ssSource": "main"})
+        res.append({"name": "앙카볼트", "rackType": rack_type, "specification": "",
+                    "quantity": (2 if form == "연결형" else 4) * qty, "colorWeight": "", "color": "", "ssSource": "main"})
+        res.append({"name": "브레싱볼트", "rackType": rack_type, "specification": "",
+                    "quantity": post_qty * 3, "colorWeight": "", "color": "", "ssSource": "main"})
+
+    # ═══ 스텐랙 ══════════════════════════════════════════════════════════════
+    # 스텐랙 SS: "스텐선반추가(단위cm) 폭x길이: 50x180" → height는 별도 또는 기본 210
+    elif rack_type == "스텐랙":
+        # 높이가 없으면 기본값 210 (SOURCE_OF_TRUTH: EXTRA_OPTIONS 고정)
+        ht_val = ht_raw if ht_raw and ht_raw != "None" else "210"
+        ht_spec = "높이{}".format(ht_val)
+        # 선반 사이즈: WxD 형식
+        sz_spec = "사이즈{}".format(sz) if sz else ""
+        res.append({"name": "기둥", "rackType": rack_type, "specification": ht_spec,
+                    "quantity": 4 * qty, "colorWeight": "", "color": "", "ssSource": "main"})
+        res.append({"name": "선반", "rackType": rack_type, "specification": sz_spec,
+                    "quantity": dan * qty, "colorWeight": "", "color": "", "ssSource": "main"})
+
+    # ═══ 경량랙 / 중량랙 ═════════════════════════════════════════════════════
+    # 경량랙 SS: "색상: 블랙 / 규격: 30x75 / 높이: 75 / 단수: 2단"
+    #   → SS '규격: 30x75' = 폭(앞뒤=깊이)x가로(좌우=폭).
+    #   → 30cm = depth(D300), 75cm = width(W700에 가장 가까운 유효값)
+    # 중량랙 SS: "폭(앞뒤)x가로(좌우): 45x185"
+    #   → 45cm = depth(D450), 185cm = width(W1800에 가장 가까운)
+    # 공통: SS의 첫번째 숫자 = depth, 두번째 = width
+    elif rack_type in ("경량랙", "중량랙"):
+        post_qty = (2 if form == "연결형" else 4) * qty
+
+        # ⚠️ w, d 반전: SS의 parse결과 w=첫째(깊이), d=둘째(폭/가로)
+        ss_depth_cm = w   # SS 첫번째 숫자 = 깊이(앞뒤)
+        ss_width_cm = d   # SS 두번째 숫자 = 폭(좌우/가로)
+
+        # cm → mm 변환 (경량랙/중량랙 공통)
+        depth_mm = ss_depth_cm * 10 if ss_depth_cm and ss_depth_cm <= 200 else (ss_depth_cm or 0)
+        width_mm = ss_width_cm * 10 if ss_width_cm and ss_width_cm <= 200 else (ss_width_cm or 0)
+        # 유효 규격 매핑 (카탈로그)
+        if width_mm > 0:
+            width_mm = get_catalog().nearest(rack_type, "width_mm", width_mm)
+        if depth_mm > 0:
+            depth_mm = get_catalog().nearest(rack_type, "depth_mm", depth_mm)
+
+        # 경량랙 색상 추출 (아이보리/블랙/실버)
+        rack_color = ""
+        if rack_type == "경량랙" and color:
+            raw_c = str(color).replace(" ", "")
+            if "블랙" in raw_c or "검정" in raw_c:
+                rack_color = "블랙"
+            elif "실버" in raw_c or "은색" in raw_c:
+                rack_color = "실버"
+            elif "아이보리" in raw_c or "백색" in raw_c or "흰" in raw_c:
+                rack_color = "아이보리"
+
+        # 기둥 spec: h{height_mm}
+        ht_mm_val = ht_raw
+        try:
+            ht_num = int(ht_raw)
+            if ht_num <= 300:
+                ht_mm_val = str(ht_num * 10)
+        except (ValueError, TypeError):
+            pass
+        g_spec = "h{}".format(ht_mm_val) if ht_mm_val else ""
+        res.append({"name": "기둥", "rackType": rack_type, "specification": g_spec,
+                    "quantity": post_qty, "colorWeight": "", "color": rack_color, "ssSource": "main"})
+
+        # 선반 spec: w{width}xd{depth}
+        if width_mm and depth_mm:
+            sel_spec = "w{}xd{}".format(width_mm, depth_mm)
+        else:
+            sel_spec = sz
+        res.append({"name": "선반", "rackType": rack_type, "specification": sel_spec,
+                    "quantity": dan * qty, "colorWeight": "", "color": rack_color, "ssSource": "main"})
+
+        # 받침(상/하) spec: d{depth_mm}
+        depth_spec = "d{}".format(depth_mm) if depth_mm else ""
+        res.append({"name": "받침(상)", "rackType": rack_type, "specification": depth_spec,
+                    "quantity": post_qty, "colorWeight": "", "color": rack_color, "ssSource": "main"})
+        res.append({"name": "받침(하)", "rackType": rack_type, "specification": depth_spec,
+                    "quantity": post_qty, "colorWeight": "", "color": rack_color, "ssSource": "main"})
+
+        # 연결대 spec: w{width_mm}
+        width_spec = "w{}".format(width_mm) if width_mm else ""
+        res.append({"name": "연결대", "rackType": rack_type, "specification": width_spec,
+                    "quantity": dan * qty, "colorWeight": "", "color": rack_color, "ssSource": "main"})
+
+        # 안전좌 / 안전핀
+        res.append({"name": "안전좌", "rackType": rack_type, "specification": "",
+                    "quantity": dan * qty, "colorWeight": "", "color": "", "ssSource": "main"})
+        res.append({"name": "안전핀", "rackType": rack_type, "specification": "",
+                    "quantity": dan * qty, "colorWeight": "", "color": "", "ssSource": "main"})
+
+    # ─── 모든 자재에 대해 공통 ID 및 단가 로드 (ID 생성 필수) ───
+    for r in res:
+        rt = r["rackType"]
+        nm = r["name"]
+        sp = r.get("specification", "")
+        cl = r.get("color", "")
+        cw = r.get("colorWeight", "")
+
+        version = "신형" if rt == "파렛트랙" else ""
+
+        r["partId"] = _generate_part_id(rt, nm, sp)
+        # _inventoryPartId 생성 (매우 중요: 테스트 코드 및 재고 연동 필수)
+        r["_inventoryPartId"] = _generate_inventory_part_id(
+            rt, nm, sp, color=cl, color_weight=cw, version=version
+        )
+        r["inventoryPartId"] = r["_inventoryPartId"]
+        
+        # _inventoryList (React 호환)
+        r["_inventoryList"] = [{
+            "inventoryPartId": r["_inventoryPartId"],
+            "quantity": r["quantity"],
+            "colorWeight": cw,
+            "color": cl,
+            "specification": sp,
+            "rackType": rt,
+            "name": nm,
+            "version": version
+        }]
+
+        # admin_prices에서 가격 조회
+        if not r.get("unitPrice"):
+            price = price_of(r["partId"])
+            if not price:
+                price = price_of(r["_inventoryPartId"])
+            r["unitPrice"] = price
+            r["totalPrice"] = price * r["quantity"]
+
+    return res
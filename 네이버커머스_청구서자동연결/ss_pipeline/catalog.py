@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+"""
+ss_pipeline/catalog.py
+─────────────────────────────────────────────────────────────────────────────
+랙 규격 카탈로그 — 유효 치수표 + O(1) 최근접 스냅
+
+  cat = get_catalog()
+  cat.nearest("경량랙", "width_mm", 950)                   → 900
+  cat.snap("파렛트랙", "rodbeam_mm", 1480, tolerance=100)   → 1390 (오차 초과면 None)
+
+원천 (프로젝트 루트 public/, React 앱과 같은 파일):
+  data.json           기본가격 사이즈/높이 키 → 랙 종류별 폭/깊이/높이
+  extra_options.json  추가상품 이름의 규격 (하이랙 기둥 높이 등)
+
+표마다 [최소값..최대값] 정수 구간의 최근접값 배열(LUT)을 미리 만들어 두므로
+스냅은 인덱스 한 번입니다 (동점이면 작은 값 — 기존 min(..., key=abs) 와 동일).
+
+컴파일 결과는 .cache/spec_catalog.json 에 저장하고, CATALOG_VERSION 이나
+원천 파일(크기/수정시각)이 바뀌면 다시 컴파일합니다. 원천 파일이 없거나 표를
+못 뽑으면 아래 내장 기본표를 씁니다 (리스너 폴더만 배포된 서버).
+import 만으로는 디스크를 건드리지 않습니다 (첫 get_catalog() 때 1회 로드).
+
+  python3 -m ss_pipeline.catalog [--refresh]   # 표 출력 + 내장 기본표와 다르면 경고 (exit 1)
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import bisect
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import Dict, List, Optional, Sequence
+
+log = logging.getLogger("sammirack.listener.catalog")
+
+# 컴파일 규칙을 바꾸면 올릴 것 (디스크 캐시 무효화)
+CATALOG_VERSION = 1
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_JSON_PATH = os.path.join(_PROJECT_ROOT, "public", "data.json")
+EXTRA_OPTIONS_PATH = os.path.join(_PROJECT_ROOT, "public", "extra_options.json")
+CATALOG_CACHE_PATH = os.environ.get("SS_CATALOG_CACHE") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "spec_catalog.json")
+
+# 원천 파일이 없을 때의 기본표 (기존 코드에 흩어져 있던 리터럴)
+BUILTIN_TABLES = {
+    "경량랙": {
+        "width_mm": [700, 900, 1000, 1200, 1500],
+        "depth_mm": [300, 450, 600],
+    },
+    "중량랙": {
+        "width_mm": [900, 1200, 1500, 1800],
+        "depth_mm": [450, 600, 900],
+    },
+    "하이랙": {
+        "depth_cm":      [45, 60, 80],
+        "width_cm":      [108, 150, 200],
+        "height_cm":     [150, 200, 250],
+        "name_depth_cm": [45, 60],   # 품목명 스냅용 (270/450kg, 600kg 전용 80 제외)
+    },
+    "파렛트랙": {
+        "rodbeam_mm": [1390, 2090, 2590, 2790],
+        "depth_mm":   [800, 1000],
+    },
+}  # type: Dict[str, Dict[str, List[int]]]
+
+# data.json 파렛트랙 기본가격 키(1380/2580/2780)는 시스템 size 키(1390/2590/2790)보다 10 작음
+_PALLET_KEY_OFFSET = 10
+# ProductContext EXTRA_OPTIONS 전용 로드빔 (철판형 2090x800 / 2090x1000) — data.json 에 없음
+_PALLET_EXTRA_RODBEAM = [2090]
+# 하이랙 600kg 색상 (깊이 80 전용 — 품목명 스냅에서 제외)
+_HIGHRACK_600KG = "600kg"
+
+_RACK_ALIASES = {"파렛트랙 철판형": "파렛트랙", "파렛트랙신형": "파렛트랙"}
+
+_SIZE_RE = re.compile(r"^(\d+)x(\d+)$")
+_EXTRA_SIZE_RE = re.compile(r"(\d+)x(\d+)")
+
+
+class Snapper(object):
+    """정렬된 유효값 목록 → 정수 구간 LUT. 구간 밖은 양 끝값."""
+
+    __slots__ = ("values", "lo", "hi", "_lut")
+
+    def __init__(self, values):
+        # type: (Sequence[int]) -> None
+        self.values = sorted(set(int(v) for v in values))
+        if not self.values:
+            raise ValueError("빈 치수표")
+        self.lo, self.hi = self.values[0], self.values[-1]
+        vals = self.values
+        lut = []
+        for v in range(self.lo, self.hi + 1):
+            i = bisect.bisect_left(vals, v)
+            if vals[i] == v or i == 0:
+                lut.append(vals[i])
+            else:
+                below, above = vals[i - 1], vals[i]
+                lut.append(below if v - below <= above - v else above)
+        self._lut = lut
+
+    def nearest(self, value):
+        # type: (int) -> int
+        if value <= self.lo:
+            return self.lo
+        if value >= self.hi:
+            return self.hi
+        if value != int(value):
+            # 소수는 LUT 로 못 찾으므로 직접 비교
+            return min(self.values, key=lambda x: abs(x - value))
+        return self._lut[int(value) - self.lo]
+
+    def within(self, value, tolerance):
+        # type: (int, int) -> Optional[int]
+        """최근접값이 tolerance 이내면 그 값, 아니면 None."""
+        best = self.nearest(value)
+        return best if abs(best - value) <= tolerance else None
+
+
+class SpecCatalog(object):
+    def __init__(self, tables, sources=None):
+        # type: (Dict[str, Dict[str, List[int]]], Optional[dict]) -> None
+        self.tables = tables
+        self.sources = sources or {}
+        self.fingerprint = hashlib.sha256(
+            json.dumps(tables, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+        self._snappers = {}  # type: Dict[tuple, Snapper]
+        for rack, dims in tables.items():
+            for dim, values in dims.items():
+                self._snappers[(rack, dim)] = Snapper(values)
+
+    def values(self, rack_type, dim):
+        # type: (str, str) -> List[int]
+        return self.snapper(rack_type, dim).values
+
+    def snapper(self, rack_type, dim):
+        # type: (str, str) -> Snapper
+        return self._snappers[(_RACK_ALIASES.get(rack_type, rack_type), dim)]
+
+    def nearest(self, rack_type, dim, value):
+        # type: (str, str, int) -> int
+        return self.snapper(rack_type, dim).nearest(value)
+
+    def snap(self, rack_type, dim, value, tolerance):
+        # type: (str, str, int, int) -> Optional[int]
+        return self.snapper(rack_type, dim).within(value, tolerance)
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# 컴파일 (public/*.json → 표)
+# ═════════════════════════════════════════════════════════════════════════════
+
+def _size_pairs(price_table):
+    # type: (object) -> List[tuple]
+    """기본가격 트리에서 'AxB' 키를 모두 (A, B) 로."""
+    pairs = []
+    if isinstance(price_table, dict):
+        for key, value in price_table.items():
+            m = _SIZE_RE.match(str(key))
+            if m:
+                pairs.append((int(m.group(1)), int(m.group(2))))
+            elif isinstance(value, dict):
+                pairs.extend(_size_pairs(value))
+    return pairs
+
+
+def _size_heights(price_table):
+    # type: (object) -> List[int]
+    """기본가격 트리에서 'AxB' 키 바로 아래의 높이 키."""
+    heights = []
+    if isinstance(price_table, dict):
+        for key, value in price_table.items():
+            if _SIZE_RE.match(str(key)) and isinstance(value, dict):
+                heights.extend(int(h) for h in value if str(h).isdigit())
+            elif isinstance(value, dict):
+                heights.extend(_size_heights(value))
+    return heights
+
+
+def compile_tables(data, extra_options=None):
+    # type: (dict, Optional[dict]) -> Dict[str, Dict[str, List[int]]]
+    """data.json / extra_options.json 내용 → 표. 못 뽑은 표는 내장 기본표로 채움."""
+    extra_options = extra_options or {}
+    tables = {}  # type: Dict[str, Dict[str, List[int]]]
+
+    for rack in ("경량랙", "중량랙"):
+        pairs = _size_pairs((data.get(rack) or {}).get("기본가격"))
+        tables[rack] = {
+            "width_mm": [w for w, _ in pairs],
+            "depth_mm": [d for _, d in pairs],
+        }
+
+    high = (data.get("하이랙") or {}).get("기본가격") or {}
+    pairs = _size_pairs(high)
+    name_pairs = _size_pairs({k: v for k, v in high.items() if _HIGHRACK_600KG not in k})
+    heights = _size_heights(high)
+    for group, options in (extra_options.get("하이랙") or {}).items():
+        for opt in options:
+            if "기둥" in str(opt.get("name", "")):
+                m = _EXTRA_SIZE_RE.search(str(opt.get("name", "")))
+                if m:
+                    heights.append(int(m.group(2)))
+    tables["하이랙"] = {
+        "depth_cm":      [d for d, _ in pairs],
+        "width_cm":      [w for _, w in pairs],
+        "height_cm":     heights,
+        "name_depth_cm": [d for d, _ in name_pairs],
+    }
+
+    pallet = []
+    for rack in ("파렛트랙", "파렛트랙 철판형"):
+        pallet.extend(_size_pairs((data.get(rack) or {}).get("기본가격")))
+    tables["파렛트랙"] = {
+        "rodbeam_mm": [w + _PALLET_KEY_OFFSET for w, _ in pallet] + _PALLET_EXTRA_RODBEAM,
+        "depth_mm":   [d for _, d in pallet],
+    }
+
+    for rack, dims in BUILTIN_TABLES.items():
+        for dim, builtin in dims.items():
+            values = sorted(set(tables.get(rack, {}).get(dim) or []))
+            if not values:
+                log.warning("카탈로그 %s.%s 를 원천에서 못 찾음 → 기본표 사용", rack, dim,
+                            extra={"tag": "WARN"})
+                values = list(builtin)
+            tables.setdefault(rack, {})[dim] = values
+    return tables
+
+
+def _source_stamp(path):
+    # type: (str) -> Optional[List[int]]
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _load_json(path):
+    # type: (str) -> dict
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_catalog(data_path=DATA_JSON_PATH, extra_path=EXTRA_OPTIONS_PATH,
+                 cache_path=CATALOG_CACHE_PATH, refresh=False):
+    # type: (str, str, str, bool) -> SpecCatalog
+    """디스크 캐시가 유효하면 그대로, 아니면 원천에서 컴파일 후 캐시 갱신."""
+    sources = {
+        "version":       CATALOG_VERSION,
+        "data.json":     _source_stamp(data_path),
+        "extra_options": _source_stamp(extra_path),
+    }
+    if not refresh and cache_path and os.path.exists(cache_path):
+        try:
+            cached = _load_json(cache_path)
+            if cached.get("sources") == sources:
+                return SpecCatalog(cached["tables"], sources)
+        except (OSError, ValueError, KeyError) as e:
+            log.warning("카탈로그 캐시 무시: %s", e, extra={"tag": "WARN"})
+
+    if sources["data.json"] is None:
+        log.warning("data.json 없음 (%s) → 내장 기본표 사용", data_path, extra={"tag": "WARN"})
+        return SpecCatalog({k: dict(v) for k, v in BUILTIN_TABLES.items()}, sources)
+
+    data = _load_json(data_path)
+    extra = _load_json(extra_path) if sources["extra_options"] is not None else {}
+    catalog = SpecCatalog(compile_tables(data, extra), sources)
+    if cache_path:
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+            tmp = "{}.{}.tmp".format(cache_path, os.getpid())
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"sources": sources, "tables": catalog.tables}, f, ensure_ascii=False)
+            os.replace(tmp, cache_path)
+        except OSError as e:
+            log.warning("카탈로그 캐시 저장 실패: %s", e, extra={"tag": "WARN"})
+    return catalog
+
+
+_CATALOG = None  # type: Optional[SpecCatalog]
+
+
+def get_catalog():
+    # type: () -> SpecCatalog
+    """프로세스 공용 카탈로그 (첫 호출 때 1회 로드)."""
+    global _CATALOG
+    if _CATALOG is None:
+        _CATALOG = load_catalog()
+    return _CATALOG
+
+
+def set_catalog(catalog):
+    # type: (Optional[SpecCatalog]) -> None
+    """카탈로그 직접 지정. None 이면 다음 조회 때 다시 로드."""
+    global _CATALOG
+    _CATALOG = catalog
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# CLI: 컴파일 결과 확인 / 캐시 재생성
+# ═════════════════════════════════════════════════════════════════════════════
+
+def main(argv=None):
+    import argparse
+    import io
+    import sys
+
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+    p = argparse.ArgumentParser(description="랙 규격 카탈로그 컴파일 결과 출력")
+    p.add_argument("--refresh", action="store_true", help="캐시를 무시하고 다시 컴파일")
+    args = p.parse_args(argv)
+
+    cat = load_catalog(refresh=args.refresh)
+    print(json.dumps({"fingerprint": cat.fingerprint, "sources": cat.sources, "tables": cat.tables},
+                     ensure_ascii=False, indent=2))
+    drift = 0
+    for rack, dims in BUILTIN_TABLES.items():
+        for dim, builtin in dims.items():
+            if cat.tables[rack][dim] != builtin:
+                drift += 1
+                print("⚠️ {}.{}: 기본표 {} ≠ 컴파일 {}".format(rack, dim, builtin, cat.tables[rack][dim]))
+    return 1 if drift else 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
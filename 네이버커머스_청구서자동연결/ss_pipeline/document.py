@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+"""
+ss_pipeline/document.py
+─────────────────────────────────────────────────────────────────────────────
+주문 그룹 → 청구서(purchase) document 페이로드
+
+원자재 정렬 규칙(src/config/materialOrder.json)은 첫 문서를 만들 때 한 번만 읽습니다.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import json
+import os
+import re
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from listener_metrics import timed
+
+from .bom import (
+    _generate_inventory_part_id,
+    _generate_part_id,
+    build_item_name,
+    build_material_item,
+    generate_bom_for_rack,
+)
+from .grouping import KST, _dedupe_group_rows
+from .order import SmartstoreOrder, as_order
+from .pricing import _lookup_admin_price
+from .racks import classify_row, get_rack_type, parse_smartstore_option
+
+_LISTENER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MATERIAL_ORDER_PATH = os.path.abspath(os.path.join(_LISTENER_DIR, "..", "src", "config", "materialOrder.json"))
+
+_MATERIAL_ORDER_RULES = None  # type: Optional[List[dict]]
+
+
+def _safe_int(val):
+    # type: (object) -> int
+    try:
+        return int(str(val or "0").replace(",", ""))
+    except ValueError:
+        return 0
+
+
+def _load_material_order_rules(path=MATERIAL_ORDER_PATH):
+    # type: (str) -> List[dict]
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        order_rows = payload.get("order", []) or []
+        return [{
+            "key": str(r.get("key", "") or ""),
+            "aliases": [str(a) for a in (r.get("aliases", []) or [])],
+            "idx": idx,
+        } for idx, r in enumerate(order_rows)]
+    except Exception:
+        return []
+
+
+def material_order_rules():
+    # type: () -> List[dict]
+    """materialOrder.json 정렬 규칙 (첫 호출 때 1회 로드)."""
+    global _MATERIAL_ORDER_RULES
+    if _MATERIAL_ORDER_RULES is None:
+        _MATERIAL_ORDER_RULES = _load_material_order_rules()
+    return _MATERIAL_ORDER_RULES
+
+
+def set_material_order_rules(rules):
+    # type: (Optional[List[dict]]) -> None
+    """정렬 규칙을 직접 지정 (워커 프로세스 초기화 등). None 이면 다음 사용 때 파일에서 다시 읽음."""
+    global _MATERIAL_ORDER_RULES
+    _MATERIAL_ORDER_RULES = rules
+
+
+def _build_addon_item_name(order):
+    # type: (dict) -> str
+    """추가옵션 주문행을 품목목록에 표시할 이름 생성."""
+    o = as_order(order)
+    pname = o.product_name.strip()
+    optv = o.option.strip()
+    if not optv:
+        return pname
+    if optv in pname:
+        return pname
+    return "{}: {}".format(pname, optv)
+
+
+def _material_group_priority(name):
+    # type: (str) -> int
+    n = str(name or "")
+    rules = material_order_rules()
+    for rule in rules:
+        key = rule.get("key", "")
+        if key == "*":
+            continue
+        if key and key in n:
+            return int(rule.get("idx", 9999))
+        aliases = rule.get("aliases", []) or []
+        for alias in aliases:
+            if alias and alias in n:
+                return int(rule.get("idx", 9999))
+
+    for rule in rules:
+        if rule.get("key") == "*":
+            return int(rule.get("idx", 9999))
+    return 9999
+
+
+def _material_source_priority(mat):
+    # type: (dict) -> int
+    marker = str(mat.get("ssSource", "") or "").strip().lower()
+    if marker in ("addon", "additional", "extra"):
+        return 1
+    return 0
+
+
+def _material_sort_key(mat):
+    # type: (dict) -> tuple
+    name = str(mat.get("name", "") or "")
+    return (
+        str(mat.get("rackType", "") or ""),  # 1. 랙 타입 (하이랙...)
+        _material_source_priority(mat),      # 2. 메인(0) vs 애드온(1) - 메인 먼저
+        _material_group_priority(name),      # 3. 부품 순서 (메인/애드온 내부에서만)
+        name,                                 # 4. 이름 (동일 우선순위 시)
+    )
+
+
+@timed("document_build")
+def build_grouped_document(group, bom_builder=None, pricer=None):
+    # type: (List[dict], Optional[Callable[..., List[dict]]], Optional[Callable[[str], int]]) -> dict
+    """
+    같은 세션으로 묶인 주문 그룹 → documents DB 한 행.
+
+    - 메인 랙 주문 → items[]
+    - 추가부품 주문 → materials[]
+    - 금액은 그룹 전체 합산
+    - doc_id는 그룹 내 가장 작은 상품주문번호 기준
+    - camelCase + snake_case 필드 동시 포함 (React 웹앱 + DB 양쪽 호환)
+
+    bom_builder(rack_type, option_data, quantity, pricer=...) / pricer(part_id) 로
+    BOM 규칙과 단가 조회를 바꿔 끼울 수 있습니다 (기본: generate_bom_for_rack / admin_prices.json).
+    """
+    build_bom = bom_builder or generate_bom_for_rack
+    price_of = pricer or _lookup_admin_price
+    group = _dedupe_group_rows([as_order(r) for r in group])
+    group_sorted = sorted(group, key=lambda r: r.product_order_id)
+
+    mains  = [r for r in group_sorted if classify_row(r) == "main"]
+    addons = [r for r in group_sorted if classify_row(r) == "addon"]
+
+    # 세션의 대표 랙 타입 결정
+    session_rack_type = ""
+    if mains:
+        session_rack_type = get_rack_type(mains[0].product_name, mains[0].option)
+    elif addons:
+        # 메인 상품 없이 추가상품만 있는 경우, 첫 번째 항목에서 랙 타입을 유추
+        for r in addons:
+            session_rack_type = get_rack_type(r.product_name, r.option)
+            if session_rack_type: break
+
+    # items[] 및 materials[](BOM) 생성
+    items = []
+    materials = []
+    
+    # 메인 랙 처리 (있는 경우에만)
+    for r in mains:
+        pname = r.product_name
+        optv  = r.option
+        qty   = r.quantity or 1
+        total = r.amount
+        
+        # 1. 항목명 생성
+        display_name = build_item_name(r)
+        parsed = parse_smartstore_option(optv)
+        rtype = get_rack_type(pname, optv)
+        
+        items.append({
+            "name":       display_name,
+            "unit":       "개",
+            "quantity":   qty,
+            "unitPrice":  total // qty if qty else total,
+            "totalPrice": total,
+            "note":       optv,
+        })
+        
+        # 2. 메인 랙의 BOM 생성하여 materials에 합산
+        if rtype and rtype != "기타":
+            rack_bom = build_bom(rtype, parsed, qty, pricer=pricer)
+            for m in rack_bom:
+                m["ssSource"] = "main"
+            materials.extend(rack_bom)
+
+    # 3. 추가부품(addons) 주문을 items/materials에 반영
+    for r in addons:
+        qty = r.quantity or 1
+        total = r.amount
+        items.append({
+            "name": _build_addon_item_name(r),
+            "unit": "개",
+            "quantity": qty,
+            "unitPrice": total // qty if qty else total,
+            "totalPrice": total,
+            "note": r.option,
+        })
+        materials.append(build_material_item(r, session_rack_type))
+
+    # 4. materials 중복 제거 및 수량 합산 (자재명 + 규격 + 색상 기준)
+    merged_mats = {}
+    for m in materials:
+        key = (m["name"], m.get("rackType", ""), m.get("specification", ""), m.get("colorWeight", ""), m.get("color", ""), m.get("ssSource", "main"))
+        if key in merged_mats:
+            merged_mats[key]["quantity"] += m["quantity"]
+            # totalPrice는 나중에 재조회된 단가로 갱신할 수 있으나 일단 합산
+            merged_mats[key]["totalPrice"] = merged_mats[key].get("totalPrice", 0) + m.get("totalPrice", 0)
+        else:
+            merged_mats[key] = m
+            
+    materials = sorted(merged_mats.values(), key=_material_sort_key)
+
+    # 5. 모든 자재에 대해 공통 ID 및 단가 로드
+    for r in materials:
+        rt = r["rackType"]
+        nm = r["name"]
+        sp = r.get("specification", "")
+        cl = r.get("color", "")
+        cw = r.get("colorWeight", "")
+
+        # 파렛트랙은 SS 기본 신형
+        version = "신형" if rt == "파렛트랙" else ""
+
+        r["partId"] = _generate_part_id(rt, nm, sp)
+        r["_inventoryPartId"] = _generate_inventory_part_id(
+            rt, nm, sp, color=cl, color_weight=cw, version=version
+        )
+        r["inventoryPartId"] = r["_inventoryPartId"]
+        
+        # _inventoryList (React 호환)
+        r["_inventoryList"] = [{
+            "inventoryPartId": r["_inventoryPartId"],
+            "quantity": r["quantity"],
+            "colorWeight": cw,
+            "color": cl,
+            "specification": sp,
+            "rackType": rt,
+            "name": nm,
+            "version": version
+        }]
+
+        # admin_prices에서 가격 조회 (이미 있으면(addon) 유지하되 없으면 조회)
+        if not r.get("unitPrice"):
+            price = price_of(r["partId"])
+            if not price:
+                price = price_of(r["_inventoryPartId"])
+            r["unitPrice"] = price
+            r["totalPrice"] = price * r["quantity"]
+
+    # 금액 합산
+    subtotal     = sum(r.amount for r in group_sorted)
+    tax          = round(subtotal * 0.1)
+    total_amount = subtotal + tax
+
+    # 대표 행 (가장 앞 주문)
+    first     = group_sorted[0]
+    order_id  = first.product_order_id
+    now_iso   = datetime.now(KST).strftime("%Y-%m-%dT%H:%M:%S.000+09:00")
+    dt_str    = first.paid_at_text
+    date_part = dt_str.split("T")[0] if "T" in dt_str else datetime.now(KST).strftime("%Y-%m-%d")
+
+    doc_id      = "purchase_ss_{}".format(order_id)
+    # 거래번호: 연락처 뒤 8자리 기준 (예: 010-8457-8978 → SS-84578978)
+    phone_raw   = first.phone
+    phone_digits = re.sub(r'\D', '', phone_raw)  # 숫자만 추출
+    phone_suffix = phone_digits[-8:] if len(phone_digits) >= 8 else phone_digits
+    doc_num     = "SS-{}".format(phone_suffix) if phone_suffix else "SS-{}".format(order_id[-10:])
+    
+    # 상호명: 구매자명 우선, 비어있으면 수취인명
+    buyer_name = first.buyer.strip()
+    recipient_name = first.recipient.strip()
+    company = buyer_name if buyer_name else recipient_name
+
+    # 메모: 배송지, 연락처 정보를 메모칸으로 이동
+    memo_str = "배송지: {} | 연락처: {}".format(
+        first.address,
+        first.phone,
+    )
+
+    return {
+        # ── DB 컬럼 (snake_case) ─────────────────────────────
+        "doc_id":          doc_id,
+        "date":            date_part,
+        "document_number": doc_num,
+        "company_name":    company,
+        "biz_number":      "",
+        "items":           items,
+        "materials":       materials,
+        "subtotal":        subtotal,
+        "tax":             tax,
+        "total_amount":    total_amount,
+        "notes":           "", # 비고칸은 비움 (메모로 이동됨)
+        "top_memo":        memo_str,
+        "created_at":      now_iso,
+        "updated_at":      now_iso,
+        "type":            "purchase",
+        # ── React 웹앱 호환 추가 필드 (camelCase) ─────────────
+        # realtimeAdminSync.js 및 PurchaseOrderForm.jsx에서 id/type 필수
+        "id":              doc_id,
+        "documentNumber":  doc_num,
+        "companyName":     company,
+        "bizNumber":       "",
+        "totalAmount":     total_amount,
+        "topMemo":         memo_str,
+        "purchaseNumber":  doc_num,
+        "customerName":    company,
+        "status":          "진행 중",
+        "isSmartstore":    True,
+        "createdAt":       now_iso,
+        "updatedAt":       now_iso,
+        # ── 디버깅 메타 (저장 시 제외) ───────────────────────
+        "_group_size":     len(group_sorted),
+        "_buyer":          first.buyer,
+        "_mains_count":    len(mains),
+        "_addons_count":   len(addons),
+        "_rack_type":      session_rack_type,
+    }
+
+
+# ── 하위 호환: 기존 단건 처리 함수 (2단계에서 제거 예정) ─────────────────────
+def build_purchase_order_item(order):
+    # type: (dict) -> dict
+    """[레거시] 단건 주문 → items[] 한 행. 2단계에서 build_grouped_document로 대체됨."""
+    qty   = int(order.get("주문수량", 1) or 1)
+    total = int(order.get("최종금액", 0) or 0)
+    return {
+        "name":       build_item_name(order),
+        "unit":       "개",
+        "quantity":   qty,
+        "unitPrice":  total // qty if qty else total,
+        "totalPrice": total,
+        "note":       str(order.get("옵션", "") or ""),
+    }
+
+
+def build_purchase_order_payload(order):
+    # type: (dict) -> dict
+    """[레거시] 단건 주문 → document 페이로드. 2단계에서 build_grouped_document로 대체됨."""
+    item    = build_purchase_order_item(order)
+    rack_type = get_rack_type(order.get("상품명", ""))
+
+    subtotal     = int(order.get("최종금액", 0) or 0)
+    tax          = round(subtotal * 0.1)
+    total_amount = subtotal + tax
+
+    payment_date = str(order.get("결제완료시각", "") or "")
+    date_part    = payment_date.split("T")[0] if "T" in payment_date else datetime.now(KST).strftime("%Y-%m-%d")
+
+    order_id   = str(order.get("상품주문번호", ""))
+    doc_number = "SS-{}".format(order_id[-10:]) if len(order_id) >= 10 else "SS-{}".format(order_id)
+    doc_id     = "purchase_ss_{}".format(order_id)
+    now_iso    = datetime.now(KST).strftime("%Y-%m-%dT%H:%M:%S.000+09:00")
+
+    return {
+        "doc_id":          doc_id,
+        "date":            date_part,
+        "document_number": doc_number,
+        "company_name":    str(order.get("구매자명", "") or ""),
+        "biz_number":      "",
+        "items":           [item],
+        "materials":       [],
+        "subtotal":        subtotal,
+        "tax":             tax,
+        "total_amount":    total_amount,
+        "notes":           "배송지: {} | 연락처: {} | 수취인: {}".format(
+                               str(order.get("배송지", "") or ""),
+                               str(order.get("연락처", "") or ""),
+                               str(order.get("수취인명", "") or ""),
+                           ),
+        "top_memo":        "",
+        "created_at":      now_iso,
+        "updated_at":      now_iso,
+        "type":            "purchase",
+        "_rack_type":      rack_type,
+        "_parsed_option":  parse_smartstore_option(str(order.get("옵션", "") or "")),
+        "_smartstore":     order.to_dict() if isinstance(order, SmartstoreOrder) else order,
+    }
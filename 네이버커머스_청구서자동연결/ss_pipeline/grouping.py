@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+ss_pipeline/grouping.py
+─────────────────────────────────────────────────────────────────────────────
+주문행 → 문서 단위 그룹핑
+
+  group_orders_by_session : 한 번에 받은 행만, 같은 구매자 + 같은 결제 분 = 문서 1건
+  SessionWindow           : 폴링 사이클을 넘어 주문번호(장바구니) 단위로 grace 초 동안 모았다가 1회 방출
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from listener_metrics import SESSIONS_EVICTED, SESSIONS_LATE, SESSIONS_OPEN
+
+from .order import KST, as_order, parse_payment_dt
+
+_parse_payment_dt = parse_payment_dt  # 기존 이름 (order_listener 등에서 import)
+
+
+def group_orders_by_session(orders):
+    # type: (List[dict]) -> List[List[dict]]
+    """
+    동일 구매자명 + 결제완료시각(분단위) 기준으로 주문을 묶습니다.
+    같은 분(minute) 내 같은 구매자 = 한 번의 장바구니 결제 = 1개 document.
+    """
+    groups = {}  # type: Dict[tuple, list]
+    for order in orders:
+        o      = as_order(order)
+        dt     = o.paid_at
+        tm_key = dt.strftime("%Y%m%d%H%M") if dt else ""
+        key    = (o.buyer, tm_key)
+        groups.setdefault(key, []).append(order)
+    return list(groups.values())
+
+
+def session_key(order):
+    # type: (dict) -> tuple
+    """주문번호(order.orderId)가 있으면 그것, 없으면(구 CSV 등) 구매자 + 결제 분."""
+    o = as_order(order)
+    if o.order_id:
+        return ("order", o.order_id)
+    dt = o.paid_at
+    return ("session", o.buyer, dt.strftime("%Y%m%d%H%M") if dt else "")
+
+
+class _OpenSession(object):
+    __slots__ = ("rows", "row_ids", "deadline")
+
+    def __init__(self, deadline):
+        # type: (float) -> None
+        self.rows = []         # type: List[dict]
+        self.row_ids = set()   # type: set
+        self.deadline = deadline
+
+
+class SessionWindow(object):
+    """
+    주문번호 단위 세션 창.
+
+    한 장바구니의 행이 두 번의 폴링에 나뉘어 오거나 결제 분 경계를 넘어도, 처음 본 뒤
+    grace_seconds 동안 열어 두었다가 창이 닫힐 때 한 그룹으로 딱 한 번 내보냅니다.
+      add(orders, now)      행 추가 (같은 상품주문번호 재수신은 무시)
+      drain(now, force)     창이 닫힌 그룹 (force 면 전부) — 처음 본 순서대로
+      pending()             아직 내보내지 않은 행 전부 (재시작 대비 보존용)
+    상태 상한:
+      max_open      열린 그룹 수. 넘치면 가장 오래된 그룹부터 일찍 방출 (listener_sessions_evicted_total)
+      max_emitted   방출한 주문번호 기억 수 (LRU). 이미 내보낸 주문번호의 행이 늦게 오면 버리지 않고
+                    새 그룹으로 열어 따로 방출 (listener_sessions_late_total)
+    now 는 단조 시계(초)이며 생략하면 time.monotonic().
+    """
+
+    def __init__(self, grace_seconds=60.0, max_open=1000, max_emitted=10000):
+        # type: (float, int, int) -> None
+        self.grace_seconds = grace_seconds
+        self.max_open = max_open
+        self.max_emitted = max_emitted
+        self._open = OrderedDict()     # type: OrderedDict   # key → _OpenSession (처음 본 순서)
+        self._emitted = OrderedDict()  # type: OrderedDict   # key → None (LRU)
+        self._ready = []               # type: List[List[dict]]  # 상한 초과로 일찍 닫힌 그룹
+
+    def __len__(self):
+        return len(self._open)
+
+    def add(self, orders, now=None):
+        # type: (List[dict], Optional[float]) -> None
+        now = time.monotonic() if now is None else now
+        for order in orders:
+            key = session_key(order)
+            session = self._open.get(key)
+            if session is None:
+                if key in self._emitted:
+                    SESSIONS_LATE.inc()
+                session = self._open[key] = _OpenSession(now + self.grace_seconds)
+            row_id = as_order(order).product_order_id
+            if row_id and row_id in session.row_ids:
+                continue
+            session.row_ids.add(row_id)
+            session.rows.append(order)
+        while len(self._open) > self.max_open:
+            SESSIONS_EVICTED.inc()
+            self._ready.append(self._close(next(iter(self._open))))
+        SESSIONS_OPEN.set(len(self._open))
+
+    def drain(self, now=None, force=False):
+        # type: (Optional[float], bool) -> List[List[dict]]
+        now = time.monotonic() if now is None else now
+        groups, self._ready = self._ready, []
+        # 창 길이가 모두 같으므로 처음 본 순서 = 마감 순서
+        while self._open:
+            key, session = next(iter(self._open.items()))
+            if not force and session.deadline > now:
+                break
+            groups.append(self._close(key))
+        SESSIONS_OPEN.set(len(self._open))
+        return groups
+
+    def pending(self):
+        # type: () -> List[dict]
+        rows = [row for group in self._ready for row in group]
+        for session in self._open.values():
+            rows.extend(session.rows)
+        return rows
+
+    def _close(self, key):
+        # type: (tuple) -> List[dict]
+        session = self._open.pop(key)
+        self._emitted[key] = None
+        self._emitted.move_to_end(key)
+        while len(self._emitted) > self.max_emitted:
+            self._emitted.popitem(last=False)
+        return session.rows
+
+
+def _dedupe_group_rows(group):
+    # type: (List[dict]) -> List[dict]
+    """같은 스마트스토어 주문행이 중복 수집된 경우 1행만 남긴다."""
+    seen = set()
+    deduped = []
+    for row in group:
+        o = as_order(row)
+        key = (o.product_order_id, o.product_name, o.option, o.quantity, o.amount,
+               o.recipient, o.phone, o.address)
+        if key in seen:
+            continue
+        seen.add(key)
+        deduped.append(row)
+    return deduped
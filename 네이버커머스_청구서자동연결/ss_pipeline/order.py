@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+ss_pipeline/order.py
+─────────────────────────────────────────────────────────────────────────────
+스마트스토어 주문 1행 레코드 (SmartstoreOrder)
+
+주문행은 원래 한글 키 11개짜리 dict 였고, 단계마다 str(order.get(...) or "") / _safe_int
+로 같은 정규화를 반복했습니다. SmartstoreOrder 는 API 응답 / CSV 행에서 한 번만 파싱해
+타입이 정해진 속성으로 들고 다닙니다 (__slots__ → dict 보다 작고 속성 조회가 빠름).
+
+  order_id          주문번호        str   (장바구니 단위, 구 CSV 에는 없음 → "")
+  product_order_id  상품주문번호    str
+  buyer             구매자명        str
+  product_name      상품명          str
+  option            옵션            str
+  quantity          주문수량        int   (파싱 불가 0 → 사용처에서 `or 1`)
+  amount            최종금액        int   ("1,234" 허용, 파싱 불가 0)
+  recipient         수취인명        str
+  phone             연락처          str
+  address           배송지          str
+  paid_at_text      결제완료시각    str   (원문)
+  paid_at                           datetime (KST, 첫 접근 때 1회 파싱 / 실패 None)
+
+하위 호환:
+  기존 dict 처럼 order.get("상품명") / order["주문수량"] / "옵션" in order / dict(order) 가
+  그대로 동작합니다 (값은 위 타입으로 정규화된 값).
+  to_dict() 는 원래 값을 되돌려 줍니다: 정규화로 바뀐 값("" 수량, None 등)과 모르는 키는
+  원본 그대로 보관했다가 복원 → CSV 로 다시 쓰면 같은 텍스트.
+
+  SmartstoreOrder.from_row(row)        주문행 dict (CSV / 다른 스크립트) → 레코드
+  SmartstoreOrder.from_naver_item(it)  /product-orders/query 응답 항목 → 레코드
+  as_order(obj)                        레코드면 그대로, dict 면 from_row
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+KST = timezone(timedelta(hours=9))
+
+# (한글 키, 속성) — 키 순서는 parse_naver_item 이 만들던 dict 와 같음
+FIELD_ATTRS = (
+    ("주문번호",     "order_id"),
+    ("상품주문번호", "product_order_id"),
+    ("구매자명",     "buyer"),
+    ("상품명",       "product_name"),
+    ("옵션",         "option"),
+    ("주문수량",     "quantity"),
+    ("최종금액",     "amount"),
+    ("수취인명",     "recipient"),
+    ("연락처",       "phone"),
+    ("배송지",       "address"),
+    ("결제완료시각", "paid_at_text"),
+)
+ORDER_FIELDS = tuple(key for key, _ in FIELD_ATTRS)
+
+_ATTR_OF = dict(FIELD_ATTRS)  # type: Dict[str, str]
+_ATTRS = frozenset(_ATTR_OF.values())
+_INT_KEYS = frozenset(("주문수량", "최종금액"))
+_TZ_SUFFIX_RE = re.compile(r'[+-]\d{2}:\d{2}$')
+
+
+def parse_payment_dt(dt_str):
+    # type: (str) -> Optional[datetime]
+    """결제완료시각 문자열을 파싱하여 datetime 반환."""
+    try:
+        dt_str2 = str(dt_str or "").strip()
+        if _TZ_SUFFIX_RE.search(dt_str2):
+            return datetime.fromisoformat(dt_str2)
+        return datetime.strptime(dt_str2[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=KST)
+    except Exception:
+        return None
+
+
+def _to_text(value):
+    # type: (object) -> str
+    return value if type(value) is str else str(value or "")
+
+
+def _to_int(value):
+    # type: (object) -> int
+    if type(value) is int:
+        return value
+    try:
+        return int(str(value or "0").replace(",", ""))
+    except ValueError:
+        return 0
+
+
+class SmartstoreOrder(object):
+    __slots__ = (
+        "order_id", "product_order_id", "buyer", "product_name", "option",
+        "quantity", "amount", "recipient", "phone", "address", "paid_at_text",
+        "_paid_at", "_raw",
+    )
+
+    def __init__(self, order_id="", product_order_id="", buyer="", product_name="", option="",
+                 quantity=0, amount=0, recipient="", phone="", address="", paid_at_text="", raw=None):
+        # type: (str, str, str, str, str, int, int, str, str, str, str, Optional[dict]) -> None
+        """값은 이미 정규화된 것으로 보고 그대로 담습니다 (변환은 from_row / from_naver_item)."""
+        self.order_id = order_id
+        self.product_order_id = product_order_id
+        self.buyer = buyer
+        self.product_name = product_name
+        self.option = option
+        self.quantity = quantity
+        self.amount = amount
+        self.recipient = recipient
+        self.phone = phone
+        self.address = address
+        self.paid_at_text = paid_at_text
+        self._paid_at = False   # False = 아직 파싱 안 함 (None 은 파싱 실패)
+        self._raw = raw         # {키: 원본} — 정규화로 바뀐 값 + 모르는 키 (대부분 None)
+
+    # ── 생성 ──
+    @classmethod
+    def from_row(cls, row):
+        # type: (dict) -> SmartstoreOrder
+        """한글 키 주문행 → 레코드. 정규화로 값이 바뀌는 키와 모르는 키는 _raw 에 원본 보관."""
+        if isinstance(row, cls):
+            return row
+        raw = None
+        values = []
+        present = 0
+        get = row.get
+        for key, _ in FIELD_ATTRS:
+            value = get(key)
+            if value is not None or key in row:
+                present += 1
+            elif key not in _INT_KEYS:
+                values.append("")
+                continue
+            if key in _INT_KEYS:
+                norm = _to_int(value)
+                same = type(value) is int or (value is not None and str(norm) == str(value)) or key not in row
+            else:
+                norm = _to_text(value)
+                same = norm is value
+            if not same:
+                if raw is None:
+                    raw = {}
+                raw[key] = value
+            values.append(norm)
+        if len(row) > present:
+            for key in row:
+                if key not in _ATTR_OF:
+                    if raw is None:
+                        raw = {}
+                    raw[key] = row[key]
+        values.append(raw)
+        return cls(*values)
+
+    @classmethod
+    def from_naver_item(cls, item):
+        # type: (dict) -> Optional[SmartstoreOrder]
+        """
+        API 응답의 단일 주문 항목 → 레코드.
+
+        API 명세 기준 필드 매핑:
+          주문번호      ← order.orderId
+          상품주문번호  ← productOrder.productOrderId
+          구매자명      ← order.ordererName
+          옵션          ← productOrder.productOption
+          주문수량      ← productOrder.quantity
+          최종금액      ← productOrder.totalPaymentAmount
+          수취인명      ← productOrder.shippingAddress.name
+          연락처        ← productOrder.shippingAddress.tel1
+          배송지        ← productOrder.shippingAddress (baseAddress + detailedAddress)
+          결제완료시각  ← order.paymentDate
+        """
+        if not isinstance(item, dict):
+            return None
+
+        content = item.get("content", item)
+        order = content.get("order") or {}
+        po = content.get("productOrder") or {}
+        shipping = po.get("shippingAddress") or {}
+
+        base_addr = shipping.get("baseAddress") or ""
+        detail_addr = shipping.get("detailedAddress") or ""
+
+        return cls(
+            order_id=_to_text(order.get("orderId")),
+            product_order_id=_to_text(po.get("productOrderId")),
+            buyer=_to_text(order.get("ordererName")),
+            product_name=_to_text(po.get("productName")),
+            option=_to_text(po.get("productOption") or "(옵션없음)"),
+            quantity=_to_int(po.get("quantity")),
+            amount=_to_int(po.get("totalPaymentAmount")),
+            recipient=_to_text(shipping.get("name") or order.get("ordererName")),
+            phone=_to_text(shipping.get("tel1") or order.get("ordererTel")),
+            address="{} {}".format(base_addr, detail_addr).strip(),
+            paid_at_text=_to_text(order.get("paymentDate")),
+        )
+
+    def replace(self, **changes):
+        # type: (...) -> SmartstoreOrder
+        """속성 일부만 바꾼 복사본 (속성 이름으로 지정, 값은 정규화된 타입)."""
+        unknown = set(changes) - _ATTRS
+        if unknown:
+            raise TypeError("알 수 없는 속성: {}".format(", ".join(sorted(unknown))))
+        values = [changes.get(attr, getattr(self, attr)) for _, attr in FIELD_ATTRS]
+        raw = self._raw
+        if raw:
+            raw = {k: v for k, v in raw.items() if _ATTR_OF.get(k) not in changes} or None
+        return SmartstoreOrder(*values, raw=raw)
+
+    # ── 파생 값 ──
+    @property
+    def paid_at(self):
+        # type: () -> Optional[datetime]
+        dt = self._paid_at
+        if dt is False:
+            dt = self._paid_at = parse_payment_dt(self.paid_at_text)
+        return dt
+
+    # ── 변환 ──
+    def to_dict(self):
+        # type: () -> dict
+        """기존 주문행 dict (원본 값 복원, 모르는 키 포함)."""
+        row = {key: getattr(self, attr) for key, attr in FIELD_ATTRS}
+        if self._raw:
+            row.update(self._raw)
+        return row
+
+    def to_csv_row(self, fields=ORDER_FIELDS):
+        # type: (Tuple[str, ...]) -> List[str]
+        """fields 순서의 CSV 값 목록 (None → "")."""
+        raw = self._raw or {}
+        out = []
+        for key in fields:
+            if key in raw:
+                value = raw[key]
+            else:
+                attr = _ATTR_OF.get(key)
+                value = getattr(self, attr) if attr else None
+            out.append("" if value is None else str(value))
+        return out
+
+    # ── dict 호환 (읽기 위주) ──
+    def __getitem__(self, key):
+        attr = _ATTR_OF.get(key)
+        if attr is not None:
+            return getattr(self, attr)
+        raw = self._raw
+        if raw is not None and key in raw:
+            return raw[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        attr = _ATTR_OF.get(key)
+        if attr is not None:
+            return getattr(self, attr)
+        raw = self._raw
+        if raw is not None:
+            return raw.get(key, default)
+        return default
+
+    def __setitem__(self, key, value):
+        attr = _ATTR_OF.get(key)
+        raw = self._raw
+        if attr is None:
+            if raw is None:
+                raw = self._raw = {}
+            raw[key] = value
+            return
+        setattr(self, attr, _to_int(value) if key in _INT_KEYS else _to_text(value))
+        if key == "결제완료시각":
+            self._paid_at = False
+        if raw is not None:
+            raw.pop(key, None)
+
+    def __contains__(self, key):
+        return key in _ATTR_OF or (self._raw is not None and key in self._raw)
+
+    def keys(self):
+        # type: () -> List[str]
+        extra = [k for k in self._raw if k not in _ATTR_OF] if self._raw else []
+        return list(ORDER_FIELDS) + extra
+
+    def __iter__(self):
+        # type: () -> Iterator[str]
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def __eq__(self, other):
+        if isinstance(other, SmartstoreOrder):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None  # dict 와 같이 변경 가능 → 해시 불가
+
+    def __repr__(self):
+        return "SmartstoreOrder(상품주문번호={!r}, 상품명={!r}, 옵션={!r}, 주문수량={}, 최종금액={})".format(
+            self.product_order_id, self.product_name, self.option, self.quantity, self.amount)
+
+
+def as_order(obj):
+    # type: (object) -> SmartstoreOrder
+    """레코드면 그대로, 주문행 dict 면 변환 (regen 의 pseudo_order 등 부분 dict 도 허용)."""
+    if type(obj) is SmartstoreOrder:
+        return obj
+    return SmartstoreOrder.from_row(obj)
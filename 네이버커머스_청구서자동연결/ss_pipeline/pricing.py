@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+ss_pipeline/pricing.py
+─────────────────────────────────────────────────────────────────────────────
+admin_prices.json 단가 조회
+
+파일은 첫 조회 때 1회만 읽습니다 (import 만으로는 디스크를 건드리지 않음).
+다른 경로의 단가표를 쓰는 도구(검증/마이그레이션)는 set_admin_prices() 로 미리 채웁니다.
+단가 변경분만 기존 문서에 반영할 때는 reprice_materials() (part_index.py reprice).
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import json
+import logging
+import os
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from listener_metrics import timed
+
+# listener_logging.LOGGER_NAME 하위 로거 (setup_logging 이 붙인 핸들러로 전달됨)
+log = logging.getLogger("sammirack.listener.pricing")
+
+# 프로젝트 루트의 admin_prices.json 경로
+ADMIN_PRICES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "admin_prices.json")
+
+_ADMIN_PRICES_CACHE = None  # type: Optional[dict]
+
+
+def normalize_admin_prices(raw):
+    # type: (object) -> dict
+    """admin_prices.json 내용 → {part_id: entry}. dict 는 그대로, 리스트는 part_id 로 색인."""
+    # admin_prices.json은 part_id를 키로 하는 dict
+    if isinstance(raw, dict):
+        return raw
+    cache = {}
+    if isinstance(raw, list):
+        # [{part_id, price, ...}, ...] 형식인 경우
+        for item in raw:
+            pid = item.get("part_id") or item.get("partId") or ""
+            if pid:
+                cache[pid] = item
+    return cache
+
+
+def set_admin_prices(raw):
+    # type: (object) -> dict
+    """단가표를 직접 지정 (파일 로드 생략). None 이면 다음 조회 때 기본 경로에서 다시 읽음."""
+    global _ADMIN_PRICES_CACHE
+    _ADMIN_PRICES_CACHE = None if raw is None else normalize_admin_prices(raw)
+    return _ADMIN_PRICES_CACHE
+
+
+def _load_admin_prices_cache():
+    # type: () -> dict
+    """admin_prices.json을 1회만 로드하여 {part_id: price} 딕셔너리 반환."""
+    global _ADMIN_PRICES_CACHE
+    if _ADMIN_PRICES_CACHE is not None:
+        return _ADMIN_PRICES_CACHE
+    try:
+        with open(ADMIN_PRICES_PATH, "r", encoding="utf-8") as f:
+            _ADMIN_PRICES_CACHE = normalize_admin_prices(json.load(f))
+    except Exception as e:
+        log.warning("admin_prices.json 로드 실패: %s", e, extra={"tag": "WARN"})
+        _ADMIN_PRICES_CACHE = {}
+    return _ADMIN_PRICES_CACHE
+
+
+def price_of_entry(entry):
+    # type: (object) -> int
+    """단가표 항목 ({price: ...} 또는 숫자) → 단가. 알 수 없으면 0."""
+    if entry is None:
+        return 0
+    if isinstance(entry, dict):
+        return int(entry.get("price", 0) or 0)
+    if isinstance(entry, (int, float)):
+        return int(entry)
+    return 0
+
+
+@timed("price_lookup")
+def _lookup_admin_price(part_id):
+    # type: (str) -> int
+    """part_id로 admin_prices에서 가격 조회. 없으면 0."""
+    return price_of_entry(_load_admin_prices_cache().get(part_id))
+
+
+def material_part_ids(mat):
+    # type: (dict) -> List[str]
+    """자재 1행이 가리키는 부품 ID (partId, _inventoryPartId/inventoryPartId, 중복 제거)."""
+    ids = []  # type: List[str]
+    for key in ("partId", "_inventoryPartId", "inventoryPartId"):
+        pid = mat.get(key)
+        if pid and pid not in ids:
+            ids.append(pid)
+    return ids
+
+
+def reprice_materials(materials, price_of=None, part_ids=None):
+    # type: (List[dict], Optional[Callable[[str], int]], Optional[Iterable[str]]) -> Tuple[List[dict], List[dict]]
+    """
+    materials 의 unitPrice/totalPrice 를 현재 단가표로 다시 매깁니다 (BOM 은 그대로).
+    단가 결정은 BOM 생성과 같음: partId → 없으면 _inventoryPartId.
+      - 추가부품(ssSource "addon")은 주문 금액이 단가이므로 그대로 둠
+      - 새 단가가 0(단가표에 없음)이면 기존 값 유지
+      - part_ids 를 주면 그 ID 를 가리키는 자재만 대상
+    반환: (새 materials (바뀐 행만 복사), 변경 [{partId, before, after}])
+    """
+    price_of = price_of or _lookup_admin_price
+    targets = set(part_ids) if part_ids is not None else None
+    result = []   # type: List[dict]
+    changes = []  # type: List[dict]
+    for mat in materials:
+        ids = material_part_ids(mat)
+        if (mat.get("ssSource") == "addon" or not ids
+                or (targets is not None and targets.isdisjoint(ids))):
+            result.append(mat)
+            continue
+        price = price_of(mat.get("partId") or "") or price_of(mat.get("_inventoryPartId") or "")
+        if not price or price == mat.get("unitPrice"):
+            result.append(mat)
+            continue
+        qty = int(mat.get("quantity", 0) or 0)
+        changes.append({"partId": ids[0], "before": mat.get("unitPrice"), "after": price})
+        result.append(dict(mat, unitPrice=price, totalPrice=price * qty))
+    return result, changes
+
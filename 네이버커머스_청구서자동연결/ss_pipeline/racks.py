@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+"""
+ss_pipeline/racks.py
+─────────────────────────────────────────────────────────────────────────────
+랙 종류 판별 + 스마트스토어 옵션 문자열 파싱
+
+  is_supported_rack / get_rack_type      : 상품명(+옵션) → 지원 여부 / 랙 타입
+  parse_smartstore_option                : "A.색상: ... / B.규격: ..." → dict
+  map_pallet_size_key / map_highrack_color: 옵션 값 → data.json 키
+  classify_row                           : 주문행 → "main" / "addon"
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import re
+
+from .catalog import get_catalog
+from .order import as_order
+
+
+def filter_korean(text):
+    # type: (str) -> str
+    """한글, 영문, 숫자 및 공백만 남깁니다."""
+    if not text: return ""
+    return re.sub(r'[^a-zA-Z0-9\u3131-\u3163\uac00-\ud7a3\s×xX*()./-]', '', str(text))
+
+
+# ─── 지원 랙 타입 화이트리스트 ──────────────────────────────────────────────
+# admin_prices.json 기준 실제 존재하는 rack_type만 포함
+# 절대 다른 종류를 여기에 매핑(aliasing)하지 말 것
+SUPPORTED_RACK_PREFIXES = {
+    "하이랙":   "하이랙",
+    "파렛트랙": "파렛트랙",
+    "파래트랙": "파렛트랙",
+    "파랫트랙": "파렛트랙",
+    "중량랙":   "중량랙",
+    "경량랙":   "경량랙",
+    "스텐랙":   "스텐랙",
+    "스텐":     "스텐랙",
+}
+
+# ─── 비지원 랙 블랙리스트 (초스피드/실버랙/사이버랙/올스텐랙 등) ────────────
+# 이 키워드로 시작하는 주문은 리슨 단계에서 즉시 무시
+# 절대 다른 종류로 매핑하거나 분류하지 말 것
+UNSUPPORTED_RACK_PREFIXES = [
+    "초스피드", "실버랙", "사이버랙", "올스텐랙",
+    "조립식 앵글", "앵글선반", "철제선반 경량", "철제선반 무볼트",
+]
+
+# ─── 추가부품(addon) 판단 키워드 ─────────────────────────────────────────────
+# 중요:
+# - 메인 주문의 옵션 플레이스홀더("A.색상: 추가상품구매")는 addon 판정 근거가 아님
+# - 실제 추가부품 주문으로 명확히 보이는 패턴만 addon으로 판정
+ADDON_KEYWORDS = ["단추가", "선반추가", "기둥추가", "로드빔추가"]
+
+
+
+def is_supported_rack(product_name, option_str=""):
+    # type: (str, str) -> bool
+    """
+    스마트스토어 상품명(+옵션)이 sammirack-estimator 지원 랙 관련 주문인지 확인.
+    비지원 랙(초스피드/실버/사이버/올스텐/스텐)은 False → 주문 전체 skip.
+
+    단, 추가부품(선반추가/기둥추가/로드빔추가/단추가 등):
+    - 상품명 또는 옵션 중 하나라도 ADDON_KEYWORDS 포함 시 True (통과)
+    - 예) 상품명에는 랙명이 없어도 옵션에 '선반추가/기둥추가' 문구가 있으면 통과
+    """
+    name     = (product_name or "").strip()
+    opt_str  = (option_str or "").strip()
+    combined = name + " " + opt_str
+
+    # 추가부품 키워드 → 통과 (그룹 내 addon 후보)
+    for kw in ADDON_KEYWORDS:
+        if kw in combined:
+            return True
+
+    # 비지원 랙 블랙리스트
+    for prefix in UNSUPPORTED_RACK_PREFIXES:
+        if name.startswith(prefix):
+            return False
+    # 지원 랙 화이트리스트
+    for prefix in SUPPORTED_RACK_PREFIXES:
+        if name.startswith(prefix):
+            return True
+    # 알 수 없는 상품명도 skip (안전 우선)
+    return False
+
+
+
+def get_rack_type(product_name, option_name=""):
+    # type: (str, str) -> str
+    """지원 랙의 정규화된 rackType 반환. 비지원이면 빈 문자열.
+
+    ⚠️ 규칙: 상품명에서 가장 먼저(왼쪽) 나오는 랙 종류 이름이 해당 랙.
+    뒤에 SEO용으로 다른 랙 이름이 아무리 많아도 무시.
+    예) "하이랙 철제선반 앵글 중량랙 경량랙 창고 파렛트랙..." → 하이랙
+    예) "파렛트랙 파래트랙 중량랙 창고..." → 파렛트랙
+    예) "철제선반 경량랙 수납장 조립식앵글..." → 경량랙
+    """
+    name = (product_name or "").strip()
+
+    # 상품명에서 각 지원 랙 키워드의 위치를 찾아서 가장 앞에 있는 것 선택
+    best_pos = len(name) + 1
+    best_type = ""
+
+    for prefix, rack_type in SUPPORTED_RACK_PREFIXES.items():
+        pos = name.find(prefix)
+        if pos != -1 and pos < best_pos:
+            best_pos = pos
+            best_type = rack_type
+
+    if not best_type:
+        return ""
+
+    combined = name + " " + (option_name or "")
+
+    # ── 하이랙 강제 판별: 하이랙 전용 색상/중량 키워드가 있으면 무조건 하이랙 ──
+    # 파렛트랙에는 메트그레이/아이보리(볼트식)/블루+오렌지/270kg/450kg/600kg 없음
+    # 파렛트랙은 2t/3t, 색상 없음
+    _HIGHRACK_ONLY = ["메트그레이(볼트식)", "아이보리(볼트식)", "블루(기둥)+오렌지",
+                      "(볼트식)270kg", "(볼트식)450kg", "(볼트식)600kg"]
+    if best_type != "하이랙" and any(k in combined for k in _HIGHRACK_ONLY):
+        return "하이랙"
+
+    # 파렛트랙인 경우 철판형 여부 추가 판별
+    if best_type == "파렛트랙":
+        if any(k in combined for k in ["철판형", "선반형", "700kg", "990kg"]):
+            return "파렛트랙 철판형"
+
+    return best_type
+
+
+def _strip_segment_label(seg):
+    # type: (str) -> str
+    seg = re.sub(r'^[A-Za-z]\s*[.\-]\s*', '', seg).strip()
+    seg = re.sub(r'^\d+\s*[.\-]\s*', '', seg).strip()
+    return seg
+
+
+def _extract_size_numbers(val):
+    # type: (str) -> list
+    val_no_weight = re.sub(r'\d+\s*[kK][gG]', '', val)
+    nums = re.findall(r'\d+', val_no_weight)
+    return [int(n) for n in nums]
+
+
+def _detect_connection_type(val):
+    # type: (str) -> str
+    if "연결" in val:
+        return "연결형"
+    if "독립" in val:
+        return "독립형"
+    return ""
+
+
+def parse_smartstore_option(option_str):
+    # type: (str) -> dict
+    """
+    스마트스토어 옵션 문자열 파싱.
+    반환 키: rack_type_hint, color, width, length, height, dan, size_raw, is_iron, 원본옵션
+    """
+    if not option_str or option_str == "(옵션없음)":
+        return {"원본옵션": option_str or ""}
+
+    result = {"원본옵션": option_str, "is_iron": False}
+    if "철판형" in option_str or "선반형" in option_str:
+        result["is_iron"] = True
+
+    segments = [s.strip() for s in option_str.split("/")]
+
+    for seg in segments:
+        seg = _strip_segment_label(seg)
+        if ":" not in seg:
+            # 3개 숫자(WxLxH)
+            m3 = re.search(r'(\d+)[^\d]*[xX*][^\d]*(\d+)[^\d]*[xX*][^\d]*(\d+)', seg)
+            if m3:
+                result["width"] = int(m3.group(1))
+                result["length"] = int(m3.group(2))
+                result["height"] = int(m3.group(3))
+                result["size_raw"] = m3.group(0)
+                continue
+            # 2개 숫자(WxL)
+            m2 = re.search(r'(\d+)[^\d]*[xX*][^\d]*(\d+)', seg)
+            if m2:
+                result["width"] = int(m2.group(1))
+                result["length"] = int(m2.group(2))
+                result["size_raw"] = m2.group(0)
+                continue
+            continue
+            
+        colon_idx = seg.index(":")
+        raw_key = seg[:colon_idx].strip()
+        raw_val = seg[colon_idx + 1:].strip()
+        key_lower = raw_key.lower()
+
+        if "색상" in raw_key:
+            result["color"] = raw_val
+        elif "단수" in raw_key or raw_key == "단":
+            result["dan"] = raw_val
+        elif any(k in raw_key for k in ["선반", "폭", "규격", "사이즈", "길이"]) or "cm" in key_lower:
+            nums = _extract_size_numbers(raw_val)
+            conn = _detect_connection_type(raw_val)
+            if conn:
+                result["rack_type_hint"] = conn
+            if len(nums) >= 3:
+                result["width"]  = nums[0]
+                result["length"] = nums[1]
+                result["height"] = nums[2]
+            elif len(nums) == 2:
+                result["width"]  = nums[0]
+                result["length"] = nums[1]
+            elif len(nums) == 1:
+                result["width"]  = nums[0]
+            # size_raw: 숫자만 추출하여 깨끗한 WxD 형식으로 저장 (한글 제거)
+            if len(nums) >= 2:
+                result["size_raw"] = "{}x{}".format(nums[0], nums[1])
+            elif len(nums) == 1:
+                result["size_raw"] = str(nums[0])
+            else:
+                result["size_raw"] = raw_val
+        elif "높이" in raw_key:
+            nums = _extract_size_numbers(raw_val)
+            if nums:
+                result["height"] = nums[0]
+            conn = _detect_connection_type(raw_val)
+            if conn and "rack_type_hint" not in result:
+                result["rack_type_hint"] = conn
+        elif "추가" in raw_key or "단추가" in raw_key:
+            result["extra_add"] = raw_val
+        else:
+            result["extra_{}".format(raw_key)] = raw_val
+
+    return result
+
+
+# ─── 파렛트랙 / 파렛트랙 철판형 size 키 변환 ──────────────────────────────────
+# SOURCE OF TRUTH: ProductContext.jsx + bom_data_weight_added.json 기준
+# 파렛트랙 (일반):  1390x1000 / 2590x1000 / 2790x1000
+# 파렛트랙 철판형:  1390x800 / 1390x1000 / 2590x800 / 2590x1000
+#                   + EXTRA: 2090x800 / 2090x1000  (ProductContext EXTRA_OPTIONS)
+#
+# 스마트스토어 옵션에서 치수 두 숫자(a, b)를 받아서:
+#   - 로드빔 길이를 판별 (1390 / 2090 / 2590 / 2790?)
+#   - 철판형 여부를 반환
+
+# 로드빔 길이 후보(1390/2090/2590/2790, 2090은 철판형 EXTRA_OPTIONS 전용)와
+# 타이빔/깊이 후보(800/1000)는 catalog "파렛트랙" rodbeam_mm / depth_mm (허용 오차 ±100mm)
+_PALLET_TOLERANCE = 100
+
+def _nearest(val, candidates, tolerance=100):
+    # type: (int, list, int) -> int
+    """candidates 중 val에 가장 가까운 값 반환. 허용 오차 초과 시 0 반환."""
+    best, best_dist = 0, tolerance + 1
+    for c in candidates:
+        d = abs(val - c)
+        if d < best_dist:
+            best, best_dist = c, d
+    return best if best_dist <= tolerance else 0
+
+
+def map_pallet_size_key(num_a, num_b, product_name="", option_data=None):
+    # type: (int, int, str, dict) -> tuple
+    """
+    파렛트랙/철판형 스마트스토어 치수 (두 숫자) → 실제 시스템 size 키 + 타입 판정.
+
+    스마트스토어 표기는 폭x깊이 또는 깊이x폭 등 혼재.
+    로드빔 길이(1390/2090/2590/2790)가 어느 숫자인지 판별 후 size 키 생성.
+
+    반환: (size_key, is_iron)
+      size_key : str  "1390x1000", "2590x800" 등. 매핑 실패 시 ""
+      is_iron  : bool True=철판형, False=일반 파렛트랙
+
+    ※ 2090 = 철판형 EXTRA_OPTIONS 전용 (파렛트랙 일반엔 없음)
+    ※ 2790 = 파렛트랙 일반만 (철판형 없음)
+    ※ 800 깊이 = 철판형만 허용
+    """
+    cat = get_catalog()
+    a_beam = cat.snap("파렛트랙", "rodbeam_mm", num_a, _PALLET_TOLERANCE) or 0
+    b_depth = cat.snap("파렛트랙", "depth_mm", num_b, _PALLET_TOLERANCE) or 0
+    b_beam = cat.snap("파렛트랙", "rodbeam_mm", num_b, _PALLET_TOLERANCE) or 0
+    a_depth = cat.snap("파렛트랙", "depth_mm", num_a, _PALLET_TOLERANCE) or 0
+
+    # 케이스1: a가 로드빔, b가 깊이
+    if a_beam and b_depth:
+        rod = a_beam
+        dep = b_depth
+    # 케이스2: b가 로드빔, a가 깊이
+    elif b_beam and a_depth:
+        rod = b_beam
+        dep = a_depth
+    else:
+        # 매핑 불가
+        return ("", False)
+
+    is_iron = "철판" in product_name
+    if option_data and option_data.get("is_iron"):
+        is_iron = True
+        
+    # 800 깊이는 철판형만 허용
+    if dep == 800:
+        is_iron = True
+    # 2090은 철판형 EXTRA_OPTIONS 전용
+    if rod == 2090 and not is_iron:
+        is_iron = True
+    # 2790은 파렛트랙 일반만 (철판형 없음)
+    if rod == 2790 and is_iron:
+        return ("", False)  # 존재하지 않는 조합
+
+    size_key = "{}x{}".format(rod, dep)
+    return (size_key, is_iron)
+
+
+def map_highrack_color(raw_color):
+    # type: (str) -> str
+    """
+    스마트스토어의 잡다한 하이랙 색상(예: 아이보리 200kg, 700kg 등)을
+    시스템의 5가지 표준 color 키로 매핑.
+    (메트그레이 270/450, 블루오렌지 270/450, 블루오렌지 600kg)
+    """
+    if not raw_color: return "메트그레이(볼트식)270kg"
+    
+    raw = str(raw_color).replace(" ", "")
+    is_blue_orange = "블루" in raw or "오렌지" in raw
+    is_ivory = "아이보리" in raw
+    
+    # 중량 추출 (숫자만 보고 시스템 표준 중량으로 매핑)
+    weight = "270kg"
+    if "700" in raw or "600" in raw:
+        weight = "600kg"
+    elif "450" in raw or "350" in raw:
+        weight = "450kg"
+    elif "200" in raw or "270" in raw:
+        weight = "270kg"
+        
+    if is_blue_orange:
+        # 블루오렌지의 경우 로드빔은 _generate_inventory_part_id에서 별도 처리됨
+        return "블루(기둥)+오렌지(가로대)(볼트식){}".format(weight)
+    elif is_ivory:
+        return "아이보리(볼트식){}".format(weight)
+    else:
+        # 기타 색상(메트그레이 등)은 전부 메트그레이 통일
+        return "메트그레이(볼트식){}".format(weight)
+
+
+def classify_row(order):
+    # type: (dict) -> str
+    """
+    주문 1행이 메인 랙인지 추가부품(addon)인지 분류.
+
+    ★ 버그 수정: ADDON_KEYWORDS 체크가 반드시 최우선이어야 함.
+      이전 코드는 parse_option 결과 색상/규격 체크가 먼저 실행되어
+      '아이보리선반 단추가(볼트식)' 같은 상품이 items[]로 잘못 분류됨.
+
+    반환: "main" | "addon"
+    """
+    o            = as_order(order)
+    product_name = o.product_name
+    option_str   = o.option
+    combined     = product_name + " " + option_str
+
+    # ① 지원 랙 이름으로 시작하면 파싱 없이 바로 main
+    #    (옵션에 '추가상품구매'가 있어도 메인 주문임)
+    for prefix in SUPPORTED_RACK_PREFIXES:
+        if product_name.strip().startswith(prefix):
+            return "main"
+
+    # ② 명시적인 추가부품 문구가 있으면 addon
+    addon_check_str = combined.replace("추가상품구매", "")
+    for kw in ADDON_KEYWORDS:
+        if kw in addon_check_str:
+            return "addon"
+
+    # ③ 색상 또는 규격(폭) 있으면 main
+    parsed = parse_smartstore_option(option_str)
+    if (parsed.get("color") or parsed.get("width") or parsed.get("size_raw")):
+        return "main"
+        
+    return "addon"
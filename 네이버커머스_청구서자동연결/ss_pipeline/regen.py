@@ -0,0 +1,511 @@
+# -*- coding: utf-8 -*-
+"""
+ss_pipeline/regen.py
+─────────────────────────────────────────────────────────────────────────────
+purchase_ss_* 문서 일괄 재생성 엔진 (멀티프로세스)
+
+  engine = RegenEngine(workers=8, keep_documents=True)
+  report = DiffReport("order_logs/regen_report.jsonl")
+  writer = BatchWriter(store, batch_size=50)
+  for result in engine.run(sorted(docs.items())):
+      report.add(result)
+      if result["status"] == "ok":
+          writer.add(result["doc_id"], result["document"])
+  writer.close()
+
+- 문서를 chunksize 개씩 묶어 ProcessPoolExecutor 로 보냅니다. 동시에 떠 있는 묶음은
+  workers × 2 개로 제한하므로 문서 수와 관계없이 메모리가 일정합니다.
+- admin_prices 단가표와 materialOrder.json 정렬 규칙은 부모 프로세스에서 1회 로드합니다.
+  fork 면 워커가 그대로 물려받아 읽기 전용으로 공유(copy-on-write)하고,
+  spawn 이면 워커 초기화 때 한 번만 넘깁니다.
+- 결과는 끝나는 순서대로 바로 흘려보냅니다 (diff 리포트 / batch 저장 / 진행률).
+- workers=1 이면 풀 없이 현재 프로세스에서 같은 코드로 돕니다 (디버깅용).
+- 재생성 전/후 items+materials 의 content hash 가 같으면 diff.changed=False 이고
+  document 를 돌려주지 않습니다 (저장 생략 → updated_at 보존).
+- Checkpoint: 처리한 doc_id 별 {저장된 내용 hash, 규칙 버전}. 다음 실행에서는
+  내용도 규칙(ss_pipeline 소스 전체, 단가표, 규격 카탈로그, REGEN_LOGIC_VERSION)도 그대로인 문서를 건너뜁니다.
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import datetime
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .bom import build_item_name, generate_bom_for_rack
+from .catalog import get_catalog
+from .document import build_grouped_document, material_order_rules, set_material_order_rules
+from .pricing import _load_admin_prices_cache, set_admin_prices
+from .racks import get_rack_type, parse_smartstore_option
+
+STATUS_OK = "ok"
+STATUS_SKIP = "skip"
+STATUS_ERROR = "error"
+
+# ss_pipeline 밖의 입력으로 재생성 결과가 바뀌면 올릴 것 (패키지 소스 / 단가표 / 카탈로그 변경은 자동 감지)
+REGEN_LOGIC_VERSION = 1
+
+_PKG_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _json_list(value):
+    # type: (object) -> list
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str) and value:
+        try:
+            parsed = json.loads(value)
+            return parsed if isinstance(parsed, list) else []
+        except ValueError:
+            return []
+    return []
+
+
+def _sha(text):
+    # type: (str) -> str
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def content_hash(items, materials):
+    # type: (List[dict], List[dict]) -> str
+    """items + materials 내용 hash (키 순서 무관)."""
+    return _sha(json.dumps({"items": items, "materials": materials}, ensure_ascii=False,
+                           sort_keys=True, separators=(",", ":"), default=str))
+
+
+def document_hash(doc):
+    # type: (dict) -> str
+    """저장된 문서의 content_hash (items/materials 가 JSON 문자열이어도 됨)."""
+    return content_hash(_json_list(doc.get("items")), _json_list(doc.get("materials")))
+
+
+def rules_versions():
+    # type: () -> Dict[str, str]
+    """재생성 결과를 좌우하는 입력별 버전. 하나라도 바뀌면 체크포인트의 문서를 다시 봅니다."""
+    versions = {"logic": str(REGEN_LOGIC_VERSION)}
+    # racks/bom 외에도 catalog / order / document / pricing 등이 결과를 바꾸므로 패키지 소스 전부
+    for filename in sorted(os.listdir(_PKG_DIR)):
+        if filename.endswith(".py"):
+            with open(os.path.join(_PKG_DIR, filename), "rb") as f:
+                versions[filename[:-3]] = hashlib.sha256(f.read()).hexdigest()[:16]
+    versions["prices"] = _sha(json.dumps(_load_admin_prices_cache(), ensure_ascii=False,
+                                         sort_keys=True, default=str))
+    versions["catalog"] = get_catalog().fingerprint
+    return versions
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# 문서 1건 재생성 + 비교
+# ═════════════════════════════════════════════════════════════════════════════
+
+def _rebuild_item_name(pseudo_order):
+    # type: (dict) -> str
+    """
+    build_item_name 을 저장된 이름에 다시 적용. 비지원 랙은 상품명 뒤에 규격을 덧붙이므로
+    이미 같은 규격이 붙어 있으면 그대로 둠 (재실행할 때마다 이름이 길어지지 않게).
+    """
+    name = pseudo_order["상품명"]
+    new_name = build_item_name(pseudo_order)
+    if name and new_name.startswith(name + " ") and name.endswith(new_name[len(name):]):
+        return name
+    return new_name
+
+
+def regenerate_document(doc, warnings=None):
+    # type: (dict, Optional[List[str]]) -> Tuple[Optional[List[dict]], Optional[List[dict]], Optional[str]]
+    """
+    문서의 items JSON에서 원본 상품명+옵션을 읽어
+    수정된 코드로 materials를 재생성하고, items의 name도 함께 갱신합니다.
+    반환: (materials, items, 오류메시지). BOM 단계 경고는 warnings 에 모읍니다.
+    """
+    items = doc.get("items", [])
+    if isinstance(items, str):
+        try:
+            items = json.loads(items)
+        except (json.JSONDecodeError, TypeError):
+            return None, None, "items JSON 파싱 실패"
+
+    if not items:
+        return None, None, "items 비어있음"
+
+    all_materials = {}
+    updated_items = []
+
+    for item in items:
+        # 원본 주문 행 구조 복원 (build_item_name을 위해)
+        pseudo_order = {
+            "상품명": item.get("name", ""),
+            "옵션": item.get("note", ""),
+        }
+
+        # 1. 항목명(name) 재생성 (하이랙 감지 및 규격 rounding 적용)
+        item["name"] = _rebuild_item_name(pseudo_order)
+        updated_items.append(item)
+
+        name = pseudo_order["상품명"]
+        note = pseudo_order["옵션"]
+        qty = item.get("quantity", 1) or 1
+
+        # 랙 종류 판별 (원본 상품명 기준)
+        rack_type = get_rack_type(name, note)
+        if not rack_type:
+            continue  # 비지원 랙은 건너뜀
+
+        # 옵션 파싱
+        option = parse_smartstore_option(note)
+
+        # BOM 생성
+        try:
+            bom = generate_bom_for_rack(rack_type, option, qty)
+            # 병합 (같은 _inventoryPartId는 수량 합산)
+            for mat in bom:
+                inv_id = mat.get("_inventoryPartId", "")
+                if inv_id in all_materials:
+                    all_materials[inv_id]["quantity"] += mat["quantity"]
+                else:
+                    all_materials[inv_id] = dict(mat)
+        except Exception as e:
+            if warnings is not None:
+                warnings.append("BOM 재생성 에러 ({}): {}".format(name[:40], e))
+
+    materials = sorted(all_materials.values(),
+                       key=lambda x: (x.get("rackType", ""), x["name"]))
+    return materials, updated_items, None
+
+
+def _qty_by_part(materials):
+    # type: (List[dict]) -> Dict[str, int]
+    qty = {}  # type: Dict[str, int]
+    for mat in materials:
+        key = (mat.get("_inventoryPartId") or mat.get("inventoryPartId")
+               or mat.get("partId") or mat.get("name") or "")
+        try:
+            qty[key] = qty.get(key, 0) + int(mat.get("quantity", 0) or 0)
+        except (TypeError, ValueError):
+            qty[key] = qty.get(key, 0)
+    return qty
+
+
+def diff_document(old_materials, new_materials, old_item_names, new_items):
+    # type: (List[dict], List[dict], List[str], List[dict]) -> Dict[str, object]
+    """기존 vs 재생성 materials(부품ID별 수량) / items 이름 비교."""
+    before, after = _qty_by_part(old_materials), _qty_by_part(new_materials)
+    added = sorted(set(after) - set(before))
+    removed = sorted(set(before) - set(after))
+    qty_changed = {pid: [before[pid], after[pid]]
+                   for pid in sorted(set(before) & set(after)) if before[pid] != after[pid]}
+    new_names = [str(it.get("name", "")) for it in new_items]
+    renamed = [[old, new] for old, new in zip(old_item_names, new_names) if old != new]
+    return {
+        "changed":          bool(added or removed or qty_changed or renamed
+                                 or len(old_materials) != len(new_materials)),
+        "materials_before": len(old_materials),
+        "materials_after":  len(new_materials),
+        "added":            added,
+        "removed":          removed,
+        "qty_changed":      qty_changed,
+        "items_renamed":    renamed,
+    }
+
+
+def regenerate_one(doc_id, doc, keep_document=False):
+    # type: (str, dict, bool) -> Dict[str, object]
+    """
+    문서 1건 → 결과 dict {doc_id, status, error, warnings, diff, source_hash, content_hash[, document]}.
+    document 는 keep_document 이고 내용이 바뀐 경우에만 붙습니다.
+    """
+    result = {"doc_id": doc_id, "status": STATUS_OK, "error": None, "warnings": [], "diff": None,
+              "source_hash": None, "content_hash": None}
+    items = _json_list(doc.get("items"))
+    old_materials = _json_list(doc.get("materials"))
+    # regenerate_document 가 items 의 name 을 바꾸므로 먼저 계산
+    result["source_hash"] = content_hash(items, old_materials)
+    if not items:
+        # 파싱 실패도 기존 마이그레이션과 같이 '건너뜀' 으로 집계
+        result.update(status=STATUS_SKIP, error="items 없음")
+        return result
+
+    old_item_names = [str(it.get("name", "")) for it in items]
+    items = [dict(it) for it in items]  # 호출자 문서(workers=1)의 items 는 그대로 둠
+    try:
+        new_mats, updated_items, err = regenerate_document(dict(doc, items=items), result["warnings"])
+    except Exception as e:
+        new_mats, updated_items, err = None, None, "{}: {}".format(type(e).__name__, e)
+    if err:
+        result.update(status=STATUS_ERROR, error=err)
+        return result
+
+    result["diff"] = diff_document(old_materials, new_mats, old_item_names, updated_items)
+    result["content_hash"] = content_hash(updated_items, new_mats)
+    # 저장 여부는 hash 기준 (부품별 수량이 같아도 단가 등 다른 필드가 바뀌었으면 변경)
+    result["diff"]["changed"] = result["content_hash"] != result["source_hash"]
+    if keep_document and result["diff"]["changed"]:
+        updated_doc = dict(doc)
+        updated_doc["materials"] = new_mats
+        updated_doc["items"] = updated_items
+        result["document"] = updated_doc
+    return result
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# 워커
+# ═════════════════════════════════════════════════════════════════════════════
+
+def _init_worker(tables):
+    # type: (Optional[Tuple[dict, List[dict]]]) -> None
+    """spawn 워커: 부모가 읽어 둔 단가표/정렬 규칙을 1회 주입 (fork 면 tables=None, 이미 물려받음)."""
+    if tables is not None:
+        prices, rules = tables
+        set_admin_prices(prices)
+        set_material_order_rules(rules)
+
+
+def _regen_chunk(chunk, keep_documents):
+    # type: (List[Tuple[str, dict]], bool) -> List[Dict[str, object]]
+    return [regenerate_one(doc_id, doc, keep_documents) for doc_id, doc in chunk]
+
+
+def _build_chunk(groups):
+    # type: (List[List[dict]]) -> List[dict]
+    return [build_grouped_document(group) for group in groups]
+
+
+def _chunks(iterable, size):
+    # type: (Iterable, int) -> Iterator[list]
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class RegenEngine(object):
+    def __init__(self, workers=None, chunksize=32, keep_documents=False):
+        # type: (Optional[int], int, bool) -> None
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.chunksize = max(1, chunksize)
+        self.keep_documents = keep_documents
+
+    def _shared_tables(self):
+        # type: () -> Optional[Tuple[dict, List[dict]]]
+        """부모에서 테이블을 로드. fork 면 None (워커가 메모리를 그대로 물려받음)."""
+        prices = _load_admin_prices_cache()
+        rules = material_order_rules()
+        if multiprocessing.get_start_method() == "fork":
+            return None
+        return prices, rules
+
+    def _pool(self):
+        # type: () -> ProcessPoolExecutor
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                   initargs=(self._shared_tables(),))
+
+    def run(self, docs):
+        # type: (Iterable[Tuple[str, dict]]) -> Iterator[Dict[str, object]]
+        """(doc_id, doc) 들을 재생성해 결과를 끝나는 순서대로 내놓습니다."""
+        # 지연 디코딩 문서(StoredDocument)는 JSON 문자열 그대로 보내 워커에서 파싱
+        plain = ((doc_id, dict(doc)) for doc_id, doc in docs)
+        if self.workers == 1:
+            for doc_id, doc in plain:
+                yield regenerate_one(doc_id, doc, self.keep_documents)
+            return
+
+        max_pending = self.workers * 2
+        with self._pool() as pool:
+            pending = set()
+            for chunk in _chunks(plain, self.chunksize):
+                pending.add(pool.submit(_regen_chunk, chunk, self.keep_documents))
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        for result in future.result():
+                            yield result
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for result in future.result():
+                        yield result
+
+    def build_documents(self, groups):
+        # type: (List[List[dict]]) -> List[dict]
+        """주문 그룹 목록 → build_grouped_document 결과 (입력 순서 유지)."""
+        if self.workers == 1 or len(groups) < 2:
+            return _build_chunk(groups)
+        chunks = list(_chunks(groups, self.chunksize))
+        with self._pool() as pool:
+            return [payload for part in pool.map(_build_chunk, chunks) for payload in part]
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# 결과 소비: diff 리포트 / batch 저장 / 진행률
+# ═════════════════════════════════════════════════════════════════════════════
+
+class DiffReport(object):
+    """결과를 JSONL 로 흘려 쓰고(path 가 있으면) 요약 건수를 모읍니다."""
+
+    def __init__(self, path=""):
+        # type: (str) -> None
+        self.path = path
+        self._fp = open(path, "w", encoding="utf-8") if path else None
+        self.counts = {"total": 0, "changed": 0, "unchanged": 0, "skip": 0, "error": 0,
+                       "materials_added": 0, "materials_removed": 0, "qty_changed": 0,
+                       "items_renamed": 0}
+
+    def add(self, result):
+        # type: (Dict[str, object]) -> None
+        counts = self.counts
+        counts["total"] += 1
+        diff = result.get("diff")
+        if result["status"] != STATUS_OK:
+            counts[result["status"]] += 1
+        elif diff["changed"]:
+            counts["changed"] += 1
+            counts["materials_added"] += len(diff["added"])
+            counts["materials_removed"] += len(diff["removed"])
+            counts["qty_changed"] += len(diff["qty_changed"])
+            counts["items_renamed"] += len(diff["items_renamed"])
+        else:
+            counts["unchanged"] += 1
+        if self._fp is not None:
+            line = {k: v for k, v in result.items() if k != "document"}
+            self._fp.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+    def close(self):
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+
+class BatchWriter(object):
+    """
+    batch_size 건씩 모아 store.save_documents 로 저장 (DocumentStore 인터페이스).
+    on_saved(doc_ids) 는 batch 마다 저장에 성공한 doc_id 목록으로 불립니다 (체크포인트 기록용).
+    """
+
+    def __init__(self, store, batch_size=50, on_saved=None):
+        self.store = store
+        self.batch_size = max(1, batch_size)
+        self.on_saved = on_saved
+        self.pending = {}      # type: Dict[str, dict]
+        self.saved = 0
+        self.failed_ids = []   # type: List[str]
+
+    def add(self, doc_id, doc):
+        # type: (str, dict) -> None
+        self.pending[doc_id] = doc
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, {}
+        saved, failed_ids = self.store.save_documents(batch, batch_size=self.batch_size)
+        self.saved += saved
+        self.failed_ids.extend(failed_ids)
+        if self.on_saved is not None:
+            failed = set(failed_ids)
+            self.on_saved([doc_id for doc_id in batch if doc_id not in failed])
+
+    def close(self):
+        # type: () -> Tuple[int, List[str]]
+        self.flush()
+        return self.saved, self.failed_ids
+
+
+class Checkpoint(object):
+    """
+    처리 완료 문서 기록 (JSON 파일).
+
+      {"rules": 규칙 버전, "versions": {logic, <ss_pipeline 모듈별 소스 hash>, prices, catalog},
+       "docs": {doc_id: {"hash": 저장된 content_hash, "rules": 처리 당시 규칙 버전}}}
+
+    문서 내용 hash 와 규칙 버전이 모두 같으면 재생성 결과도 같으므로 건너뜁니다.
+    """
+
+    def __init__(self, path, versions=None):
+        # type: (str, Optional[Dict[str, str]]) -> None
+        self.path = path
+        self.versions = versions or rules_versions()
+        self.rules = _sha(json.dumps(self.versions, sort_keys=True))
+        self.docs = {}               # type: Dict[str, Dict[str, str]]
+        self.previous_versions = {}  # type: Dict[str, str]
+        self._dirty = False
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.docs = data.get("docs") or {}
+            self.previous_versions = data.get("versions") or {}
+
+    def changed_rules(self):
+        # type: () -> List[str]
+        """지난 체크포인트 이후 바뀐 규칙 이름 (처음이면 빈 목록)."""
+        if not self.previous_versions:
+            return []
+        return sorted(k for k, v in self.versions.items() if self.previous_versions.get(k) != v)
+
+    def is_current(self, doc_id, source_hash):
+        # type: (str, str) -> bool
+        entry = self.docs.get(doc_id)
+        return bool(entry) and entry.get("hash") == source_hash and entry.get("rules") == self.rules
+
+    def record(self, doc_id, stored_hash):
+        # type: (str, str) -> None
+        self.docs[doc_id] = {"hash": stored_hash, "rules": self.rules}
+        self._dirty = True
+
+    def save(self):
+        """임시 파일 → os.replace (중단돼도 이전 체크포인트는 온전)."""
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = "{}.{}.tmp".format(self.path, os.getpid())
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "rules":    self.rules,
+                "versions": self.versions,
+                "saved_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                "docs":     self.docs,
+            }, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+
+class Progress(object):
+    """interval 초마다 한 줄: 처리 건수 / 비율 / 처리 속도 / ETA."""
+
+    def __init__(self, total=None, interval=2.0, stream=None):
+        # type: (Optional[int], float, Optional[object]) -> None
+        self.total = total
+        self.interval = interval
+        self.stream = stream or sys.stdout
+        self.done = 0
+        self.started = time.perf_counter()
+        self._last = self.started
+
+    def tick(self, n=1):
+        self.done += n
+        now = time.perf_counter()
+        if now - self._last >= self.interval:
+            self._last = now
+            self.stream.write(self.line() + "\n")
+            self.stream.flush()
+
+    def line(self):
+        # type: () -> str
+        elapsed = max(1e-9, time.perf_counter() - self.started)
+        rate = self.done / elapsed
+        if self.total:
+            remaining = max(0, self.total - self.done)
+            eta = int(remaining / rate) if rate else 0
+            return "  진행 {}/{} ({:.1f}%)  {:.0f}건/s  ETA {:d}:{:02d}".format(
+                self.done, self.total, 100.0 * self.done / self.total, rate, eta // 60, eta % 60)
+        return "  진행 {}건  {:.0f}건/s".format(self.done, rate)
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+ss_pipeline/runner.py
+─────────────────────────────────────────────────────────────────────────────
+단계 조합 실행기
+
+  pipeline = Pipeline(CsvSource("order_logs/orders_*.csv"), RowParser(),
+                      sinks=[JsonlSink("/tmp/docs.jsonl")], executor="process", workers=4)
+  result = pipeline.run()
+
+실행 방식 (executor):
+  serial  : 현재 스레드에서 순서대로
+  thread  : ThreadPoolExecutor — 싱크/단가 조회가 I/O 위주일 때
+  process : ProcessPoolExecutor — BOM 생성이 CPU 위주인 대량 재생성 (builder 는 pickle 가능해야 함)
+
+문서 생성만 병렬로 돌고, 결과는 그룹 순서대로 현재 스레드에서 싱크에 넘깁니다.
+그룹 하나가 실패해도 나머지는 계속 처리하고 failed 로 집계합니다.
+
+CLI (CSV 로그 재생 → JSONL, 네트워크 없음):
+  python3 -m ss_pipeline.runner --csv "order_logs/orders_*.csv" --out /tmp/docs.jsonl --executor process
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import argparse
+import functools
+import io
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .stages import (
+    CsvSource,
+    DocumentBuilder,
+    DocumentSink,
+    JsonlSink,
+    OrderGrouper,
+    OrderParser,
+    OrderSource,
+    RowParser,
+    SessionGrouper,
+)
+
+log = logging.getLogger("sammirack.listener.pipeline")
+
+EXECUTORS = ("serial", "thread", "process")
+
+
+def _build_group(builder, group):
+    # type: (DocumentBuilder, List[dict]) -> Tuple[Optional[dict], Optional[str]]
+    """프로세스 풀에서도 쓰이므로 모듈 최상위 함수. 예외는 문자열로 돌려준다."""
+    try:
+        return builder.build(group), None
+    except Exception as e:
+        return None, "{}: {}".format(type(e).__name__, e)
+
+
+class Pipeline(object):
+    def __init__(self, source, parser=None, grouper=None, builder=None, sinks=(),
+                 executor="serial", workers=None, chunksize=16):
+        # type: (OrderSource, Optional[OrderParser], Optional[OrderGrouper], Optional[DocumentBuilder], Sequence[DocumentSink], str, Optional[int], int) -> None
+        if executor not in EXECUTORS:
+            raise ValueError("executor 는 {} 중 하나: {}".format("/".join(EXECUTORS), executor))
+        self.source = source
+        self.parser = parser or RowParser()
+        self.grouper = grouper or SessionGrouper()
+        self.builder = builder or DocumentBuilder()
+        self.sinks = list(sinks)
+        self.executor = executor
+        self.workers = workers
+        self.chunksize = max(1, chunksize)
+
+    def prepare(self):
+        # type: () -> Tuple[List[List[dict]], Dict[str, int]]
+        """source → parser → grouper. (그룹 목록, 건수) 반환."""
+        records = self.source.fetch()
+        orders = []    # type: List[dict]
+        accepted = []  # type: List[dict]
+        for record in records:
+            order = self.parser.parse(record)
+            if order is None:
+                continue
+            orders.append(order)
+            if self.grouper.accept(order):
+                accepted.append(order)
+        groups = self.grouper.group(accepted) if accepted else []
+        groups += self.grouper.drain(force=True)   # 일괄 실행: 창을 열어 둔 grouper 도 여기서 모두 방출
+        counts = {
+            "records": len(records),
+            "orders":  len(orders),
+            "skipped": len(orders) - len(accepted),
+            "groups":  len(groups),
+        }
+        return groups, counts
+
+    def build(self, groups):
+        # type: (List[List[dict]]) -> Iterator[Tuple[List[dict], Optional[dict], Optional[str]]]
+        """그룹마다 (group, payload, error) 를 입력 순서대로 내놓습니다."""
+        build_one = functools.partial(_build_group, self.builder)
+        if self.executor == "serial" or len(groups) < 2:
+            for group in groups:
+                payload, error = build_one(group)
+                yield group, payload, error
+            return
+        if self.executor == "thread":
+            pool = ThreadPoolExecutor(max_workers=self.workers)
+            results = pool.map(build_one, groups)
+        else:
+            pool = ProcessPoolExecutor(max_workers=self.workers)
+            results = pool.map(build_one, groups, chunksize=self.chunksize)
+        with pool:
+            for group, (payload, error) in zip(groups, results):
+                yield group, payload, error
+
+    def run(self):
+        # type: () -> Dict[str, object]
+        t0 = time.perf_counter()
+        groups, result = self.prepare()
+        documents = failed = 0
+        written = {type(sink).__name__: 0 for sink in self.sinks}  # type: Dict[str, int]
+        try:
+            for group, payload, error in self.build(groups):
+                if payload is None:
+                    failed += 1
+                    log.error("문서 생성 실패: %s", error, extra={
+                        "tag": "PIPELINE", "order_ids": [o.get("상품주문번호") for o in group]})
+                    continue
+                documents += 1
+                for sink in self.sinks:
+                    name = type(sink).__name__
+                    try:
+                        if sink.write(payload):
+                            written[name] += 1
+                    except Exception as e:
+                        log.error("싱크 %s 실패: %s", name, e,
+                                  extra={"tag": "PIPELINE", "doc_id": payload.get("doc_id")})
+        finally:
+            for sink in self.sinks:
+                sink.close()
+        result.update({
+            "documents": documents,
+            "failed":    failed,
+            "written":   written,
+            "executor":  self.executor,
+            "elapsed_s": round(time.perf_counter() - t0, 3),
+        })
+        return result
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# CLI
+# ═════════════════════════════════════════════════════════════════════════════
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="주문 CSV 로그 → document JSONL (ss_pipeline 재생)")
+    p.add_argument("--csv", required=True, help="주문 CSV glob (예: order_logs/orders_*.csv)")
+    p.add_argument("--out", default="", help="document JSONL 출력 경로 (생략 시 건수만)")
+    p.add_argument("--executor", choices=EXECUTORS, default="serial")
+    p.add_argument("--workers", type=int, default=None, help="스레드/프로세스 수 (기본: CPU 수)")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+    args = parse_args(argv)
+    sinks = [JsonlSink(args.out)] if args.out else []
+    result = Pipeline(CsvSource(args.csv), sinks=sinks, executor=args.executor, workers=args.workers).run()
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+ss_pipeline/stages.py
+─────────────────────────────────────────────────────────────────────────────
+파이프라인 단계 인터페이스 + 기본 구현
+
+  source → parser → grouper → (BOM builder + pricer → 문서) → sinks
+
+  단계          메서드                                   기본 구현
+  OrderSource   fetch() → 원천 레코드 리스트             RowSource / CsvSource
+  OrderParser   parse(record) → SmartstoreOrder | None  RowParser / NaverItemParser
+  OrderGrouper  accept(order) / group(orders) / drain() / pending()  SessionGrouper / WindowedSessionGrouper
+  BomBuilder    build(rack_type, option_data, qty, pricer) RuleBomBuilder
+  Pricer        price(part_id) → int                    AdminPricer / TablePricer
+  DocumentSink  write(payload) → bool, close()          ListSink / JsonlSink
+
+네이버 API 소스와 서버 저장 싱크는 네트워크가 필요하므로 order_listener 에 있습니다
+(NaverOrderSource / ServerSink). 프로세스 실행기(runner.Pipeline)에서 쓰는 단계는
+pickle 가능해야 합니다 (모듈 최상위 클래스 + 단순 속성).
+주문행은 ss_pipeline.order.SmartstoreOrder (dict 처럼 한글 키로도 읽힘).
+─────────────────────────────────────────────────────────────────────────────
+"""
+
+import glob
+import json
+import os
+from typing import Iterable, List, Optional
+
+from .bom import generate_bom_for_rack
+from .document import build_grouped_document
+from .grouping import SessionWindow, group_orders_by_session
+from .order import SmartstoreOrder, as_order
+from .pricing import _lookup_admin_price, normalize_admin_prices, price_of_entry
+from .racks import is_supported_rack
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# 인터페이스
+# ═════════════════════════════════════════════════════════════════════════════
+
+class OrderSource(object):
+    """주문 원천 (API / CSV / 메모리)."""
+
+    def fetch(self):
+        # type: () -> List[dict]
+        raise NotImplementedError
+
+
+class OrderParser(object):
+    """원천 레코드 1건 → 주문행 (SmartstoreOrder). 버릴 레코드는 None."""
+
+    def parse(self, record):
+        # type: (dict) -> Optional[SmartstoreOrder]
+        raise NotImplementedError
+
+
+class OrderGrouper(object):
+    """지원 랙 필터 + 문서 단위 그룹핑."""
+
+    def accept(self, order):
+        # type: (dict) -> bool
+        return True
+
+    def group(self, orders):
+        # type: (List[dict]) -> List[List[dict]]
+        raise NotImplementedError
+
+    def drain(self, force=False):
+        # type: (bool) -> List[List[dict]]
+        """사이클 사이에 들고 있던 그룹 중 내보낼 것 (상태 없는 grouper 는 항상 빈 리스트)."""
+        return []
+
+    def pending(self):
+        # type: () -> List[dict]
+        """들고 있지만 아직 내보내지 않은 주문행 (재시작 시 group() 으로 다시 넣을 수 있게)."""
+        return []
+
+
+class BomBuilder(object):
+    """메인 랙 1행 → materials[] (pricer 는 part_id → 단가 함수 또는 None)."""
+
+    def build(self, rack_type, option_data, quantity, pricer=None):
+        # type: (str, dict, int, object) -> List[dict]
+        raise NotImplementedError
+
+
+class Pricer(object):
+    """part_id → 단가 (모르면 0)."""
+
+    def price(self, part_id):
+        # type: (str) -> int
+        raise NotImplementedError
+
+
+class DocumentSink(object):
+    """완성된 document 페이로드를 받는 곳. write 가 False 면 실패로 집계."""
+
+    def write(self, payload):
+        # type: (dict) -> bool
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# 기본 구현
+# ═════════════════════════════════════════════════════════════════════════════
+
+class RowSource(OrderSource):
+    """이미 주문행 형태인 dict 목록 (테스트 / 다른 스크립트가 모은 행)."""
+
+    def __init__(self, rows):
+        # type: (Iterable[dict]) -> None
+        self.rows = list(rows)
+
+    def fetch(self):
+        return list(self.rows)
+
+
+class CsvSource(OrderSource):
+    """order_logs/orders_*.csv 누적 로그."""
+
+    def __init__(self, pattern):
+        # type: (str) -> None
+        self.pattern = pattern
+
+    def fetch(self):
+        from order_csv_log import iter_order_rows
+
+        rows = []  # type: List[dict]
+        for path in sorted(glob.glob(self.pattern)):
+            rows.extend(iter_order_rows(path))
+        return rows
+
+
+class RowParser(OrderParser):
+    """주문행 dict → SmartstoreOrder (상품주문번호 없는 행만 버림)."""
+
+    def parse(self, record):
+        if isinstance(record, SmartstoreOrder):
+            return record if record.product_order_id else None
+        if not isinstance(record, dict) or not record.get("상품주문번호"):
+            return None
+        return SmartstoreOrder.from_row(record)
+
+
+def parse_naver_item(item):
+    # type: (dict) -> Optional[SmartstoreOrder]
+    """API 응답의 단일 주문 항목 → 주문행 (필드 매핑은 SmartstoreOrder.from_naver_item)."""
+    return SmartstoreOrder.from_naver_item(item)
+
+
+class NaverItemParser(OrderParser):
+    """네이버 커머스 /product-orders/query 응답 항목 → 주문행."""
+
+    def parse(self, record):
+        return parse_naver_item(record)
+
+
+class SessionGrouper(OrderGrouper):
+    """is_supported_rack 통과분만, 구매자 + 결제 분 단위로 묶음 (리스너 기본 동작)."""
+
+    def accept(self, order):
+        o = as_order(order)
+        return is_supported_rack(o.product_name, o.option)
+
+    def group(self, orders):
+        return group_orders_by_session(orders)
+
+
+class WindowedSessionGrouper(SessionGrouper):
+    """
+    주문번호 단위로 grace_seconds 동안 모았다가 창이 닫히면 1회 방출 (grouping.SessionWindow).
+    group() 은 이번에 닫힌 그룹만 돌려주므로, 새 주문이 없는 사이클에도 drain() 을 불러야 합니다.
+    """
+
+    def __init__(self, grace_seconds=60.0, max_open=1000):
+        # type: (float, int) -> None
+        self.window = SessionWindow(grace_seconds=grace_seconds, max_open=max_open)
+
+    def group(self, orders):
+        self.window.add(orders)
+        return self.window.drain()
+
+    def drain(self, force=False):
+        return self.window.drain(force=force)
+
+    def pending(self):
+        return self.window.pending()
+
+
+class RuleBomBuilder(BomBuilder):
+    """generate_bom_for_rack (React regenerateBOMFromOptions 재현)."""
+
+    def build(self, rack_type, option_data, quantity, pricer=None):
+        return generate_bom_for_rack(rack_type, option_data, quantity, pricer=pricer)
+
+
+class AdminPricer(Pricer):
+    """admin_prices.json (프로세스마다 첫 조회 때 1회 로드)."""
+
+    def price(self, part_id):
+        return _lookup_admin_price(part_id)
+
+
+class TablePricer(Pricer):
+    """메모리 단가표 {part_id: price 또는 {price: ...}}."""
+
+    def __init__(self, table):
+        # type: (object) -> None
+        self.table = normalize_admin_prices(table)
+
+    def price(self, part_id):
+        return price_of_entry(self.table.get(part_id))
+
+
+class DocumentBuilder(object):
+    """주문 그룹 → document 페이로드 (BOM builder / pricer 조합)."""
+
+    def __init__(self, bom_builder=None, pricer=None):
+        # type: (Optional[BomBuilder], Optional[Pricer]) -> None
+        self.bom_builder = bom_builder or RuleBomBuilder()
+        self.pricer = pricer or AdminPricer()
+
+    def build(self, group):
+        # type: (List[dict]) -> dict
+        return build_grouped_document(group, bom_builder=self.bom_builder.build, pricer=self.pricer.price)
+
+
+class ListSink(DocumentSink):
+    """메모리에 모음 (테스트 / 후속 처리용)."""
+
+    def __init__(self):
+        self.payloads = []  # type: List[dict]
+
+    def write(self, payload):
+        self.payloads.append(payload)
+        return True
+
+
+class JsonlSink(DocumentSink):
+    """document 1건 = JSON 1줄."""
+
+    def __init__(self, path):
+        # type: (str) -> None
+        self.path = path
+        self._fp = None
+
+    def write(self, payload):
+        if self._fp is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._fp = open(self.path, "a", encoding="utf-8")
+        self._fp.write(json.dumps(payload, ensure_ascii=False, default=str) + "\n")
+        return True
+
+    def close(self):
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
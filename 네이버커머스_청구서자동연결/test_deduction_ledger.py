@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+test_deduction_ledger.py
+═══════════════════════════════════════════════════════════════════════
+재고 차감 원장 검증: deduct_inventory_for_smartstore → mock_sammirack_api
+(127.0.0.1 대역 서버, 임시 원장 DB — 운영 서버/원장은 건드리지 않음)
+
+  acked 문서 재전송 생략 / pending + 서버 근거 → acked /
+  pending + 근거 없음 → 재전송 안 함 / 4xx → failed /
+  5xx · 연결 실패 · 응답 유실 → pending / reconcile 결과
+═══════════════════════════════════════════════════════════════════════
+"""
+import sys, io, os, socket, tempfile, threading, logging
+sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+sys.path.insert(0, '.')
+
+import mock_sammirack_api
+
+MOCK_ARGS = mock_sammirack_api.parse_args(["--port", "0", "--fail-routes", "deduct", "--seed", "1"])
+MOCK_INVENTORY = {"P1": 10, "P2": 5, "P3": 7}
+MOCK = mock_sammirack_api.make_server(MOCK_ARGS, inventory=dict(MOCK_INVENTORY), prices={})
+threading.Thread(target=MOCK.serve_forever, daemon=True).start()
+MOCK_URL = "http://127.0.0.1:{}/api".format(MOCK.server_address[1])
+
+# config 가 import 시점에 읽으므로 order_listener 보다 먼저 지정
+os.environ["SAMMIRACK_SERVER_URL"] = MOCK_URL
+
+import deduction_ledger as D
+import order_listener as L
+
+if not L.SAMMIRACK_SERVER_URL.startswith("http://127.0.0.1:"):
+    sys.exit("❌ SAMMIRACK_SERVER_URL 이 대역 서버가 아님: {}".format(L.SAMMIRACK_SERVER_URL))
+
+LEDGER_PATH = tempfile.mktemp(prefix="test_deduction_ledger_", suffix=".db")
+D._LEDGER = D.DeductionLedger(LEDGER_PATH)
+LEDGER = D._LEDGER
+
+logging.getLogger("sammirack.listener").setLevel(logging.CRITICAL)
+
+PASS = 0
+FAIL = 0
+TESTS = []
+
+def check(test_id, condition, msg):
+    global PASS, FAIL
+    status = "✅" if condition else "❌"
+    if not condition:
+        FAIL += 1
+    else:
+        PASS += 1
+    TESTS.append((test_id, status, msg, condition))
+    print(f"  {status} [{test_id}] {msg}")
+
+
+def deduct(doc_id, deductions):
+    """partId 검증(inventory_index)은 건너뛰고 주어진 차감량 그대로 요청."""
+    L.validated_deductions = lambda *a, **k: dict(deductions)
+    payload = {"doc_id": doc_id, "materials": [{"inventoryPartId": pid, "quantity": q} for pid, q in deductions.items()]}
+    return L.deduct_inventory_for_smartstore(payload)
+
+
+def status_of(doc_id):
+    entry = LEDGER.entry_for(doc_id)
+    return entry["status"] if entry else None
+
+
+def server_deductions(doc_id=None):
+    """서버(대역)가 실제로 반영한 차감 수 — doc_id 를 주면 그 문서의 activity_log 건수."""
+    if doc_id is None:
+        return MOCK.store.summary()["deductions"]
+    return sum(1 for log in MOCK.store.recent_activity(10000)
+               if (log["details"] or {}).get("documentId") == doc_id)
+
+
+def closed_port_url():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return "http://127.0.0.1:{}/api".format(port)
+
+
+def run_all():
+    print("=" * 70)
+    print("재고 차감 원장 (deduction_ledger) 검증 — 대역 서버 {}".format(MOCK_URL))
+    print("=" * 70)
+
+    # ─── TC-1: 정상 차감 → acked ─────────────────────────────────────
+    print("\n[TC-1] 정상 차감")
+    ok = deduct("doc-ok", {"P1": 2})
+    check("TC-1-반환", ok is True, "차감 성공 반환")
+    check("TC-1-원장", status_of("doc-ok") == D.STATUS_ACKED, f"원장 acked ({status_of('doc-ok')})")
+    check("TC-1-서버", MOCK.store.inventory()["P1"] == 8, f"서버 재고 P1 10→8 ({MOCK.store.inventory()['P1']})")
+
+    # ─── TC-2: 이미 acked → 재전송 생략 ─────────────────────────────
+    print("\n[TC-2] acked 문서 재호출")
+    before = server_deductions()
+    ok = deduct("doc-ok", {"P1": 2})
+    check("TC-2-반환", ok is True, "성공으로 처리")
+    check("TC-2-재전송없음", server_deductions() == before, "서버 차감 요청 없음")
+    ok = deduct("doc-ok", {"P1": 3})
+    check("TC-2-내용변경", ok is True and server_deductions() == before,
+          "다른 내용으로 다시 불러도 재차감 안 함")
+
+    # ─── TC-3: 5xx → pending, 근거 없으면 재전송 안 함 ──────────────
+    print("\n[TC-3] 5xx 응답")
+    MOCK_ARGS.p5xx = 1.0
+    ok = deduct("doc-5xx", {"P2": 1})
+    MOCK_ARGS.p5xx = 0.0
+    check("TC-3-반환", ok is False, "실패 반환")
+    check("TC-3-원장", status_of("doc-5xx") == D.STATUS_PENDING, f"원장 pending 유지 ({status_of('doc-5xx')})")
+    ok = deduct("doc-5xx", {"P2": 1})
+    check("TC-3-재호출", ok is False and status_of("doc-5xx") == D.STATUS_PENDING,
+          "서버 근거 없음 → 실패 반환, pending 유지")
+    check("TC-3-재전송없음", server_deductions("doc-5xx") == 0 and MOCK.store.inventory()["P2"] == 5,
+          "pending 문서 재전송 안 함 (서버 재고 P2 그대로)")
+
+    # ─── TC-4: pending + 서버 근거 → acked ──────────────────────────
+    print("\n[TC-4] pending 문서의 서버 반영 확인")
+    MOCK.store.deduct({"P2": 1}, "doc-5xx", "smartstore-listener")   # 서버는 실제로 반영했던 경우
+    ok = deduct("doc-5xx", {"P2": 1})
+    check("TC-4-반환", ok is True, "성공 반환")
+    check("TC-4-원장", status_of("doc-5xx") == D.STATUS_ACKED, f"원장 acked ({status_of('doc-5xx')})")
+    ack = LEDGER.entry_for("doc-5xx")["server_ack"] or {}
+    check("TC-4-근거", ack.get("source") == "server_lookup" and ack.get("results") == {"P2": 4},
+          f"server_ack 에 서버 조회 결과 저장 ({ack.get('results')})")
+    check("TC-4-이중차감없음", server_deductions("doc-5xx") == 1, "서버 차감 1회뿐")
+
+    # ─── TC-5: 응답 유실 (COMMIT 후 연결 끊김) ──────────────────────
+    print("\n[TC-5] 응답 유실")
+    MOCK_ARGS.p_lost_ack = 1.0
+    ok = deduct("doc-lost", {"P3": 2})
+    MOCK_ARGS.p_lost_ack = 0.0
+    check("TC-5-원장", ok is False and status_of("doc-lost") == D.STATUS_PENDING,
+          f"응답 유실 → pending ({status_of('doc-lost')})")
+    ok = deduct("doc-lost", {"P3": 2})
+    check("TC-5-확정", ok is True and status_of("doc-lost") == D.STATUS_ACKED, "재호출 시 서버 근거로 acked")
+    check("TC-5-이중차감없음", server_deductions("doc-lost") == 1 and MOCK.store.inventory()["P3"] == 5,
+          f"서버 차감 1회, P3 7→5 ({MOCK.store.inventory()['P3']})")
+
+    # ─── TC-6: 4xx → failed ────────────────────────────────────────
+    print("\n[TC-6] 4xx 거부")
+    ok = deduct("doc-4xx", {"P1": -1})
+    check("TC-6-원장", ok is False and status_of("doc-4xx") == D.STATUS_FAILED,
+          f"거부 → failed ({status_of('doc-4xx')})")
+    err = LEDGER.entry_for("doc-4xx")["server_ack"] or {}
+    check("TC-6-사유", err.get("status") == 400, f"거부 상태코드 기록 ({err.get('status')})")
+    ok = deduct("doc-4xx", {"P1": 1})
+    check("TC-6-재요청", ok is True and status_of("doc-4xx") == D.STATUS_ACKED
+          and LEDGER.entry_for("doc-4xx")["attempts"] == 2, "failed 문서는 새 요청으로 다시 차감")
+
+    # ─── TC-7: 연결 실패 → pending ─────────────────────────────────
+    print("\n[TC-7] 연결 실패")
+    L.SAMMIRACK_SERVER_URL = closed_port_url()
+    try:
+        ok = deduct("doc-conn", {"P1": 1})
+        check("TC-7-원장", ok is False and status_of("doc-conn") == D.STATUS_PENDING,
+              f"연결 실패 → pending ({status_of('doc-conn')})")
+        ok = deduct("doc-conn", {"P1": 1})
+        check("TC-7-확인실패", ok is False and status_of("doc-conn") == D.STATUS_PENDING,
+              "반영 확인도 실패 → 보류 (pending 유지)")
+    finally:
+        L.SAMMIRACK_SERVER_URL = MOCK_URL
+    ok = deduct("doc-conn", {"P1": 1})
+    check("TC-7-재전송없음", ok is False and server_deductions("doc-conn") == 0,
+          "서버 복구 후에도 근거 없으면 재전송 안 함")
+
+    # ─── TC-8: resolve_pending / reconcile ─────────────────────────
+    print("\n[TC-8] reconcile")
+    MOCK.store.deduct({"P1": 1}, "doc-conn", "smartstore-listener")
+    resolved = D.resolve_pending(LEDGER, MOCK_URL)
+    check("TC-8-resolve", resolved == {"doc-conn": D.STATUS_ACKED} and status_of("doc-conn") == D.STATUS_ACKED,
+          f"서버 근거 있는 pending → acked ({resolved})")
+
+    live = D.fetch_live_inventory(MOCK_URL)
+    report = D.reconcile(LEDGER, MOCK_INVENTORY, live)
+    check("TC-8-일치", report["drift"] == [] and report["pending"] == [] and report["unknown_parts"] == [],
+          f"원장 acked 합계 = 서버 재고 차이 (drift={report['drift']})")
+
+    LEDGER.record_pending("doc-ghost", {"P2": 2})
+    LEDGER.mark_acked("doc-ghost", {"results": None})   # 원장만 acked, 서버엔 없음
+    LEDGER.record_pending("doc-unknown", {"P9": 1})
+    report = D.reconcile(LEDGER, MOCK_INVENTORY, D.fetch_live_inventory(MOCK_URL))
+    drift = {d["partId"]: d for d in report["drift"]}
+    check("TC-8-drift", set(drift) == {"P2"} and drift["P2"]["expected"] == 2 and drift["P2"]["diff"] == 2,
+          f"서버 미반영 차감 → P2 drift +2 ({drift.get('P2')})")
+    check("TC-8-pending", report["pending"] == ["doc-unknown"], f"pending 목록 ({report['pending']})")
+    report = D.reconcile(LEDGER, MOCK_INVENTORY, None)
+    check("TC-8-라이브없음", all(d["live"] is None and d["diff"] is None for d in report["drift"]),
+          "라이브 재고 없이도 기대 재고 목록 반환")
+
+    check("TC-9-이중차감", MOCK.store.summary()["double_deducted_docs"] == [], "서버 이중 차감 문서 없음")
+
+    # ─── 결과 ─────────────────────────────────────────────────────────
+    print(f"\n{'='*70}")
+    print(f"결과: ✅ PASS={PASS}  ❌ FAIL={FAIL}  총 {PASS + FAIL}건")
+    print(f"{'='*70}")
+
+    if FAIL > 0:
+        print(f"\n[실패 상세 ({FAIL}건)]")
+        for tid, s, msg, ok in TESTS:
+            if not ok:
+                print(f"  {s} [{tid}] {msg}")
+
+    return FAIL == 0
+
+
+if __name__ == "__main__":
+    try:
+        ok = run_all()
+    finally:
+        MOCK.shutdown()
+        MOCK.store.close()
+        LEDGER.close()
+        for path in (MOCK.db_path, LEDGER_PATH, LEDGER_PATH + "-wal", LEDGER_PATH + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+    sys.exit(0 if ok else 1)
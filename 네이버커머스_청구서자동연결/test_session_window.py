@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+test_session_window.py
+═══════════════════════════════════════════════════════════════════════
+주문번호 세션 창 검증: SessionWindow (ss_pipeline.grouping) +
+리스너 open_sessions.json 보존/복원 (임시 디렉터리, 네트워크 호출 없음)
+
+  grace 만료 / 두 폴링에 나뉜 장바구니 / 닫힌 세션의 늦은 행 /
+  max_open 초과 방출 / 재시작 후 대기 세션 복원
+═══════════════════════════════════════════════════════════════════════
+"""
+import sys, io, os, json, shutil, tempfile, logging
+sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+sys.path.insert(0, '.')
+
+# 리스너 생성자가 서버 주소를 들고 있으므로 운영 서버 대신 닫힌 로컬 주소
+os.environ["SAMMIRACK_SERVER_URL"] = "http://127.0.0.1:9/api"
+
+from listener_metrics import SESSIONS_EVICTED, SESSIONS_LATE, SESSIONS_OPEN
+from ss_pipeline.grouping import SessionWindow, session_key
+from ss_pipeline.stages import WindowedSessionGrouper
+import order_listener as L
+
+L.ENABLE_PAYLOAD_LOGGING = False   # 생성자가 order_logs 에 페이로드 로그를 만들지 않도록
+logging.getLogger("sammirack.listener").setLevel(logging.CRITICAL)
+
+PASS = 0
+FAIL = 0
+TESTS = []
+
+def check(test_id, condition, msg):
+    global PASS, FAIL
+    status = "✅" if condition else "❌"
+    if not condition:
+        FAIL += 1
+    else:
+        PASS += 1
+    TESTS.append((test_id, status, msg, condition))
+    print(f"  {status} [{test_id}] {msg}")
+
+
+def row(order_id, product_order_id, buyer="홍길동", paid="2026-03-05T10:00:30.000+09:00"):
+    return {
+        "주문번호": order_id, "상품주문번호": product_order_id, "구매자명": buyer,
+        "상품명": "하이랙 선반", "옵션": "색상: 메트그레이(볼트식)", "주문수량": 1, "최종금액": 10000,
+        "수취인명": buyer, "연락처": "010-0000-0000", "배송지": "서울", "결제완료시각": paid,
+    }
+
+
+def ids(group):
+    return sorted(r["상품주문번호"] for r in group)
+
+
+def run_all():
+    print("=" * 70)
+    print("세션 창 (SessionWindow) / 대기 세션 복원 검증")
+    print("=" * 70)
+
+    # ─── TC-1: grace 만료 ──────────────────────────────────────────
+    print("\n[TC-1] grace 만료")
+    w = SessionWindow(grace_seconds=60)
+    w.add([row("O1", "P1-1"), row("O1", "P1-2")], now=100.0)
+    check("TC-1-대기", w.drain(now=159.9) == [] and len(w) == 1, "창 열린 동안(59.9초) 방출 없음")
+    groups = w.drain(now=160.0)
+    check("TC-1-방출", [ids(g) for g in groups] == [["P1-1", "P1-2"]], f"grace 경과 → 1그룹 1회 방출 ({[ids(g) for g in groups]})")
+    check("TC-1-1회", w.drain(now=500.0) == [] and len(w) == 0 and w.pending() == [], "다시 방출되지 않음")
+    check("TC-1-게이지", SESSIONS_OPEN.value() == 0, "listener_sessions_open = 0")
+
+    # ─── TC-2: 두 폴링에 나뉜 장바구니 ─────────────────────────────
+    print("\n[TC-2] 두 폴링에 나뉜 장바구니 (결제 분 경계 포함)")
+    w = SessionWindow(grace_seconds=60)
+    w.add([row("O2", "P2-1", paid="2026-03-05T10:00:59.000+09:00")], now=100.0)
+    check("TC-2-첫폴링", w.drain(now=130.0) == [], "첫 폴링 뒤 방출 없음")
+    w.add([row("O2", "P2-2", paid="2026-03-05T10:01:01.000+09:00"), row("O2", "P2-1", paid="2026-03-05T10:00:59.000+09:00")], now=130.0)
+    check("TC-2-마감", w.drain(now=159.9) == [], "마감은 처음 본 시각 + grace (두 번째 폴링으로 연장 안 됨)")
+    groups = w.drain(now=160.0)
+    check("TC-2-합침", [ids(g) for g in groups] == [["P2-1", "P2-2"]],
+          f"다음 폴링 행과 합쳐 1그룹, 재수신 행은 1번만 ({[ids(g) for g in groups]})")
+
+    # ─── TC-3: 닫힌 세션의 늦은 행 ─────────────────────────────────
+    print("\n[TC-3] 이미 방출한 주문번호의 늦은 행")
+    late_before = SESSIONS_LATE.value()
+    w.add([row("O2", "P2-3")], now=200.0)
+    check("TC-3-지표", SESSIONS_LATE.value() == late_before + 1, "listener_sessions_late_total +1")
+    check("TC-3-대기", w.drain(now=259.0) == [] and len(w) == 1, "버리지 않고 새 창으로 엶")
+    groups = w.drain(now=260.0)
+    check("TC-3-방출", [ids(g) for g in groups] == [["P2-3"]], f"늦은 행만 따로 방출 ({[ids(g) for g in groups]})")
+
+    # ─── TC-4: max_open 초과 방출 ──────────────────────────────────
+    print("\n[TC-4] max_open 초과")
+    evicted_before = SESSIONS_EVICTED.value()
+    w = SessionWindow(grace_seconds=60, max_open=2)
+    w.add([row("O4a", "P4a")], now=100.0)
+    w.add([row("O4b", "P4b")], now=101.0)
+    w.add([row("O4c", "P4c")], now=102.0)
+    check("TC-4-상한", len(w) == 2, f"열린 세션 2개 유지 ({len(w)})")
+    check("TC-4-지표", SESSIONS_EVICTED.value() == evicted_before + 1, "listener_sessions_evicted_total +1")
+    check("TC-4-보존", sorted(r["상품주문번호"] for r in w.pending()) == ["P4a", "P4b", "P4c"],
+          "일찍 닫힌 그룹도 pending() 에 포함 (재시작 보존)")
+    groups = w.drain(now=102.0)
+    check("TC-4-가장오래된", [ids(g) for g in groups] == [["P4a"]], f"가장 오래된 그룹부터 일찍 방출 ({[ids(g) for g in groups]})")
+    groups = w.drain(now=0.0, force=True)
+    check("TC-4-force", [ids(g) for g in groups] == [["P4b"], ["P4c"]], "force → 남은 그룹 전부, 처음 본 순서")
+
+    # ─── TC-5: 주문번호 없는 행 (구 CSV) ───────────────────────────
+    print("\n[TC-5] 주문번호 없는 행")
+    check("TC-5-키", session_key(row("", "P5-1")) == session_key(row("", "P5-2", paid="2026-03-05T10:00:01.000+09:00"))
+          != session_key(row("", "P5-3", paid="2026-03-05T10:01:00.000+09:00")), "구매자 + 결제 분 단위로 묶음")
+
+    # ─── TC-6: 재시작 후 대기 세션 복원 ────────────────────────────
+    print("\n[TC-6] open_sessions.json 보존 / 복원")
+    log_dir = tempfile.mkdtemp(prefix="test_session_window_")
+    try:
+        def listener():
+            lst = L.OrderListener(grouper=WindowedSessionGrouper(grace_seconds=60), sinks=[])
+            lst.log_dir = log_dir
+            lst.emitted = []
+            lst.process_order_group = lst.emitted.append
+            return lst
+
+        path = os.path.join(log_dir, L.OPEN_SESSIONS_FILENAME)
+        first = listener()
+        first._emit_groups(first.grouper.group([row("O6", "P6-1"), row("O7", "P7-1")]))
+        first._save_open_sessions()
+        saved = json.load(open(path, encoding="utf-8")) if os.path.exists(path) else []
+        check("TC-6-저장", sorted(r.get("상품주문번호") for r in saved) == ["P6-1", "P7-1"],
+              f"창에 남은 행 저장 ({len(saved)}행)")
+        mtime = os.stat(path).st_mtime_ns
+        first._save_open_sessions()
+        check("TC-6-변경시만", os.stat(path).st_mtime_ns == mtime, "바뀐 게 없으면 다시 쓰지 않음")
+        # 강제 종료 (drain / _shutdown 없이)
+
+        second = listener()
+        second._restore_open_sessions()
+        check("TC-6-본것등록", {"P6-1", "P7-1"} <= second._seen_ids, "복원 행을 본 것으로 등록 (초기화 폴링이 건너뜀)")
+        check("TC-6-창대기", second.emitted == [] and len(second.grouper.window) == 2, "복원 즉시 방출하지 않고 창에 다시 넣음")
+        second.grouper.group([row("O6", "P6-2")])
+        groups = second.grouper.drain(force=True)
+        second._emit_groups(groups)
+        check("TC-6-이어처리", sorted(ids(g) for g in second.emitted) == [["P6-1", "P6-2"], ["P7-1"]],
+              f"재시작 뒤 도착한 같은 장바구니 행과 합쳐 방출 ({[ids(g) for g in second.emitted]})")
+        second._save_open_sessions()
+        check("TC-6-정리", not os.path.exists(path), "창이 비면 open_sessions.json 삭제")
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("[{\"상품주문번호\": ")
+        third = listener()
+        third._restore_open_sessions()
+        check("TC-6-손상", third.emitted == [] and len(third.grouper.window) == 0, "깨진 파일은 로그만 남기고 무시")
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+    # ─── 결과 ─────────────────────────────────────────────────────────
+    print(f"\n{'='*70}")
+    print(f"결과: ✅ PASS={PASS}  ❌ FAIL={FAIL}  총 {PASS + FAIL}건")
+    print(f"{'='*70}")
+
+    if FAIL > 0:
+        print(f"\n[실패 상세 ({FAIL}건)]")
+        for tid, s, msg, ok in TESTS:
+            if not ok:
+                print(f"  {s} [{tid}] {msg}")
+
+    return FAIL == 0
+
+
+if __name__ == "__main__":
+    ok = run_all()
+    sys.exit(0 if ok else 1)
@@ -12,20 +12,21 @@ verify_ss_doc_regeneration.py
 4. items/materials 행 수와 각 주문행의 main/addon 분류 결과 출력
 """
 import argparse
-import csv
 import glob
 import io
 import json
 import os
-import sqlite3
 import sys
-from urllib.request import urlopen
 
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-import order_listener as listener
-from order_listener import build_grouped_document, classify_row, group_orders_by_session
+import api_transport
+from document_store import SqliteDocumentStore, normalize_documents
+from order_csv_log import iter_order_rows
+from ss_pipeline import build_grouped_document, classify_row, group_orders_by_session, set_admin_prices
+from ss_pipeline.grouping import _dedupe_group_rows
+from ss_pipeline.regen import RegenEngine
 
 
 ORDER_FIELDS = [
@@ -89,6 +90,12 @@ def parse_args():
         default=10,
         help="API 조회 타임아웃 초",
     )
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="전체 그룹 재생성 워커 프로세스 수 (0=CPU 수, 1=단일 프로세스)",
+    )
     return p.parse_args()
 
 
@@ -121,27 +128,18 @@ def prime_admin_prices_cache():
     ]
     for path in candidates:
         raw = _load_json_if_exists(path)
-        if raw is None:
-            continue
-        if isinstance(raw, dict):
-            listener._ADMIN_PRICES_CACHE = raw
+        if isinstance(raw, (dict, list)):
+            set_admin_prices(raw)
             return path
-        if isinstance(raw, list):
-            cache = {}
-            for item in raw:
-                pid = item.get("part_id") or item.get("partId") or ""
-                if pid:
-                    cache[pid] = item
-            listener._ADMIN_PRICES_CACHE = cache
-            return path
-    listener._ADMIN_PRICES_CACHE = {}
+    set_admin_prices({})
     return ""
 
 
 def load_documents_from_api(api_base, timeout_seconds):
     url = "{}/documents".format(api_base.rstrip("/"))
-    with urlopen(url, timeout=timeout_seconds) as resp:
-        return json.loads(resp.read().decode("utf-8"))
+    resp = api_transport.get(url, "documents_fetch", timeout=timeout_seconds)
+    resp.raise_for_status()
+    return resp.json()
 
 
 def load_documents_from_json(path):
@@ -150,76 +148,9 @@ def load_documents_from_json(path):
 
 
 def load_documents_from_sqlite(db_path):
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    try:
-        tables = {
-            row["name"]
-            for row in conn.execute(
-                "SELECT name FROM sqlite_master WHERE type='table'"
-            ).fetchall()
-        }
-        if "documents" not in tables:
-            raise RuntimeError(
-                "documents 테이블이 없습니다. 현재 테이블: {}".format(
-                    ", ".join(sorted(tables)) if tables else "(없음)"
-                )
-            )
-        rows = conn.execute(
-            """
-            SELECT doc_id, type, date, document_number, company_name, biz_number,
-                   items, materials, subtotal, tax, total_amount, notes, top_memo,
-                   created_at, updated_at, deleted
-            FROM documents
-            ORDER BY date DESC
-            """
-        ).fetchall()
-    finally:
-        conn.close()
-
-    documents = {}
-    for row in rows:
-        doc_id = row["doc_id"]
-        documents[doc_id] = {
-            "doc_id": doc_id,
-            "id": doc_id,
-            "type": row["type"],
-            "date": row["date"],
-            "document_number": row["document_number"],
-            "documentNumber": row["document_number"],
-            "company_name": row["company_name"],
-            "companyName": row["company_name"],
-            "biz_number": row["biz_number"],
-            "bizNumber": row["biz_number"],
-            "items": _safe_json_loads(row["items"], []),
-            "materials": _safe_json_loads(row["materials"], []),
-            "subtotal": row["subtotal"],
-            "tax": row["tax"],
-            "total_amount": row["total_amount"],
-            "totalAmount": row["total_amount"],
-            "notes": row["notes"],
-            "top_memo": row["top_memo"],
-            "topMemo": row["top_memo"],
-            "created_at": row["created_at"],
-            "createdAt": row["created_at"],
-            "updated_at": row["updated_at"],
-            "updatedAt": row["updated_at"],
-            "deleted": row["deleted"],
-        }
-    return documents
-
-
-def normalize_documents(raw):
-    if isinstance(raw, dict):
-        return raw
-    if isinstance(raw, list):
-        normalized = {}
-        for doc in raw:
-            doc_id = doc.get("doc_id") or doc.get("id") or ""
-            if doc_id:
-                normalized[doc_id] = doc
-        return normalized
-    return {}
+    # 읽기 전용 연결 + items/materials 지연 디코딩 (일치하는 문서만 파싱됨)
+    with SqliteDocumentStore(db_path, readonly=True) as store:
+        return store.load_documents()
 
 
 def find_documents_by_number(documents, document_number):
@@ -232,21 +163,19 @@ def find_documents_by_number(documents, document_number):
             copied["items"] = _safe_json_loads(copied.get("items"), [])
             copied["materials"] = _safe_json_loads(copied.get("materials"), [])
             matches.append(copied)
+    # 같은 번호가 여럿이면 최신 문서 우선 (저장소 순회 순서에 의존하지 않음)
+    matches.sort(key=lambda d: str(d.get("date") or ""), reverse=True)
     return matches
 
 
 def load_orders_from_csv(csv_path):
-    orders = []
-    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
-        reader = csv.reader(f)
-        try:
-            next(reader)
-        except StopIteration:
-            return orders
-        for row in reader:
-            if len(row) < len(ORDER_FIELDS):
-                continue
-            orders.append(dict(zip(ORDER_FIELDS, row[: len(ORDER_FIELDS)])))
+    # 중복 헤더는 건너뛰고, 잘린 행은 조용히 버리지 않고 경고 출력
+    problems = []
+    orders = list(iter_order_rows(csv_path, ORDER_FIELDS, problems))
+    for line_no, reason, _row in problems:
+        if reason == "torn_row":
+            print("  경고: {} {}행 컬럼 수 불일치 → 제외 (order_csv_log.py repair 로 정리)".format(
+                os.path.basename(csv_path), line_no))
     return orders
 
 
@@ -479,6 +408,8 @@ def main():
     print("[기존 문서 로드]")
     print("  source          :", document_source)
     print("  documents       :", len(documents))
+    for line in api_transport.format_transfer_summary():
+        print("  transfer        :", line.strip())
 
     existing_matches = find_documents_by_number(documents, args.document_number)
     existing_doc = existing_matches[0] if existing_matches else None
@@ -498,11 +429,11 @@ def main():
         return
 
     groups = group_orders_by_session(all_orders)
+    payloads = RegenEngine(workers=args.workers or None).build_documents(groups)
     candidates = []
-    for group in groups:
-        deduped_group = listener._dedupe_group_rows(group)
-        payload = build_grouped_document(group)
+    for group, payload in zip(groups, payloads):
         if payload.get("document_number") == args.document_number:
+            deduped_group = _dedupe_group_rows(group)
             candidates.append({
                 "group": deduped_group,
                 "payload": payload,
@@ -514,7 +445,7 @@ def main():
     if existing_order_id:
         forced_group = find_group_by_order_id(groups, existing_order_id)
         if forced_group is not None:
-            deduped_group = listener._dedupe_group_rows(forced_group)
+            deduped_group = _dedupe_group_rows(forced_group)
             forced_payload = build_grouped_document(forced_group)
             forced_doc_id = forced_payload.get("doc_id", "")
             if not any(c["payload"].get("doc_id") == forced_doc_id for c in candidates):